@@ -1,5 +1,8 @@
 import threading
-from queue import Queue
+import itertools
+import glob
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
 from flask import Flask, request, jsonify, render_template, redirect, url_for
 import os
 import logging
@@ -28,6 +31,13 @@ from urllib3.util.retry import Retry
 # Application logging and configuration (adjust these as needed)
 from app_logging import MONITOR_LOG
 from config import config, load_config, load_flask_config
+from database import (
+    save_download_task,
+    update_download_task,
+    get_download_tasks,
+    delete_download_tasks,
+    prune_download_tasks
+)
 
 # Load config and initialize Flask app.
 app = Flask(__name__)
@@ -57,6 +67,12 @@ DOWNLOAD_DIR = watch
 if not os.path.exists(DOWNLOAD_DIR):
     os.makedirs(DOWNLOAD_DIR)
 
+# Partial downloads live in a hidden folder: monitor.py skips hidden directories
+# when processing and when cleaning up orphan temp files, so resumable .part
+# files survive both a live transfer and a restart
+PARTIALS_DIR = os.path.join(DOWNLOAD_DIR, ".partials")
+os.makedirs(PARTIALS_DIR, exist_ok=True)
+
 # Default headers for HTTP requests.
 default_headers = {
     "User-Agent": (
@@ -148,11 +164,291 @@ def resolve_final_url(url: str, *, hdrs=headers, max_hops: int = 6) -> str:
 # -------------------------------
 # QUEUE AND WORKER THREAD SETUP (for non-scrape downloads)
 # -------------------------------
-download_queue = Queue()
+# Lower numbers run first; ties run oldest first
+PRIORITY_USER = 0        # Browser extension and downloads started from the UI
+PRIORITY_SCHEDULED = 10  # Pull list and weekly pack automation
+DOWNLOAD_HISTORY_DAYS = 7
+
+
+def get_download_host(url):
+    """Host class a (resolved) download URL is routed and throttled under."""
+    url = url.lower()
+    if "pixeldrain.com" in url:
+        return 'pixeldrain'
+    if "comicbookplus.com" in url:
+        return 'comicbookplus'
+    if "mega.nz" in url or "mega.co.nz" in url:
+        return 'mega'
+    if "comicfiles.ru" in url or "getcomics" in url:   # GetComics' direct host
+        return 'getcomics'
+    return 'other'
+
+
+def parse_host_limits(value):
+    """Parse DOWNLOAD_HOST_LIMITS ("pixeldrain:2,mega:1") into {host: limit}."""
+    limits = {}
+    for item in value.split(','):
+        host, _, limit = item.partition(':')
+        try:
+            limits[host.strip().lower()] = max(1, int(limit))
+        except ValueError:
+            if item.strip():
+                monitor_logger.warning(f"Ignoring invalid DOWNLOAD_HOST_LIMITS entry: {item}")
+    return limits
+
+
+class BandwidthLimiter:
+    """
+    Token bucket shared by every download thread, enforcing
+    DOWNLOAD_BANDWIDTH_LIMIT_MB across all hosts. Downloaders call consume()
+    after writing each chunk; a rate of 0 disables the cap.
+    """
+
+    def __init__(self, bytes_per_second):
+        self.rate = bytes_per_second
+        self.lock = threading.Lock()
+        self.allowance = 0.0
+        self.last = time.monotonic()
+
+    def consume(self, nbytes):
+        if self.rate <= 0 or nbytes <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            # Refill, allowing at most one second of burst
+            self.allowance = min(self.rate, self.allowance + (now - self.last) * self.rate)
+            self.last = now
+            self.allowance -= nbytes
+            wait = -self.allowance / self.rate if self.allowance < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class DownloadScheduler:
+    """
+    Priority queue of download tasks, persisted in the download_queue table.
+
+    Workers take the highest-priority task whose host is below its
+    DOWNLOAD_HOST_LIMITS slot count, so a slow Mega transfer holds a Mega
+    slot instead of the worker GetComics jobs are waiting for. A task's host
+    is only known once its URL is resolved: workers resolve unresolved tasks
+    first and put them back in their place if that host turns out to be full.
+    """
+
+    def __init__(self, num_workers, host_limits):
+        self.num_workers = num_workers
+        self.host_limits = host_limits
+        self.cond = threading.Condition()
+        self.pending = {}  # download_id -> task
+        self.active = Counter()
+        self.seq = itertools.count()
+        self.stopping = False
+        self.workers = []
+
+    def start(self):
+        for i in range(self.num_workers):
+            t = threading.Thread(target=self._run, daemon=True, name=f"DownloadWorker-{i}")
+            t.start()
+            self.workers.append(t)
+
+    def stop(self, timeout=5):
+        """Stop taking new tasks; unfinished ones stay in the database for the next start."""
+        with self.cond:
+            self.stopping = True
+            self.cond.notify_all()
+        for t in self.workers:
+            t.join(timeout)
+
+    def submit(self, task, persist=True):
+        task.setdefault('priority', PRIORITY_USER)
+        task['seq'] = next(self.seq)
+        if persist:
+            save_download_task(task)
+        with self.cond:
+            self.pending[task['download_id']] = task
+            self.cond.notify()
+
+    def reprioritize(self, download_id, priority):
+        """Change the priority of a queued task; returns False if it is not queued."""
+        with self.cond:
+            task = self.pending.get(download_id)
+            if task is None:
+                return False
+            task['priority'] = priority
+            self.cond.notify()
+        update_download_task(download_id, priority=priority)
+        return True
+
+    def discard(self, download_id):
+        """Drop a queued task; returns False if it is not queued."""
+        with self.cond:
+            return self.pending.pop(download_id, None) is not None
+
+    @staticmethod
+    def _cancelled(task):
+        return download_progress.get(task['download_id'], {}).get('cancelled')
+
+    def _has_slot(self, host):
+        limit = self.host_limits.get(host)
+        return limit is None or self.active[host] < limit
+
+    def _take(self):
+        """Wait for the next runnable task; claims its host slot if already resolved."""
+        with self.cond:
+            while not self.stopping:
+                for task in sorted(self.pending.values(), key=lambda t: (t['priority'], t['seq'])):
+                    # Checked here, under the lock, so a cancelled task never holds a host slot
+                    if self._cancelled(task):
+                        del self.pending[task['download_id']]
+                        continue
+                    if task.get('final_url') is None:
+                        del self.pending[task['download_id']]
+                        return task
+                    if self._has_slot(task['host']):
+                        del self.pending[task['download_id']]
+                        self.active[task['host']] += 1
+                        return task
+                self.cond.wait()
+            return None
+
+    def _resolve(self, task):
+        use_headers = basic_headers if task.get('internal') else headers
+        task['final_url'] = resolve_final_url(task['url'], hdrs=use_headers)
+        task['host'] = get_download_host(task['final_url'])
+        monitor_logger.info(f"Resolved → {task['final_url']} (host={task['host']}, internal={task.get('internal', False)})")
+        update_download_task(task['download_id'], final_url=task['final_url'], host=task['host'])
+
+    def _claim(self, task):
+        """Take a host slot for a freshly resolved task, or put it back in the queue."""
+        with self.cond:
+            if self._cancelled(task):
+                return False
+            if self._has_slot(task['host']):
+                self.active[task['host']] += 1
+                return True
+            self.pending[task['download_id']] = task
+            return False
+
+    def _run(self):
+        while True:
+            task = self._take()
+            if task is None:
+                return
+            download_id = task['download_id']
+            if task.get('final_url') is None:
+                self._resolve(task)
+                if not self._claim(task):
+                    continue
+            download_progress.setdefault(download_id, {})['host'] = task['host']
+            update_download_task(download_id, status='in_progress')
+            try:
+                process_download(task)
+            finally:
+                with self.cond:
+                    self.active[task['host']] -= 1
+                    self.cond.notify_all()
+                details = download_progress.get(download_id, {})
+                update_download_task(download_id, status=details.get('status'),
+                                     filename=details.get('filename'), error=details.get('error'))
+
+    def status(self):
+        with self.cond:
+            return {
+                'queued': len(self.pending),
+                'active': {host: count for host, count in self.active.items() if count},
+                'host_limits': self.host_limits,
+                'workers': self.num_workers
+            }
+
+
+def enqueue_download(url, dest_filename=None, internal=False, weekly_pack_info=None, priority=PRIORITY_USER):
+    """
+    Queue a download.
+
+    Args:
+        url: Download URL (resolved by the worker that picks it up)
+        dest_filename: Optional destination filename
+        internal: Use basic headers (Pull List, Weekly Packs, UI searches) instead of custom headers
+        weekly_pack_info: Optional dict (pack_date, publisher, format) for weekly pack status updates
+        priority: Lower runs first (PRIORITY_USER, PRIORITY_SCHEDULED)
+
+    Returns:
+        The new download id
+    """
+    download_id = str(uuid.uuid4())
+    download_progress[download_id] = {
+        'url': url,
+        'progress': 0,
+        'bytes_total': 0,
+        'bytes_downloaded': 0,
+        'status': 'queued',
+        'filename': dest_filename,
+        'error': None,
+        'priority': priority,
+    }
+    download_scheduler.submit({
+        'download_id': download_id,
+        'url': url,
+        'dest_filename': dest_filename,
+        'internal': internal,
+        'weekly_pack_info': weekly_pack_info,
+        'priority': priority
+    })
+    return download_id
+
+
+def restore_download_queue():
+    """
+    Reload download history and re-queue downloads a restart interrupted.
+
+    Downloads that were in progress start over from their original URL, as
+    resolved links (PixelDrain sessions, GetComics mirrors) may have expired.
+    """
+    pruned = prune_download_tasks(DOWNLOAD_HISTORY_DAYS)
+    if pruned:
+        monitor_logger.info(f"Pruned {pruned} old download records")
+
+    # Partial files nothing has resumed for as long as history is kept
+    cutoff = time.time() - DOWNLOAD_HISTORY_DAYS * 86400
+    for entry in os.scandir(PARTIALS_DIR):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+            except OSError as e:
+                monitor_logger.warning(f"Failed to remove stale partial download {entry.path}: {e}")
+
+    requeued = 0
+    for task in get_download_tasks():
+        download_id = task['download_id']
+        if download_id in download_progress:
+            continue
+        unfinished = task['status'] in ('queued', 'in_progress')
+        download_progress[download_id] = {
+            'url': task['url'],
+            'progress': 0 if unfinished else (100 if task['status'] == 'complete' else -1),
+            'bytes_total': 0,
+            'bytes_downloaded': 0,
+            'status': 'queued' if unfinished else task['status'],
+            'filename': task['filename'] or task['dest_filename'],
+            'error': task['error'],
+            'priority': task['priority'],
+        }
+        if unfinished:
+            task['final_url'] = task['host'] = None
+            update_download_task(download_id, status='queued')
+            download_scheduler.submit(task, persist=False)
+            requeued += 1
+
+    if requeued:
+        monitor_logger.info(f"Restored {requeued} unfinished download(s) from the queue")
+    return requeued
+
 
 def process_download(task):
     download_id = task['download_id']
     original_url  = task['url']
+    final_url = task['final_url']
+    host = task['host']
     dest_filename = task.get('dest_filename')
     internal = task.get('internal', False)
     weekly_pack_info = task.get('weekly_pack_info')  # Optional: for weekly pack status updates
@@ -180,25 +476,22 @@ def process_download(task):
             monitor_logger.error(f"Error updating weekly pack status to downloading: {e}")
 
     try:
-        final_url = resolve_final_url(original_url, hdrs=use_headers)
-        monitor_logger.info(f"Resolved → {final_url} (internal={internal})")
-
-        if "pixeldrain.com" in final_url:
+        if host == 'pixeldrain':
             monitor_logger.debug(f"Routing to: download_pixeldrain")
             file_path = download_pixeldrain(final_url, download_id, dest_filename, hdrs=use_headers)
-        elif "comicbookplus.com" in final_url:
+        elif host == 'comicbookplus':
             monitor_logger.debug(f"Routing to: download_comicbookplus")
             file_path = download_comicbookplus(final_url, download_id, dest_filename, hdrs=use_headers)
-        elif "comicfiles.ru" in final_url:              # GetComics' direct host
-            monitor_logger.debug(f"Routing to: download_getcomics (comicfiles.ru)")
-            file_path = download_getcomics(final_url, download_id, hdrs=use_headers)
-        elif "mega.nz" in final_url or "mega.co.nz" in final_url:  # MEGA
+        elif host == 'mega':
             monitor_logger.debug(f"Routing to: download_mega")
             file_path = download_mega(final_url, download_id, dest_filename, hdrs=use_headers)
-        else:                                           # fall-back
-            monitor_logger.debug(f"Routing to: download_getcomics (fallback)")
+        else:                                           # comicfiles.ru and fall-back
+            monitor_logger.debug(f"Routing to: download_getcomics ({host})")
             file_path = download_getcomics(final_url, download_id, hdrs=use_headers)
 
+        if file_path is None and download_progress[download_id].get('cancelled'):
+            return
+
         download_progress[download_id]['filename'] = file_path
         download_progress[download_id]['status']   = 'complete'
 
@@ -228,7 +521,9 @@ def process_download(task):
                 for _ in range(30):
                     time.sleep(10)
                     total = 0
-                    for root, _, files in os.walk(watch_dir):
+                    for root, dirs, files in os.walk(watch_dir):
+                        # Skip hidden folders such as PARTIALS_DIR
+                        dirs[:] = [d for d in dirs if not (d.startswith('.') or d.startswith('_'))]
                         for f in files:
                             if f.startswith('.') or f.startswith('_'):
                                 continue
@@ -265,20 +560,338 @@ def process_download(task):
             except Exception as e2:
                 monitor_logger.error(f"Error updating weekly pack status to failed: {e2}")
 
-def worker():
+# Start the download workers; restore_download_queue() refills the queue once the database is ready.
+bandwidth_limiter = BandwidthLimiter(
+    config.getfloat("SETTINGS", "DOWNLOAD_BANDWIDTH_LIMIT_MB", fallback=0) * 1024 * 1024)
+download_scheduler = DownloadScheduler(
+    max(1, config.getint("SETTINGS", "DOWNLOAD_WORKERS", fallback=3)),
+    parse_host_limits(config.get("SETTINGS", "DOWNLOAD_HOST_LIMITS",
+                                 fallback="pixeldrain:2,mega:1,getcomics:2,comicbookplus:1")))
+download_scheduler.start()
+
+# -------------------------------
+# Resumable Transfers
+# -------------------------------
+TRANSFER_CHUNK = 1024 * 1024  # 1 MiB: small enough to notice a cancel quickly
+RESUME_RETRIES = 5            # consecutive failed attempts without any new bytes
+
+
+class DownloadCancelled(Exception):
+    """The user cancelled the download (or a sibling segment failed)."""
+
+
+class RangeNotSupported(Exception):
+    """The server answered a segment's Range request with the whole file."""
+
+
+class TransferProgress:
+    """
+    Byte counters for one download, shared by its segment threads and
+    mirrored into download_progress (bytes_downloaded, progress and, in
+    segmented mode, one entry per byte range under 'segments').
+    """
+
+    def __init__(self, download_id, total, ranges=()):
+        self.entry = download_progress.setdefault(download_id, {})
+        self.total = total
+        self.lock = threading.Lock()
+        self.done = 0
+        self.aborted = False
+        self.entry['bytes_total'] = total or 0
+        self.entry['segments'] = [{'start': start, 'end': end, 'bytes_downloaded': 0} for start, end in ranges]
+
+    def stopped(self):
+        return self.aborted or self.entry.get('cancelled')
+
+    def add(self, segment, nbytes):
+        with self.lock:
+            self.done += nbytes
+            if segment is not None:
+                self.entry['segments'][segment]['bytes_downloaded'] += nbytes
+            self.entry['bytes_downloaded'] = self.done
+            if self.total:
+                self.entry['progress'] = int(self.done / self.total * 100)
+
+
+def _segment_ranges(total):
+    """Byte ranges for DOWNLOAD_SEGMENTS parallel connections, or [] for a single stream."""
+    count = config.getint("SETTINGS", "DOWNLOAD_SEGMENTS", fallback=1)
+    min_bytes = config.getint("SETTINGS", "DOWNLOAD_SEGMENT_MIN_MB", fallback=32) * 1024 * 1024
+    if count <= 1 or not total or total < min_bytes:
+        return []
+    size = -(-total // count)
+    return [(start, min(start + size, total) - 1) for start in range(0, total, size)]
+
+
+def get_partial_path(download_id):
+    """
+    Resumable temp file for a download. Keyed by the persisted download_id, not
+    the file name, so two downloads of the same name never share partials.
+    """
+    return os.path.join(PARTIALS_DIR, f"{download_id}.part")
+
+
+def finish_partial(part_path, file_path):
+    """
+    Move a completed partial to file_path without overwriting an existing file;
+    if the name was taken meanwhile, name_1, name_2, ... is used instead.
+
+    Returns:
+        The path the file was saved to
+    """
+    base, ext = os.path.splitext(file_path)
+    counter = 1
     while True:
-        task = download_queue.get()
-        if task is None:  # Shutdown signal if needed.
-            break
-        process_download(task)
-        download_queue.task_done()
+        try:
+            # link() fails instead of replacing when the name exists
+            os.link(part_path, file_path)
+        except FileExistsError:
+            file_path = f"{base}_{counter}{ext}"
+            counter += 1
+            continue
+        except OSError:
+            # No hard links on this filesystem
+            while os.path.exists(file_path):
+                file_path = f"{base}_{counter}{ext}"
+                counter += 1
+            os.replace(part_path, file_path)
+            return file_path
+        os.remove(part_path)
+        return file_path
+
+
+def _response_validator(hdrs):
+    """Strong ETag or Last-Modified of a response, usable in If-Range (None if neither)."""
+    etag = hdrs.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return hdrs.get("Last-Modified")
+
+
+def _discard_partials(part_path):
+    """Delete part_path, its segment files and its .meta sidecar."""
+    _remove_partials(part_path)
+    for path in (part_path, part_path + ".meta"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _check_partials(part_path, validator, total):
+    """
+    Keep partial files from an earlier run only if they belong to the same
+    remote file: the .meta sidecar must hold the same validator and size.
+    A partial without a validator cannot be matched and starts over.
+    """
+    meta_path = part_path + ".meta"
+    if os.path.exists(part_path) or glob.glob(glob.escape(part_path) + ".[0-9]*"):
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+        if not validator or meta.get("validator") != validator or meta.get("total") != total:
+            monitor_logger.info(f"Discarding partial download from a different remote file: {part_path}")
+            _discard_partials(part_path)
+    with open(meta_path, "w") as f:
+        json.dump({"validator": validator, "total": total}, f)
+
+
+def _remove_partials(part_path, keep=()):
+    """Delete segment files (part_path.<offset>) other than those in keep."""
+    for path in glob.glob(glob.escape(part_path) + ".*"):
+        if path.rsplit(".", 1)[-1].isdigit() and path not in keep:
+            try:
+                os.remove(path)
+            except OSError as e:
+                monitor_logger.warning(f"Failed to remove partial download {path}: {e}")
+
+
+def _fetch_range(session, url, path, progress, req_headers, auth, timeout,
+                 start=0, end=None, segment=None, response=None, validator=None):
+    """
+    Write bytes start..end (inclusive, None for "to the end") of url to path.
+
+    Resumes from whatever path already holds and, when a connection drops,
+    continues with a Range request from the last byte written instead of
+    starting over. Gives up after RESUME_RETRIES attempts in a row that
+    added nothing.
+
+    Args:
+        response: Already open response for the whole file, used if path is empty
+        validator: ETag/Last-Modified sent as If-Range, so a changed file
+                   comes back whole (200) instead of being spliced onto path
+
+    Returns:
+        Bytes held in path
+    """
+    expected = end - start + 1 if end is not None else None
+    have = os.path.getsize(path) if os.path.exists(path) else 0
+    if expected is not None and have > expected:
+        os.remove(path)
+        have = 0
+    progress.add(segment, have)
+
+    failures = 0
+    while expected is None or have < expected:
+        before = have
+        try:
+            if response is not None and have:
+                response.close()
+                response = None
+            if response is None:
+                headers = dict(req_headers)
+                if start + have or end is not None:
+                    headers["Range"] = f"bytes={start + have}-{'' if end is None else end}"
+                    if validator:
+                        headers["If-Range"] = validator
+                response = session.get(url, stream=True, headers=headers, auth=auth,
+                                       allow_redirects=True, timeout=timeout)
+                response.raise_for_status()
+                if "Range" in headers and response.status_code != 206:
+                    if segment is not None:
+                        raise RangeNotSupported(f"Server ignored Range for bytes {start}-{end}")
+                    monitor_logger.info("Server did not honor Range (or the file changed); restarting from 0")
+                    open(path, "wb").close()
+                    progress.add(segment, -have)
+                    have = before = 0
+
+            with response, open(path, "ab") as f:
+                for chunk in response.iter_content(chunk_size=TRANSFER_CHUNK):
+                    if progress.stopped():
+                        raise DownloadCancelled()
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    have += len(chunk)
+                    progress.add(segment, len(chunk))
+                    bandwidth_limiter.consume(len(chunk))
+            response = None
+
+            if expected is None:
+                break
+            if have < expected:
+                raise ConnectionError(f"Connection closed after {have} of {expected} bytes")
+
+        except (DownloadCancelled, RangeNotSupported):
+            raise
+        except (RequestException, IncompleteRead) as e:
+            response = None
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            if status and 400 <= status < 500 and status not in (408, 429):
+                raise
+            failures = 0 if have > before else failures + 1
+            if failures >= RESUME_RETRIES:
+                raise Exception(f"Transfer failed after {RESUME_RETRIES} attempts without progress: {e}")
+            delay = min(30, 2 ** failures)
+            monitor_logger.warning(f"Transfer interrupted at byte {start + have} ({e}); resuming in {delay}s")
+            time.sleep(delay)
+
+    if response is not None:
+        response.close()
+    return have
+
+
+def _fetch_segments(session, url, part_path, download_id, total, ranges, req_headers, auth, timeout,
+                    validator=None):
+    """Fetch ranges in parallel into part_path.<offset> files, then join them into part_path."""
+    segment_paths = [f"{part_path}.{start}" for start, _ in ranges]
+    _remove_partials(part_path, keep=segment_paths)  # left over from a different DOWNLOAD_SEGMENTS
+    progress = TransferProgress(download_id, total, ranges)
+    monitor_logger.info(f"Segmented download: {len(ranges)} connections for {total / (1024 * 1024):.1f}MB")
+
+    with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="DownloadSegment") as pool:
+        futures = [pool.submit(_fetch_range, session, url, path, progress, req_headers, auth, timeout,
+                               start, end, i, None, validator)
+                   for i, (path, (start, end)) in enumerate(zip(segment_paths, ranges))]
+        wait(futures, return_when=FIRST_EXCEPTION)
+        # Stop the other segments as soon as one fails
+        if any(f.done() and f.exception() for f in futures):
+            progress.aborted = True
+
+    errors = [f.exception() for f in futures if f.exception()]
+    for error in errors:
+        if not isinstance(error, DownloadCancelled):
+            raise error
+    if errors:
+        raise errors[0]
+
+    # Join in order; if this is interrupted, part_path is a valid prefix and resumes single-stream
+    with open(part_path, "wb") as out:
+        for path in segment_paths:
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, out, TRANSFER_CHUNK)
+    _remove_partials(part_path)
+
+
+def fetch_resumable(session, url, part_path, download_id, req_headers=None, auth=None,
+                    response=None, timeout=(30, 300)):
+    """
+    Download url into part_path, resuming whatever an earlier attempt left there.
+
+    When DOWNLOAD_SEGMENTS > 1 and the server sends "Accept-Ranges: bytes",
+    files of at least DOWNLOAD_SEGMENT_MIN_MB are fetched as that many
+    parallel byte ranges. Partials from an earlier run are reused only when
+    the server still reports the same ETag/Last-Modified, and resumed ranges
+    carry If-Range. The result is checked against Content-Length.
+
+    Args:
+        session: requests.Session to download with
+        url: Download URL
+        part_path: Temporary file the download is written to (see get_partial_path)
+        download_id: Unique identifier for progress tracking
+        req_headers: Request headers
+        auth: Optional requests auth
+        response: Already open streaming response for url (its headers are reused)
+        timeout: requests timeout
+
+    Returns:
+        Size in bytes, or None if the download was cancelled (partial files are removed)
+    """
+    req_headers = {**(req_headers or {}), "Accept-Encoding": "identity"}  # sizes must match Content-Length
+    req_headers.pop("Range", None)
+    try:
+        if response is None:
+            response = session.get(url, stream=True, headers=req_headers, auth=auth,
+                                   allow_redirects=True, timeout=timeout)
+            response.raise_for_status()
+        url = response.url
+        total = _parse_total_from_headers(response.headers, None)
+        if response.headers.get("Content-Encoding", "identity") != "identity":
+            total = None  # Content-Length counts compressed bytes
+        validator = _response_validator(response.headers)
+        _check_partials(part_path, validator, total)
+
+        ranges = []
+        if response.headers.get("Accept-Ranges", "").lower() == "bytes" and not os.path.exists(part_path):
+            ranges = _segment_ranges(total)
+        if ranges:
+            response.close()
+            response = None
+            try:
+                _fetch_segments(session, url, part_path, download_id, total, ranges, req_headers, auth, timeout,
+                                validator)
+            except RangeNotSupported as e:
+                monitor_logger.info(f"{e}; falling back to a single connection")
+                _remove_partials(part_path)
+                ranges = []
+        if not ranges:
+            progress = TransferProgress(download_id, total)
+            _fetch_range(session, url, part_path, progress, req_headers, auth, timeout,
+                         end=total - 1 if total else None, response=response, validator=validator)
+            _remove_partials(part_path)
+
+    except DownloadCancelled:
+        monitor_logger.info(f"Download {download_id} cancelled; deleting partial files.")
+        _discard_partials(part_path)
+        return None
+
+    size = os.path.getsize(part_path)
+    if total and size != total:
+        _discard_partials(part_path)
+        raise Exception(f"Download incomplete: got {size} bytes, expected {total} bytes")
+    os.remove(part_path + ".meta")
+    return size
 
-# Start a few worker threads for processing downloads.
-worker_threads = []
-for i in range(3):
-    t = threading.Thread(target=worker, daemon=True)
-    t.start()
-    worker_threads.append(t)
 
 # -------------------------------
 # Other Download Functions
@@ -286,6 +899,9 @@ for i in range(3):
 def download_getcomics(url, download_id, hdrs=None):
     """Download a file from GetComics or similar direct download hosts.
 
+    The file is written to a .part file under PARTIALS_DIR and resumed with
+    Range requests when the connection drops (see fetch_resumable).
+
     Args:
         url: The download URL
         download_id: Unique identifier for progress tracking
@@ -316,177 +932,101 @@ def download_getcomics(url, download_id, hdrs=None):
     )
     session.mount("http://", adapter)
     session.mount("https://", adapter)
-
-    # Set TCP keepalive and socket options for better performance
     session.headers.update(hdrs)
+    session.headers["Accept-Encoding"] = "identity"  # sizes must match Content-Length
 
+    # Open the transfer; its headers name the file
+    response = None
     for attempt in range(retries):
         try:
             monitor_logger.info(f"Attempt {attempt + 1} to download {url}")
             # Increase timeout for large files: 60s connection, 300s read (5 minutes)
             response = session.get(url, stream=True, timeout=(60, 300))
             response.raise_for_status()
-            if response.status_code in (403, 404):
-                monitor_logger.warning(f"Fatal HTTP error {response.status_code}; aborting retries.")
-                break
-
-
-            final_url = response.url
-            parsed_url = urlparse(final_url)
-            filename = os.path.basename(parsed_url.path)
-            filename = unquote(filename)
-
-            if not filename:
-                filename = str(uuid.uuid4())
-                monitor_logger.info(f"Filename generated from final URL: {filename}")
-
-            content_disposition = response.headers.get("Content-Disposition")
-            if content_disposition:
-                fname_match = re.search('filename="?([^";]+)"?', content_disposition)
-                if fname_match:
-                    filename = unquote(fname_match.group(1))
-                    monitor_logger.info(f"Filename from Content-Disposition: {filename}")
-
-            file_path = os.path.join(DOWNLOAD_DIR, filename)
-            base, ext = os.path.splitext(filename)
-            counter = 1
-            while os.path.exists(file_path):
-                filename = f"{base}_{counter}{ext}"
-                file_path = os.path.join(DOWNLOAD_DIR, filename)
-                counter += 1
-
-            download_progress[download_id]['filename'] = file_path
-            # Create a unique temp file per attempt
-            attempt_suffix = f".{attempt}.crdownload"
-            temp_file_path = file_path + attempt_suffix
-            
-            monitor_logger.info(f"Temp file path: {temp_file_path}")
-            monitor_logger.info(f"Final file path: {file_path}")
-
-            total_length = int(response.headers.get('content-length', 0))
-            download_progress[download_id]['bytes_total'] = total_length
-            downloaded = 0
-
-            # Optimize chunk size based on file size
-            if total_length > 1024 * 1024 * 1024:  # > 1GB: use 4MB chunks
-                chunk_size = 4 * 1024 * 1024
-            elif total_length > 100 * 1024 * 1024:  # > 100MB: use 1MB chunks
-                chunk_size = 1024 * 1024
-            else:  # smaller files: use 256KB chunks
-                chunk_size = 256 * 1024
-
-            monitor_logger.info(f"Downloading {total_length / (1024*1024):.1f}MB using {chunk_size / 1024}KB chunks")
-
-            # Use larger buffer for writing to disk (improves I/O performance)
-            buffer_size = 8 * 1024 * 1024  # 8MB write buffer
-
-            with open(temp_file_path, 'wb', buffering=buffer_size) as f:
-                # Track time for speed calculation
-                start_time = time.time()
-                last_log_time = start_time
-                last_downloaded = 0
-
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    if download_progress.get(download_id, {}).get('cancelled'):
-                        monitor_logger.info(f"Download {download_id} cancelled; deleting temp file.")
-                        f.close()
-                        if os.path.exists(temp_file_path):
-                            os.remove(temp_file_path)
-                        download_progress[download_id]['status'] = 'cancelled'
-                        return None
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        download_progress[download_id]['bytes_downloaded'] = downloaded
-
-                        # Update progress
-                        if total_length > 0:
-                            percent = int((downloaded / total_length) * 100)
-                            download_progress[download_id]['progress'] = percent
-
-                            # Log speed every 10 seconds for large files
-                            current_time = time.time()
-                            if total_length > 100 * 1024 * 1024 and (current_time - last_log_time) >= 10:
-                                speed_mbps = ((downloaded - last_downloaded) / (1024 * 1024)) / (current_time - last_log_time)
-                                monitor_logger.info(f"Download progress: {percent}% ({downloaded / (1024*1024):.1f}MB / {total_length / (1024*1024):.1f}MB) @ {speed_mbps:.2f} MB/s")
-                                last_log_time = current_time
-                                last_downloaded = downloaded
-
-            # Log final download stats
-            total_time = time.time() - start_time
-            avg_speed = (downloaded / (1024 * 1024)) / total_time if total_time > 0 else 0
-            monitor_logger.info(f"Download completed in {total_time:.1f}s @ average {avg_speed:.2f} MB/s")
-
-            # Verify download completed successfully
-            if total_length > 0 and downloaded != total_length:
-                raise Exception(f"Download incomplete: got {downloaded} bytes, expected {total_length} bytes")
-
-            # Verify temp file exists and has expected size
-            if not os.path.exists(temp_file_path):
-                raise Exception(f"Temp file not found: {temp_file_path}")
-
-            temp_file_size = os.path.getsize(temp_file_path)
-            if total_length > 0 and temp_file_size != total_length:
-                raise Exception(f"Temp file size mismatch: {temp_file_size} bytes, expected {total_length} bytes")
-
-            # Rename temp file to final destination
-            try:
-                os.rename(temp_file_path, file_path)
-                monitor_logger.info(f"Successfully renamed temp file to: {file_path}")
-            except Exception as rename_err:
-                monitor_logger.error(f"Failed to rename temp file: {rename_err}")
-                raise
-
-            # Verify final file exists
-            if not os.path.exists(file_path):
-                raise Exception(f"Final file not found after rename: {file_path}")
-
-            download_progress[download_id]['progress'] = 100
-            monitor_logger.info(f"Download completed: {file_path} ({downloaded} bytes)")
-
-            # Clean up session
-            session.close()
-
-            return file_path
-
-        except (ChunkedEncodingError, ConnectionError, IncompleteRead, RequestException, Exception) as e:
+            break
+        except (ChunkedEncodingError, ConnectionError, IncompleteRead, RequestException) as e:
             monitor_logger.warning(f"Attempt {attempt + 1} failed with error: {e}")
             last_exception = e
-
-            # Clean up the attempt-specific temp file
-            if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
-                try:
-                    os.remove(temp_file_path)
-                    monitor_logger.info(f"Cleaned up temp file between retries: {temp_file_path}")
-                except Exception as cleanup_err:
-                    monitor_logger.warning(f"Failed to remove temp file: {cleanup_err}")
-            else:
-                monitor_logger.debug("No temp file to clean up between retries")
-
+            response = None
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            if status in (403, 404):
+                monitor_logger.warning(f"Fatal HTTP error {status}; aborting retries.")
+                break
             # Wait before next retry (exponential backoff)
             if attempt < retries - 1:  # Don't sleep after the last attempt
                 time.sleep(delay * (2 ** attempt))
 
-    # All retries failed - cleanup
-    session.close()
+    if response is None:
+        session.close()
+        monitor_logger.error(f"Download failed after {retries} attempts: {last_exception}")
+        download_progress[download_id]['status'] = 'error'
+        download_progress[download_id]['progress'] = -1
+        raise Exception(f"Download failed after {retries} attempts for {url}: {last_exception}")
+
+    final_url = response.url
+    parsed_url = urlparse(final_url)
+    filename = os.path.basename(parsed_url.path)
+    filename = unquote(filename)
+
+    if not filename:
+        filename = str(uuid.uuid4())
+        monitor_logger.info(f"Filename generated from final URL: {filename}")
+
+    content_disposition = response.headers.get("Content-Disposition")
+    if content_disposition:
+        fname_match = re.search('filename="?([^";]+)"?', content_disposition)
+        if fname_match:
+            filename = unquote(fname_match.group(1))
+            monitor_logger.info(f"Filename from Content-Disposition: {filename}")
+
+    file_path = os.path.join(DOWNLOAD_DIR, filename)
+    base, ext = os.path.splitext(filename)
+    counter = 1
+    while os.path.exists(file_path):
+        filename = f"{base}_{counter}{ext}"
+        file_path = os.path.join(DOWNLOAD_DIR, filename)
+        counter += 1
+
+    download_progress[download_id]['filename'] = file_path
+    # An earlier attempt (or a run before a restart) resumes from this file
+    temp_file_path = get_partial_path(download_id)
+
+    monitor_logger.info(f"Temp file path: {temp_file_path}")
+    monitor_logger.info(f"Final file path: {file_path}")
+
+    total_length = _parse_total_from_headers(response.headers, 0)
+    monitor_logger.info(f"Downloading {total_length / (1024*1024):.1f}MB")
+
+    try:
+        start_time = time.time()
+        downloaded = fetch_resumable(session, final_url, temp_file_path, download_id,
+                                     response=response, timeout=(60, 300))
+        if downloaded is None:
+            download_progress[download_id]['status'] = 'cancelled'
+            return None
 
-    monitor_logger.error(f"Download failed after {retries} attempts: {last_exception}")
-    download_progress[download_id]['status'] = 'error'
-    download_progress[download_id]['progress'] = -1
+        # Log final download stats
+        total_time = time.time() - start_time
+        avg_speed = (downloaded / (1024 * 1024)) / total_time if total_time > 0 else 0
+        monitor_logger.info(f"Download completed in {total_time:.1f}s @ average {avg_speed:.2f} MB/s")
 
-    # Remove leftover crdownload files from all attempts
-    if 'file_path' in locals():
-        for i in range(retries):
-            leftover = file_path + f".{i}.crdownload"
-            if os.path.exists(leftover):
-                try:
-                    os.remove(leftover)
-                except Exception as e:
-                    monitor_logger.warning(f"Failed to remove stale temp file: {leftover} — {e}")
-            else:
-                monitor_logger.debug(f"No leftover temp file to remove: {leftover}")
+        # Rename temp file to final destination
+        file_path = finish_partial(temp_file_path, file_path)
+        download_progress[download_id]['filename'] = file_path
+        monitor_logger.info(f"Successfully renamed temp file to: {file_path}")
 
-    raise Exception(f"Download failed after {retries} attempts for {url}: {last_exception}")
+        download_progress[download_id]['progress'] = 100
+        monitor_logger.info(f"Download completed: {file_path} ({downloaded} bytes)")
+        return file_path
+
+    except Exception as e:
+        # The .part file is kept so a retry of this download resumes from it
+        monitor_logger.error(f"Download failed for {url}: {e}")
+        download_progress[download_id]['status'] = 'error'
+        download_progress[download_id]['progress'] = -1
+        raise Exception(f"Download failed for {url}: {e}")
+    finally:
+        session.close()
 
 # -------------------------------
 # Pixeldrain support
@@ -606,77 +1146,29 @@ def download_pixeldrain(url: str, download_id: str, dest_name: Optional[str] = N
     while os.path.exists(out_path):
         out_path = f"{base}_{n}{ext}"
         n += 1
-    tmp_path = out_path + ".part"
-
-    # 4) resume support
-    existing = os.path.getsize(tmp_path) if os.path.exists(tmp_path) else 0
-    range_header = {"Range": f"bytes={existing}-"} if existing > 0 else {}
+    tmp_path = get_partial_path(download_id)
 
-    # 5) start download (bigger chunks; robust retries)
+    # 4) download with resume (and segments when enabled); an interrupted
+    #    run's .part file is picked up again
     req_headers = {
         **hdrs,
         "Accept": "application/octet-stream",
         "Connection": "keep-alive",
-        "Accept-Encoding": "identity",  # avoid gzip on large binaries
-        **range_header,
     }
 
     monitor_logger.info(
         f"PixelDrain download → {dl_url} "
-        f"({'auth' if auth else 'anon'}; resume={existing>0}; tmp={os.path.basename(tmp_path)})"
+        f"({'auth' if auth else 'anon'}; resume={os.path.exists(tmp_path)}; tmp={os.path.basename(tmp_path)})"
     )
 
-    # Open mode: append if resuming, else write-new
-    mode = "ab" if existing > 0 else "wb"
-    chunk = 8 * 1024 * 1024  # 8 MiB
-
     try:
-        with session.get(dl_url, stream=True, headers=req_headers, auth=auth,
-                         allow_redirects=True, timeout=(10, 180)) as r, open(tmp_path, mode) as f:
-
-            r.raise_for_status()
-
-            # If we asked for a range but didn’t get 206, start over
-            if existing > 0 and r.status_code != 206:
-                monitor_logger.info("Server did not honor Range; restarting from 0")
-                f.close()
-                os.remove(tmp_path)
-                existing = 0
-                req_headers.pop("Range", None)
-                with session.get(dl_url, stream=True, headers=req_headers, auth=auth,
-                                 allow_redirects=True, timeout=(10, 180)) as r2, open(tmp_path, "wb") as f2:
-                    r2.raise_for_status()
-                    total = _parse_total_from_headers(r2.headers, None)
-                    if total:
-                        download_progress[download_id]["bytes_total"] = total
-                    done = 0
-                    for chunk_bytes in r2.iter_content(chunk_size=chunk):
-                        if chunk_bytes:
-                            f2.write(chunk_bytes)
-                            done += len(chunk_bytes)
-                            if total:
-                                download_progress[download_id]["bytes_downloaded"] = done
-                                download_progress[download_id]["progress"] = int(done / total * 100)
-            else:
-                total = _parse_total_from_headers(r.headers, None)
-                if total:
-                    # If resuming, total is the full size; update counters accordingly
-                    download_progress[download_id]["bytes_total"] = total
-                done = existing
-                if existing and total:
-                    download_progress[download_id]["bytes_downloaded"] = existing
-                    download_progress[download_id]["progress"] = int(existing / total * 100)
-
-                for chunk_bytes in r.iter_content(chunk_size=chunk):
-                    if not chunk_bytes:
-                        continue
-                    f.write(chunk_bytes)
-                    done += len(chunk_bytes)
-                    if total:
-                        download_progress[download_id]["bytes_downloaded"] = done
-                        download_progress[download_id]["progress"] = int(done / total * 100)
+        size = fetch_resumable(session, dl_url, tmp_path, download_id, req_headers, auth=auth,
+                               timeout=(10, 180))
+        if size is None:
+            download_progress[download_id]["status"] = "cancelled"
+            return None
 
-        os.replace(tmp_path, out_path)
+        out_path = finish_partial(tmp_path, out_path)
         download_progress[download_id]["progress"] = 100
         monitor_logger.info(f"PixelDrain download complete → {out_path}")
         return out_path
@@ -793,6 +1285,7 @@ def download_comicbookplus(url: str, download_id: str, dest_name: Optional[str]
                     if chunk:
                         f.write(chunk)
                         done += len(chunk)
+                        bandwidth_limiter.consume(len(chunk))
                         download_progress[download_id]['bytes_downloaded'] = done
                         if total:
                             download_progress[download_id]['progress'] = int(done / total * 100)
@@ -876,13 +1369,15 @@ def download_mega(url: str, download_id: str, dest_name: Optional[str] = None, h
         })
         monitor_logger.debug(f"Progress tracking initialized for {download_id}")
 
-        # Progress callback that updates download_progress and checks cancellation
+        # Progress callback that updates download_progress, checks cancellation
+        # and throttles to the global bandwidth cap
         def progress_callback(downloaded_bytes, total_bytes, percent):
             # Check for cancellation
             if download_progress.get(download_id, {}).get('cancelled'):
                 monitor_logger.info(f"Cancellation requested for {download_id}")
                 return False  # Signal cancellation
 
+            bandwidth_limiter.consume(downloaded_bytes - download_progress[download_id]['bytes_downloaded'])
             download_progress[download_id]['bytes_downloaded'] = downloaded_bytes
             download_progress[download_id]['progress'] = int(percent)
             return True  # Continue download
@@ -943,23 +1438,12 @@ def download():
     if not data or 'link' not in data:
         return jsonify({'error': 'Missing "link" in request data'}), 400
 
-    url = data['link']
-    download_id = str(uuid.uuid4())
-    download_progress[download_id] = {
-         'url': url,
-         'progress': 0,
-         'bytes_total': 0,
-         'bytes_downloaded': 0,
-         'status': 'queued',
-         'filename': None,
-         'error': None,
-    }
-    task = {
-         'download_id': download_id,
-         'url': url,
-         'dest_filename': data.get("dest_filename")
-    }
-    download_queue.put(task)
+    try:
+        priority = int(data.get('priority', PRIORITY_USER))
+    except (TypeError, ValueError):
+        return jsonify({'error': '"priority" must be an integer'}), 400
+
+    download_id = enqueue_download(data['link'], data.get("dest_filename"), priority=priority)
     return jsonify({'message': 'Download queued', 'download_id': download_id}), 200
 
 @app.route('/download_status/<download_id>', methods=['GET'])
@@ -967,11 +1451,26 @@ def download_status(download_id):
     progress = download_progress.get(download_id, 0)
     return jsonify({'download_id': download_id, 'progress': progress})
 
+@app.route('/download_priority/<download_id>', methods=['POST'])
+def download_priority(download_id):
+    data = request.get_json() or {}
+    try:
+        priority = int(data['priority'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Missing or invalid "priority"'}), 400
+    if not download_scheduler.reprioritize(download_id, priority):
+        return jsonify({'error': 'Download is not queued'}), 404
+    download_progress[download_id]['priority'] = priority
+    return jsonify({'message': 'Priority updated', 'priority': priority}), 200
+
 @app.route('/cancel_download/<download_id>', methods=['POST'])
 def cancel_download(download_id):
     if download_id in download_progress:
         download_progress[download_id]['cancelled'] = True
         download_progress[download_id]['status'] = 'cancelled'
+        # Queued tasks never reach a worker; in-progress ones stop at their next chunk
+        download_scheduler.discard(download_id)
+        update_download_task(download_id, status='cancelled')
         return jsonify({'message': 'Download cancelled'}), 200
     else:
         return jsonify({'error': 'Download not found'}), 404
@@ -983,7 +1482,7 @@ def download_status_all():
 @app.route('/download_summary')
 def download_summary():
     active = sum(1 for d in download_progress.values() if d.get("status") in ["queued", "in_progress"])
-    return jsonify({"active": active})
+    return jsonify({"active": active, "queue": download_scheduler.status()})
 
 @app.route('/clear_downloads', methods=['POST'])
 def clear_downloads():
@@ -993,6 +1492,7 @@ def clear_downloads():
     ]
     for download_id in keys_to_delete:
         del download_progress[download_id]
+    delete_download_tasks(keys_to_delete)
     return jsonify({'message': f'Cleared {len(keys_to_delete)} downloads'}), 200
 
 @app.route('/status', methods=['GET'])
@@ -1006,10 +1506,8 @@ def status():
 import signal
 def shutdown_handler(signum, frame):
     monitor_logger.info("Shutting down download workers...")
-    for _ in worker_threads:
-        download_queue.put(None)
-    for t in worker_threads:
-        t.join()
+    # Unfinished downloads stay in the download_queue table and resume on the next start
+    download_scheduler.stop()
     monitor_logger.info("All workers stopped.")
     os._exit(0)
 
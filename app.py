@@ -45,16 +45,16 @@ from opds import opds_bp
 from models import gcd
 from models import metron
 from config import config, load_flask_config, write_config, load_config
-from edit import get_edit_modal, save_cbz, cropCenter, cropLeft, cropRight, cropFreeForm, get_image_data_url, modal_body_template
+from edit import (get_edit_modal, save_cbz, cropCenter, cropLeft, cropRight, cropFreeForm, get_image_data_url, modal_body_template,
+                  is_edit_session_path, get_session, get_session_thumbnail, get_session_manifest, full_image_data_url)
 from memory_utils import initialize_memory_management, cleanup_on_exit, memory_context, get_global_monitor
 from app_logging import app_logger, APP_LOG, MONITOR_LOG
 from helpers import is_hidden
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from collections import OrderedDict
 from version import __version__
 import requests
 from packaging import version as pkg_version
-from database import (init_db, get_db_connection, get_recent_files, log_recent_file, invalidate_browse_cache,
+from database import (init_db, get_db_connection, get_recent_files, log_recent_file, invalidate_browse_cache, invalidate_browse_cache_paths,
                       get_file_index_from_db, save_file_index_to_db, update_file_index_entry,
                       add_file_index_entry, delete_file_index_entry, clear_file_index_from_db,
                       sync_file_index_incremental, search_file_index,
@@ -64,7 +64,7 @@ from database import (init_db, get_db_connection, get_recent_files, log_recent_f
                       clear_stats_cache_keys, mark_issue_read, get_issues_read, get_recent_read_issues,
                       save_issues_bulk, get_issues_for_series, update_series_sync_time, get_wanted_issues,
                       delete_issues_for_series, get_series_needing_sync, get_all_mapped_series, get_series_by_id,
-                      get_continue_reading_items)
+                      get_continue_reading_items, get_archive_manifest)
 import recommendations
 from models.stats import (get_library_stats, get_file_type_distribution, get_top_publishers,
                           get_reading_history_stats, get_largest_comics, get_top_series_by_count,
@@ -73,6 +73,12 @@ from models.timeline import get_reading_timeline
 # Add URL encoding support for template filters
 from urllib.parse import quote_plus
 from file_watcher import FileWatcher
+from archive_analyzer import queue_archive_analysis, render_thumbnail, is_page_file, run_analysis, get_thumbnail_cache_path
+from archive_writer import CbzWriter, get_compression_stats, iter_merge_zips
+from path_cache import PathIndexedCache
+from cache_manager import get_cache_manager
+from generations import make_etag, bump_tree, table_generation, directory_generation, subtree_generation
+from directory_heat import record_access, hot_directories, READ_WEIGHT
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
@@ -638,7 +644,7 @@ def scheduled_getcomics_download():
     try:
         from database import get_all_mapped_series, get_issues_for_series, update_last_getcomics_run
         from models.getcomics import search_getcomics, get_download_links, score_getcomics_result
-        from api import download_queue, download_progress
+        from api import enqueue_download, PRIORITY_SCHEDULED
         from datetime import date
 
         app_logger.info("📥 Starting scheduled GetComics auto-download...")
@@ -745,27 +751,8 @@ def scheduled_getcomics_download():
                     if download_url:
                         # Queue the download (matching manual download structure)
                         filename = f"{series_name} {issue_num}.cbz".replace('/', '-').replace('\\', '-')
-                        download_id = str(uuid.uuid4())
-
-                        # Set up progress tracking (same structure as manual download)
-                        download_progress[download_id] = {
-                            'url': download_url,
-                            'progress': 0,
-                            'bytes_total': 0,
-                            'bytes_downloaded': 0,
-                            'status': 'queued',
-                            'filename': filename,
-                            'error': None,
-                        }
-
-                        # Queue task (same structure as manual download)
-                        task = {
-                            'download_id': download_id,
-                            'url': download_url,
-                            'dest_filename': filename,
-                            'internal': True  # Use basic headers (no custom_headers_str required)
-                        }
-                        download_queue.put(task)
+                        # Use basic headers (no custom_headers_str required)
+                        enqueue_download(download_url, filename, internal=True, priority=PRIORITY_SCHEDULED)
 
                         download_count += 1
                         app_logger.info(f"📥 Queued download: {filename}")
@@ -846,7 +833,7 @@ def scheduled_weekly_packs_download():
         from models.getcomics import (find_latest_weekly_pack_url, check_weekly_pack_availability,
                                       parse_weekly_pack_page, get_weekly_pack_url_for_date,
                                       get_weekly_pack_dates_in_range)
-        from api import download_queue, download_progress
+        from api import enqueue_download, PRIORITY_SCHEDULED
 
 
         app_logger.info("📦 Starting scheduled Weekly Packs download...")
@@ -912,30 +899,12 @@ def scheduled_weekly_packs_download():
 
                     filename = f"{pack_date} {publisher} Week ({format_pref}).zip"
                     filename = filename.replace('/', '-').replace('\\', '-')
-                    download_id = str(uuid.uuid4())
-
-                    download_progress[download_id] = {
-                        'url': pixeldrain_url,
-                        'progress': 0,
-                        'bytes_total': 0,
-                        'bytes_downloaded': 0,
-                        'status': 'queued',
-                        'filename': filename,
-                        'error': None,
-                    }
-
-                    task = {
-                        'download_id': download_id,
-                        'url': pixeldrain_url,
-                        'dest_filename': filename,
-                        'internal': True,
-                        'weekly_pack_info': {
-                            'pack_date': pack_date,
-                            'publisher': publisher,
-                            'format': format_pref
-                        }
-                    }
-                    download_queue.put(task)
+                    enqueue_download(pixeldrain_url, filename, internal=True, priority=PRIORITY_SCHEDULED,
+                                     weekly_pack_info={
+                                         'pack_date': pack_date,
+                                         'publisher': publisher,
+                                         'format': format_pref
+                                     })
                     log_weekly_pack_download(pack_date, publisher, format_pref, pixeldrain_url, 'queued')
                     total_download_count += 1
                     latest_successful_pack = pack_date
@@ -966,30 +935,12 @@ def scheduled_weekly_packs_download():
                     for publisher, pixeldrain_url in download_links.items():
                         filename = f"{pack_date} {publisher} Week ({format_pref}).zip"
                         filename = filename.replace('/', '-').replace('\\', '-')
-                        download_id = str(uuid.uuid4())
-
-                        download_progress[download_id] = {
-                            'url': pixeldrain_url,
-                            'progress': 0,
-                            'bytes_total': 0,
-                            'bytes_downloaded': 0,
-                            'status': 'queued',
-                            'filename': filename,
-                            'error': None,
-                        }
-
-                        task = {
-                            'download_id': download_id,
-                            'url': pixeldrain_url,
-                            'dest_filename': filename,
-                            'internal': True,
-                            'weekly_pack_info': {
-                                'pack_date': pack_date,
-                                'publisher': publisher,
-                                'format': format_pref
-                            }
-                        }
-                        download_queue.put(task)
+                        enqueue_download(pixeldrain_url, filename, internal=True, priority=PRIORITY_SCHEDULED,
+                                         weekly_pack_info={
+                                             'pack_date': pack_date,
+                                             'publisher': publisher,
+                                             'format': format_pref
+                                         })
                         log_weekly_pack_download(pack_date, publisher, format_pref, pixeldrain_url, 'queued')
                         total_download_count += 1
                         latest_successful_pack = pack_date
@@ -1166,7 +1117,12 @@ def scan_library_task():
                                 thumbnails_dir = os.path.join(config.get("SETTINGS", "CACHE_DIR", fallback="/cache"), "thumbnails")
                                 cache_path = os.path.join(thumbnails_dir, shard_dir, filename)
 
-                                thumbnail_executor.submit(generate_thumbnail_task, full_path, cache_path)
+                                # CBZ/ZIP go through the single-pass analyzer (thumbnail,
+                                # metadata and page manifest from one archive open)
+                                if full_path.lower().endswith(('.cbz', '.zip')):
+                                    queue_archive_analysis(full_path)
+                                else:
+                                    thumbnail_executor.submit(generate_thumbnail_task, full_path, cache_path)
                                 count_queued += 1
                             else:
                                 count_skipped += 1
@@ -1996,7 +1952,7 @@ def extract_comicinfo(file_path):
         file_path: Path to the CBZ file
 
     Returns:
-        Dict with series, number, volume, year or None
+        Dict with series, number, volume, year or None if there is no ComicInfo.xml
     """
     import zipfile
     import xml.etree.ElementTree as ET
@@ -2004,6 +1960,13 @@ def extract_comicinfo(file_path):
     if not file_path.lower().endswith(('.cbz', '.zip')):
         return None
 
+    # Use the metadata scanner's columns when they are current (no archive open)
+    from database import get_file_comicinfo_by_path
+    from metadata_scanner import to_db_path
+    scanned = get_file_comicinfo_by_path(to_db_path(file_path))
+    if scanned is not None:
+        return scanned or None
+
     try:
         with zipfile.ZipFile(file_path, 'r') as zf:
             if 'ComicInfo.xml' in zf.namelist():
@@ -2890,7 +2853,7 @@ def api_getcomics_search():
 def api_getcomics_download():
     """Get download link from getcomics page and queue download."""
     from models.getcomics import get_download_links
-    from api import download_queue, download_progress
+    from api import enqueue_download
 
 
     data = request.get_json() or {}
@@ -2909,24 +2872,8 @@ def api_getcomics_download():
         if not download_url:
             return jsonify({"success": False, "error": "No download link found"}), 404
 
-        # Queue download using existing system
-        download_id = str(uuid.uuid4())
-        download_progress[download_id] = {
-            'url': download_url,
-            'progress': 0,
-            'bytes_total': 0,
-            'bytes_downloaded': 0,
-            'status': 'queued',
-            'filename': filename,
-            'error': None,
-        }
-        task = {
-            'download_id': download_id,
-            'url': download_url,
-            'dest_filename': filename,
-            'internal': True  # Use basic headers (no custom_headers_str required)
-        }
-        download_queue.put(task)
+        # Queue download using existing system (basic headers, no custom_headers_str required)
+        download_id = enqueue_download(download_url, filename, internal=True)
 
         return jsonify({"success": True, "download_id": download_id})
     except Exception as e:
@@ -3226,18 +3173,17 @@ def get_critical_path_error_message(path, operation="modify"):
 #     Cache System      #
 #########################
 
-# Global cache for directory listings with thread safety
-cache_lock = threading.RLock()
-directory_cache = OrderedDict()  # Use OrderedDict for LRU behavior
-cache_timestamps = {}
-cache_stats = {
-    'hits': 0,
-    'misses': 0,
-    'evictions': 0,
-    'invalidations': 0
-}
+# Global cache for directory listings. Every in-memory cache region shares
+# cache_manager's lock, byte accounting and global budget (see cache_manager.py)
 CACHE_DURATION = 5  # Cache for 5 seconds
 MAX_CACHE_SIZE = 500  # Increased maximum number of cached directories
+DIRECTORY_CACHE_BYTES = 128 * 1024 * 1024
+cache_manager = get_cache_manager()
+cache_lock = cache_manager.lock
+directory_cache = cache_manager.register(
+    'directory', DIRECTORY_CACHE_BYTES, ttl=CACHE_DURATION, max_entries=MAX_CACHE_SIZE,
+    store=PathIndexedCache()  # LRU order plus a path trie for invalidation
+)
 CACHE_REBUILD_INTERVAL = 6 * 60 * 60  # 6 hours in seconds
 last_cache_rebuild = time.time()
 last_cache_invalidation = None  # Track when cache was last invalidated
@@ -3255,60 +3201,47 @@ def get_directory_hash(path):
         app_logger.debug(f"Error generating hash for {path}: {e}")
         return "error"
 
-def is_cache_valid(cache_key):
-    """Check if cached data is still valid with thread safety."""
-    with cache_lock:
-        if cache_key not in cache_timestamps:
-            app_logger.debug(f"Cache key not found in timestamps: {cache_key}")
-            return False
-
-        # Check if cache has expired
-        age = time.time() - cache_timestamps[cache_key]
-        if age > CACHE_DURATION:
-            app_logger.debug(f"Cache expired for {cache_key} (age: {age:.1f}s > {CACHE_DURATION}s)")
-            return False
-
-        # For browse: cache, just use TTL validation (no hash check)
-        # The hash changes on directory access which causes false invalidations
-        # We have automatic invalidation on file operations, so TTL is sufficient
-        if cache_key.startswith("browse:"):
-            app_logger.debug(f"Browse cache valid for {cache_key} (age: {age:.1f}s)")
-            return True
-
-        # For regular directory listings, still use hash validation
-        actual_path = cache_key
-        current_hash = get_directory_hash(actual_path)
-        cached_data = directory_cache.get(cache_key, {})
+def get_cached_listing(cache_key):
+    """Cached listing for cache_key if it is still valid, else None."""
+    def hash_matches(cached_data):
+        current_hash = get_directory_hash(cache_key)
         cached_hash = cached_data.get('hash') if isinstance(cached_data, dict) else None
-
         if current_hash != cached_hash:
             app_logger.debug(f"Hash mismatch for {cache_key}: current={current_hash}, cached={cached_hash}")
             return False
-
         return True
 
+    # For browse: cache, just use TTL validation (no hash check)
+    # The hash changes on directory access which causes false invalidations
+    # We have automatic invalidation on file operations, so TTL is sufficient
+    # For regular directory listings, still use hash validation; a mismatch
+    # drops the entry and counts as a miss, not a hit
+    validate = None if cache_key.startswith("browse:") else hash_matches
+    cached_data = directory_cache.get(cache_key, validate=validate)
+    if cached_data is None:
+        app_logger.debug(f"Cache MISS for directory: {cache_key}")
+        return None
+
+    app_logger.debug(f"Cache HIT for directory: {cache_key}")
+    return cached_data
+
 def cleanup_cache():
-    """Remove expired entries from cache with improved LRU management."""
-    with cache_lock:
-        current_time = time.time()
-        expired_paths = [
-            path for path, timestamp in cache_timestamps.items()
-            if current_time - timestamp > CACHE_DURATION
-        ]
+    """Remove expired entries from cache (size limits are enforced on insert)."""
+    directory_cache.expire()
 
-        for path in expired_paths:
-            if path in directory_cache:
-                directory_cache.pop(path, None)
-                cache_timestamps.pop(path, None)
-                cache_stats['evictions'] += 1
+def etag_not_modified(etag):
+    """A 304 response if the client already holds etag (If-None-Match), else None."""
+    if request.args.get('refresh') == 'true':
+        return None
+    if request.if_none_match.contains_weak(etag):
+        return tag_response(Response(status=304), etag)
+    return None
 
-        # Enforce size limit with LRU eviction
-        while len(directory_cache) > MAX_CACHE_SIZE:
-            # Remove oldest item (first in OrderedDict)
-            oldest_path = next(iter(directory_cache))
-            directory_cache.pop(oldest_path, None)
-            cache_timestamps.pop(oldest_path, None)
-            cache_stats['evictions'] += 1
+def tag_response(response, etag):
+    """Attach a weak ETag; no-cache makes browsers revalidate on every fetch."""
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 def filesystem_search(query):
     """Fallback filesystem search when index is not ready"""
@@ -3388,37 +3321,15 @@ def filesystem_search(query):
 
 
 def get_directory_listing(path):
-    """Get directory listing with optimized file system operations, caching, and memory awareness."""
-    try:
-        # Check if we have valid cached data
-        if is_cache_valid(path):
-            with cache_lock:
-                cached_data = directory_cache.get(path)
-                if cached_data:
-                    cache_stats['hits'] += 1
-                    app_logger.debug(f"Cache HIT for directory: {path}")
-                    # Move to end for LRU
-                    directory_cache.move_to_end(path)
-                    return cached_data
-
-        # Cache miss - need to read from filesystem
-        cache_stats['misses'] += 1
-        app_logger.debug(f"Cache MISS for directory: {path}")
-
-        # Check memory before operation and adjust cache size if needed
-        monitor = get_global_monitor()
-        memory_usage = monitor.get_memory_usage()
-
-        # Reduce cache size if memory is high
-        if memory_usage > 800:  # 800MB threshold
-            with cache_lock:
-                target_size = max(50, MAX_CACHE_SIZE // 2)
-                while len(directory_cache) > target_size:
-                    oldest_path = next(iter(directory_cache))
-                    directory_cache.pop(oldest_path, None)
-                    cache_timestamps.pop(oldest_path, None)
-                    cache_stats['evictions'] += 1
+    """Get directory listing from the cache, or from the filesystem on a miss."""
+    cached_data = get_cached_listing(path)
+    if cached_data is not None:
+        return cached_data
+    return read_directory_listing(path)
 
+def read_directory_listing(path):
+    """Read a directory listing with optimized file system operations and cache it."""
+    try:
         with memory_context("list_directories"):
             entries = os.listdir(path)
 
@@ -3458,22 +3369,11 @@ def get_directory_listing(path):
                 "hash": get_directory_hash(path)
             }
 
-            # Store in cache
-            with cache_lock:
-                directory_cache[path] = result
-                cache_timestamps[path] = time.time()
-                # Move to end for LRU
-                directory_cache.move_to_end(path)
-
-                # Enforce cache size limit
-                while len(directory_cache) > MAX_CACHE_SIZE:
-                    oldest_path = next(iter(directory_cache))
-                    directory_cache.pop(oldest_path, None)
-                    cache_timestamps.pop(oldest_path, None)
-                    cache_stats['evictions'] += 1
+            # Store in cache (the region evicts by LRU within its byte and entry limits)
+            directory_cache.set(path, result)
 
             # Cleanup expired entries periodically
-            if cache_stats['misses'] % 10 == 0:
+            if directory_cache.misses % 10 == 0:
                 cleanup_cache()
 
             return result
@@ -3483,87 +3383,58 @@ def get_directory_listing(path):
 
 def invalidate_cache_for_path(path):
     """Invalidate cache for a specific path and its parent with improved tracking."""
-    global last_cache_invalidation, _data_dir_stats_last_update
+    invalidate_cache_for_paths([path])
+
+def invalidate_cache_for_paths(paths):
+    """
+    Invalidate cache for many paths (each path, its parent and its subtree)
+    with one database transaction and one cache lock acquisition.
+
+    The cache's path index finds the affected keys directly, so the lock is
+    held for O(affected keys) rather than a scan of the whole cache per path.
+    """
+    global last_cache_invalidation
 
     # Skip cache invalidation for WATCH and TARGET directories
-    if is_critical_path(path):
-        app_logger.debug(f"Skipping cache invalidation for critical path: {path}")
+    targets = set()
+    for path in paths:
+        if is_critical_path(path):
+            app_logger.debug(f"Skipping cache invalidation for critical path: {path}")
+        else:
+            targets.add(path)
+    if not targets:
         return
 
     # Invalidate database browse cache
-    invalidate_browse_cache(path)
+    invalidate_browse_cache_paths(targets)
 
-    with cache_lock:
-        invalidated_count = 0
+    # Change the ETags of the affected listings
+    bump_tree(*targets)
 
-        # Invalidate the specific path (both regular and browse: prefixed)
-        if path in directory_cache:
-            directory_cache.pop(path, None)
-            cache_timestamps.pop(path, None)
-            invalidated_count += 1
-
-        browse_key = f"browse:{path}"
-        if browse_key in directory_cache:
-            directory_cache.pop(browse_key, None)
-            cache_timestamps.pop(browse_key, None)
-            invalidated_count += 1
-
-        # Also invalidate parent directory cache (both regular and browse: prefixed)
-        parent = os.path.dirname(path)
-        if parent:
-            if parent in directory_cache:
-                directory_cache.pop(parent, None)
-                cache_timestamps.pop(parent, None)
-                invalidated_count += 1
-
-            parent_browse_key = f"browse:{parent}"
-            if parent_browse_key in directory_cache:
-                directory_cache.pop(parent_browse_key, None)
-                cache_timestamps.pop(parent_browse_key, None)
-                invalidated_count += 1
-
-        # Invalidate any child directory caches (both regular and browse: prefixed)
-        paths_to_invalidate = []
-        for cached_key in directory_cache.keys():
-            # Handle both regular paths and browse: prefixed keys
-            if cached_key.startswith("browse:"):
-                cached_path = cached_key[7:]
-            else:
-                cached_path = cached_key
-
-            if cached_path.startswith(path + os.sep):
-                paths_to_invalidate.append(cached_key)
-
-        for cached_key in paths_to_invalidate:
-            directory_cache.pop(cached_key, None)
-            cache_timestamps.pop(cached_key, None)
-            invalidated_count += 1
-
-        cache_stats['invalidations'] += invalidated_count
+    with cache_lock:
+        stale_keys = set()
+        for path in targets:
+            stale_keys |= directory_cache.entries.keys_for_invalidation(path)
+        invalidated_count = directory_cache.invalidate(stale_keys)
 
     # Also invalidate directory stats cache when files change
-    _data_dir_stats_last_update = 0
+    data_dir_stats_cache.clear()
 
     # Track when cache invalidation occurred
     last_cache_invalidation = time.time()
 
     if invalidated_count > 0:
-        app_logger.debug(f"Invalidated {invalidated_count} memory cache entries for path: {path}")
+        app_logger.debug(f"Invalidated {invalidated_count} memory cache entries for {len(targets)} paths")
 
 def rebuild_entire_cache():
     """Rebuild the entire directory cache and search index."""
-    global directory_cache, cache_timestamps, last_cache_rebuild, last_cache_invalidation
+    global last_cache_rebuild, last_cache_invalidation
 
     app_logger.info("🔄 Starting scheduled cache rebuild...")
     start_time = time.time()
 
-    with cache_lock:
-        cleared_count = len(directory_cache)
-        # Clear all caches
-        directory_cache.clear()
-        cache_timestamps.clear()
-        # Keep performance stats but mark rebuild
-        cache_stats['evictions'] += cleared_count
+    # Clear all entries, keep performance stats
+    cleared_count = directory_cache.clear()
 
     # Rebuild search index
     invalidate_file_index()
@@ -3576,46 +3447,101 @@ def rebuild_entire_cache():
     rebuild_time = time.time() - start_time
     app_logger.info(f"✅ Cache rebuild completed in {rebuild_time:.2f} seconds ({cleared_count} entries cleared)")
 
-    # Warm up cache with frequently accessed directories
-    warmup_cache()
+    # Warm up the most used directories without holding up the caller
+    threading.Thread(target=warmup_cache_background, daemon=True).start()
 
     return rebuild_time
 
+WARMUP_ARCHIVE_READ_ESTIMATE = 4 * 1024 * 1024  # Central directory, ComicInfo and cover of one archive
+warmup_status = {}
+
 def warmup_cache():
-    """Proactively cache frequently accessed directories."""
-    warmup_paths = [DATA_DIR, TARGET_DIR]
+    """
+    Warm the directories users actually open, hottest first by decayed
+    browse/read frequency (see directory_heat), until WARMUP_TIME_BUDGET
+    seconds or WARMUP_IO_BUDGET_MB of archive reads are spent:
+    - the directory listing and its file_index rows
+    - cover thumbnails and page manifests of its archives that lack them
+    """
+    global warmup_status
 
-    # Add common subdirectories
-    for base_path in [DATA_DIR, TARGET_DIR]:
-        try:
-            if os.path.exists(base_path):
-                subdirs = [d for d in os.listdir(base_path)
-                          if os.path.isdir(os.path.join(base_path, d)) and not d.startswith('.') and not d.startswith('_')]
-                # Add first few subdirectories to warmup
-                for subdir in subdirs[:5]:
-                    warmup_paths.append(os.path.join(base_path, subdir))
-        except (OSError, IOError):
-            continue
+    top_n = config.getint("SETTINGS", "WARMUP_TOP_N", fallback=20)
+    time_budget = config.getfloat("SETTINGS", "WARMUP_TIME_BUDGET", fallback=30)
+    io_budget = config.getint("SETTINGS", "WARMUP_IO_BUDGET_MB", fallback=256) * 1024 * 1024
+    start_time = time.time()
+    deadline = start_time + time_budget
+
+    hot_paths = hot_directories(top_n)
+    if not hot_paths:
+        # No access history yet (fresh install): the library roots are the only safe guess
+        hot_paths = [root for root in get_library_roots() if os.path.isdir(root)][:top_n]
 
-    # Pre-cache these directories
     warmed_count = 0
-    for path in warmup_paths:
+    analyzed_count = 0
+    io_used = 0
+    for path in hot_paths:
+        if time.time() >= deadline or io_used >= io_budget:
+            break
+        if not os.path.isdir(path):
+            continue
+
         try:
-            if os.path.exists(path) and path not in directory_cache:
-                listing_data = get_directory_listing(path)
-                with cache_lock:
-                    directory_cache[path] = listing_data
-                    cache_timestamps[path] = time.time()
-                warmed_count += 1
-
-                # Don't warm up too many at once
-                if warmed_count >= 10:
-                    break
+            read_directory_listing(path)
+            _, files = get_directory_children(path)
         except Exception as e:
             app_logger.debug(f"Failed to warm up cache for {path}: {e}")
+            continue
+        warmed_count += 1
+
+        for entry in files:
+            if time.time() >= deadline or io_used >= io_budget:
+                break
+            file_path = entry['path']
+            if not file_path.lower().endswith(('.cbz', '.zip')):
+                continue
+            try:
+                file_mtime = os.path.getmtime(file_path)
+            except OSError:
+                continue
+            if (os.path.exists(get_thumbnail_cache_path(file_path))
+                    and get_archive_manifest(file_path, file_mtime=file_mtime) is not None):
+                continue
+
+            # Synchronous, so the time budget covers the work and not just the queueing
+            run_analysis(file_path)
+            analyzed_count += 1
+            io_used += min(entry.get('size') or 0, WARMUP_ARCHIVE_READ_ESTIMATE)
+
+    elapsed = time.time() - start_time
+    warmup_status = {
+        "finished_at": time.time(),
+        "elapsed": round(elapsed, 2),
+        "candidates": len(hot_paths),
+        "directories": warmed_count,
+        "archives_analyzed": analyzed_count,
+        "io_bytes": io_used,
+        "budget_exhausted": elapsed >= time_budget or io_used >= io_budget
+    }
 
     if warmed_count > 0:
-        app_logger.info(f"🔥 Warmed up cache with {warmed_count} frequently accessed directories")
+        app_logger.info(
+            f"🔥 Warmed up {warmed_count}/{len(hot_paths)} hot directories, "
+            f"analyzed {analyzed_count} archives in {elapsed:.1f}s"
+        )
+
+def warmup_cache_background():
+    """Warm the cache once the file index is available (startup)."""
+    wait_count = 0
+    while not index_built:
+        time.sleep(1)
+        wait_count += 1
+        if wait_count > 300:  # 5 minute timeout
+            app_logger.warning("Cache warmup timed out waiting for file index")
+            return
+    try:
+        warmup_cache()
+    except Exception as e:
+        app_logger.error(f"Error during cache warmup: {e}")
 
 @app.route('/warmup-cache', methods=['POST'])
 def warmup_cache_endpoint():
@@ -3635,20 +3561,13 @@ def should_rebuild_cache():
 @app.route('/clear-cache', methods=['POST'])
 def clear_cache():
     """Manually clear the directory cache."""
-    global directory_cache, cache_timestamps, last_cache_invalidation, _data_dir_stats_last_update
+    global last_cache_invalidation
 
-    with cache_lock:
-        cleared_count = len(directory_cache)
-        directory_cache.clear()
-        cache_timestamps.clear()
-        # Reset stats
-        cache_stats['hits'] = 0
-        cache_stats['misses'] = 0
-        cache_stats['evictions'] = 0
-        cache_stats['invalidations'] = 0
+    # Clear entries and reset stats
+    cleared_count = directory_cache.clear(reset_stats=True)
 
     last_cache_invalidation = time.time()
-    _data_dir_stats_last_update = 0  # Also invalidate directory stats cache
+    data_dir_stats_cache.clear()  # Also invalidate directory stats cache
 
     # Also clear stats cache (for insights page charts)
     clear_stats_cache()
@@ -3676,11 +3595,21 @@ def rebuild_cache():
         app_logger.error(f"Error rebuilding cache: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+CACHE_STATUS_ETAG_SECONDS = 30  # Longest the time-derived fields may lag behind
+
 @app.route('/cache-status', methods=['GET'])
 def get_cache_status():
     """Get current cache status and next rebuild time."""
     global last_cache_rebuild
-    
+
+    etag = make_etag(
+        'status', int(time.time() // CACHE_STATUS_ETAG_SECONDS), last_cache_rebuild, last_cache_invalidation,
+        index_built, cache_manager.activity(), subtree_generation(DATA_DIR)
+    )
+    not_modified = etag_not_modified(etag)
+    if not_modified:
+        return not_modified
+
     start_time = time.time()
     current_time = time.time()
     time_since_rebuild = current_time - last_cache_rebuild
@@ -3703,9 +3632,8 @@ def get_cache_status():
     except Exception as e:
         app_logger.warning(f"Error getting data directory stats, using cached or default values: {e}")
         # Use cached stats if available, otherwise use defaults
-        if _data_dir_stats_cache:
-            data_dir_stats = _data_dir_stats_cache
-        else:
+        data_dir_stats = _last_data_dir_stats
+        if not data_dir_stats:
             data_dir_stats = {
                 "subdir_count": 0,
                 "total_files": 0,
@@ -3723,11 +3651,9 @@ def get_cache_status():
     response_time = time.time() - start_time
     app_logger.debug(f"Full cache status request completed in {response_time:.3f}s")
     
-    # Calculate cache hit rate
-    total_requests = cache_stats['hits'] + cache_stats['misses']
-    hit_rate = (cache_stats['hits'] / total_requests * 100) if total_requests > 0 else 0
+    directory_stats = directory_cache.stats()
 
-    return jsonify({
+    return tag_response(jsonify({
         "last_rebuild": last_cache_rebuild,
         "time_since_rebuild": time_since_rebuild,
         "time_until_next": time_until_next,
@@ -3741,14 +3667,16 @@ def get_cache_status():
         "cache_duration": CACHE_DURATION,
         "max_cache_size": MAX_CACHE_SIZE,
         "cache_stats": {
-            "hits": cache_stats['hits'],
-            "misses": cache_stats['misses'],
-            "hit_rate": round(hit_rate, 2),
-            "evictions": cache_stats['evictions'],
-            "invalidations": cache_stats['invalidations']
+            "hits": directory_stats['hits'],
+            "misses": directory_stats['misses'],
+            "hit_rate": directory_stats['hit_rate'],
+            "evictions": directory_stats['evictions'],
+            "invalidations": directory_stats['invalidations']
         },
+        "cache_manager": cache_manager.metrics(),
+        "warmup": warmup_status,
         "response_time": round(response_time, 3)
-    })
+    }), etag)
 
 @app.route('/cache-status-light', methods=['GET'])
 def get_cache_status_light():
@@ -3777,9 +3705,8 @@ def get_cache_status_light():
     
     app_logger.debug(f"Light cache status request - cache size: {len(directory_cache)}, index built: {index_built}")
     
-    # Calculate cache hit rate for light status
-    total_requests = cache_stats['hits'] + cache_stats['misses']
-    hit_rate = (cache_stats['hits'] / total_requests * 100) if total_requests > 0 else 0
+    # Cache hit rate for light status
+    hit_rate = directory_cache.stats()['hit_rate']
 
     return jsonify({
         "last_rebuild": last_cache_rebuild,
@@ -3792,43 +3719,33 @@ def get_cache_status_light():
         "cache_invalidated": cache_recently_invalidated,
         "cache_duration": CACHE_DURATION,
         "max_cache_size": MAX_CACHE_SIZE,
-        "hit_rate": round(hit_rate, 2)
+        "hit_rate": hit_rate
     })
 
 @app.route('/cache-debug', methods=['GET'])
 def get_cache_debug():
     """Debug endpoint to show current cache state and performance metrics."""
-    global directory_cache, cache_timestamps, last_cache_rebuild, last_cache_invalidation
+    global last_cache_rebuild, last_cache_invalidation
 
     current_time = time.time()
 
-    with cache_lock:
-        # Get some sample cache entries
-        sample_cache = {}
-        for i, (path, timestamp) in enumerate(list(cache_timestamps.items())[:5]):
-            age = current_time - timestamp
-            sample_cache[path] = {
-                "age_seconds": round(age, 2),
-                "cached_data": bool(path in directory_cache)
-            }
-
-        # Calculate memory usage more accurately
-        cache_memory_mb = round(sys.getsizeof(directory_cache) / (1024 * 1024), 2)
+    # Sample cache entries, least recently used first
+    sample_cache = directory_cache.describe(limit=5)
+    directory_stats = directory_cache.stats()
 
     return jsonify({
         "current_time": current_time,
         "cache_size": len(directory_cache),
-        "cache_timestamps_count": len(cache_timestamps),
         "last_rebuild": last_cache_rebuild,
         "last_invalidation": last_cache_invalidation,
         "sample_cache_entries": sample_cache,
-        "memory_usage_mb": cache_memory_mb,
+        "memory_usage_mb": round(directory_stats['bytes'] / (1024 * 1024), 2),
         "cache_performance": {
-            "hits": cache_stats['hits'],
-            "misses": cache_stats['misses'],
-            "hit_rate_percent": round((cache_stats['hits'] / max(1, cache_stats['hits'] + cache_stats['misses'])) * 100, 2),
-            "evictions": cache_stats['evictions'],
-            "invalidations": cache_stats['invalidations']
+            "hits": directory_stats['hits'],
+            "misses": directory_stats['misses'],
+            "hit_rate_percent": directory_stats['hit_rate'],
+            "evictions": directory_stats['evictions'],
+            "invalidations": directory_stats['invalidations']
         }
     })
 
@@ -4430,19 +4347,19 @@ def api_wanted_status():
 
 
 # Cache for directory statistics to avoid repeated filesystem walks
-_data_dir_stats_cache = {}
-_data_dir_stats_last_update = 0
 DATA_DIR_STATS_CACHE_DURATION = 300  # Cache for 5 minutes
+DATA_DIR_STATS_KEY = 'data_dir'
+data_dir_stats_cache = cache_manager.register('data_dir_stats', 64 * 1024, ttl=DATA_DIR_STATS_CACHE_DURATION)
+_last_data_dir_stats = {}  # Served when a fresh scan fails
 
 def get_data_directory_stats():
     """Get statistics about the DATA_DIR including subdirectory count and file count."""
-    global _data_dir_stats_cache, _data_dir_stats_last_update
-    
-    current_time = time.time()
-    
+    global _last_data_dir_stats
+
     # Return cached stats if they're still valid
-    if (current_time - _data_dir_stats_last_update) < DATA_DIR_STATS_CACHE_DURATION:
-        return _data_dir_stats_cache
+    cached_stats = data_dir_stats_cache.get(DATA_DIR_STATS_KEY)
+    if cached_stats is not None:
+        return cached_stats
     
     try:
         app_logger.debug("Calculating fresh data directory statistics...")
@@ -4484,7 +4401,7 @@ def get_data_directory_stats():
         scan_time = time.time() - start_time
         
         # Cache the results
-        _data_dir_stats_cache = {
+        _last_data_dir_stats = {
             "subdir_count": subdir_count,
             "total_files": total_files,
             "total_dirs": subdir_count + 1,  # +1 for the root DATA_DIR
@@ -4492,16 +4409,16 @@ def get_data_directory_stats():
             "max_depth_reached": max_depth,  # Show what depth limit was used
             "scan_time": round(scan_time, 2)  # Show how long the scan took
         }
-        _data_dir_stats_last_update = current_time
-        
-        app_logger.debug(f"Data directory stats updated: {subdir_count} subdirs, {total_files} files (scan limited: {_data_dir_stats_cache['scan_limited']}, time: {scan_time:.2f}s)")
-        return _data_dir_stats_cache
+        data_dir_stats_cache.set(DATA_DIR_STATS_KEY, _last_data_dir_stats)
+
+        app_logger.debug(f"Data directory stats updated: {subdir_count} subdirs, {total_files} files (scan limited: {_last_data_dir_stats['scan_limited']}, time: {scan_time:.2f}s)")
+        return _last_data_dir_stats
         
     except Exception as e:
         app_logger.error(f"Error getting data directory stats: {e}")
         # Return cached stats if available, otherwise return defaults
-        if _data_dir_stats_cache:
-            return _data_dir_stats_cache
+        if _last_data_dir_stats:
+            return _last_data_dir_stats
         return {
             "subdir_count": 0,
             "total_files": 0,
@@ -4880,6 +4797,7 @@ def update_index_on_move(old_path, new_path):
                     conn.commit()
                     rows_affected = c.rowcount
                     conn.close()
+                    bump_tree(old_path, new_path)
                     app_logger.debug(f"Updated {rows_affected} child entries for moved directory: {old_path} -> {new_path}")
 
             return
@@ -4996,6 +4914,7 @@ app_logger.info(f"App started successfully! (Debug logging: {'enabled' if debug_
 
 # Initialize memory management
 initialize_memory_management()
+cache_manager.attach_monitor(get_global_monitor())
 
 #########################
 #   List Directories    #
@@ -5040,8 +4959,8 @@ def list_directories():
         cleanup_cache()
 
         # Check if we have valid cached data
-        if is_cache_valid(current_path):
-            cached_data = directory_cache[current_path]
+        cached_data = get_cached_listing(current_path)
+        if cached_data is not None:
             parent_dir = get_parent_dir(current_path)
 
             return jsonify({
@@ -5052,18 +4971,8 @@ def list_directories():
                 "cached": True
             })
 
-        # Get fresh directory listing
-        listing_data = get_directory_listing(current_path)
-
-        # Cache the result with thread safety
-        with cache_lock:
-            cache_stats['misses'] += 1
-            directory_cache[current_path] = listing_data
-            cache_timestamps[current_path] = time.time()
-
-            # LRU eviction is handled by cleanup_cache()
-            if len(directory_cache) > MAX_CACHE_SIZE:
-                cleanup_cache()
+        # Get fresh directory listing (cached by read_directory_listing)
+        listing_data = read_directory_listing(current_path)
 
         parent_dir = get_parent_dir(current_path)
 
@@ -5208,8 +5117,8 @@ def list_downloads():
         cleanup_cache()
         
         # Check if we have valid cached data
-        if is_cache_valid(current_path):
-            cached_data = directory_cache[current_path]
+        cached_data = get_cached_listing(current_path)
+        if cached_data is not None:
             parent_dir = os.path.dirname(current_path) if current_path != TARGET_DIR else None
             
             return jsonify({
@@ -5220,18 +5129,8 @@ def list_downloads():
                 "cached": True
             })
         
-        # Get fresh directory listing
-        listing_data = get_directory_listing(current_path)
-
-        # Cache the result with thread safety
-        with cache_lock:
-            cache_stats['misses'] += 1
-            directory_cache[current_path] = listing_data
-            cache_timestamps[current_path] = time.time()
-
-            # LRU eviction is handled by cleanup_cache()
-            if len(directory_cache) > MAX_CACHE_SIZE:
-                cleanup_cache()
+        # Get fresh directory listing (cached by read_directory_listing)
+        listing_data = read_directory_listing(current_path)
 
         parent_dir = os.path.dirname(current_path) if current_path != TARGET_DIR else None
 
@@ -6224,48 +6123,23 @@ def cbz_clear_comicinfo():
         return jsonify({"success": False, "error": "File is not a CBZ"}), 400
 
     try:
-        import zipfile
+        from archive_writer import remove_comicinfo_from_zip
 
-        # Create a temporary file for the new CBZ
-        temp_zip_path = file_path + ".tmpzip"
-        comicinfo_found = False
-
-        # Open the original CBZ and create a new one without ComicInfo.xml
-        with zipfile.ZipFile(file_path, 'r') as old_zip, \
-             zipfile.ZipFile(temp_zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as new_zip:
-
-            for item in old_zip.infolist():
-                if item.filename.lower() == "comicinfo.xml":
-                    comicinfo_found = True
-                    app_logger.info(f"Removing ComicInfo.xml from {file_path}")
-                    # Skip this file (don't write it to new zip)
-                    continue
-                else:
-                    # Copy all other files as-is
-                    new_zip.writestr(item, old_zip.read(item.filename))
-
-        if not comicinfo_found:
-            # Clean up temp file if ComicInfo.xml wasn't found
-            os.remove(temp_zip_path)
+        # Pages are raw-copied into the new archive; only ComicInfo.xml is dropped
+        if not remove_comicinfo_from_zip(file_path):
             return jsonify({"success": False, "error": "ComicInfo.xml not found in CBZ"}), 404
 
-        # Replace the original CBZ with the updated one
-        os.replace(temp_zip_path, file_path)
-
         app_logger.info(f"Successfully removed ComicInfo.xml from {file_path}")
         return jsonify({"success": True})
 
     except Exception as e:
         app_logger.error(f"Error removing ComicInfo.xml from {file_path}: {e}")
-        # Clean up temp file if it exists
-        if os.path.exists(file_path + ".tmpzip"):
-            os.remove(file_path + ".tmpzip")
         return jsonify({"success": False, "error": str(e)}), 500
 
 
 @app.route('/api/combine-cbz', methods=['POST'])
 def combine_cbz():
-    """Combine multiple CBZ files into a single CBZ file."""
+    """Combine multiple CBZ files into a single CBZ file, streaming progress as SSE."""
     data = request.get_json()
     files = data.get('files', [])
     output_name = data.get('output_name', 'Combined')
@@ -6288,93 +6162,62 @@ def combine_cbz():
                 normalized.startswith(os.path.normpath(target_dir))):
             return jsonify({"error": "Access denied"}), 403
 
-    temp_dir = None
-    try:
-        # Create temp extraction directory
-        temp_dir = os.path.join(directory, f'.tmp_combine_{os.getpid()}')
-        os.makedirs(temp_dir, exist_ok=True)
-
-        file_counter = {}  # Track duplicate filenames
-        extracted_count = 0
-
-        # Extract all files from each CBZ
-        for cbz_path in files:
-            if not os.path.exists(cbz_path):
-                app_logger.warning(f"CBZ file not found, skipping: {cbz_path}")
-                continue
-
-            try:
-                with zipfile.ZipFile(cbz_path, 'r') as zf:
-                    for name in zf.namelist():
-                        # Skip directories and metadata files
-                        if name.endswith('/') or name.lower() == 'comicinfo.xml':
-                            continue
-
-                        # Get base filename (flatten nested directories)
-                        base_name = os.path.basename(name)
-                        if not base_name:  # Skip empty names
-                            continue
-
-                        name_part, ext = os.path.splitext(base_name)
-
-                        # Handle duplicates: append a, b, c, etc.
-                        if base_name in file_counter:
-                            count = file_counter[base_name]
-                            suffix = chr(ord('a') + count)
-                            new_name = f"{name_part}{suffix}{ext}"
-                            file_counter[base_name] += 1
-                        else:
-                            new_name = base_name
-                            file_counter[base_name] = 1
-
-                        # Extract to temp dir with new name
-                        content = zf.read(name)
-                        dest_path = os.path.join(temp_dir, new_name)
-                        with open(dest_path, 'wb') as f:
-                            f.write(content)
-                        extracted_count += 1
-
-            except zipfile.BadZipFile:
-                app_logger.warning(f"Invalid CBZ file, skipping: {cbz_path}")
-                continue
-
-        if extracted_count == 0:
-            shutil.rmtree(temp_dir)
-            return jsonify({"error": "No files could be extracted from the selected CBZ files"}), 400
-
-        # Create output CBZ
-        output_path = os.path.join(directory, f"{output_name}.cbz")
-
-        # Handle existing file - append (1), (2), etc.
-        counter = 1
-        while os.path.exists(output_path):
-            output_path = os.path.join(directory, f"{output_name} ({counter}).cbz")
-            counter += 1
-
-        # Compress temp dir to CBZ
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-            extracted_files = sorted(os.listdir(temp_dir))
-            for filename in extracted_files:
-                file_path_full = os.path.join(temp_dir, filename)
-                zf.write(file_path_full, filename)
+    # Create output CBZ next to the sources - append (1), (2), etc. if it exists
+    output_path = os.path.join(directory, f"{output_name}.cbz")
+    counter = 1
+    while os.path.exists(output_path):
+        output_path = os.path.join(directory, f"{output_name} ({counter}).cbz")
+        counter += 1
+
+    sources = []
+    for cbz_path in files:
+        if os.path.exists(cbz_path):
+            sources.append(cbz_path)
+        else:
+            app_logger.warning(f"CBZ file not found, skipping: {cbz_path}")
+
+    # Prefix every page with its source's position so each issue's pages stay
+    # together and in order; nested folders are flattened
+    prefix_width = max(2, len(str(len(sources))))
+    used_names = set()
+
+    def rename(source_index, info):
+        name_part, ext = os.path.splitext(os.path.basename(info.filename))
+        new_name = f"{source_index + 1:0{prefix_width}d}_{name_part}{ext}"
+        # Handle duplicates left by flattening: append a, b, c, etc.
+        suffix = 0
+        while new_name in used_names:
+            new_name = f"{source_index + 1:0{prefix_width}d}_{name_part}{chr(ord('a') + suffix)}{ext}"
+            suffix += 1
+        used_names.add(new_name)
+        return new_name
+
+    def skip(name):
+        # Skip metadata files and empty names
+        return os.path.basename(name).lower() == 'comicinfo.xml' or not os.path.basename(name)
 
-        # Cleanup temp directory
-        shutil.rmtree(temp_dir)
-        temp_dir = None
+    def generate():
+        # Pages are raw-copied from each source straight into the new archive
+        total_images = 0
+        try:
+            for done, total, source_path in iter_merge_zips(sources, output_path, rename, skip):
+                total_images = done
+                if done == total or done % 10 == 1:
+                    yield f"data: {json.dumps({'type': 'progress', 'current': done, 'total': total, 'file': os.path.basename(source_path)})}\n\n"
+        except Exception as e:
+            app_logger.error(f"Error combining CBZ files: {e}")
+            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+            return
 
-        app_logger.info(f"Combined {len(files)} CBZ files into {output_path} ({extracted_count} images)")
-        return jsonify({
+        app_logger.info(f"Combined {len(sources)} CBZ files into {output_path} ({total_images} images)")
+        result = {
             "success": True,
             "output_file": os.path.basename(output_path),
-            "total_images": extracted_count
-        })
+            "total_images": total_images
+        }
+        yield f"data: {json.dumps({'type': 'complete', 'result': result})}\n\n"
 
-    except Exception as e:
-        # Cleanup on error
-        if temp_dir and os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-        app_logger.error(f"Error combining CBZ files: {e}")
-        return jsonify({"error": str(e)}), 500
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
 
 
 #####################################
@@ -6486,6 +6329,13 @@ def api_browse():
     if not path:
         path = DATA_DIR
 
+    # Generation before the query: a change during the request moves the tag again
+    etag = make_etag('browse', directory_generation(path))
+    record_access(path)
+    not_modified = etag_not_modified(etag)
+    if not_modified:
+        return not_modified
+
     try:
         app_logger.info(f"🔍 /api/browse request for path: {path}")
 
@@ -6558,7 +6408,7 @@ def api_browse():
         elapsed = time.time() - request_start
         app_logger.info(f"✅ /api/browse returned {len(directories)} dirs, {len(files)} files for {path} in {elapsed:.3f}s")
 
-        return jsonify(result)
+        return tag_response(jsonify(result), etag)
     except Exception as e:
         app_logger.error(f"Error browsing {path}: {e}")
         return jsonify({"error": str(e)}), 500
@@ -6568,9 +6418,14 @@ def api_browse():
 def api_issues_read_paths():
     """Return list of all read issue paths for client-side caching."""
     from database import get_issues_read
+    etag = make_etag('read', table_generation('issues_read'))
+    not_modified = etag_not_modified(etag)
+    if not_modified:
+        return not_modified
+
     issues = get_issues_read()
     paths = [issue['issue_path'] for issue in issues]
-    return jsonify({"paths": paths})
+    return tag_response(jsonify({"paths": paths}), etag)
 
 
 @app.route('/api/scan-directory', methods=['POST'])
@@ -6802,6 +6657,17 @@ def api_browse_recursive():
     if not os.path.exists(full_path) or not os.path.isdir(full_path):
         return jsonify({"error": "Invalid path"}), 400
 
+    # Only DATA_DIR is covered by the file watcher, so only its subtrees have
+    # generation counters that follow changes made outside the app
+    etag = None
+    normalized_path = os.path.normpath(full_path)
+    normalized_data_dir = os.path.normpath(DATA_DIR)
+    if normalized_path == normalized_data_dir or normalized_path.startswith(normalized_data_dir + os.sep):
+        etag = make_etag('recursive', subtree_generation(full_path))
+        not_modified = etag_not_modified(etag)
+        if not_modified:
+            return not_modified
+
     # Define excluded extensions and prefixes
     excluded_extensions = {".png", ".jpg", ".jpeg", ".gif", ".html", ".css", ".ds_store", ".json", ".db", ".xml"}
     allowed_files = {"missing.txt", "cvinfo"}
@@ -6881,12 +6747,13 @@ def api_browse_recursive():
         return (filename.lower(), 0, 0, filename.lower())
 
     files.sort(key=natural_sort_key)
-    
-    return jsonify({
+
+    response = jsonify({
         "current_path": path,
         "files": files,
         "total": len(files)
     })
+    return tag_response(response, etag) if etag else response
 
 @app.route('/api/folder-thumbnail')
 def serve_folder_thumbnail():
@@ -7012,13 +6879,21 @@ def read_comic_info(comic_path):
     if not os.path.exists(comic_path):
         return jsonify({"error": "Comic file not found"}), 404
 
+    record_access(os.path.dirname(comic_path), READ_WEIGHT)
+
     try:
+        # Use the analyzer's page manifest if it matches the current file
+        manifest = get_archive_manifest(comic_path, file_mtime=os.path.getmtime(comic_path))
+        if manifest is not None:
+            return jsonify({
+                "success": True,
+                "page_count": manifest['page_count'],
+                "filename": os.path.basename(comic_path)
+            })
+
         # Determine archive type
         ext = os.path.splitext(comic_path)[1].lower()
 
-        # Get list of image files from archive
-        image_files = []
-
         if ext in ['.cbz', '.zip']:
             with zipfile.ZipFile(comic_path, 'r') as archive:
                 all_files = archive.namelist()
@@ -7028,13 +6903,8 @@ def read_comic_info(comic_path):
         else:
             return jsonify({"error": "Unsupported file format"}), 400
 
-        # Filter for image files
-        image_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
-        for filename in all_files:
-            if filename.lower().endswith(image_extensions):
-                # Skip macOS metadata files
-                if not filename.startswith('__MACOSX') and not os.path.basename(filename).startswith('.'):
-                    image_files.append(filename)
+        # Filter for image files (skipping macOS metadata files)
+        image_files = [f for f in all_files if is_page_file(f)]
 
         return jsonify({
             "success": True,
@@ -7355,18 +7225,9 @@ def generate_thumbnail_task(file_path, cache_path):
             
             if image_files:
                 with zf.open(image_files[0]) as image_file:
-                    img = Image.open(image_file)
-                    if img.mode in ('RGBA', 'LA', 'P'):
-                        img = img.convert('RGB')
-                    
                     # Resize to 300px height
-                    aspect_ratio = img.width / img.height
-                    new_height = 300
-                    new_width = int(new_height * aspect_ratio)
-                    img.thumbnail((new_width, new_height), Image.Resampling.LANCZOS)
-                    
-                    img.save(cache_path, format='JPEG', quality=85)
-                    
+                    render_thumbnail(image_file, cache_path)
+
                     # Update DB success
                     conn = get_db_connection()
                     if conn:
@@ -8437,6 +8298,16 @@ def rename():
     # Validate input
     if not old_path or not new_path:
         return jsonify({"error": "Missing old or new path"}), 400
+
+    # Pages of an open CBZ edit session are renamed in the session manifest
+    if is_edit_session_path(old_path):
+        try:
+            get_session(old_path).rename(old_path, new_path)
+            return jsonify({"success": True})
+        except FileExistsError as e:
+            return jsonify({"error": str(e)}), 400
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
     
     # Check if the old path exists
     if not os.path.exists(old_path):
@@ -8539,7 +8410,12 @@ def crop_image():
 
         file_cards = []
 
-        if crop_type == 'left':
+        if is_edit_session_path(file_path):
+            # Crop a page of an open CBZ edit session
+            session = get_session(file_path)
+            file_cards = [session.card(entry, full_path=True) for entry in session.crop(file_path, crop_type)]
+
+        elif crop_type == 'left':
             new_image_path, backup_path = cropLeft(file_path)
             for path in [new_image_path, backup_path]:
                 file_cards.append({
@@ -8593,6 +8469,13 @@ def get_full_image_data():
         if not file_path:
             return jsonify({'success': False, 'error': 'Missing file path'}), 400
 
+        # Page of an open CBZ edit session, read straight from the archive
+        if is_edit_session_path(file_path):
+            session = get_session(file_path)
+            with session.lock:
+                image_bytes = session.read(session.resolve(file_path))
+            return jsonify({'success': True, 'imageData': full_image_data_url(image_bytes)})
+
         if not os.path.exists(file_path):
             return jsonify({'success': False, 'error': 'File not found'}), 404
 
@@ -8645,6 +8528,19 @@ def crop_image_freeform():
         if not file_path or x is None or y is None or width is None or height is None:
             return jsonify({'success': False, 'error': 'Missing file path or crop coordinates'}), 400
 
+        if is_edit_session_path(file_path):
+            # Crop a page of an open CBZ edit session
+            session = get_session(file_path)
+            cropped, backup = session.crop_freeform(file_path, x, y, width, height)
+            return jsonify({
+                'success': True,
+                'newImagePath': session.virtual_path(cropped),
+                'newImageData': session.thumbnail_url(cropped),
+                'backupImagePath': session.virtual_path(backup),
+                'backupImageData': session.thumbnail_url(backup),
+                'message': 'Free form crop completed.'
+            })
+
         # Perform the crop
         new_image_path, backup_path = cropFreeForm(file_path, x, y, width, height)
 
@@ -8672,6 +8568,15 @@ def delete():
     target = data.get('target')
     if not target:
         return jsonify({"error": "Missing target path"}), 400
+
+    # Pages of an open CBZ edit session are deleted from the session manifest
+    if is_edit_session_path(target):
+        try:
+            get_session(target).delete(target)
+            return jsonify({"success": True})
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+
     if not os.path.exists(target):
         return jsonify({"error": "Target does not exist"}), 404
 
@@ -9366,6 +9271,24 @@ def config_page():
 #########################
 #   Streaming Routes    #
 #########################
+def stop_process_group(process, grace_seconds=5):
+    """
+    Terminate a script started with start_new_session=True together with any
+    worker processes it spawned (SIGTERM, then SIGKILL after grace_seconds).
+    """
+    if process.poll() is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=grace_seconds)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+    app_logger.info(f"Stopped script process group {process.pid}")
+
+
 @app.route('/stream/<script_type>')
 def stream_logs(script_type):
     file_path = request.args.get('file_path')  # Get file_path for single_file script
@@ -9415,14 +9338,23 @@ def stream_logs(script_type):
             # Set longer timeout for large file operations
             timeout_seconds = int(config.get("SETTINGS", "OPERATION_TIMEOUT", fallback="3600"))
             
+            # Own process group so worker pools (conversion_pool) die with the script
             process = subprocess.Popen(
                 ['python', '-u', script_file, directory],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
-                bufsize=0
+                bufsize=0,
+                start_new_session=True
             )
-            
+
+            try:
+                yield from relay_logs(process, timeout_seconds)
+            finally:
+                # Browser closed the stream (cancel) or the relay failed: stop the whole group
+                stop_process_group(process)
+
+        def relay_logs(process, timeout_seconds):
             while True:
                 # Check if process is still running
                 if process.poll() is not None:
@@ -9444,14 +9376,14 @@ def stream_logs(script_type):
                             continue
                 else:
                     # No output available, send keepalive for long operations
-                    if script_type in ['convert', 'rebuild']:
+                    if script_type in ['convert', 'rebuild', 'pdf']:
                         yield f"data: \n\n"  # Keepalive to prevent timeout
 
             # Wait for process to complete
             try:
                 process.wait(timeout=timeout_seconds)
             except subprocess.TimeoutExpired:
-                process.kill()
+                stop_process_group(process)
                 yield f"data: ERROR: Process timed out after {timeout_seconds} seconds\n\n"
                 return
 
@@ -9652,7 +9584,7 @@ def app_logs_page():
 # Route for monitor logs page
 @app.route('/mon-logs')
 def mon_logs_page():
-    return redirect(url_for('logs_page'))
+    return redirect(url_for('logs_page', tab='mon'))
 
 # Function to stream logs in real-time (tail last 1000 lines to prevent timeout)
 def stream_logs_file(log_file):
@@ -9703,6 +9635,12 @@ def stream_app_logs():
 def stream_mon_logs():
     return Response(stream_logs_file(MONITOR_LOG), content_type='text/event-stream')
 
+@app.route('/api/monitor-stats')
+def api_monitor_stats():
+    """Per-stage state and last-hour throughput of the monitor.py pipeline."""
+    from database import get_monitor_pipeline_stats
+    return jsonify(get_monitor_pipeline_stats())
+
 #########################
 #    Edit CBZ Route     #
 #########################
@@ -9727,6 +9665,39 @@ def edit_cbz():
 # Register the save route using the imported save_cbz function.
 app.add_url_rule('/save', view_func=save_cbz, methods=['POST'])
 
+
+@app.route('/edit-session/<sid>', methods=['GET', 'DELETE'])
+def edit_session(sid):
+    """
+    GET: paginated manifest of an edit session (cards and pending operations),
+         ?offset=0&limit=50.
+    DELETE: discard the session without saving.
+    """
+    try:
+        if request.method == 'DELETE':
+            get_session(sid).discard()
+            return jsonify({"success": True})
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = min(500, max(1, request.args.get('limit', 50, type=int)))
+        return jsonify(get_session_manifest(sid, offset, limit))
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+
+
+@app.route('/edit-session/<sid>/thumbnail/<int:entry_id>')
+def edit_session_thumbnail(sid, entry_id):
+    """Thumbnail of one page in an edit session; an entry's image never changes."""
+    try:
+        data = get_session_thumbnail(sid, entry_id)
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        app_logger.error(f"Error creating edit thumbnail: {e}")
+        return jsonify({"error": str(e)}), 500
+    response = Response(data, mimetype='image/jpeg')
+    response.headers['Cache-Control'] = 'private, max-age=86400, immutable'
+    return response
+
 #########################
 #    Monitor Process    #
 #########################
@@ -10821,73 +10792,28 @@ def add_comicinfo_to_cbz(file_path, comicinfo_xml_bytes):
     Writes ComicInfo.xml at the ROOT of the CBZ.
     - Removes any existing ComicInfo.xml (case-insensitive)
     - Uses UTF-8 bytes for content
-    - Rebuilds the entire ZIP by extracting and recompressing (matches single_file.py approach)
+    - Copies all other members' compressed bytes as-is (no extract/recompress)
     - Handles RAR files incorrectly named as CBZ
     """
-    from single_file import convert_single_rar_file
+    from rar_convert import convert_single_rar_file
+    from archive_writer import write_comicinfo_to_zip
 
     # Safety: ensure bytes
     if isinstance(comicinfo_xml_bytes, str):
         comicinfo_xml_bytes = comicinfo_xml_bytes.encode("utf-8")
 
-    # Create temp directory and file in the same directory as the source file
     file_dir = os.path.dirname(file_path) or '.'
     base_name = os.path.splitext(os.path.basename(file_path))[0]
 
-    # Create temporary extraction directory
-    temp_extract_dir = os.path.join(file_dir, f".tmp_extract_{base_name}_{os.getpid()}")
-    temp_zip_path = os.path.join(file_dir, f".tmp_{base_name}_{os.getpid()}.cbz")
-
     try:
-        # Step 1: Extract all files to temporary directory
-        os.makedirs(temp_extract_dir, exist_ok=True)
-
-        with zipfile.ZipFile(file_path, 'r') as src:
-            for filename in src.namelist():
-                # Skip any existing ComicInfo.xml
-                if os.path.basename(filename).lower() == "comicinfo.xml":
-                    continue
-                src.extract(filename, temp_extract_dir)
-
-        # Step 2: Write ComicInfo.xml to temp directory
-        comicinfo_path = os.path.join(temp_extract_dir, "ComicInfo.xml")
-        with open(comicinfo_path, 'wb') as f:
-            f.write(comicinfo_xml_bytes)
-
-        # Step 3: Recompress everything into new CBZ (sorted for consistency)
-        with zipfile.ZipFile(temp_zip_path, 'w', zipfile.ZIP_DEFLATED) as dst:
-            # Get all files and sort them
-            all_files = []
-            for root, dirs, files in os.walk(temp_extract_dir):
-                for file in files:
-                    file_path_full = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path_full, temp_extract_dir)
-                    all_files.append((file_path_full, arcname))
-
-            # Sort by arcname for consistent ordering
-            all_files.sort(key=lambda x: x[1])
-
-            # Write all files
-            for file_path_full, arcname in all_files:
-                dst.write(file_path_full, arcname)
-
-        # Step 4: Replace original file
-        os.replace(temp_zip_path, file_path)
+        # Drop ComicInfo.xml anywhere in the archive, append the new one at the root
+        write_comicinfo_to_zip(file_path, comicinfo_xml_bytes, root_only=False)
 
     except zipfile.BadZipFile as e:
         # Handle the case where a .cbz file is actually a RAR file
         if "File is not a zip file" in str(e) or "BadZipFile" in str(e):
             app_logger.warning(f"Detected that {os.path.basename(file_path)} is not a valid ZIP file. Attempting to convert from RAR...")
 
-            # Clean up any partial extraction
-            if os.path.exists(temp_extract_dir):
-                shutil.rmtree(temp_extract_dir, ignore_errors=True)
-            if os.path.exists(temp_zip_path):
-                try:
-                    os.unlink(temp_zip_path)
-                except:
-                    pass
-
             # Rename to .rar for conversion
             rar_file = os.path.join(file_dir, base_name + ".rar")
             shutil.move(file_path, rar_file)
@@ -10918,17 +10844,6 @@ def add_comicinfo_to_cbz(file_path, comicinfo_xml_bytes):
         else:
             raise
 
-    finally:
-        # Clean up temp directory
-        if os.path.exists(temp_extract_dir):
-            shutil.rmtree(temp_extract_dir, ignore_errors=True)
-        # Clean up temp zip if it still exists
-        if os.path.exists(temp_zip_path):
-            try:
-                os.unlink(temp_zip_path)
-            except:
-                pass
-
 @app.route('/validate-gcd-issue', methods=['POST'])
 def validate_gcd_issue():
     """Validate that a specific issue number exists in the given series"""
@@ -11518,8 +11433,7 @@ def search_comicvine_metadata():
                         response_data["moved"] = True
                         response_data["new_file_path"] = new_file_path
                         log_file_if_in_data(new_file_path)
-                        invalidate_cache_for_path(os.path.dirname(file_path))
-                        invalidate_cache_for_path(os.path.dirname(new_file_path))
+                        invalidate_cache_for_paths([os.path.dirname(file_path), os.path.dirname(new_file_path)])
                         update_index_on_move(file_path, new_file_path)
 
                     return jsonify(response_data)
@@ -11680,8 +11594,7 @@ def search_comicvine_metadata():
 
             # Update database caches and file index for the moved file
             log_file_if_in_data(new_file_path)
-            invalidate_cache_for_path(os.path.dirname(file_path))
-            invalidate_cache_for_path(os.path.dirname(new_file_path))
+            invalidate_cache_for_paths([os.path.dirname(file_path), os.path.dirname(new_file_path)])
             update_index_on_move(file_path, new_file_path)
 
         return jsonify(response_data)
@@ -11784,8 +11697,7 @@ def search_comicvine_metadata_with_selection():
 
             # Update database caches and file index for the moved file
             log_file_if_in_data(new_file_path)
-            invalidate_cache_for_path(os.path.dirname(file_path))
-            invalidate_cache_for_path(os.path.dirname(new_file_path))
+            invalidate_cache_for_paths([os.path.dirname(file_path), os.path.dirname(new_file_path)])
             update_index_on_move(file_path, new_file_path)
 
         return jsonify(response_data)
@@ -11826,6 +11738,11 @@ def api_insights():
     """Return library stats as JSON for Homepage custom API widget."""
     from database import get_reading_stats_by_year
 
+    etag = make_etag('insights', table_generation('file_index'), table_generation('issues_read'))
+    not_modified = etag_not_modified(etag)
+    if not_modified:
+        return not_modified
+
     library_stats = get_library_stats()
     if not library_stats:
         return jsonify({"error": "Failed to get stats"}), 500
@@ -11836,7 +11753,7 @@ def api_insights():
     hours = total_seconds // 3600
     minutes = (total_seconds % 3600) // 60
 
-    return jsonify({
+    return tag_response(jsonify({
         "total_files": library_stats.get('total_files', 0),
         "total_size": library_stats.get('total_size', 0),
         "issues_read": library_stats.get('total_read', 0),
@@ -11845,7 +11762,7 @@ def api_insights():
         "time_reading": total_seconds,
         "time_reading_hours": hours,
         "time_reading_minutes": minutes
-    })
+    }), etag)
 
 
 @app.route('/api/reading-stats')
@@ -11969,7 +11886,7 @@ def api_wrapped_download(year):
 
         # Create ZIP in memory
         zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        with CbzWriter(zip_buffer) as zf:
             for filename, image_bytes in slides:
                 zf.writestr(f"wrapped_{year}/{filename}", image_bytes)
 
@@ -12022,13 +11939,14 @@ def prebuild_browse_cache():
     except Exception as e:
         app_logger.error(f"❌ Error pre-building browse cache: {e}")
 
-# Start file watcher for /data directory in background
+# Start file watcher for the library roots in background
 def start_file_watcher_background():
     try:
-        app_logger.info(f"Initializing file watcher for {DATA_DIR}...")
-        file_watcher = FileWatcher(watch_path=DATA_DIR, debounce_seconds=2)
+        watch_paths = get_library_roots() or [DATA_DIR]
+        app_logger.info(f"Initializing file watcher for {', '.join(watch_paths)}...")
+        file_watcher = FileWatcher(watch_paths=watch_paths, debounce_seconds=2)
         if file_watcher.start():
-            app_logger.info(f"👁️ File watcher started for {DATA_DIR} (tracking recent files)...")
+            app_logger.info(f"👁️ File watcher started ({', '.join(f'{root}: {backend}' for root, backend in file_watcher.backends.items())})")
         else:
             app_logger.warning("⚠️ File watcher failed to start")
     except Exception as e:
@@ -12079,6 +11997,16 @@ def start_background_services():
     threading.Thread(target=start_metadata_scanner_background, daemon=True).start()
     app_logger.info("🔄 Metadata scanner initialization queued (waiting for index)...")
 
+    # Warm the most used directories (waits for index)
+    threading.Thread(target=warmup_cache_background, daemon=True).start()
+
+    # Re-queue downloads interrupted by the last shutdown
+    try:
+        from api import restore_download_queue
+        restore_download_queue()
+    except Exception as e:
+        app_logger.error(f"Failed to restore download queue: {e}")
+
     # Configure rebuild schedule from database
     configure_rebuild_schedule()
 
@@ -12122,6 +12050,27 @@ def api_metadata_scan_status():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/archive-analyzer-status', methods=['GET'])
+def api_archive_analyzer_status():
+    """Get single-pass archive analyzer progress and per-stage timings."""
+    try:
+        from archive_analyzer import get_analyzer_status
+        return jsonify(get_analyzer_status())
+    except Exception as e:
+        app_logger.error(f"Error getting archive analyzer status: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/compression-stats', methods=['GET'])
+def api_compression_stats():
+    """Get bytes saved by deflate versus CPU time for archives written by this process."""
+    try:
+        return jsonify(get_compression_stats())
+    except Exception as e:
+        app_logger.error(f"Error getting compression stats: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/metadata-scan-trigger', methods=['POST'])
 def api_metadata_scan_trigger():
     """Manually trigger a metadata scan of pending files."""
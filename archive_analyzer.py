@@ -0,0 +1,339 @@
+"""
+archive_analyzer.py - Single-pass analysis of comic archives
+
+Opens each CBZ/ZIP exactly once and produces everything the rest of the app
+otherwise gets by re-opening the same file:
+1. ComicInfo.xml fields (written to the file_index ci_* columns)
+2. The sorted page manifest (stored in archive_manifest)
+3. The cover thumbnail (written to the thumbnail cache, thumbnail_jobs updated)
+4. A content fingerprint built from the central directory (names, CRCs, sizes)
+
+Work is fed by the file watcher and the startup library scan, and runs on a
+small thread pool. Per-stage timings are accumulated for the status API.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from app_logging import app_logger
+from config import config
+from comicinfo import read_comicinfo_fields, SCANNER_FIELDS
+from database import (
+    clear_file_metadata,
+    get_db_connection,
+    get_file_index_entry_by_path,
+    save_archive_manifest,
+    update_file_metadata,
+    update_metadata_scanned_at
+)
+from metadata_scanner import comicinfo_to_db_metadata, to_db_path
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp')
+THUMBNAIL_HEIGHT = 300
+STAGES = ('open', 'comicinfo', 'manifest', 'fingerprint', 'thumbnail', 'store')
+
+# Global state
+analyzer_executor = None
+analyzer_lock = threading.Lock()
+pending_paths = set()
+analyzer_stats = {
+    'analyzed': 0,
+    'errors': 0,
+    'started_at': None,
+    'last_update': None,
+    'stage_ms': {stage: 0.0 for stage in STAGES}
+}
+
+
+def get_thumbnail_cache_path(file_path):
+    """
+    Get the sharded thumbnail cache path for an archive.
+
+    Uses the same md5-of-path layout as /api/thumbnail.
+    """
+    path_hash = hashlib.md5(file_path.encode('utf-8')).hexdigest()
+    thumbnails_dir = os.path.join(config.get("SETTINGS", "CACHE_DIR", fallback="/cache"), "thumbnails")
+    return os.path.join(thumbnails_dir, path_hash[:2], f"{path_hash}.jpg")
+
+
+def is_page_file(name):
+    """Return True if an archive member is a comic page image."""
+    if not name.lower().endswith(IMAGE_EXTENSIONS):
+        return False
+    # Skip macOS metadata files
+    if name.startswith('__MACOSX') or os.path.basename(name).startswith('.'):
+        return False
+    return True
+
+
+def render_thumbnail(image_file, cache_path):
+    """
+    Resize an open image file-like object to thumbnail height and save as JPEG.
+
+    Args:
+        image_file: File-like object with image data
+        cache_path: Destination path for the JPEG thumbnail
+    """
+    from PIL import Image
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+    img = Image.open(image_file)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGB')
+
+    aspect_ratio = img.width / img.height
+    new_width = int(THUMBNAIL_HEIGHT * aspect_ratio)
+    img.thumbnail((new_width, THUMBNAIL_HEIGHT), Image.Resampling.LANCZOS)
+    img.save(cache_path, format='JPEG', quality=85)
+
+
+def compute_fingerprint(infolist):
+    """
+    Build a content fingerprint from the archive's central directory.
+
+    The CRC-32 of every member already covers its content, so hashing
+    (name, crc, size) tuples identifies the archive contents without
+    inflating a single page.
+    """
+    digest = hashlib.sha1()
+    for info in sorted(infolist, key=lambda i: i.filename):
+        if info.is_dir():
+            continue
+        digest.update(f"{info.filename}\0{info.CRC:08x}\0{info.file_size}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def analyze_archive(file_path, thumbnail_path=None):
+    """
+    Open an archive once and extract metadata, page manifest, cover thumbnail
+    and fingerprint.
+
+    Args:
+        file_path: Path to the CBZ/ZIP file
+        thumbnail_path: Where to write the cover thumbnail (None to skip)
+
+    Returns:
+        Dict with comicinfo, pages, fingerprint, thumbnail, timings
+    """
+    timings = {}
+    result = {
+        'path': file_path,
+        'comicinfo': None,
+        'pages': [],
+        'fingerprint': None,
+        'thumbnail': None,
+        'timings': timings
+    }
+
+    start = time.perf_counter()
+    with zipfile.ZipFile(file_path, 'r') as zf:
+        infolist = zf.infolist()
+        timings['open'] = time.perf_counter() - start
+
+        # ComicInfo.xml (None if the archive has none)
+        start = time.perf_counter()
+        if 'ComicInfo.xml' in zf.NameToInfo:
+            result['comicinfo'] = read_comicinfo_fields(zf.read('ComicInfo.xml'), SCANNER_FIELDS)
+        timings['comicinfo'] = time.perf_counter() - start
+
+        # Sorted page manifest
+        start = time.perf_counter()
+        result['pages'] = sorted([i.filename for i in infolist if not i.is_dir() and is_page_file(i.filename)],
+                                 key=str.lower)
+        timings['manifest'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result['fingerprint'] = compute_fingerprint(infolist)
+        timings['fingerprint'] = time.perf_counter() - start
+
+        # Cover thumbnail from the first page
+        start = time.perf_counter()
+        if thumbnail_path and result['pages']:
+            try:
+                with zf.open(result['pages'][0]) as image_file:
+                    render_thumbnail(image_file, thumbnail_path)
+                result['thumbnail'] = thumbnail_path
+            except Exception as e:
+                app_logger.error(f"Error generating thumbnail for {file_path}: {e}")
+        timings['thumbnail'] = time.perf_counter() - start
+
+    return result
+
+
+def _set_thumbnail_status(file_path, status, file_mtime=None):
+    """Record the thumbnail job outcome for an analyzed archive."""
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        conn.execute("""
+            INSERT INTO thumbnail_jobs (path, status, file_mtime, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(path) DO UPDATE SET
+                status=excluded.status,
+                file_mtime=COALESCE(excluded.file_mtime, thumbnail_jobs.file_mtime),
+                updated_at=CURRENT_TIMESTAMP
+        """, (file_path, status, file_mtime))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _store_result(result, file_mtime):
+    """Write one analysis result to file_index, archive_manifest and thumbnail_jobs."""
+    file_path = result['path']
+    entry = get_file_index_entry_by_path(to_db_path(file_path))
+    if entry:
+        if result['comicinfo'] is not None:
+            update_file_metadata(entry['id'], comicinfo_to_db_metadata(result['comicinfo']), time.time())
+        else:
+            clear_file_metadata(entry['id'], time.time())
+
+    save_archive_manifest(file_path, result['fingerprint'], result['pages'], file_mtime)
+    _set_thumbnail_status(file_path, 'completed' if result['thumbnail'] else 'error', file_mtime)
+
+
+def run_analysis(file_path):
+    """
+    Analyze one archive and store the results. Runs on the analyzer pool.
+
+    Args:
+        file_path: Full filesystem path to the CBZ/ZIP file
+    """
+    try:
+        if not os.path.exists(file_path):
+            app_logger.debug(f"Archive analysis skipped (file missing): {file_path}")
+            return None
+
+        file_mtime = os.path.getmtime(file_path)
+        result = analyze_archive(file_path, get_thumbnail_cache_path(file_path))
+
+        start = time.perf_counter()
+        _store_result(result, file_mtime)
+        result['timings']['store'] = time.perf_counter() - start
+
+        with analyzer_lock:
+            analyzer_stats['analyzed'] += 1
+            analyzer_stats['last_update'] = time.time()
+            for stage, seconds in result['timings'].items():
+                analyzer_stats['stage_ms'][stage] += seconds * 1000
+
+        app_logger.debug(
+            f"Analyzed {os.path.basename(file_path)}: {len(result['pages'])} pages, "
+            + ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in result['timings'].items())
+        )
+        return result
+
+    except zipfile.BadZipFile:
+        app_logger.debug(f"Archive analysis skipped (invalid ZIP): {file_path}")
+        _record_failure(file_path)
+    except Exception as e:
+        app_logger.warning(f"Archive analysis error for {file_path}: {e}")
+        _record_failure(file_path)
+    finally:
+        with analyzer_lock:
+            pending_paths.discard(file_path)
+    return None
+
+
+def _record_failure(file_path):
+    """Mark a failed archive as scanned so it is not retried until it changes."""
+    with analyzer_lock:
+        analyzer_stats['errors'] += 1
+    try:
+        entry = get_file_index_entry_by_path(to_db_path(file_path))
+        if entry:
+            update_metadata_scanned_at(entry['id'], time.time())
+        _set_thumbnail_status(file_path, 'error')
+    except Exception as e:
+        app_logger.error(f"Error recording analysis failure for {file_path}: {e}")
+
+
+def _get_executor():
+    """Lazily create the analyzer thread pool."""
+    global analyzer_executor
+    with analyzer_lock:
+        if analyzer_executor is None:
+            num_workers = config.getint('SETTINGS', 'ARCHIVE_ANALYZER_THREADS', fallback=2)
+            num_workers = max(1, min(num_workers, 8))
+            analyzer_executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="ArchiveAnalyzer")
+            analyzer_stats['started_at'] = time.time()
+            app_logger.info(f"Started archive analyzer with {num_workers} worker thread(s)")
+        return analyzer_executor
+
+
+def queue_archive_analysis(file_path):
+    """
+    Queue an archive for single-pass analysis.
+
+    Paths already waiting in the pool are not queued twice.
+
+    Args:
+        file_path: Full filesystem path to the file
+
+    Returns:
+        True if the file was queued
+    """
+    if not file_path.lower().endswith(('.cbz', '.zip')):
+        return False
+
+    executor = _get_executor()
+    with analyzer_lock:
+        if file_path in pending_paths:
+            return False
+        pending_paths.add(file_path)
+
+    executor.submit(run_analysis, file_path)
+    return True
+
+
+def queue_archive_analyses(file_paths):
+    """
+    Queue a batch of archives for analysis (file watcher batches).
+
+    Args:
+        file_paths: Full filesystem paths; non-ZIP and already queued paths are skipped
+
+    Returns:
+        Number of archives queued
+    """
+    file_paths = [path for path in file_paths if path.lower().endswith(('.cbz', '.zip'))]
+    if not file_paths:
+        return 0
+
+    executor = _get_executor()
+    with analyzer_lock:
+        new_paths = [path for path in dict.fromkeys(file_paths) if path not in pending_paths]
+        pending_paths.update(new_paths)
+
+    for file_path in new_paths:
+        executor.submit(run_analysis, file_path)
+    return len(new_paths)
+
+
+def get_analyzer_status():
+    """
+    Get analyzer progress and per-stage timings for the status API.
+
+    Returns:
+        Dict with counts and average milliseconds per stage
+    """
+    with analyzer_lock:
+        analyzed = analyzer_stats['analyzed']
+        return {
+            'analyzed': analyzed,
+            'errors': analyzer_stats['errors'],
+            'pending': len(pending_paths),
+            'started_at': analyzer_stats['started_at'],
+            'last_update': analyzer_stats['last_update'],
+            'workers': analyzer_executor._max_workers if analyzer_executor else 0,
+            'stage_avg_ms': {
+                stage: round(total / analyzed, 2) if analyzed else 0.0
+                for stage, total in analyzer_stats['stage_ms'].items()
+            }
+        }
@@ -0,0 +1,754 @@
+"""
+archive_writer.py - Shared CBZ/ZIP writing helpers
+
+Rewriting a CBZ with zipfile normally means old_zip.read() (inflate) and
+new_zip.writestr() (deflate) for every page. For metadata edits only one tiny
+member changes, so this module copies the untouched members' compressed bytes
+verbatim into the new archive and writes a fresh central directory. Tagging a
+500 MB omnibus becomes a sequential file copy instead of seconds of CPU and a
+full copy of the archive in RAM.
+
+Every CBZ writer in the app goes through CbzWriter, which picks STORED or
+DEFLATE per member: JPEG/PNG/WebP pages are already compressed, so deflating
+them costs CPU on write and an inflate on every read for ~0% size gain.
+Settings (config.ini [SETTINGS]):
+- ARCHIVE_COMPRESSION: auto (per member type, default), deflate (legacy:
+  everything deflated) or store
+- ARCHIVE_COMPRESSION_PROBE: probe unknown types by deflating a small sample
+- ARCHIVE_DEFLATE_LEVEL: zlib level for deflated members (default 6)
+"""
+
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+import zipfile
+import zlib
+
+from app_logging import app_logger
+from config import config
+
+COPY_BUFFER_SIZE = 1024 * 1024  # 1 MiB chunks when streaming member data
+COMICINFO_NAME = "ComicInfo.xml"
+
+_LOCAL_HEADER_SIZE = 30
+_MASK_DATA_DESCRIPTOR = 0x08
+_ZIP64_EXTRA_ID = 0x0001
+_ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+# Already-compressed formats: deflating them gains ~0%
+STORED_EXTENSIONS = frozenset((
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.jxl', '.heic', '.heif',
+    '.zip', '.cbz', '.rar', '.cbr', '.7z', '.gz', '.mp4', '.webm'
+))
+# Text and raw bitmaps compress well
+DEFLATE_EXTENSIONS = frozenset((
+    '.xml', '.txt', '.json', '.nfo', '.sfv', '.html', '.htm', '.css', '.md',
+    '.csv', '.svg', '.bmp', '.tif', '.tiff'
+))
+# Page images, as the reader and the page editor see them
+PAGE_EXTENSIONS = ('.jpg', '.jpeg', '.bmp', '.gif', '.png', '.webp')
+PROBE_SAMPLE_SIZE = 64 * 1024
+PROBE_MIN_SAVING = 0.05  # deflate unless the sample shrinks by less than 5%
+
+_stats_lock = threading.Lock()
+_compression_totals = {
+    'archives': 0,
+    'stored': 0,
+    'deflated': 0,
+    'raw_copied': 0,
+    'bytes_in': 0,
+    'bytes_out': 0,
+    'deflate_saved': 0,
+    'deflate_seconds': 0.0,
+    'probe_seconds': 0.0
+}
+
+
+def _strip_zip64_extra(extra):
+    """Remove the ZIP64 extra field; FileHeader/central directory re-add it if needed."""
+    out = b''
+    i = 0
+    while i + 4 <= len(extra):
+        header_id, size = struct.unpack('<HH', extra[i:i + 4])
+        if header_id != _ZIP64_EXTRA_ID:
+            out += extra[i:i + 4 + size]
+        i += 4 + size
+    return out
+
+
+def _member_data_offset(src, info):
+    """Return the offset of a member's compressed data in the source file."""
+    src.fp.seek(info.header_offset)
+    header = src.fp.read(_LOCAL_HEADER_SIZE)
+    if len(header) != _LOCAL_HEADER_SIZE or header[:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"Bad local file header for {info.filename}")
+    name_len, extra_len = struct.unpack('<HH', header[26:30])
+    return info.header_offset + _LOCAL_HEADER_SIZE + name_len + extra_len
+
+
+def copy_member_raw(src, dst, info, arcname=None):
+    """
+    Copy one member's compressed bytes from src to dst without inflating it.
+
+    A new local header is written from the central directory entry (so the
+    member can be renamed in flight and any data descriptor is folded into
+    the header); the compressed payload is streamed in bounded chunks.
+
+    Args:
+        src: zipfile.ZipFile opened for reading
+        dst: zipfile.ZipFile opened for writing (seekable)
+        info: ZipInfo of the member in src
+        arcname: Optional new name for the member
+
+    Returns:
+        The ZipInfo written to dst
+    """
+    zinfo = zipfile.ZipInfo(arcname or info.filename, date_time=info.date_time)
+    zinfo.compress_type = info.compress_type
+    zinfo.comment = info.comment
+    zinfo.extra = _strip_zip64_extra(info.extra)
+    zinfo.create_system = info.create_system
+    zinfo.create_version = info.create_version
+    zinfo.extract_version = info.extract_version
+    zinfo.flag_bits = info.flag_bits & ~_MASK_DATA_DESCRIPTOR
+    zinfo.internal_attr = info.internal_attr
+    zinfo.external_attr = info.external_attr
+    zinfo.CRC = info.CRC
+    zinfo.compress_size = info.compress_size
+    zinfo.file_size = info.file_size
+
+    data_offset = _member_data_offset(src, info)
+
+    # zipfile has no public raw-write API; append at start_dir the same way
+    # ZipFile._open_to_write does, then register the entry for the central directory
+    zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    dst.fp.seek(dst.start_dir)
+    zinfo.header_offset = dst.fp.tell()
+    dst.fp.write(zinfo.FileHeader(zip64))
+
+    src.fp.seek(data_offset)
+    remaining = zinfo.compress_size
+    while remaining > 0:
+        chunk = src.fp.read(min(COPY_BUFFER_SIZE, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated data for {info.filename}")
+        dst.fp.write(chunk)
+        remaining -= len(chunk)
+
+    dst.filelist.append(zinfo)
+    dst.NameToInfo[zinfo.filename] = zinfo
+    dst.start_dir = dst.fp.tell()
+    dst._didModify = True
+    return zinfo
+
+
+def _compression_settings():
+    """Read the compression policy from config (mode, probe, deflate level)."""
+    mode = config.get('SETTINGS', 'ARCHIVE_COMPRESSION', fallback='auto').strip().lower()
+    if mode not in ('auto', 'deflate', 'store'):
+        mode = 'auto'
+    probe = config.getboolean('SETTINGS', 'ARCHIVE_COMPRESSION_PROBE', fallback=True)
+    level = config.getint('SETTINGS', 'ARCHIVE_DEFLATE_LEVEL', fallback=6)
+    return mode, probe, max(1, min(level, 9))
+
+
+def is_compressible(sample):
+    """
+    Quick compressibility probe: deflate a sample at level 1 and check the saving.
+
+    Args:
+        sample: Leading bytes of the member (up to PROBE_SAMPLE_SIZE)
+
+    Returns:
+        True if deflating is worth it
+    """
+    sample = sample[:PROBE_SAMPLE_SIZE]
+    if len(sample) < 512:
+        return True
+    return len(zlib.compress(sample, 1)) < len(sample) * (1 - PROBE_MIN_SAVING)
+
+
+def choose_compression(name, sample=None, settings=None):
+    """
+    Pick STORED or DEFLATE (and level) for one archive member.
+
+    Known image/archive types are stored, known text types are deflated and
+    anything else is probed (when enabled and a sample is available).
+
+    Args:
+        name: Member name
+        sample: Optional leading bytes of the member for the probe
+        settings: Optional (mode, probe, level) tuple from _compression_settings()
+
+    Returns:
+        Tuple of (compress_type, compresslevel)
+    """
+    mode, probe, level = settings or _compression_settings()
+    if mode == 'store':
+        return zipfile.ZIP_STORED, None
+    if mode == 'deflate':
+        return zipfile.ZIP_DEFLATED, level
+
+    ext = os.path.splitext(name)[1].lower()
+    if ext in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED, None
+    if ext in DEFLATE_EXTENSIONS or not probe or sample is None:
+        return zipfile.ZIP_DEFLATED, level
+    return (zipfile.ZIP_DEFLATED, level) if is_compressible(sample) else (zipfile.ZIP_STORED, None)
+
+
+def _set_compress_level(zinfo, level):
+    # ZipFile.open(zinfo, 'w') takes no level argument and reads it from the
+    # member; the attribute went public as compress_level in Python 3.13
+    if hasattr(zinfo, 'compress_level'):
+        zinfo.compress_level = level
+    else:
+        zinfo._compresslevel = level
+
+
+def _read_sample(file_path):
+    try:
+        with open(file_path, 'rb') as f:
+            return f.read(PROBE_SAMPLE_SIZE)
+    except OSError:
+        return None
+
+
+class CbzWriter:
+    """
+    Write-mode ZipFile wrapper that applies the compression policy per member.
+
+    Drop-in for ``zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)`` in the
+    CBZ writers: write(), writestr() and write_stream() pick STORED/DEFLATE
+    for each member, copy_raw() copies a member from another archive without
+    recompressing. On close, bytes saved by deflate and the time it took are
+    logged and added to the process-wide totals (get_compression_stats()).
+    """
+
+    def __init__(self, file, mode='w'):
+        self.zf = zipfile.ZipFile(file, mode, compression=zipfile.ZIP_DEFLATED)
+        self.name = os.path.basename(file).removesuffix('.tmpzip') if isinstance(file, str) else '<stream>'
+        self.settings = _compression_settings()
+        self.stats = {key: 0 for key in _compression_totals if key != 'archives'}
+        self.stats.update(deflate_seconds=0.0, probe_seconds=0.0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(report=exc_type is None)
+
+    @property
+    def comment(self):
+        return self.zf.comment
+
+    @comment.setter
+    def comment(self, value):
+        self.zf.comment = value
+
+    def namelist(self):
+        return self.zf.namelist()
+
+    def _choose(self, name, sample):
+        start = time.perf_counter()
+        compress_type, level = choose_compression(name, sample, self.settings)
+        self.stats['probe_seconds'] += time.perf_counter() - start
+        return compress_type, level
+
+    def _record(self, zinfo, elapsed):
+        self.stats['bytes_in'] += zinfo.file_size
+        self.stats['bytes_out'] += zinfo.compress_size
+        if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+            self.stats['deflated'] += 1
+            self.stats['deflate_saved'] += zinfo.file_size - zinfo.compress_size
+            self.stats['deflate_seconds'] += elapsed
+        else:
+            self.stats['stored'] += 1
+
+    def write(self, filename, arcname=None):
+        """Add a file from disk (same arguments as ZipFile.write)."""
+        name = arcname or filename
+        needs_sample = self.settings[1] and os.path.splitext(name)[1].lower() not in STORED_EXTENSIONS
+        compress_type, level = self._choose(name, _read_sample(filename) if needs_sample else None)
+
+        start = time.perf_counter()
+        self.zf.write(filename, arcname, compress_type=compress_type, compresslevel=level)
+        self._record(self.zf.filelist[-1], time.perf_counter() - start)
+
+    def writestr(self, zinfo_or_arcname, data):
+        """Add a member from bytes/str (same arguments as ZipFile.writestr)."""
+        name = zinfo_or_arcname.filename if isinstance(zinfo_or_arcname, zipfile.ZipInfo) else zinfo_or_arcname
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        compress_type, level = self._choose(name, data[:PROBE_SAMPLE_SIZE])
+
+        start = time.perf_counter()
+        self.zf.writestr(zinfo_or_arcname, data, compress_type=compress_type, compresslevel=level)
+        self._record(self.zf.filelist[-1], time.perf_counter() - start)
+
+    def write_stream(self, zinfo, fileobj):
+        """
+        Stream a member from an open file object through a bounded buffer.
+
+        The first chunk doubles as the probe sample, so nothing is read twice.
+
+        Args:
+            zinfo: ZipInfo for the new member (file_size set if known, for ZIP64)
+            fileobj: Readable binary file object
+        """
+        first = fileobj.read(COPY_BUFFER_SIZE)
+        zinfo.compress_type, level = self._choose(zinfo.filename, first)
+        if level is not None:
+            _set_compress_level(zinfo, level)
+
+        start = time.perf_counter()
+        with self.zf.open(zinfo, 'w', force_zip64=zinfo.file_size > zipfile.ZIP64_LIMIT) as writer:
+            writer.write(first)
+            shutil.copyfileobj(fileobj, writer, COPY_BUFFER_SIZE)
+        self._record(zinfo, time.perf_counter() - start)
+
+    def copy_raw(self, src, info, arcname=None):
+        """Copy a member's compressed bytes from another archive (see copy_member_raw)."""
+        zinfo = copy_member_raw(src, self.zf, info, arcname)
+        self.stats['raw_copied'] += 1
+        self.stats['bytes_in'] += zinfo.file_size
+        self.stats['bytes_out'] += zinfo.compress_size
+        return zinfo
+
+    def close(self, report=True):
+        """Close the archive and report bytes saved versus deflate time."""
+        self.zf.close()
+        recompressed = self.stats['stored'] + self.stats['deflated']
+        written = recompressed + self.stats['raw_copied']
+        if not report or not written:
+            return
+
+        with _stats_lock:
+            _compression_totals['archives'] += 1
+            for key, value in self.stats.items():
+                _compression_totals[key] += value
+
+        # Metadata-only rewrites recompress a single member and raw-copy the
+        # pages; keep those out of the info log
+        log = app_logger.info if recompressed > 1 else app_logger.debug
+        log(
+            f"Wrote {self.name}: {written} members ({self.stats['stored']} stored, "
+            f"{self.stats['deflated']} deflated, {self.stats['raw_copied']} copied raw), deflate saved "
+            f"{self.stats['deflate_saved'] / 1024:.0f} KB in {self.stats['deflate_seconds'] * 1000:.0f} ms"
+        )
+
+
+def get_compression_stats():
+    """
+    Get process-wide compression totals for archives written via CbzWriter.
+
+    Returns:
+        Dict with member counts, bytes in/out, bytes saved by deflate and the
+        time spent deflating
+    """
+    with _stats_lock:
+        stats = dict(_compression_totals)
+    stats['deflate_seconds'] = round(stats['deflate_seconds'], 3)
+    stats['probe_seconds'] = round(stats['probe_seconds'], 3)
+    stats['saved_kb_per_cpu_second'] = (
+        round(stats['deflate_saved'] / 1024 / stats['deflate_seconds'], 1) if stats['deflate_seconds'] else 0.0
+    )
+    return stats
+
+
+def rewrite_zip(zip_path, skip=None, replace=None, append=None):
+    """
+    Rewrite a ZIP/CBZ, raw-copying every member that is not changed.
+
+    The new archive is written next to the original and atomically swapped
+    in with os.replace().
+
+    Args:
+        zip_path: Path to the .zip/.cbz file
+        skip: Optional callable(name) -> bool; matching members are dropped
+        replace: Optional dict of member name -> bytes, written in place of
+                 the existing member (same position)
+        append: Optional list of (name, bytes) written after all members
+
+    Returns:
+        Dict with copied, replaced, skipped, appended counts
+    """
+    replace = replace or {}
+    append = append or []
+    stats = {'copied': 0, 'replaced': 0, 'skipped': 0, 'appended': 0}
+    temp_path = zip_path + ".tmpzip"
+
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as src, CbzWriter(temp_path) as dst:
+            dst.comment = src.comment
+
+            for info in src.infolist():
+                if skip and skip(info.filename):
+                    stats['skipped'] += 1
+                    continue
+                if info.filename in replace:
+                    zinfo = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                    zinfo.external_attr = info.external_attr
+                    dst.writestr(zinfo, replace[info.filename])
+                    stats['replaced'] += 1
+                    continue
+                dst.copy_raw(src, info)
+                stats['copied'] += 1
+
+            for name, data in append:
+                dst.writestr(name, data)
+                stats['appended'] += 1
+
+        os.replace(temp_path, zip_path)
+        return stats
+
+    finally:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError as e:
+                app_logger.warning(f"Could not remove temp archive {temp_path}: {e}")
+
+
+def is_comicinfo_member(name, root_only=True):
+    """Return True if a member name is ComicInfo.xml (case-insensitive)."""
+    if root_only:
+        return name.lower() == COMICINFO_NAME.lower()
+    return os.path.basename(name).lower() == COMICINFO_NAME.lower()
+
+
+def write_comicinfo_to_zip(zip_path, xml_bytes, root_only=True):
+    """
+    Replace (or add) ComicInfo.xml at the root of a ZIP/CBZ without
+    recompressing any other member.
+
+    Args:
+        zip_path: Path to the .zip/.cbz file
+        xml_bytes: New ComicInfo.xml content (str or bytes)
+        root_only: Only drop a root-level ComicInfo.xml (False drops any
+                   ComicInfo.xml in subfolders too)
+
+    Returns:
+        Dict of rewrite_zip counts
+    """
+    if isinstance(xml_bytes, str):
+        xml_bytes = xml_bytes.encode('utf-8')
+
+    return rewrite_zip(
+        zip_path,
+        skip=lambda name: is_comicinfo_member(name, root_only),
+        append=[(COMICINFO_NAME, xml_bytes)]
+    )
+
+
+def remove_comicinfo_from_zip(zip_path):
+    """
+    Drop the root ComicInfo.xml from a ZIP/CBZ without recompressing pages.
+
+    Returns:
+        True if a ComicInfo.xml was found and removed, False otherwise
+    """
+    with zipfile.ZipFile(zip_path, 'r') as src:
+        if not any(is_comicinfo_member(name) for name in src.namelist()):
+            return False
+
+    rewrite_zip(zip_path, skip=is_comicinfo_member)
+    return True
+
+
+def safe_zip_date_time(date_time):
+    """
+    Return a member timestamp the ZIP format can store.
+
+    Archives built by other tools can carry zeroed or out-of-range DOS dates
+    (month 0, year < 1980) that make ZipFile.writestr() raise; those fall
+    back to 1980-01-01 00:00:00.
+    """
+    try:
+        year, month, day, hour, minute, second = date_time
+    except (TypeError, ValueError):
+        return _ZIP_EPOCH
+    if year < 1980 or year > 2107 or not (1 <= month <= 12 and 1 <= day <= 31) \
+            or hour > 23 or minute > 59 or second > 59:
+        return _ZIP_EPOCH
+    return tuple(date_time)
+
+
+def matches_extensions(name, extensions):
+    """
+    Return True if a member's extension (or whole basename, for dotfiles
+    like .DS_Store) is in a DELETED_FILES/SKIPPED_FILES style list.
+    """
+    basename = os.path.basename(name).lower()
+    return os.path.splitext(basename)[1] in extensions or basename in extensions
+
+
+def stream_rebuild_zip(src_path, dst_path, skip=None, progress=None):
+    """
+    Rebuild a ZIP/CBZ member by member without extracting it to disk.
+
+    Every member is inflated from the source (verifying its CRC) and written
+    straight into the destination through a bounded buffer, compressed per
+    the CbzWriter policy, so neither a temp
+    folder nor a whole page in RAM is needed. Directory entries are dropped
+    and timestamps are fixed in flight with safe_zip_date_time(). The result
+    is written next to dst_path and swapped in with os.replace(), so src_path
+    and dst_path may be the same file.
+
+    Args:
+        src_path: Archive to read
+        dst_path: Archive to write
+        skip: Optional callable(name) -> bool; matching members are dropped
+        progress: Optional callable(done, total) called after each member
+
+    Returns:
+        Dict with written, skipped counts
+    """
+    stats = {'written': 0, 'skipped': 0}
+    temp_path = dst_path + ".tmpzip"
+
+    try:
+        with zipfile.ZipFile(src_path, 'r') as src, CbzWriter(temp_path) as dst:
+            members = [info for info in src.infolist() if not info.is_dir()]
+            total = len(members)
+
+            for done, info in enumerate(members, start=1):
+                if skip and skip(info.filename):
+                    stats['skipped'] += 1
+                else:
+                    zinfo = zipfile.ZipInfo(info.filename, date_time=safe_zip_date_time(info.date_time))
+                    zinfo.external_attr = info.external_attr
+                    zinfo.file_size = info.file_size
+                    with src.open(info) as reader:
+                        dst.write_stream(zinfo, reader)
+                    stats['written'] += 1
+
+                if progress:
+                    progress(done, total)
+
+        os.replace(temp_path, dst_path)
+        return stats
+
+    finally:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError as e:
+                app_logger.warning(f"Could not remove temp archive {temp_path}: {e}")
+
+
+def iter_merge_zips(sources, dst_path, rename=None, skip=None):
+    """
+    Merge several ZIP/CBZ archives into one by raw-copying their members.
+
+    Sources are merged in the given order, each in member-name order. No
+    member is inflated or re-compressed: its compressed bytes are streamed
+    into the new archive under the name returned by rename(). The result is
+    written next to dst_path and moved into place with os.replace() once
+    complete; if the generator is closed early (client went away) or fails,
+    the partial file is removed.
+
+    Args:
+        sources: Archive paths; missing or invalid ones are skipped with a warning
+        dst_path: Archive to write
+        rename: Optional callable(source_index, info) -> arcname
+        skip: Optional callable(name) -> bool; matching members are dropped
+
+    Yields:
+        (done, total, source_path) after each member written
+
+    Raises:
+        ValueError: if the sources contain no members to merge
+    """
+    temp_path = dst_path + ".tmpzip"
+
+    # Read the central directories first so progress has a total
+    plan = []
+    for source_path in sources:
+        try:
+            with zipfile.ZipFile(source_path, 'r') as src:
+                members = sorted(
+                    (info for info in src.infolist()
+                     if not info.is_dir() and not (skip and skip(info.filename))),
+                    key=lambda info: info.filename
+                )
+        except (OSError, zipfile.BadZipFile) as e:
+            app_logger.warning(f"Skipping {os.path.basename(source_path)} in merge: {e}")
+            continue
+        plan.append((source_path, [info.filename for info in members]))
+
+    total = sum(len(names) for _, names in plan)
+    if not total:
+        raise ValueError("No files to merge in the selected archives")
+
+    done = 0
+    try:
+        with CbzWriter(temp_path) as dst:
+            for source_index, (source_path, names) in enumerate(plan):
+                with zipfile.ZipFile(source_path, 'r') as src:
+                    for name in names:
+                        info = src.getinfo(name)
+                        dst.copy_raw(src, info, rename(source_index, info) if rename else None)
+                        done += 1
+                        yield done, total, source_path
+
+        os.replace(temp_path, dst_path)
+
+    finally:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError as e:
+                app_logger.warning(f"Could not remove temp archive {temp_path}: {e}")
+
+
+def natural_sort_key(file_path):
+    """
+    Create a sort key that mimics JavaScript's natural sorting behavior:
+    - Files starting with special characters (non-alphanumeric) come first
+    - Then case-insensitive natural (numeric-aware) sorting
+
+    This matches the sortInlineEditCards function in static/js/index.js
+    """
+    filename = os.path.basename(file_path)
+    starts_with_alphanum = bool(re.match(r'^[a-zA-Z0-9]', filename))
+    alphanum_key = [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', filename)]
+    return (1 if starts_with_alphanum else 0, alphanum_key)
+
+
+class ArchiveEdit:
+    """
+    Pending member edits to a ZIP/CBZ, applied in one rewrite.
+
+    Only the members that change are decoded or written; everything else is
+    raw-copied (see copy_member_raw), so cropping a cover or dropping the
+    first page of a 300-page book is a sequential copy, not a re-zip.
+
+    Members keep their archive order. replace() keeps a member's position;
+    insert() and rename() place the member at its sort position, before the
+    first member that sorts after it (natural_sort_key by default).
+
+    Usage:
+        with ArchiveEdit(path) as edit:
+            cover = edit.pages()[0]
+            edit.rename(cover, 'cover_b.jpg')
+            edit.insert('cover_a.jpg', cropped_bytes)
+            edit.apply()
+    """
+
+    def __init__(self, zip_path, sort_key=natural_sort_key):
+        self.zip_path = zip_path
+        self.sort_key = sort_key
+        self.src = zipfile.ZipFile(zip_path, 'r')
+        # [arcname, source ZipInfo or None, new bytes or None, date_time]
+        self._entries = [
+            [info.filename, info, None, info.date_time]
+            for info in self.src.infolist() if not info.is_dir()
+        ]
+        self._changed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.src.close()
+
+    def _find(self, name):
+        for index, entry in enumerate(self._entries):
+            if entry[0] == name:
+                return index
+        raise KeyError(f"There is no item named {name!r} in the archive")
+
+    def _place(self, entry):
+        key = self.sort_key(entry[0])
+        for index, other in enumerate(self._entries):
+            if self.sort_key(other[0]) > key:
+                self._entries.insert(index, entry)
+                return
+        self._entries.append(entry)
+
+    def names(self):
+        """Member names in the order they will be written."""
+        return [entry[0] for entry in self._entries]
+
+    def pages(self, extensions=PAGE_EXTENSIONS):
+        """Page image names in sort order."""
+        return sorted((name for name in self.names() if name.lower().endswith(extensions)), key=self.sort_key)
+
+    def __contains__(self, name):
+        return any(entry[0] == name for entry in self._entries)
+
+    def read(self, name):
+        """Current contents of a member (pending data if it was replaced)."""
+        _, info, data, _ = self._entries[self._find(name)]
+        return data if data is not None else self.src.read(info)
+
+    def delete(self, name):
+        """Drop a member."""
+        del self._entries[self._find(name)]
+        self._changed = True
+
+    def replace(self, name, data):
+        """Write new contents for a member at its current position."""
+        self._entries[self._find(name)][2] = data
+        self._changed = True
+
+    def rename(self, name, new_name):
+        """Rename a member (still raw-copied) and move it to its sort position."""
+        if new_name != name and new_name in self:
+            raise ValueError(f"{new_name!r} already exists in the archive")
+        entry = self._entries.pop(self._find(name))
+        entry[0] = new_name
+        self._place(entry)
+        self._changed = True
+
+    def insert(self, name, data, date_time=None):
+        """Add a new member at its sort position."""
+        if name in self:
+            raise ValueError(f"{name!r} already exists in the archive")
+        self._place([name, None, data, date_time or time.localtime()[:6]])
+        self._changed = True
+
+    def apply(self):
+        """
+        Write the edited archive next to the original and swap it in.
+
+        Returns:
+            Dict with copied and written member counts (None if nothing changed)
+        """
+        if not self._changed:
+            return None
+
+        stats = {'copied': 0, 'written': 0}
+        temp_path = self.zip_path + ".tmpzip"
+        try:
+            with CbzWriter(temp_path) as dst:
+                dst.comment = self.src.comment
+                for name, info, data, date_time in self._entries:
+                    if data is None:
+                        dst.copy_raw(self.src, info, name)
+                        stats['copied'] += 1
+                    else:
+                        zinfo = zipfile.ZipInfo(name, date_time=safe_zip_date_time(date_time))
+                        if info is not None:
+                            zinfo.external_attr = info.external_attr
+                        dst.writestr(zinfo, data)
+                        stats['written'] += 1
+
+            self.src.close()
+            os.replace(temp_path, self.zip_path)
+            self._changed = False
+            return stats
+
+        finally:
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError as e:
+                    app_logger.warning(f"Could not remove temp archive {temp_path}: {e}")
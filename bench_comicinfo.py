@@ -0,0 +1,90 @@
+"""
+bench_comicinfo.py - Benchmark ComicInfo.xml parsing paths
+
+Collects ComicInfo.xml files from the CBZ/ZIP archives under a directory
+(your real library is the corpus) and times:
+- stdlib: read_comicinfo_xml (full ElementTree + _sanitize_xml retry), then
+  filtered to the scanner fields
+- fast:   read_comicinfo_fields (lxml recover mode, streaming, scanner fields
+  only; falls back to stdlib when lxml is not installed)
+
+Usage:
+    python bench_comicinfo.py <directory> [max_files] [rounds]
+"""
+
+import os
+import sys
+import time
+import zipfile
+
+from app_logging import app_logger
+from comicinfo import read_comicinfo_xml, read_comicinfo_fields, lxml_etree, SCANNER_FIELDS
+
+
+def collect_corpus(directory, max_files=2000):
+    """Read raw ComicInfo.xml bytes from up to max_files archives under directory."""
+    corpus = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.lower().endswith(('.cbz', '.zip')):
+                continue
+            try:
+                with zipfile.ZipFile(os.path.join(root, name), 'r') as zf:
+                    corpus.append(zf.read('ComicInfo.xml'))
+            except (KeyError, zipfile.BadZipFile, OSError):
+                continue
+            if len(corpus) >= max_files:
+                return corpus
+    return corpus
+
+
+def _stdlib_fields(xml_data):
+    data = read_comicinfo_xml(xml_data)
+    return {tag: value for tag, value in data.items() if tag in SCANNER_FIELDS}
+
+
+def time_parser(parser, corpus, rounds):
+    """Return the best-of-rounds wall time for parsing the whole corpus."""
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for xml_data in corpus:
+            parser(xml_data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_benchmark(directory, max_files=2000, rounds=3):
+    corpus = collect_corpus(directory, max_files)
+    if not corpus:
+        app_logger.error(f"No ComicInfo.xml files found under {directory}")
+        return
+
+    total_kb = sum(len(x) for x in corpus) / 1024
+    app_logger.info(f"Corpus: {len(corpus)} ComicInfo.xml files ({total_kb:.0f} KB), best of {rounds} rounds")
+    app_logger.info(f"lxml available: {lxml_etree is not None}")
+
+    # Both paths must agree on the scanner fields
+    mismatches = sum(1 for x in corpus if _stdlib_fields(x) != read_comicinfo_fields(x, SCANNER_FIELDS))
+
+    results = {
+        'stdlib': time_parser(_stdlib_fields, corpus, rounds),
+        'fast': time_parser(lambda x: read_comicinfo_fields(x, SCANNER_FIELDS), corpus, rounds),
+    }
+    for name, elapsed in results.items():
+        app_logger.info(
+            f"{name:>6}: {elapsed * 1000:.1f} ms total, "
+            f"{elapsed * 1000 / len(corpus):.3f} ms/file, {len(corpus) / elapsed:.0f} files/sec"
+        )
+    app_logger.info(f"Speedup: {results['stdlib'] / results['fast']:.2f}x, field mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        app_logger.error("No directory provided!")
+    else:
+        directory = sys.argv[1]
+        max_files = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+        rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+        run_benchmark(directory, max_files, rounds)
@@ -0,0 +1,402 @@
+"""
+cache_manager.py - Byte-budgeted in-memory caches with shared accounting
+
+The app used to keep several caches that each evicted on their own terms:
+directory_cache capped at MAX_CACHE_SIZE entries, the data directory stats
+dict with a hand-rolled TTL, the edit session thumbnail LRU, and an ad-hoc
+"RSS above 800 MB -> halve directory_cache" check on every listing miss.
+None of them knew how much memory the others held.
+
+CacheManager owns named CacheRegions:
+- Each region tracks the approximate size in bytes of every entry and
+  enforces its own max_bytes (and optional max_entries) with an LRU or LFU
+  policy; an optional TTL expires entries on read and in expire().
+- The manager enforces a global budget (CACHE_MEMORY_MB) across all regions:
+  when the sum goes over, every region is trimmed in proportion to its size.
+- attach_monitor() hooks the manager into MemoryMonitor: when process RSS
+  goes over the monitor's cleanup threshold, regions shed half their bytes.
+  RSS rarely falls after frees, so a later pass only sheds again once RSS
+  has grown PRESSURE_RSS_STEP_MB past the last shed or PRESSURE_COOLDOWN
+  seconds have gone by; otherwise the caches would be emptied every pass.
+- metrics() reports hits, misses, evictions, expirations, invalidations and
+  bytes per region for /cache-status.
+
+All regions share one re-entrant lock, so callers that need several cache
+operations to be atomic (app.cache_lock) can hold it around them.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from app_logging import app_logger
+from config import config
+
+LRU = 'lru'
+LFU = 'lfu'
+PRESSURE_SHED_FRACTION = 0.5
+PRESSURE_RSS_STEP_MB = 64
+PRESSURE_COOLDOWN = 900  # seconds
+
+
+def estimate_size(value):
+    """
+    Approximate deep size in bytes of JSON-like data (dicts, lists, strings,
+    bytes, numbers). Shared/interned objects are counted every time they
+    appear, so the estimate errs on the high side.
+    """
+    size = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return size
+
+
+class CacheRegion:
+    """
+    One named cache. Values live in `entries` (an OrderedDict in LRU order,
+    or a subclass such as path_cache.PathIndexedCache); per-entry size,
+    store time and hit count live alongside in `_meta`.
+    """
+
+    def __init__(self, manager, name, max_bytes, ttl=None, policy=LRU, max_entries=None,
+                 store=None, sizer=estimate_size):
+        if policy not in (LRU, LFU):
+            raise ValueError(f"Unknown cache policy: {policy}")
+        self.manager = manager
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.policy = policy
+        self.max_entries = max_entries
+        self.sizer = sizer
+        self.lock = manager.lock
+        self.entries = store if store is not None else OrderedDict()
+        self._meta = {}  # key -> [size, stored_at, hits]
+        self.bytes = 0
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    # -- reads ------------------------------------------------------------
+
+    def _expired(self, meta, now):
+        return self.ttl is not None and now - meta[1] > self.ttl
+
+    def get(self, key, default=None, validate=None):
+        """
+        Cached value (counting a hit) or default (counting a miss).
+
+        validate(value), if given, runs outside the lock before the hit is
+        counted; an entry it rejects is invalidated and counted as a miss.
+        """
+        with self.lock:
+            meta = self._meta.get(key)
+            if meta is None:
+                self.misses += 1
+                return default
+            if self._expired(meta, time.time()):
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            value = self.entries[key]
+            if validate is None:
+                self._hit(key, meta)
+                return value
+
+        valid = validate(value)
+        with self.lock:
+            # Another thread may have replaced or dropped the entry meanwhile
+            current = self.entries.get(key) is value
+            if valid:
+                if current:
+                    self._hit(key, self._meta[key])
+                else:
+                    self.hits += 1
+                return value
+            if current:
+                self._remove(key)
+                self.invalidations += 1
+            self.misses += 1
+            return default
+
+    def _hit(self, key, meta):
+        self.hits += 1
+        meta[2] += 1
+        self.entries.move_to_end(key)
+
+    def peek(self, key, default=None):
+        """Cached value without touching stats, recency or expiry."""
+        with self.lock:
+            return self.entries.get(key, default)
+
+    def __contains__(self, key):
+        with self.lock:
+            meta = self._meta.get(key)
+            return meta is not None and not self._expired(meta, time.time())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def keys(self):
+        """Snapshot of the cached keys."""
+        with self.lock:
+            return list(self.entries)
+
+    # -- writes -----------------------------------------------------------
+
+    def set(self, key, value, size=None):
+        """Store value, then evict within the region and the global budget."""
+        if size is None:
+            size = self.sizer(value)
+        with self.lock:
+            if key in self._meta:
+                self._remove(key)
+            if size > self.max_bytes:
+                # Would evict the whole region and still not fit
+                return
+            self.entries[key] = value
+            self._meta[key] = [size, time.time(), 0]
+            self.bytes += size
+            while len(self.entries) > 1 and self._over_limit():
+                self._evict_one(protect=key)
+        self.manager.enforce_budget()
+
+    def _over_limit(self):
+        if self.bytes > self.max_bytes:
+            return True
+        return self.max_entries is not None and len(self.entries) > self.max_entries
+
+    def _remove(self, key):
+        self.entries.pop(key, None)
+        meta = self._meta.pop(key, None)
+        if meta is not None:
+            self.bytes -= meta[0]
+
+    def _evict_one(self, protect=None):
+        if self.policy == LFU:
+            # Fewest hits first, oldest store time breaks ties; a new entry
+            # has no hits yet, so the one being inserted is protected
+            key = min((k for k in self._meta if k != protect),
+                      key=lambda k: (self._meta[k][2], self._meta[k][1]))
+        else:
+            key = next(iter(self.entries))
+        freed = self._meta[key][0]
+        self._remove(key)
+        self.evictions += 1
+        return freed
+
+    def pop(self, key, default=None):
+        """Invalidate one key; returns its value or default."""
+        with self.lock:
+            if key not in self._meta:
+                return default
+            value = self.entries[key]
+            self._remove(key)
+            self.invalidations += 1
+            return value
+
+    def invalidate(self, keys):
+        """Invalidate several keys; returns how many were cached."""
+        count = 0
+        with self.lock:
+            for key in keys:
+                if key in self._meta:
+                    self._remove(key)
+                    count += 1
+            self.invalidations += count
+        return count
+
+    def clear(self, reset_stats=False):
+        """Drop every entry; returns how many there were."""
+        with self.lock:
+            count = len(self.entries)
+            self.entries.clear()
+            self._meta.clear()
+            self.bytes = 0
+            if reset_stats:
+                self._reset_stats()
+            else:
+                self.invalidations += count
+            return count
+
+    def expire(self):
+        """Drop entries past their TTL; returns how many were dropped."""
+        if self.ttl is None:
+            return 0
+        with self.lock:
+            now = time.time()
+            expired = [key for key, meta in self._meta.items() if self._expired(meta, now)]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+            return len(expired)
+
+    def trim(self, target_bytes):
+        """Evict by policy until the region holds at most target_bytes; returns bytes freed."""
+        freed = 0
+        with self.lock:
+            while self.entries and self.bytes > target_bytes:
+                freed += self._evict_one()
+        return freed
+
+    # -- reporting --------------------------------------------------------
+
+    def describe(self, limit=5):
+        """Age, size and hits of the first `limit` entries in eviction order."""
+        with self.lock:
+            now = time.time()
+            sample = {}
+            for key in list(self.entries)[:limit]:
+                size, stored_at, hits = self._meta[key]
+                sample[str(key)] = {"age_seconds": round(now - stored_at, 2), "bytes": size, "hits": hits}
+            return sample
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "policy": self.policy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / requests * 100, 2) if requests else 0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
+
+
+class CacheManager:
+    """Registry of CacheRegions sharing one lock and one global byte budget."""
+
+    def __init__(self, budget_bytes):
+        self.lock = threading.RLock()
+        self.budget_bytes = budget_bytes
+        self.regions = {}
+        self.budget_trims = 0
+        self.pressure_trims = 0
+        self.pressure_skips = 0
+        self.monitor = None
+        self._last_shed_rss = None
+        self._last_shed_at = 0
+
+    def register(self, name, max_bytes, ttl=None, policy=LRU, max_entries=None, store=None, sizer=estimate_size):
+        """
+        Create a named region, or return the existing one with that name.
+
+        Args:
+            name: Region name shown in metrics
+            max_bytes: Byte limit for this region on its own
+            ttl: Seconds an entry stays valid, or None
+            policy: LRU or LFU eviction
+            max_entries: Optional entry-count limit on top of max_bytes
+            store: Mapping to hold the values (defaults to an OrderedDict)
+            sizer: Function returning an entry's size in bytes
+
+        Returns:
+            CacheRegion
+        """
+        with self.lock:
+            region = self.regions.get(name)
+            if region is None:
+                region = CacheRegion(self, name, max_bytes, ttl, policy, max_entries, store, sizer)
+                self.regions[name] = region
+            return region
+
+    def total_bytes(self):
+        with self.lock:
+            return sum(region.bytes for region in self.regions.values())
+
+    def _shrink_all(self, factor):
+        """Trim every region to factor x its current size; returns bytes freed."""
+        freed = 0
+        for region in self.regions.values():
+            if region.bytes:
+                freed += region.trim(int(region.bytes * factor))
+        return freed
+
+    def enforce_budget(self):
+        """Trim regions proportionally when their sum is over the global budget."""
+        with self.lock:
+            total = self.total_bytes()
+            if total <= self.budget_bytes:
+                return 0
+            self.budget_trims += 1
+            return self._shrink_all(self.budget_bytes / total)
+
+    def relieve_pressure(self, fraction=PRESSURE_SHED_FRACTION):
+        """
+        Shed a fraction of every region (process memory is high), unless RSS
+        has not grown since the last shed and the cooldown has not passed.
+        """
+        rss_mb = self.monitor.get_memory_usage() if self.monitor is not None else None
+        now = time.time()
+        with self.lock:
+            if (rss_mb is not None and self._last_shed_rss is not None
+                    and rss_mb < self._last_shed_rss + PRESSURE_RSS_STEP_MB
+                    and now - self._last_shed_at < PRESSURE_COOLDOWN):
+                self.pressure_skips += 1
+                return 0
+            freed = self._shrink_all(1 - fraction)
+            self.pressure_trims += 1
+            self._last_shed_rss = rss_mb
+            self._last_shed_at = now
+        app_logger.info(f"Memory pressure: dropped {freed / (1024 * 1024):.1f}MB of cached data")
+        return freed
+
+    def expire_all(self):
+        """Drop expired entries from every region."""
+        with self.lock:
+            return sum(region.expire() for region in self.regions.values())
+
+    def attach_monitor(self, monitor):
+        """Shed cached data whenever MemoryMonitor sees RSS above its cleanup threshold."""
+        self.monitor = monitor
+        monitor.add_pressure_callback(self.relieve_pressure)
+
+    def activity(self):
+        """A number that moves whenever any region's contents change (reads do not count)."""
+        with self.lock:
+            return sum(region.evictions + region.expirations + region.invalidations + region.bytes
+                       for region in self.regions.values())
+
+    def metrics(self):
+        with self.lock:
+            metrics = {
+                "budget_bytes": self.budget_bytes,
+                "total_bytes": self.total_bytes(),
+                "budget_trims": self.budget_trims,
+                "pressure_trims": self.pressure_trims,
+                "pressure_skips": self.pressure_skips,
+                "regions": {name: region.stats() for name, region in self.regions.items()}
+            }
+        if self.monitor is not None:
+            metrics["process_memory_mb"] = round(self.monitor.get_memory_usage(), 1)
+            metrics["pressure_threshold_mb"] = self.monitor.cleanup_threshold_mb
+        return metrics
+
+
+_manager = CacheManager(config.getint("SETTINGS", "CACHE_MEMORY_MB", fallback=256) * 1024 * 1024)
+
+
+def get_cache_manager():
+    """Get the process-wide cache manager."""
+    return _manager
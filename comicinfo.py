@@ -2,10 +2,20 @@ import os
 import sys
 import re
 import zipfile
+import rarfile
 import xml.etree.ElementTree as ET
+from io import BytesIO
 from app_logging import app_logger
+from archive_writer import rewrite_zip
 from config import config, load_config
 
+# Optional fast path: lxml parses in C and can recover from malformed XML
+# without the regex _sanitize_xml retry
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
 load_config()
 
 ignore = config.get("SETTINGS", "IGNORED_FILES", fallback=".DS_Store,cover.jpg")
@@ -17,6 +27,13 @@ app_logger.info(f"************* XML Settings *************")
 app_logger.info(f"Markdown: {xml_markdown}")
 app_logger.info(f"List: {xml_list}")
 
+# ComicInfo.xml fields stored by the metadata scanner (file_index ci_* columns)
+SCANNER_FIELDS = (
+    'Title', 'Series', 'Number', 'Count', 'Volume', 'Year',
+    'Writer', 'Penciller', 'Inker', 'Colorist', 'Letterer', 'CoverArtist',
+    'Publisher', 'Genre', 'Characters'
+)
+
 
 #########################
 #   Helper Functions    #
@@ -242,12 +259,92 @@ def read_comicinfo_xml(xml_data: bytes) -> dict:
         return {}
 
 
-def read_comicinfo_from_zip(zip_path: str) -> dict:
+# Bare ampersands are the most common ComicInfo.xml defect ("Tom & Jerry").
+# lxml's recover mode silently drops them, so escape them up front.
+_BARE_AMPERSAND = re.compile(rb'&(?!(?:amp|lt|gt|quot|apos|#\d+|#x[0-9a-fA-F]+);)')
+
+
+def _read_fields_lxml(xml_data: bytes, fields) -> dict:
+    """
+    Stream the top-level ComicInfo elements with lxml in recover mode,
+    keeping only the requested fields and discarding everything else
+    (e.g. long Comments/Pages blocks) as soon as it is parsed.
+
+    :param xml_data: Raw ComicInfo.xml bytes.
+    :param fields:   Set of tag names to extract.
+    :return:         Dictionary of tag -> text for the requested fields found.
+    """
+    if b'&' in xml_data:
+        xml_data = _BARE_AMPERSAND.sub(b'&amp;', xml_data)
+
+    data = {}
+    depth = 0
+    context = lxml_etree.iterparse(
+        BytesIO(xml_data),
+        events=('start', 'end'),
+        recover=True,
+        resolve_entities=False,
+        no_network=True
+    )
+    for event, elem in context:
+        if event == 'start':
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth == 1:
+            tag = elem.tag
+            if isinstance(tag, str):
+                tag_name = tag.split('}')[-1] if '}' in tag else tag
+                if tag_name in fields:
+                    data[tag_name] = elem.text if elem.text else ""
+            # Free the finished child and any earlier siblings
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+            if len(data) == len(fields):
+                break
+
+    return data
+
+
+def read_comicinfo_fields(xml_data: bytes, fields=SCANNER_FIELDS) -> dict:
+    """
+    Parse only the given fields from the raw bytes of a ComicInfo.xml file.
+
+    Uses lxml (recover mode, streaming) when installed and falls back to
+    read_comicinfo_xml (ElementTree + _sanitize_xml retry) otherwise or if
+    lxml cannot make sense of the document.
+
+    :param xml_data: Bytes of the original ComicInfo.xml content.
+    :param fields:   Iterable of tag names to extract.
+    :return:         Dictionary of tag -> text for the requested fields found.
+    """
+    wanted = frozenset(fields)
+    if lxml_etree is not None:
+        try:
+            data = _read_fields_lxml(xml_data, wanted)
+            if data:
+                return data
+        except lxml_etree.XMLSyntaxError as e:
+            app_logger.debug(f"lxml could not recover ComicInfo.xml, using fallback parser: {e}")
+        except Exception as e:
+            app_logger.error(f"Unexpected lxml error parsing ComicInfo.xml: {e}")
+
+    data = read_comicinfo_xml(xml_data)
+    return {tag: value for tag, value in data.items() if tag in wanted}
+
+
+def read_comicinfo_from_zip(zip_path: str, fields=None, none_if_missing=False) -> dict:
     """
     Reads ComicInfo.xml from a .zip or .cbz file and returns the parsed data as a dict.
-    If ComicInfo.xml does not exist, returns an empty dict.
+    If ComicInfo.xml does not exist, returns an empty dict (None with none_if_missing).
 
     :param zip_path: Path to the .zip or .cbz file.
+    :param fields:   Optional iterable of tag names; when given, only those
+                     fields are extracted via the fast read_comicinfo_fields path.
+    :param none_if_missing: Return None instead of {} when there is no ComicInfo.xml,
+                     so "no ComicInfo" can be told apart from an empty one.
     :return:         Dictionary of ComicInfo.xml data (tags -> text).
     """
     _, ext = os.path.splitext(zip_path)
@@ -257,10 +354,68 @@ def read_comicinfo_from_zip(zip_path: str) -> dict:
     try:
         with zipfile.ZipFile(zip_path, 'r') as z:
             xml_data = z.read("ComicInfo.xml")
+            if fields is not None:
+                return read_comicinfo_fields(xml_data, fields)
             return read_comicinfo_xml(xml_data)
     except KeyError:
         # "ComicInfo.xml" not found inside the archive
-        return {}
+        return None if none_if_missing else {}
+
+
+def read_comicinfo_from_rar(rar_path: str, fields=None, none_if_missing=False) -> dict:
+    """
+    Reads ComicInfo.xml from a .rar or .cbr file without extracting the archive.
+
+    rarfile parses only the archive headers to locate the member, then
+    decompresses just that entry (for solid archives the preceding stream
+    still has to be decoded, which is why the scanner queues RAR files at
+    a lower priority).
+
+    :param rar_path: Path to the .rar or .cbr file.
+    :param fields:   Optional iterable of tag names (see read_comicinfo_from_zip).
+    :param none_if_missing: See read_comicinfo_from_zip.
+    :return:         Dictionary of ComicInfo.xml data (tags -> text).
+    """
+    _, ext = os.path.splitext(rar_path)
+    if ext.lower() not in ['.rar', '.cbr']:
+        raise ValueError("Only .rar or .cbr files are supported by this function.")
+
+    with rarfile.RarFile(rar_path, 'r') as rf:
+        # Prefer the root entry, but accept ComicInfo.xml in a single top folder
+        member = None
+        for info in rf.infolist():
+            if info.is_dir():
+                continue
+            name = info.filename.replace('\\', '/')
+            if name == "ComicInfo.xml":
+                member = info
+                break
+            if member is None and name.rsplit('/', 1)[-1].lower() == "comicinfo.xml":
+                member = info
+
+        if member is None:
+            return None if none_if_missing else {}
+
+        xml_data = rf.read(member)
+
+    if fields is not None:
+        return read_comicinfo_fields(xml_data, fields)
+    return read_comicinfo_xml(xml_data)
+
+
+def read_comicinfo_from_archive(archive_path: str, fields=None, none_if_missing=False) -> dict:
+    """
+    Reads ComicInfo.xml from a CBZ/ZIP or CBR/RAR archive, picking the
+    backend by file extension.
+
+    :param archive_path: Path to the archive.
+    :param fields:       Optional iterable of tag names to extract.
+    :param none_if_missing: See read_comicinfo_from_zip.
+    :return:             Dictionary of ComicInfo.xml data (tags -> text).
+    """
+    if archive_path.lower().endswith(('.rar', '.cbr')):
+        return read_comicinfo_from_rar(archive_path, fields, none_if_missing)
+    return read_comicinfo_from_zip(archive_path, fields, none_if_missing)
 
 
 def update_comicinfo_xml(xml_data: bytes, updates: dict) -> bytes:
@@ -301,8 +456,9 @@ def update_comicinfo_xml(xml_data: bytes, updates: dict) -> bytes:
 def update_comicinfo_in_zip(zip_path: str, updates: dict):
     """
     Updates the 'ComicInfo.xml' entry in a ZIP or CBZ without extracting
-    all files to disk. Internally, this still rebuilds the ZIP because
-    in-place edits aren't supported by the ZIP format.
+    all files to disk. The ZIP format has no in-place edits, so the archive
+    is rebuilt, but every other member's compressed bytes are copied as-is
+    (no decompress/recompress of pages).
 
     :param zip_path: Path to the .zip or .cbz file.
     :param updates:  Dict of XML tag -> new value, e.g. {'Title': 'Updated Title'}.
@@ -310,28 +466,15 @@ def update_comicinfo_in_zip(zip_path: str, updates: dict):
     _, ext = os.path.splitext(zip_path)
     if ext.lower() not in ['.zip', '.cbz']:
         raise ValueError("Only .zip or .cbz files are supported by this function.")
-    
-    temp_zip_path = zip_path + ".tmpzip"
-
-    with zipfile.ZipFile(zip_path, 'r') as old_zip, \
-         zipfile.ZipFile(temp_zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as new_zip:
-
-        for item in old_zip.infolist():
-            if item.filename == "ComicInfo.xml":
-                # 1. Read the XML data from the old zip
-                xml_data = old_zip.read(item.filename)
 
-                # 2. Pass it to our separate function for updates
-                updated_xml_data = update_comicinfo_xml(xml_data, updates)
-
-                # 3. Write the updated file into the new zip
-                new_zip.writestr(item, updated_xml_data)
-            else:
-                # Copy all other files as-is
-                new_zip.writestr(item, old_zip.read(item.filename))
+    with zipfile.ZipFile(zip_path, 'r') as old_zip:
+        if "ComicInfo.xml" not in old_zip.NameToInfo:
+            # Nothing to update
+            return
+        xml_data = old_zip.read("ComicInfo.xml")
 
-    # Replace the original ZIP/CBZ with the updated one
-    os.replace(temp_zip_path, zip_path)
+    updated_xml_data = update_comicinfo_xml(xml_data, updates)
+    rewrite_zip(zip_path, replace={"ComicInfo.xml": updated_xml_data})
 
 
 if __name__ == "__main__":
@@ -785,37 +785,15 @@ def add_comicinfo_to_archive(file_path: str, xml_content) -> bool:
     Returns:
         True on success, False on failure
     """
-    import zipfile
-    import tempfile
+    from archive_writer import write_comicinfo_to_zip
 
-    temp_path = None
     try:
-        # Create temp file
-        temp_fd, temp_path = tempfile.mkstemp(suffix='.cbz')
-        os.close(temp_fd)
-
-        with zipfile.ZipFile(file_path, 'r') as zin:
-            with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as zout:
-                for item in zin.infolist():
-                    # Skip existing ComicInfo.xml
-                    if item.filename.lower() == 'comicinfo.xml':
-                        continue
-                    zout.writestr(item, zin.read(item.filename))
-
-                # Add new ComicInfo.xml - handle both str and bytes
-                if isinstance(xml_content, bytes):
-                    zout.writestr('ComicInfo.xml', xml_content)
-                else:
-                    zout.writestr('ComicInfo.xml', xml_content.encode('utf-8'))
-
-        # Replace original with temp
-        shutil.move(temp_path, file_path)
+        # Pages are raw-copied; only ComicInfo.xml is (re)written
+        write_comicinfo_to_zip(file_path, xml_content)
         return True
 
     except Exception as e:
         app_logger.error(f"Error adding ComicInfo.xml to {file_path}: {e}")
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
         return False
 
 
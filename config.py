@@ -61,7 +61,37 @@ def load_config():
         "BOOTSTRAP_THEME": "default",
         "TIMEZONE": "UTC",
         "ENABLE_METADATA_SCAN": "True",
-        "METADATA_SCAN_THREADS": "2"
+        "METADATA_SCAN_THREADS": "2",
+        "METADATA_SCAN_MAX_THREADS": "8",
+        "METADATA_SCAN_MODE": "thread",
+        "METADATA_SCAN_ADAPTIVE": "True",
+        "ARCHIVE_ANALYZER_THREADS": "2",
+        "ARCHIVE_COMPRESSION": "auto",
+        "ARCHIVE_COMPRESSION_PROBE": "True",
+        "ARCHIVE_DEFLATE_LEVEL": "6",
+        "CONVERSION_WORKERS": "2",
+        "PDF_RENDER_THREADS": "4",
+        "PDF_DPI": "150",
+        "PDF_OUTPUT_FORMAT": "jpeg",
+        "PDF_OUTPUT_QUALITY": "75",
+        "ENHANCE_WORKERS": "0",
+        "CACHE_MEMORY_MB": "256",
+        "WARMUP_TOP_N": "20",
+        "WARMUP_TIME_BUDGET": "30",
+        "WARMUP_IO_BUDGET_MB": "256",
+        "WARMUP_HALF_LIFE_DAYS": "7",
+        "WATCHER_BACKEND": "auto",
+        "WATCHER_POLL_INTERVAL": "60",
+        "WATCHER_POLL_IO_BUDGET": "2000",
+        "MONITOR_OBSERVER": "auto",
+        "MONITOR_POLL_INTERVAL": "5",
+        "MONITOR_MOVE_WORKERS": "2",
+        "MONITOR_CONVERT_WORKERS": "2",
+        "DOWNLOAD_WORKERS": "3",
+        "DOWNLOAD_HOST_LIMITS": "pixeldrain:2,mega:1,getcomics:2,comicbookplus:1",
+        "DOWNLOAD_BANDWIDTH_LIMIT_MB": "0",
+        "DOWNLOAD_SEGMENTS": "1",
+        "DOWNLOAD_SEGMENT_MIN_MB": "32"
     }
 
     if not os.path.exists(CONFIG_FILE):
@@ -0,0 +1,243 @@
+"""
+conversion_pool.py - Bounded process pool for directory-level convert/rebuild
+
+convert.py and rebuild.py hand their per-archive jobs to run_jobs(), which
+runs up to CONVERSION_WORKERS of them at once in worker processes:
+- Disk guard: each job reserves ~2x its archive size (extracted pages plus the
+  new CBZ). A job only starts when the free space on its volume covers the
+  reservations of every running job, and archives above LARGE_FILE_THRESHOLD
+  never run alongside another job.
+- Live progress: "Processing file: name (i/N)" is logged when a job is
+  submitted and worker log lines (e.g. "Compression progress") are forwarded
+  to stdout as they happen, so /stream/<script_type> and the progress bar see
+  the same lines as a sequential run. Callers that run several phases pass
+  one processed_files counter so the numbering continues across them.
+- Cancellation: on SIGTERM (the stream route kills the whole process group
+  when the browser disconnects) pending jobs are dropped, workers are
+  terminated and temp files of in-flight jobs are removed.
+
+CONVERSION_WORKERS = 1 keeps the original sequential, in-process behaviour.
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from app_logging import app_logger
+from config import config
+
+LARGE_FILE_THRESHOLD = config.getint("SETTINGS", "LARGE_FILE_THRESHOLD", fallback=500) * 1024 * 1024  # Convert MB to bytes
+TEMP_SPACE_FACTOR = 2  # extracted pages + new CBZ, pages are already compressed
+POLL_SECONDS = 0.5  # how often the parent forwards worker output and retries the disk guard
+
+# Queue a worker process forwards its log lines to (set by _init_worker)
+_log_queue = None
+
+
+class _QueueHandler(logging.Handler):
+    def emit(self, record):
+        try:
+            _log_queue.put(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+class ConversionCancelled(Exception):
+    """Raised in the parent when the run is cancelled (SIGTERM)."""
+
+
+def conversion_workers():
+    """Number of concurrent conversion jobs from config (1 = sequential)."""
+    workers = config.getint("SETTINGS", "CONVERSION_WORKERS", fallback=2)
+    return max(1, min(workers, os.cpu_count() or 1))
+
+
+def make_job(path, args=(), temp_path=None):
+    """
+    Describe one conversion job.
+
+    Args:
+        path: Archive being processed (used for sizing and progress lines)
+        args: Extra positional arguments for the worker function
+        temp_path: Temp folder or file the job may leave behind if killed
+
+    Returns:
+        Job dict
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    return {
+        'path': path,
+        'args': tuple(args),
+        'temp_path': temp_path,
+        'size': size,
+        'temp_bytes': size * TEMP_SPACE_FACTOR,
+        'large': size > LARGE_FILE_THRESHOLD
+    }
+
+
+def _init_worker(log_queue):
+    """Route the worker's console logging to the parent through log_queue."""
+    global _log_queue
+    _log_queue = log_queue
+    # The parent handles SIGTERM; workers just die with the process group
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for handler in list(app_logger.handlers):
+        if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
+            app_logger.removeHandler(handler)
+    forward = _QueueHandler()
+    forward.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    app_logger.addHandler(forward)
+
+
+def _run_job(worker, path, args):
+    """Run one job in a worker process; failures are logged and reported as False."""
+    try:
+        return worker(path, *args)
+    except Exception as e:
+        app_logger.error(f"Failed to process {os.path.basename(path)}: {e}")
+        return False
+
+
+def _has_disk_space(job, running):
+    """Disk guard: can job start alongside the running jobs?"""
+    if not running:
+        return True
+    if job['large'] or any(other['large'] for other in running):
+        return False
+    try:
+        free = shutil.disk_usage(os.path.dirname(job['path']) or '.').free
+    except OSError:
+        return True
+    reserved = sum(other['temp_bytes'] for other in running)
+    return free - reserved >= job['temp_bytes']
+
+
+def _cleanup_job(job):
+    temp_path = job['temp_path']
+    if not temp_path or not os.path.exists(temp_path):
+        return
+    if os.path.isdir(temp_path):
+        shutil.rmtree(temp_path, ignore_errors=True)
+    else:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+
+def _announce(job, processed_files, total):
+    """Log the "Processing file: name (i/N)" line the progress bar counts."""
+    processed_files[0] += 1
+    app_logger.info(f"Processing file: {os.path.basename(job['path'])} ({processed_files[0]}/{total})")
+
+
+def _forward_output(log_queue):
+    """Write worker log lines received so far to stdout."""
+    lines = []
+    while True:
+        try:
+            lines.append(log_queue.get_nowait())
+        except queue.Empty:
+            break
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+
+
+def _run_sequential(jobs, worker, total, processed_files):
+    results = []
+    for job in jobs:
+        _announce(job, processed_files, total)
+        try:
+            results.append(worker(job['path'], *job['args']))
+        except Exception as e:
+            app_logger.error(f"Failed to process {os.path.basename(job['path'])}: {e}")
+            results.append(False)
+    return results
+
+
+def _raise_cancelled(signum, frame):
+    raise ConversionCancelled()
+
+
+def run_jobs(jobs, worker, workers=None, total_files=None, processed_files=None):
+    """
+    Run conversion jobs on a bounded process pool.
+
+    Args:
+        jobs: List of job dicts from make_job(), in the order they are started
+        worker: Module-level function worker(path, *args) -> bool
+        workers: Pool size (defaults to CONVERSION_WORKERS)
+        total_files: N in the "(i/N)" progress lines (defaults to len(jobs))
+        processed_files: Optional one-item list counter shared between calls,
+                         so a multi-phase run keeps numbering from where the
+                         previous phase stopped
+
+    Returns:
+        List of worker results in job order (False for failed/cancelled jobs)
+    """
+    workers = workers or conversion_workers()
+    total = total_files or len(jobs)
+    if processed_files is None:
+        processed_files = [0]
+    if workers <= 1 or len(jobs) <= 1:
+        return _run_sequential(jobs, worker, total, processed_files)
+
+    results = [False] * len(jobs)
+    pending = list(range(len(jobs)))
+    running = {}  # future -> job index
+    started_at = time.time()
+
+    app_logger.info(f"Running {len(jobs)} jobs on {workers} worker processes")
+    log_queue = multiprocessing.Queue()
+    previous_handler = signal.signal(signal.SIGTERM, _raise_cancelled)
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(log_queue,))
+    try:
+        while pending or running:
+            # Fill free slots in submission order while the disk guard allows it
+            while pending and len(running) < workers:
+                job = jobs[pending[0]]
+                if not _has_disk_space(job, [jobs[i] for i in running.values()]):
+                    break
+                index = pending.pop(0)
+                _announce(job, processed_files, total)
+                running[executor.submit(_run_job, worker, job['path'], job['args'])] = index
+
+            # A job that does not fit waits here until a running job frees its space
+            done, _ = wait(running, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+            _forward_output(log_queue)
+            for future in done:
+                index = running.pop(future)
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    app_logger.error(f"Worker failed on {os.path.basename(jobs[index]['path'])}: {e}")
+                    _cleanup_job(jobs[index])
+
+        executor.shutdown(wait=True)
+        _forward_output(log_queue)
+        elapsed = time.time() - started_at
+        app_logger.info(f"Processed {len(jobs)} files in {elapsed:.1f}s ({len(jobs) / elapsed if elapsed else 0:.2f} files/sec)")
+        return results
+
+    except (ConversionCancelled, KeyboardInterrupt):
+        app_logger.warning("Conversion cancelled, stopping worker processes...")
+        for process in list(getattr(executor, '_processes', {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+        for index in running.values():
+            _cleanup_job(jobs[index])
+        raise
+
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
@@ -6,6 +6,8 @@ import zipfile
 from datetime import datetime
 from config import config
 from app_logging import app_logger
+from cache_manager import get_cache_manager, LFU
+from generations import bump_table, bump_directory, bump_tree, bump_all
 
 def get_db_path():
     # Ensure we get the latest config value
@@ -368,6 +370,66 @@ def init_db():
             )
         ''')
 
+        # Create archive_manifest table (page manifest + fingerprint from archive analyzer)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS archive_manifest (
+                path TEXT PRIMARY KEY,
+                fingerprint TEXT,
+                page_count INTEGER DEFAULT 0,
+                pages TEXT,
+                file_mtime REAL,
+                analyzed_at REAL
+            )
+        ''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_archive_manifest_fingerprint ON archive_manifest(fingerprint)')
+
+        # Create directory_access table (exponentially decayed browse/read frequency per directory)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS directory_access (
+                path TEXT PRIMARY KEY,
+                score REAL NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+        ''')
+
+        # Create monitor_files table (per-file state of the watch folder pipeline in monitor.py)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS monitor_files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source_path TEXT NOT NULL,
+                current_path TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                first_seen REAL,
+                detected_at REAL,
+                updated_at REAL,
+                finished_at REAL,
+                stage_times TEXT,
+                error TEXT
+            )
+        ''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_monitor_files_stage ON monitor_files(stage)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_monitor_files_finished ON monitor_files(finished_at)')
+
+        # Create download_queue table (download tasks of api.py, so a restart keeps the queue)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS download_queue (
+                download_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                final_url TEXT,
+                host TEXT,
+                dest_filename TEXT,
+                internal INTEGER DEFAULT 0,
+                weekly_pack_info TEXT,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                filename TEXT,
+                error TEXT,
+                created_at REAL,
+                updated_at REAL
+            )
+        ''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_download_queue_status ON download_queue(status)')
+
         # Create reading_positions table (save reading position for comics)
         c.execute('''
             CREATE TABLE IF NOT EXISTS reading_positions (
@@ -1144,6 +1206,9 @@ def save_file_index_to_db(file_index):
         conn.commit()
         conn.close()
 
+        bump_table('file_index')
+        bump_all()
+
         app_logger.info(f"Saved {len(records)} entries to file index database")
         return True
 
@@ -1250,7 +1315,7 @@ def get_path_counts_batch(paths):
         return {p: (0, 0) for p in paths}
 
 
-def update_file_index_entry(path, name=None, new_path=None, parent=None, size=None):
+def update_file_index_entry(path, name=None, new_path=None, parent=None, size=None, modified_at=None):
     """
     Update a single file index entry incrementally.
 
@@ -1302,12 +1367,24 @@ def update_file_index_entry(path, name=None, new_path=None, parent=None, size=No
 
         query = f"UPDATE file_index SET {', '.join(updates)} WHERE path = ?"
         c.execute(query, params)
+        rows_affected = c.rowcount
+
+        if new_path is not None and rows_affected > 0:
+            # Carry the page manifest along (a directory's subtree included)
+            c.execute('UPDATE archive_manifest SET path = ? WHERE path = ?', (new_path, path))
+            c.execute('''
+                UPDATE archive_manifest SET path = ? || SUBSTR(path, ?) WHERE path >= ? AND path < ?
+            ''', (new_path, len(path) + 1, f"{path}/", f"{path}0"))
 
         conn.commit()
-        rows_affected = c.rowcount
         conn.close()
 
         if rows_affected > 0:
+            bump_table('file_index')
+            if new_path is not None:
+                bump_tree(path, new_path)
+            else:
+                bump_directory(os.path.dirname(path))
             app_logger.debug(f"Updated file index entry: {path}")
             return True
         else:
@@ -1358,6 +1435,9 @@ def add_file_index_entry(name, path, entry_type, size=None, parent=None, has_thu
         conn.commit()
         conn.close()
 
+        bump_table('file_index')
+        bump_directory(parent or os.path.dirname(path))
+
         app_logger.debug(f"Added file index entry: {path}")
         return True
 
@@ -1384,14 +1464,22 @@ def delete_file_index_entry(path):
 
         # Delete the entry
         c.execute('DELETE FROM file_index WHERE path = ?', (path,))
+        rows_affected = c.rowcount
 
         # Also delete any children (for directories)
         c.execute('DELETE FROM file_index WHERE parent = ? OR path LIKE ?', (path, f"{path}/%"))
+        rows_affected += c.rowcount
+
+        # Page manifests of the entry and everything below it
+        c.execute('DELETE FROM archive_manifest WHERE path = ? OR (path >= ? AND path < ?)',
+                  (path, f"{path}/", f"{path}0"))
 
         conn.commit()
-        rows_affected = c.rowcount
         conn.close()
 
+        bump_table('file_index')
+        bump_tree(path)
+
         if rows_affected > 0:
             app_logger.debug(f"Deleted {rows_affected} file index entries for: {path}")
             return True
@@ -1422,6 +1510,9 @@ def clear_file_index_from_db():
         rows_affected = c.rowcount
         conn.close()
 
+        bump_table('file_index')
+        bump_all()
+
         app_logger.info(f"Cleared {rows_affected} entries from file index database")
         return True
 
@@ -1467,6 +1558,7 @@ def sync_file_index_incremental(filesystem_entries):
         if removed_paths:
             for path in removed_paths:
                 c.execute('DELETE FROM file_index WHERE path = ?', (path,))
+                c.execute('DELETE FROM archive_manifest WHERE path = ?', (path,))
             app_logger.info(f"Removed {len(removed_paths)} orphaned entries from file_index")
 
         # Add new entries
@@ -1499,272 +1591,1149 @@ def sync_file_index_incremental(filesystem_entries):
         conn.commit()
         conn.close()
 
-        if new_paths:
-            app_logger.info(f"Added {len(new_paths)} new entries to file_index")
+        if new_paths or removed_paths:
+            bump_table('file_index')
+            bump_directory(*{os.path.dirname(path) for path in new_paths | removed_paths})
+
+        if new_paths:
+            app_logger.info(f"Added {len(new_paths)} new entries to file_index")
+
+        return {
+            'added': len(new_paths),
+            'removed': len(removed_paths),
+            'unchanged': len(existing_paths),
+            'new_paths': list(new_paths)
+        }
+
+    except Exception as e:
+        app_logger.error(f"Failed to sync file index incrementally: {e}")
+        return {'added': 0, 'removed': 0, 'unchanged': 0, 'new_paths': []}
+
+
+def apply_file_index_changes(upserts=(), moves=(), deletes=()):
+    """
+    Apply one batch of filesystem changes to the file index in a single transaction.
+
+    Moves run first, then deletes, then upserts, so a batch coalesced by the
+    file watcher can be applied as-is.
+
+    Args:
+        upserts: Entry dicts {name, path, type, size, parent, has_thumbnail, modified_at}
+                 to insert or refresh
+        moves: (old_path, entry) pairs. The row at old_path (and for a directory,
+               every row below it, plus their page manifests) is rewritten to
+               entry['path']. If old_path is not indexed, entry is upserted instead.
+        deletes: Paths to remove together with everything below them
+
+    Returns:
+        Dict {'upserted': N, 'moved': N, 'deleted': N, 'new_paths': [...]} where
+        new_paths are entries that were not in the index before, or None on failure
+    """
+    upsert_sql = '''
+        INSERT INTO file_index (name, path, type, size, parent, has_thumbnail, modified_at, first_indexed_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            name = excluded.name,
+            type = excluded.type,
+            size = excluded.size,
+            parent = excluded.parent,
+            has_thumbnail = excluded.has_thumbnail,
+            modified_at = excluded.modified_at,
+            last_updated = CURRENT_TIMESTAMP
+    '''
+    conn = None
+    try:
+        import time
+
+        conn = get_db_connection()
+        if not conn:
+            return None
+
+        c = conn.cursor()
+        current_time = time.time()
+        new_paths = []
+
+        def exists(path):
+            c.execute('SELECT 1 FROM file_index WHERE path = ?', (path,))
+            return c.fetchone() is not None
+
+        def upsert(entry):
+            if not exists(entry['path']):
+                new_paths.append(entry['path'])
+            c.execute(upsert_sql, (
+                entry['name'], entry['path'], entry['type'], entry.get('size'), entry.get('parent'),
+                entry.get('has_thumbnail', 0), entry.get('modified_at'), current_time
+            ))
+
+        # Subtrees are matched with the range "path/" <= child < "path0" ('0' sorts
+        # right after '/'); LIKE would ignore case and treat '_' and '%' as wildcards
+        def delete_tree(path):
+            c.execute('DELETE FROM file_index WHERE path = ? OR (path >= ? AND path < ?)',
+                      (path, f"{path}/", f"{path}0"))
+            removed = c.rowcount
+            c.execute('DELETE FROM archive_manifest WHERE path = ? OR (path >= ? AND path < ?)',
+                      (path, f"{path}/", f"{path}0"))
+            return removed
+
+        moved_count = 0
+        for old_path, entry in moves:
+            new_path = entry['path']
+            if not exists(old_path):
+                # Source was never indexed (e.g. a download renamed into place)
+                upsert(entry)
+                continue
+
+            # A move onto an existing path replaces it
+            delete_tree(new_path)
+            c.execute('''
+                UPDATE file_index
+                SET path = ?, name = ?, parent = ?, size = COALESCE(?, size),
+                    modified_at = COALESCE(?, modified_at), last_updated = CURRENT_TIMESTAMP
+                WHERE path = ?
+            ''', (new_path, entry['name'], entry.get('parent'), entry.get('size'), entry.get('modified_at'), old_path))
+            c.execute('UPDATE archive_manifest SET path = ? WHERE path = ?', (new_path, old_path))
+
+            if entry['type'] == 'directory':
+                offset = len(old_path) + 1
+                c.execute('''
+                    UPDATE file_index
+                    SET path = ? || SUBSTR(path, ?),
+                        parent = ? || SUBSTR(parent, ?)
+                    WHERE path >= ? AND path < ?
+                ''', (new_path, offset, new_path, offset, f"{old_path}/", f"{old_path}0"))
+                c.execute('''
+                    UPDATE archive_manifest SET path = ? || SUBSTR(path, ?) WHERE path >= ? AND path < ?
+                ''', (new_path, offset, f"{old_path}/", f"{old_path}0"))
+            moved_count += 1
+
+        deleted_count = 0
+        for path in deletes:
+            deleted_count += delete_tree(path)
+
+        for entry in upserts:
+            upsert(entry)
+
+        conn.commit()
+
+        bump_table('file_index')
+        bump_tree(*deletes, *[old_path for old_path, _ in moves], *[entry['path'] for _, entry in moves])
+        bump_directory(*{entry.get('parent') or os.path.dirname(entry['path']) for entry in upserts})
+
+        return {
+            'upserted': len(upserts),
+            'moved': moved_count,
+            'deleted': deleted_count,
+            'new_paths': new_paths
+        }
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        app_logger.error(f"Failed to apply file index changes: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+
+def get_indexed_directories(root):
+    """
+    Get the paths of all indexed directories under a root.
+
+    Args:
+        root: Library root path
+
+    Returns:
+        Sorted list of directory paths (root itself not included)
+    """
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return []
+
+        c = conn.cursor()
+        root = root.rstrip('/')
+        # Range instead of LIKE: case-sensitive, no '_'/'%' wildcards ('0' sorts right after '/')
+        c.execute("SELECT path FROM file_index WHERE type = 'directory' AND path >= ? AND path < ? ORDER BY path",
+                  (f"{root}/", f"{root}0"))
+        paths = [row['path'] for row in c.fetchall()]
+        conn.close()
+        return paths
+
+    except Exception as e:
+        app_logger.error(f"Failed to get indexed directories under {root}: {e}")
+        return []
+
+
+def get_indexed_children(parent):
+    """
+    Get the indexed entries directly inside a directory.
+
+    Args:
+        parent: Directory path
+
+    Returns:
+        Dict {path: (type, size, modified_at)}, or None on failure
+    """
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+
+        c = conn.cursor()
+        c.execute('SELECT path, type, size, modified_at FROM file_index WHERE parent = ?', (parent,))
+        children = {row['path']: (row['type'], row['size'], row['modified_at']) for row in c.fetchall()}
+        conn.close()
+        return children
+
+    except Exception as e:
+        app_logger.error(f"Failed to get indexed children of {parent}: {e}")
+        return None
+
+
+def search_file_index(query, limit=100):
+    """
+    Search the file index for entries matching the query.
+
+    Args:
+        query: Search query string
+        limit: Maximum number of results to return
+
+    Returns:
+        List of matching entries
+    """
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return []
+
+        c = conn.cursor()
+
+        # Search with LIKE for partial matching (case-insensitive)
+        c.execute('''
+            SELECT name, path, type, size, parent
+            FROM file_index
+            WHERE LOWER(name) LIKE LOWER(?)
+            ORDER BY type DESC, name ASC
+            LIMIT ?
+        ''', (f'%{query}%', limit))
+
+        rows = c.fetchall()
+        conn.close()
+
+        # Convert to list of dictionaries
+        results = []
+        for row in rows:
+            entry = {
+                'name': row['name'],
+                'path': row['path'],
+                'type': row['type'],
+                'parent': row['parent']
+            }
+            if row['size'] is not None:
+                entry['size'] = row['size']
+            results.append(entry)
+
+        return results
+
+    except Exception as e:
+        app_logger.error(f"Failed to search file index: {e}")
+        return []
+
+
+# ============================================
+# File Index Metadata Scanning Functions
+# ============================================
+
+def update_file_metadata(file_id, metadata_dict, scanned_at):
+    """
+    Update ComicInfo.xml metadata columns for a file_index entry.
+
+    Args:
+        file_id: ID of the file_index entry
+        metadata_dict: Dict with keys like 'ci_title', 'ci_writer', etc.
+        scanned_at: Unix timestamp of when scan completed
+
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return False
+
+        c = conn.cursor()
+        c.execute('''
+            UPDATE file_index
+            SET ci_title = ?, ci_series = ?, ci_number = ?, ci_count = ?,
+                ci_volume = ?, ci_year = ?, ci_writer = ?, ci_penciller = ?,
+                ci_inker = ?, ci_colorist = ?, ci_letterer = ?, ci_coverartist = ?,
+                ci_publisher = ?, ci_genre = ?, ci_characters = ?,
+                metadata_scanned_at = ?
+            WHERE id = ?
+        ''', (
+            metadata_dict.get('ci_title', ''),
+            metadata_dict.get('ci_series', ''),
+            metadata_dict.get('ci_number', ''),
+            metadata_dict.get('ci_count', ''),
+            metadata_dict.get('ci_volume', ''),
+            metadata_dict.get('ci_year', ''),
+            metadata_dict.get('ci_writer', ''),
+            metadata_dict.get('ci_penciller', ''),
+            metadata_dict.get('ci_inker', ''),
+            metadata_dict.get('ci_colorist', ''),
+            metadata_dict.get('ci_letterer', ''),
+            metadata_dict.get('ci_coverartist', ''),
+            metadata_dict.get('ci_publisher', ''),
+            metadata_dict.get('ci_genre', ''),
+            metadata_dict.get('ci_characters', ''),
+            scanned_at,
+            file_id
+        ))
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except Exception as e:
+        app_logger.error(f"Failed to update file metadata for id {file_id}: {e}")
+        return False
+
+
+def update_metadata_scanned_at(file_id, scanned_at):
+    """
+    Mark a file as scanned without updating metadata fields.
+    Used when the file could not be read (see clear_file_metadata for
+    files without a ComicInfo.xml).
+
+    Args:
+        file_id: ID of the file_index entry
+        scanned_at: Unix timestamp (or None)
+
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return False
+
+        c = conn.cursor()
+        c.execute('UPDATE file_index SET metadata_scanned_at = ? WHERE id = ?',
+                  (scanned_at, file_id))
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except Exception as e:
+        app_logger.error(f"Failed to update metadata_scanned_at for id {file_id}: {e}")
+        return False
+
+
+def clear_file_metadata(file_id, scanned_at):
+    """
+    Mark a file as scanned and found to have no ComicInfo.xml.
+
+    The ci_* columns are set to NULL; update_file_metadata always writes
+    strings, so NULL tells "no ComicInfo" apart from an empty one.
+
+    Args:
+        file_id: ID of the file_index entry
+        scanned_at: Unix timestamp of when scan completed
+
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return False
+
+        c = conn.cursor()
+        c.execute('''
+            UPDATE file_index
+            SET ci_title = NULL, ci_series = NULL, ci_number = NULL, ci_count = NULL,
+                ci_volume = NULL, ci_year = NULL, ci_writer = NULL, ci_penciller = NULL,
+                ci_inker = NULL, ci_colorist = NULL, ci_letterer = NULL, ci_coverartist = NULL,
+                ci_publisher = NULL, ci_genre = NULL, ci_characters = NULL,
+                metadata_scanned_at = ?
+            WHERE id = ?
+        ''', (scanned_at, file_id))
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except Exception as e:
+        app_logger.error(f"Failed to clear metadata for id {file_id}: {e}")
+        return False
+
+
+def get_files_needing_metadata_scan(limit=1000):
+    """
+    Get files that need metadata scanning.
+
+    Criteria:
+    - type = 'file'
+    - path ends with .cbz, .zip, .cbr or .rar
+    - metadata_scanned_at IS NULL OR metadata_scanned_at < modified_at
+
+    Args:
+        limit: Maximum number of files to return
+
+    Returns:
+        List of dicts with id, path, modified_at
+    """
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return []
+
+        c = conn.cursor()
+        c.execute('''
+            SELECT id, path, modified_at
+            FROM file_index
+            WHERE type = 'file'
+            AND (LOWER(path) LIKE '%.cbz' OR LOWER(path) LIKE '%.zip'
+                 OR LOWER(path) LIKE '%.cbr' OR LOWER(path) LIKE '%.rar')
+            AND (metadata_scanned_at IS NULL OR metadata_scanned_at < modified_at)
+            ORDER BY modified_at DESC
+            LIMIT ?
+        ''', (limit,))
+
+        rows = c.fetchall()
+        conn.close()
+
+        return [{'id': r['id'], 'path': r['path'], 'modified_at': r['modified_at']} for r in rows]
+
+    except Exception as e:
+        app_logger.error(f"Failed to get files needing metadata scan: {e}")
+        return []
+
+
+def get_metadata_scan_stats():
+    """
+    Get statistics for metadata scanning progress.
+
+    Returns:
+        Dict with total, scanned, pending counts
+    """
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return {'total': 0, 'scanned': 0, 'pending': 0}
+
+        c = conn.cursor()
+
+        # Total scannable archives (CBZ/ZIP/CBR/RAR)
+        c.execute('''
+            SELECT COUNT(*) as count FROM file_index
+            WHERE type = 'file'
+            AND (LOWER(path) LIKE '%.cbz' OR LOWER(path) LIKE '%.zip'
+                 OR LOWER(path) LIKE '%.cbr' OR LOWER(path) LIKE '%.rar')
+        ''')
+        total = c.fetchone()['count']
+
+        # Files needing scan
+        c.execute('''
+            SELECT COUNT(*) as count FROM file_index
+            WHERE type = 'file'
+            AND (LOWER(path) LIKE '%.cbz' OR LOWER(path) LIKE '%.zip'
+                 OR LOWER(path) LIKE '%.cbr' OR LOWER(path) LIKE '%.rar')
+            AND (metadata_scanned_at IS NULL OR metadata_scanned_at < modified_at)
+        ''')
+        pending = c.fetchone()['count']
+
+        conn.close()
+
+        return {
+            'total': total,
+            'scanned': total - pending,
+            'pending': pending
+        }
+
+    except Exception as e:
+        app_logger.error(f"Failed to get metadata scan stats: {e}")
+        return {'total': 0, 'scanned': 0, 'pending': 0}
+
+
+def get_file_index_entry_by_path(path):
+    """
+    Get a file_index entry by its path.
+
+    Args:
+        path: The file path to look up
+
+    Returns:
+        Dict with file_index entry data, or None if not found
+    """
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+
+        c = conn.cursor()
+        c.execute('SELECT id, path, modified_at FROM file_index WHERE path = ?', (path,))
+        row = c.fetchone()
+        conn.close()
+
+        if row:
+            return {'id': row['id'], 'path': row['path'], 'modified_at': row['modified_at']}
+        return None
+
+    except Exception as e:
+        app_logger.error(f"Failed to get file_index entry for {path}: {e}")
+        return None
+
+
+def get_file_comicinfo_by_path(path):
+    """
+    Get the scanned ComicInfo.xml columns for a file_index entry.
+
+    Only returns data when the metadata scan is current (scanned after the
+    file was last modified), so callers can skip opening the archive.
+
+    Args:
+        path: The file_index path to look up (metadata_scanner.to_db_path of the file)
+
+    Returns:
+        Dict with series, number, volume, year; {} if the scan found no
+        ComicInfo.xml (ci_* columns NULL); None if not scanned
+    """
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+
+        c = conn.cursor()
+        c.execute('''
+            SELECT ci_series, ci_number, ci_volume, ci_year, metadata_scanned_at, modified_at
+            FROM file_index
+            WHERE path = ?
+        ''', (path,))
+        row = c.fetchone()
+        conn.close()
+
+        if not row or row['metadata_scanned_at'] is None:
+            return None
+        if row['modified_at'] and row['metadata_scanned_at'] < row['modified_at']:
+            return None
+        if all(row[col] is None for col in ('ci_series', 'ci_number', 'ci_volume', 'ci_year')):
+            return {}
+
+        return {
+            'series': row['ci_series'] or '',
+            'number': row['ci_number'] or '',
+            'volume': row['ci_volume'] or '',
+            'year': row['ci_year'] or ''
+        }
+
+    except Exception as e:
+        app_logger.error(f"Failed to get ComicInfo columns for {path}: {e}")
+        return None
+
+
+# =============================================================================
+# Archive Manifest (page list + content fingerprint per archive)
+# =============================================================================
+
+def save_archive_manifest(path, fingerprint, pages, file_mtime):
+    """
+    Save the sorted page manifest and content fingerprint for an archive.
+
+    Args:
+        path: Full path of the archive
+        fingerprint: Content fingerprint string
+        pages: Sorted list of page member names
+        file_mtime: Archive mtime at analysis time
+
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        import json
+        import time
+
+        conn = get_db_connection()
+        if not conn:
+            return False
+
+        c = conn.cursor()
+        c.execute('''
+            INSERT OR REPLACE INTO archive_manifest (path, fingerprint, page_count, pages, file_mtime, analyzed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (path, fingerprint, len(pages), json.dumps(pages), file_mtime, time.time()))
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except Exception as e:
+        app_logger.error(f"Failed to save archive manifest for {path}: {e}")
+        return False
+
+
+def get_archive_manifest(path, file_mtime=None):
+    """
+    Get the stored page manifest for an archive.
+
+    Args:
+        path: Full path of the archive
+        file_mtime: If given, only return the manifest when it was built
+                    from this exact mtime (stale manifests return None)
+
+    Returns:
+        Dict with fingerprint, page_count, pages, file_mtime or None
+    """
+    try:
+        import json
+
+        conn = get_db_connection()
+        if not conn:
+            return None
+
+        c = conn.cursor()
+        c.execute('SELECT fingerprint, page_count, pages, file_mtime FROM archive_manifest WHERE path = ?', (path,))
+        row = c.fetchone()
+        conn.close()
+
+        if not row:
+            return None
+        if file_mtime is not None and (row['file_mtime'] is None or abs(row['file_mtime'] - file_mtime) > 1):
+            return None
+
+        return {
+            'fingerprint': row['fingerprint'],
+            'page_count': row['page_count'],
+            'pages': json.loads(row['pages']) if row['pages'] else [],
+            'file_mtime': row['file_mtime']
+        }
+
+    except Exception as e:
+        app_logger.error(f"Failed to get archive manifest for {path}: {e}")
+        return None
+
+
+#########################
+#   Directory Access    #
+#########################
+
+def _register_access_decay(conn, half_life):
+    """SQL function access_decay(age_seconds): weight left after age with the given half-life."""
+    conn.create_function('access_decay', 1, lambda age: 0.5 ** (max(age or 0, 0) / half_life), deterministic=True)
+
+
+def record_directory_accesses(counts, half_life, now=None):
+    """
+    Add access counts to the decayed per-directory scores in one transaction.
+
+    The stored score is decayed to `now` before the new count is added, so
+    score * access_decay(later - updated_at) is the directory's heat later.
+
+    Args:
+        counts: Dict of directory path -> accesses (weighted) since the last call
+        half_life: Seconds after which an access counts half
+        now: Timestamp of the accesses (defaults to the current time)
+
+    Returns:
+        True if successful, False otherwise
+    """
+    if not counts:
+        return True
+
+    import time
+    now = now or time.time()
+
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return False
+
+        _register_access_decay(conn, half_life)
+        c = conn.cursor()
+        c.executemany('''
+            INSERT INTO directory_access (path, score, updated_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                score = score * access_decay(excluded.updated_at - updated_at) + excluded.score,
+                updated_at = excluded.updated_at
+        ''', [(path, count, now) for path, count in counts.items()])
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except Exception as e:
+        app_logger.error(f"Failed to record directory accesses: {e}")
+        return False
+
+
+def get_hot_directories(limit, half_life, min_heat=0.0):
+    """
+    Get the directories with the highest decayed access score.
+
+    Args:
+        limit: Maximum number of directories
+        half_life: Seconds after which an access counts half
+        min_heat: Skip directories whose current score is below this
+
+    Returns:
+        List of (path, heat) tuples, hottest first
+    """
+    import time
+
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return []
+
+        _register_access_decay(conn, half_life)
+        c = conn.cursor()
+        c.execute('''
+            SELECT path, score * access_decay(? - updated_at) AS heat
+            FROM directory_access
+            WHERE heat >= ?
+            ORDER BY heat DESC
+            LIMIT ?
+        ''', (time.time(), min_heat, limit))
+        rows = [(row['path'], row['heat']) for row in c.fetchall()]
+        conn.close()
+        return rows
+
+    except Exception as e:
+        app_logger.error(f"Failed to get hot directories: {e}")
+        return []
+
+
+def prune_directory_access(half_life, min_heat):
+    """
+    Delete directories whose decayed score has fallen below min_heat.
+
+    Returns:
+        Number of rows deleted
+    """
+    import time
+
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return 0
+
+        _register_access_decay(conn, half_life)
+        c = conn.cursor()
+        c.execute('DELETE FROM directory_access WHERE score * access_decay(? - updated_at) < ?',
+                  (time.time(), min_heat))
+        count = c.rowcount
+        conn.commit()
+        conn.close()
+        return count
+
+    except Exception as e:
+        app_logger.error(f"Failed to prune directory access scores: {e}")
+        return 0
+
+
+#########################
+#   Monitor Pipeline    #
+#########################
+
+# Stages a monitor_files row can be waiting for, in pipeline order, and its final states
+MONITOR_STAGES = ('rename', 'move', 'convert', 'index')
+MONITOR_FINAL_STATES = ('done', 'skipped', 'failed')
+
+
+def create_monitor_file(source_path, first_seen, detected_at):
+    """
+    Record a finished download entering the monitor pipeline.
+
+    Args:
+        source_path: Path of the file in the watch folder
+        first_seen: Timestamp of the first event for the file
+        detected_at: Timestamp completion was detected
+
+    Returns:
+        Row id, or None on failure
+    """
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+
+        c = conn.cursor()
+        c.execute('''
+            INSERT INTO monitor_files (source_path, current_path, stage, first_seen, detected_at, updated_at, stage_times)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (source_path, source_path, MONITOR_STAGES[0], first_seen, detected_at, detected_at, '{}'))
+        file_id = c.lastrowid
+        conn.commit()
+        conn.close()
+        return file_id
+
+    except Exception as e:
+        app_logger.error(f"Failed to record monitor file {source_path}: {e}")
+        return None
+
+
+def advance_monitor_file(file_id, stage, current_path, stage_times, error=None):
+    """
+    Store a monitor file's next stage (or final state) after a stage ran.
+
+    Args:
+        file_id: monitor_files row id
+        stage: Next stage from MONITOR_STAGES, or one of MONITOR_FINAL_STATES
+        current_path: Where the file is now
+        stage_times: Dict of stage -> seconds spent so far
+        error: Error message when stage is 'failed'
+
+    Returns:
+        True if successful, False otherwise
+    """
+    import json
+    import time
+
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return False
+
+        now = time.time()
+        c = conn.cursor()
+        c.execute('''
+            UPDATE monitor_files
+            SET stage = ?, current_path = ?, stage_times = ?, error = ?, updated_at = ?,
+                finished_at = CASE WHEN ? THEN ? ELSE finished_at END
+            WHERE id = ?
+        ''', (stage, current_path, json.dumps(stage_times), error, now,
+              stage in MONITOR_FINAL_STATES, now, file_id))
+        conn.commit()
+        conn.close()
+        return True
+
+    except Exception as e:
+        app_logger.error(f"Failed to update monitor file {file_id}: {e}")
+        return False
 
-        return {
-            'added': len(new_paths),
-            'removed': len(removed_paths),
-            'unchanged': len(existing_paths),
-            'new_paths': list(new_paths)
-        }
+
+def get_unfinished_monitor_files():
+    """
+    Get monitor files that were still in the pipeline, to resume after a restart.
+
+    Returns:
+        List of dicts with id, source_path, current_path, stage, first_seen,
+        detected_at and stage_times (dict)
+    """
+    import json
+
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return []
+
+        c = conn.cursor()
+        placeholders = ','.join('?' * len(MONITOR_STAGES))
+        c.execute(f'''
+            SELECT id, source_path, current_path, stage, first_seen, detected_at, stage_times
+            FROM monitor_files WHERE stage IN ({placeholders}) ORDER BY id
+        ''', MONITOR_STAGES)
+        rows = []
+        for row in c.fetchall():
+            entry = dict(row)
+            entry['stage_times'] = json.loads(row['stage_times'] or '{}')
+            rows.append(entry)
+        conn.close()
+        return rows
 
     except Exception as e:
-        app_logger.error(f"Failed to sync file index incrementally: {e}")
-        return {'added': 0, 'removed': 0, 'unchanged': 0, 'new_paths': []}
+        app_logger.error(f"Failed to get unfinished monitor files: {e}")
+        return []
 
 
-def search_file_index(query, limit=100):
+def get_monitor_pipeline_stats(window_seconds=3600):
     """
-    Search the file index for entries matching the query.
+    Throughput and latency of the monitor pipeline for the logs page.
 
     Args:
-        query: Search query string
-        limit: Maximum number of results to return
+        window_seconds: How far back finished files are counted
 
     Returns:
-        List of matching entries
+        Dict with in_flight (per stage), finished counts in the window,
+        files_per_hour, average/max time to library and average seconds per stage
     """
+    import json
+    import time
+
+    stats = {
+        'window_seconds': window_seconds,
+        'in_flight': {stage: 0 for stage in MONITOR_STAGES},
+        'done': 0,
+        'skipped': 0,
+        'failed': 0,
+        'files_per_hour': 0,
+        'avg_time_to_library': None,
+        'max_time_to_library': None,
+        'avg_detect_seconds': None,
+        'avg_stage_seconds': {},
+        'recent_failures': []
+    }
     try:
         conn = get_db_connection()
         if not conn:
-            return []
+            return stats
 
         c = conn.cursor()
+        c.execute('SELECT stage, COUNT(*) AS count FROM monitor_files GROUP BY stage')
+        for row in c.fetchall():
+            if row['stage'] in stats['in_flight']:
+                stats['in_flight'][row['stage']] = row['count']
 
-        # Search with LIKE for partial matching (case-insensitive)
+        since = time.time() - window_seconds
         c.execute('''
-            SELECT name, path, type, size, parent
-            FROM file_index
-            WHERE LOWER(name) LIKE LOWER(?)
-            ORDER BY type DESC, name ASC
-            LIMIT ?
-        ''', (f'%{query}%', limit))
-
+            SELECT stage, first_seen, detected_at, finished_at, stage_times, source_path, error
+            FROM monitor_files WHERE finished_at >= ? ORDER BY finished_at
+        ''', (since,))
         rows = c.fetchall()
         conn.close()
 
-        # Convert to list of dictionaries
-        results = []
+        latencies, detects = [], []
+        stage_totals, stage_counts = {}, {}
         for row in rows:
-            entry = {
-                'name': row['name'],
-                'path': row['path'],
-                'type': row['type'],
-                'parent': row['parent']
-            }
-            if row['size'] is not None:
-                entry['size'] = row['size']
-            results.append(entry)
+            stats[row['stage']] = stats.get(row['stage'], 0) + 1
+            if row['stage'] == 'failed':
+                stats['recent_failures'].append({'path': row['source_path'], 'error': row['error']})
+                continue
+            if row['stage'] != 'done':
+                continue
+            if row['first_seen']:
+                latencies.append(row['finished_at'] - row['first_seen'])
+                if row['detected_at']:
+                    detects.append(row['detected_at'] - row['first_seen'])
+            for stage, seconds in json.loads(row['stage_times'] or '{}').items():
+                stage_totals[stage] = stage_totals.get(stage, 0) + seconds
+                stage_counts[stage] = stage_counts.get(stage, 0) + 1
 
-        return results
+        if rows:
+            stats['files_per_hour'] = round(stats['done'] * 3600 / window_seconds, 1)
+        if latencies:
+            stats['avg_time_to_library'] = round(sum(latencies) / len(latencies), 2)
+            stats['max_time_to_library'] = round(max(latencies), 2)
+        if detects:
+            stats['avg_detect_seconds'] = round(sum(detects) / len(detects), 2)
+        stats['avg_stage_seconds'] = {stage: round(stage_totals[stage] / stage_counts[stage], 2)
+                                      for stage in MONITOR_STAGES if stage in stage_totals}
+        stats['recent_failures'] = stats['recent_failures'][-10:]
+        return stats
 
     except Exception as e:
-        app_logger.error(f"Failed to search file index: {e}")
-        return []
+        app_logger.error(f"Failed to get monitor pipeline stats: {e}")
+        return stats
 
 
-# ============================================
-# File Index Metadata Scanning Functions
-# ============================================
+def prune_monitor_files(keep_days=7):
+    """
+    Delete finished monitor_files rows older than keep_days.
 
-def update_file_metadata(file_id, metadata_dict, scanned_at):
+    Returns:
+        Number of rows deleted
     """
-    Update ComicInfo.xml metadata columns for a file_index entry.
+    import time
+
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return 0
+
+        c = conn.cursor()
+        c.execute('DELETE FROM monitor_files WHERE finished_at IS NOT NULL AND finished_at < ?',
+                  (time.time() - keep_days * 86400,))
+        count = c.rowcount
+        conn.commit()
+        conn.close()
+        return count
+
+    except Exception as e:
+        app_logger.error(f"Failed to prune monitor files: {e}")
+        return 0
+
+
+#########################
+#    Download Queue     #
+#########################
+
+def save_download_task(task, status='queued'):
+    """
+    Insert or replace a download task of the api.py download queue.
 
     Args:
-        file_id: ID of the file_index entry
-        metadata_dict: Dict with keys like 'ci_title', 'ci_writer', etc.
-        scanned_at: Unix timestamp of when scan completed
+        task: Task dict (download_id, url, dest_filename, internal,
+              weekly_pack_info, priority, and optionally final_url/host)
+        status: Download status ('queued', 'in_progress', 'complete', 'error', 'cancelled')
 
     Returns:
         True if successful, False otherwise
     """
+    import json
+    import time
+
     try:
         conn = get_db_connection()
         if not conn:
             return False
 
+        now = time.time()
+        weekly_pack_info = task.get('weekly_pack_info')
         c = conn.cursor()
         c.execute('''
-            UPDATE file_index
-            SET ci_title = ?, ci_series = ?, ci_number = ?, ci_count = ?,
-                ci_volume = ?, ci_year = ?, ci_writer = ?, ci_penciller = ?,
-                ci_inker = ?, ci_colorist = ?, ci_letterer = ?, ci_coverartist = ?,
-                ci_publisher = ?, ci_genre = ?, ci_characters = ?,
-                metadata_scanned_at = ?
-            WHERE id = ?
-        ''', (
-            metadata_dict.get('ci_title', ''),
-            metadata_dict.get('ci_series', ''),
-            metadata_dict.get('ci_number', ''),
-            metadata_dict.get('ci_count', ''),
-            metadata_dict.get('ci_volume', ''),
-            metadata_dict.get('ci_year', ''),
-            metadata_dict.get('ci_writer', ''),
-            metadata_dict.get('ci_penciller', ''),
-            metadata_dict.get('ci_inker', ''),
-            metadata_dict.get('ci_colorist', ''),
-            metadata_dict.get('ci_letterer', ''),
-            metadata_dict.get('ci_coverartist', ''),
-            metadata_dict.get('ci_publisher', ''),
-            metadata_dict.get('ci_genre', ''),
-            metadata_dict.get('ci_characters', ''),
-            scanned_at,
-            file_id
-        ))
-
+            INSERT OR REPLACE INTO download_queue
+                (download_id, url, final_url, host, dest_filename, internal, weekly_pack_info,
+                 priority, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (task['download_id'], task['url'], task.get('final_url'), task.get('host'),
+              task.get('dest_filename'), 1 if task.get('internal') else 0,
+              json.dumps(weekly_pack_info) if weekly_pack_info else None,
+              task.get('priority', 0), status, task.get('created_at', now), now))
         conn.commit()
         conn.close()
         return True
 
     except Exception as e:
-        app_logger.error(f"Failed to update file metadata for id {file_id}: {e}")
+        app_logger.error(f"Failed to save download task {task.get('download_id')}: {e}")
         return False
 
 
-def update_metadata_scanned_at(file_id, scanned_at):
+def update_download_task(download_id, status=None, filename=None, error=None,
+                         final_url=None, host=None, priority=None):
     """
-    Mark a file as scanned without updating metadata fields.
-    Used when file has no ComicInfo.xml or on error.
+    Update fields of a queued download; None leaves a field unchanged.
 
     Args:
-        file_id: ID of the file_index entry
-        scanned_at: Unix timestamp (or None)
+        download_id: Download id
+        status: New status
+        filename: Path of the downloaded file
+        error: Error message
+        final_url: URL after following redirects
+        host: Host class the download is throttled under
+        priority: New priority (lower runs first)
 
     Returns:
         True if successful, False otherwise
     """
+    import time
+
     try:
         conn = get_db_connection()
         if not conn:
             return False
 
         c = conn.cursor()
-        c.execute('UPDATE file_index SET metadata_scanned_at = ? WHERE id = ?',
-                  (scanned_at, file_id))
-
+        c.execute('''
+            UPDATE download_queue
+            SET status = COALESCE(?, status),
+                filename = COALESCE(?, filename),
+                error = COALESCE(?, error),
+                final_url = COALESCE(?, final_url),
+                host = COALESCE(?, host),
+                priority = COALESCE(?, priority),
+                updated_at = ?
+            WHERE download_id = ?
+        ''', (status, filename, error, final_url, host, priority, time.time(), download_id))
         conn.commit()
         conn.close()
         return True
 
     except Exception as e:
-        app_logger.error(f"Failed to update metadata_scanned_at for id {file_id}: {e}")
+        app_logger.error(f"Failed to update download task {download_id}: {e}")
         return False
 
 
-def get_files_needing_metadata_scan(limit=1000):
+def get_download_tasks():
     """
-    Get files that need metadata scanning.
-
-    Criteria:
-    - type = 'file'
-    - path ends with .cbz or .zip
-    - metadata_scanned_at IS NULL OR metadata_scanned_at < modified_at
-
-    Args:
-        limit: Maximum number of files to return
+    Get every stored download task, in queue order.
 
     Returns:
-        List of dicts with id, path, modified_at
+        List of task dicts (weekly_pack_info decoded, internal as bool)
     """
+    import json
+
     try:
         conn = get_db_connection()
         if not conn:
             return []
 
         c = conn.cursor()
-        c.execute('''
-            SELECT id, path, modified_at
-            FROM file_index
-            WHERE type = 'file'
-            AND (LOWER(path) LIKE '%.cbz' OR LOWER(path) LIKE '%.zip')
-            AND (metadata_scanned_at IS NULL OR metadata_scanned_at < modified_at)
-            ORDER BY modified_at DESC
-            LIMIT ?
-        ''', (limit,))
-
-        rows = c.fetchall()
+        c.execute('SELECT * FROM download_queue ORDER BY priority, created_at')
+        tasks = []
+        for row in c.fetchall():
+            task = dict(row)
+            task['internal'] = bool(task['internal'])
+            task['weekly_pack_info'] = json.loads(task['weekly_pack_info']) if task['weekly_pack_info'] else None
+            tasks.append(task)
         conn.close()
-
-        return [{'id': r['id'], 'path': r['path'], 'modified_at': r['modified_at']} for r in rows]
+        return tasks
 
     except Exception as e:
-        app_logger.error(f"Failed to get files needing metadata scan: {e}")
+        app_logger.error(f"Failed to get download tasks: {e}")
         return []
 
 
-def get_metadata_scan_stats():
+def delete_download_tasks(download_ids):
     """
-    Get statistics for metadata scanning progress.
+    Delete download tasks (cleared from the status page).
+
+    Args:
+        download_ids: Iterable of download ids
 
     Returns:
-        Dict with total, scanned, pending counts
+        Number of rows deleted
     """
+    download_ids = list(download_ids)
+    if not download_ids:
+        return 0
+
     try:
         conn = get_db_connection()
         if not conn:
-            return {'total': 0, 'scanned': 0, 'pending': 0}
+            return 0
 
         c = conn.cursor()
-
-        # Total CBZ/ZIP files
-        c.execute('''
-            SELECT COUNT(*) as count FROM file_index
-            WHERE type = 'file'
-            AND (LOWER(path) LIKE '%.cbz' OR LOWER(path) LIKE '%.zip')
-        ''')
-        total = c.fetchone()['count']
-
-        # Files needing scan
-        c.execute('''
-            SELECT COUNT(*) as count FROM file_index
-            WHERE type = 'file'
-            AND (LOWER(path) LIKE '%.cbz' OR LOWER(path) LIKE '%.zip')
-            AND (metadata_scanned_at IS NULL OR metadata_scanned_at < modified_at)
-        ''')
-        pending = c.fetchone()['count']
-
+        c.executemany('DELETE FROM download_queue WHERE download_id = ?', [(i,) for i in download_ids])
+        count = c.rowcount
+        conn.commit()
         conn.close()
-
-        return {
-            'total': total,
-            'scanned': total - pending,
-            'pending': pending
-        }
+        return count
 
     except Exception as e:
-        app_logger.error(f"Failed to get metadata scan stats: {e}")
-        return {'total': 0, 'scanned': 0, 'pending': 0}
+        app_logger.error(f"Failed to delete download tasks: {e}")
+        return 0
 
 
-def get_file_index_entry_by_path(path):
+def prune_download_tasks(keep_days=7):
     """
-    Get a file_index entry by its path.
-
-    Args:
-        path: The file path to look up
+    Delete finished download tasks older than keep_days.
 
     Returns:
-        Dict with file_index entry data, or None if not found
+        Number of rows deleted
     """
+    import time
+
     try:
         conn = get_db_connection()
         if not conn:
-            return None
+            return 0
 
         c = conn.cursor()
-        c.execute('SELECT id, path, modified_at FROM file_index WHERE path = ?', (path,))
-        row = c.fetchone()
+        c.execute('''
+            DELETE FROM download_queue
+            WHERE status IN ('complete', 'error', 'cancelled') AND updated_at < ?
+        ''', (time.time() - keep_days * 86400,))
+        count = c.rowcount
+        conn.commit()
         conn.close()
-
-        if row:
-            return {'id': row['id'], 'path': row['path'], 'modified_at': row['modified_at']}
-        return None
+        return count
 
     except Exception as e:
-        app_logger.error(f"Failed to get file_index entry for {path}: {e}")
-        return None
+        app_logger.error(f"Failed to prune download tasks: {e}")
+        return 0
 
 
 #########################
@@ -2446,6 +3415,23 @@ def invalidate_browse_cache(path):
     Returns:
         True if successful, False otherwise
     """
+    return invalidate_browse_cache_paths([path])
+
+def invalidate_browse_cache_paths(paths):
+    """
+    Invalidate browse cache for many paths in one transaction: each path,
+    its parent (so the parent sees the change) and everything below it.
+
+    Args:
+        paths: Directory paths to invalidate
+
+    Returns:
+        True if successful, False otherwise
+    """
+    paths = set(paths)
+    if not paths:
+        return True
+
     try:
         conn = get_db_connection()
         if not conn:
@@ -2453,27 +3439,26 @@ def invalidate_browse_cache(path):
 
         c = conn.cursor()
 
-        # Delete the specific path
-        c.execute('DELETE FROM browse_cache WHERE path = ?', (path,))
-
-        # Also delete parent path (so parent sees new subdirectory)
-        parent = os.path.dirname(path)
-        if parent:
-            c.execute('DELETE FROM browse_cache WHERE path = ?', (parent,))
+        exact = set(paths)
+        exact.update(os.path.dirname(path) for path in paths if os.path.dirname(path))
+        c.executemany('DELETE FROM browse_cache WHERE path = ?', [(p,) for p in exact])
+        rows_affected = c.rowcount
 
-        # Delete any child paths
-        c.execute('DELETE FROM browse_cache WHERE path LIKE ?', (f"{path}/%",))
+        # Delete any child paths: "path/" <= child < "path0" ('0' sorts right after '/'),
+        # a range the primary key index can serve
+        c.executemany('DELETE FROM browse_cache WHERE path >= ? AND path < ?',
+                      [(f"{path}/", f"{path}0") for path in paths])
+        rows_affected += c.rowcount
 
         conn.commit()
-        rows_affected = c.rowcount
         conn.close()
 
         if rows_affected > 0:
-            app_logger.debug(f"Invalidated {rows_affected} browse cache entries for: {path}")
+            app_logger.debug(f"Invalidated {rows_affected} browse cache entries for {len(paths)} paths")
         return True
 
     except Exception as e:
-        app_logger.error(f"Failed to invalidate browse cache for '{path}': {e}")
+        app_logger.error(f"Failed to invalidate browse cache for {len(paths)} paths: {e}")
         return False
 
 def clear_browse_cache():
@@ -2901,6 +3886,7 @@ def mark_issue_read(issue_path, read_at=None, page_count=0, time_spent=0,
         conn.commit()
         conn.close()
 
+        bump_table('issues_read')
         app_logger.info(f"Marked issue as read: {issue_path}")
         return True
 
@@ -2930,6 +3916,7 @@ def unmark_issue_read(issue_path):
         conn.commit()
         conn.close()
 
+        bump_table('issues_read')
         app_logger.info(f"Unmarked issue as read: {issue_path}")
         return True
 
@@ -3509,6 +4496,13 @@ def is_to_read(path):
 # Stats Cache Functions
 # =============================================================================
 
+# In-memory front for stats_cache rows, holding the stored JSON text so each
+# hit is a fresh object. Stats are only written and invalidated in the web
+# process, so the memory copy cannot go stale behind its back.
+STATS_MEMORY_BYTES = 16 * 1024 * 1024
+_stats_memory = get_cache_manager().register('stats', STATS_MEMORY_BYTES, policy=LFU, sizer=len)
+
+
 def get_cached_stats(key):
     """
     Get cached stats by key.
@@ -3522,6 +4516,10 @@ def get_cached_stats(key):
     try:
         import json
 
+        text = _stats_memory.get(key)
+        if text is not None:
+            return json.loads(text)
+
         conn = get_db_connection()
         if not conn:
             return None
@@ -3532,6 +4530,7 @@ def get_cached_stats(key):
         conn.close()
 
         if row:
+            _stats_memory.set(key, row['value'])
             return json.loads(row['value'])
         return None
 
@@ -3558,15 +4557,18 @@ def save_cached_stats(key, value):
         if not conn:
             return False
 
+        text = json.dumps(value)
         c = conn.cursor()
         c.execute('''
             INSERT OR REPLACE INTO stats_cache (key, value, updated_at)
             VALUES (?, ?, CURRENT_TIMESTAMP)
-        ''', (key, json.dumps(value)))
+        ''', (key, text))
 
         conn.commit()
         conn.close()
 
+        _stats_memory.set(key, text)
+
         app_logger.debug(f"Saved stats cache for: {key}")
         return True
 
@@ -3587,6 +4589,8 @@ def clear_stats_cache():
         if not conn:
             return False
 
+        _stats_memory.clear()
+
         c = conn.cursor()
         c.execute('DELETE FROM stats_cache')
 
@@ -3620,6 +4624,8 @@ def clear_stats_cache_keys(keys):
         if not conn:
             return False
 
+        _stats_memory.invalidate(keys)
+
         c = conn.cursor()
         placeholders = ','.join('?' * len(keys))
         c.execute(f'DELETE FROM stats_cache WHERE key IN ({placeholders})', keys)
@@ -0,0 +1,68 @@
+"""
+directory_heat.py - Which directories users actually open
+
+Browse and reader requests call record_access(); counts are buffered in
+memory and flushed to the directory_access table at most every
+FLUSH_SECONDS, so a page view costs a dict update rather than a SQLite
+write. Scores decay exponentially with a half-life of WARMUP_HALF_LIFE_DAYS,
+so a folder read heavily last year ranks below one opened daily this week.
+
+hot_directories() feeds app.warmup_cache after a cache rebuild or a
+restart.
+"""
+
+import threading
+import time
+from collections import Counter
+
+from app_logging import app_logger
+from config import config
+from database import record_directory_accesses, get_hot_directories, prune_directory_access
+
+FLUSH_SECONDS = 60
+BROWSE_WEIGHT = 1.0
+READ_WEIGHT = 2.0  # Opening a comic says more than passing through its folder
+PRUNE_BELOW = 0.01  # Scores this low (~7 half-lives of silence) are dropped
+
+_pending = Counter()
+_lock = threading.Lock()
+_last_flush = time.time()
+
+
+def half_life_seconds():
+    return config.getfloat("SETTINGS", "WARMUP_HALF_LIFE_DAYS", fallback=7.0) * 24 * 60 * 60
+
+
+def record_access(path, weight=BROWSE_WEIGHT):
+    """Count one access to a directory; flushes the buffer when it is due."""
+    global _last_flush
+    if not path:
+        return
+    with _lock:
+        _pending[path] += weight
+        due = time.time() - _last_flush >= FLUSH_SECONDS
+    if due:
+        flush()
+
+
+def flush():
+    """Write buffered access counts to SQLite."""
+    global _last_flush
+    with _lock:
+        counts = dict(_pending)
+        _pending.clear()
+        _last_flush = time.time()
+    if counts and not record_directory_accesses(counts, half_life_seconds()):
+        # Keep the counts for the next flush rather than losing them
+        with _lock:
+            _pending.update(counts)
+
+
+def hot_directories(limit):
+    """Paths of the `limit` hottest directories, hottest first."""
+    flush()
+    half_life = half_life_seconds()
+    pruned = prune_directory_access(half_life, PRUNE_BELOW)
+    if pruned:
+        app_logger.debug(f"Pruned {pruned} cold directories from access stats")
+    return [path for path, _ in get_hot_directories(limit, half_life, PRUNE_BELOW)]
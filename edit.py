@@ -2,12 +2,18 @@ import os
 import zipfile
 import shutil
 import io
+import json
 import base64
+import threading
+import time
+import uuid
 from flask import render_template_string, request, jsonify
 from PIL import Image
 from app_logging import app_logger
+from archive_writer import ArchiveEdit
+from cache_manager import get_cache_manager
 from config import config, load_config
-from helpers import create_thumbnail_streaming, safe_image_open
+from helpers import create_thumbnail_streaming, regenerate_thumbnail
 import gc
 
 load_config()
@@ -25,7 +31,7 @@ modal_body_template = '''
           <div class="row g-0">
             <div class="col-3">
               {% if card.img_data %}
-                <img src="{{ card.img_data }}" class="img-fluid rounded-start object-fit-scale border rounded" alt="{{ card.filename }}">
+                <img src="{{ card.img_data }}" loading="lazy" class="img-fluid rounded-start object-fit-scale border rounded" alt="{{ card.filename }}">
               {% else %}
                 <img src="https://via.placeholder.com/100" class="img-fluid rounded-start object-fit-scale border rounded" alt="No image">
               {% endif %}
@@ -63,263 +69,526 @@ modal_body_template = '''
     {% endfor %}
 '''
 
-def process_cbz_file(file_path):
+#########################
+#     Edit Sessions     #
+#########################
+#
+# Editing a CBZ no longer extracts it. Opening the editor creates an edit
+# session: a manifest of the archive's members plus a log of pending
+# operations (delete, rename, crop), stored as JSON under
+# CACHE_DIR/edit_sessions/<id>/ next to any cropped images. The library file
+# is not touched until save_cbz() applies the manifest in one streaming
+# rewrite (archive_writer.ArchiveEdit: untouched pages are raw-copied).
+#
+# The page cards address members through a virtual folder,
+# /edit-session/<id>/<member>, so the existing /delete, /rename, /crop,
+# /crop-freeform and /get-image-data routes hand those paths to the session
+# instead of the filesystem. Thumbnails are served lazily, one request per
+# visible card, from /edit-session/<id>/thumbnail/<entry id>.
+
+EDIT_SESSION_PREFIX = "/edit-session/"
+SESSION_TTL_SECONDS = 24 * 60 * 60
+THUMBNAIL_SIZE = (100, 100)
+THUMBNAIL_CACHE_BYTES = 32 * 1024 * 1024
+PAGE_SIZE = 50
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# Thumbnail bytes by (session id, entry id); entry contents never change
+_thumbnail_cache = get_cache_manager().register('edit_thumbnails', THUMBNAIL_CACHE_BYTES, sizer=len)
+
+
+def _sessions_root():
+    return os.path.join(config.get("SETTINGS", "CACHE_DIR", fallback="/cache"), "edit_sessions")
+
+
+def is_edit_session_path(path):
+    """True if path points into an edit session's virtual folder."""
+    return isinstance(path, str) and path.startswith(EDIT_SESSION_PREFIX)
+
+
+class EditSession:
     """
-    Process the CBZ file:
-      1. Rename the .cbz file to .zip.
-      2. Create a folder based on the file name.
-      3. Extract the ZIP contents into the folder.
-      4. If the ZIP contains a single directory (ignoring files), update folder_name to that inner directory.
-         (This is done recursively in case there are multiple nested directories.)
-      5. Delete all .nfo, .sfv, .db and .DS_Store files.
-    Returns a dictionary with 'folder_name' and 'zip_file_path'.
-    Uses memory-efficient streaming extraction.
+    Pending edits to one CBZ.
+
+    Each entry is a member of the edited archive: either an original member
+    (``source``, possibly renamed) or a new image written by a crop
+    (``file`` in the session folder). Entry ids are never reused, so a
+    thumbnail URL always shows the same image.
     """
-    app_logger.info("********************// Editing CBZ File //********************")
-    if not file_path.lower().endswith(('.cbz', '.zip')):
-        app_logger.info("Provided file is not a CBZ file.")
-        raise ValueError("Provided file is not a CBZ file.")
-    
-    base_name = os.path.splitext(file_path)[0]
-    zip_path = base_name + '.zip'
-    folder_name = base_name + '_folder'
-    
-    app_logger.info(f"Processing CBZ: {file_path} --> {zip_path}")
-    
-    try:
-        # Step 1: Rename .cbz to .zip
-        os.rename(file_path, zip_path)
-        
-        # Step 2: Create folder for extraction
-        os.makedirs(folder_name, exist_ok=True)
-        
-        # Step 3: Extract ZIP contents into folder using streaming
-        with zipfile.ZipFile(zip_path, 'r') as zf:
-            # Get list of files first to avoid memory issues
-            file_list = zf.namelist()
-            
-            for filename in file_list:
-                try:
-                    zf.extract(filename, folder_name)
-                except Exception as e:
-                    app_logger.warning(f"Failed to extract {filename}: {e}")
-                    continue
-        
-        # Step 4: Delete files that match deleted extensions (case-insensitive)
-        # This must happen BEFORE checking for nested folders, to ensure files in parent folders are deleted
-        for root, _, files in os.walk(folder_name):
-            for file in files:
-                ext = os.path.splitext(file)[1].lower()
-                if ext in deletedFiles:
-                    file_path = os.path.join(root, file)
-                    try:
-                        os.remove(file_path)
-                        app_logger.info(f"Deleted unwanted file: {file_path}")
-                    except Exception as e:
-                        app_logger.error(f"Error deleting file {file_path}: {e}")
-
-        # Step 5: Check if the extracted content contains a single directory.
-        # Do this recursively in case the ZIP nests multiple single-directory levels.
+
+    def __init__(self, sid, file_path):
+        self.sid = sid
+        self.file_path = file_path
+        self.dir = os.path.join(_sessions_root(), sid)
+        self.lock = threading.RLock()
+        self.entries = []
+        self.ops = []
+        self.root = ''
+        self.next_id = 0
+        self.created = time.time()
+        self.mtime = None
+        self.size = None
+
+    # ---- persistence ----
+
+    @property
+    def folder(self):
+        return f"{EDIT_SESSION_PREFIX}{self.sid}"
+
+    def _manifest_path(self):
+        return os.path.join(self.dir, "manifest.json")
+
+    def save_manifest(self):
+        manifest = {
+            "sid": self.sid, "file_path": self.file_path, "mtime": self.mtime, "size": self.size,
+            "root": self.root, "next_id": self.next_id, "created": self.created,
+            "entries": self.entries, "ops": self.ops
+        }
+        temp_path = self._manifest_path() + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, self._manifest_path())
+
+    @classmethod
+    def load(cls, sid):
+        session = cls(sid, None)
+        with open(session._manifest_path(), encoding="utf-8") as f:
+            manifest = json.load(f)
+        session.file_path = manifest["file_path"]
+        session.mtime = manifest["mtime"]
+        session.size = manifest["size"]
+        session.root = manifest["root"]
+        session.next_id = manifest["next_id"]
+        session.created = manifest["created"]
+        session.entries = manifest["entries"]
+        session.ops = manifest["ops"]
+        return session
+
+    @classmethod
+    def create(cls, file_path):
+        """Open an edit session on a CBZ by reading its central directory."""
+        session = cls(uuid.uuid4().hex, file_path)
+        stat = os.stat(file_path)
+        session.mtime, session.size = stat.st_mtime, stat.st_size
+
+        with zipfile.ZipFile(file_path, 'r') as zf:
+            names = [info.filename for info in zf.infolist() if not info.is_dir()]
+
+        for name in names:
+            # Files with deleted extensions are dropped on save, as before
+            if os.path.splitext(name)[1].lower() in deletedFiles:
+                session.ops.append({"op": "delete", "name": name})
+                app_logger.info(f"Deleted unwanted file: {name}")
+                continue
+            session._add_entry(name, source=name)
+
+        # Show the pages of a single wrapper folder (recursively) like the old
+        # extracted view; members outside it are kept as they are
         while True:
-            # List only directories, ignoring any loose files.
-            inner_dirs = [d for d in os.listdir(folder_name) if os.path.isdir(os.path.join(folder_name, d))]
-            if len(inner_dirs) == 1:
-                folder_name = os.path.join(folder_name, inner_dirs[0])
-                app_logger.info(f"Found a single nested folder, updating folder_name to: {folder_name}")
-            else:
+            inner_dirs = {
+                entry["name"][len(session.root):].split('/', 1)[0]
+                for entry in session.entries
+                if entry["name"].startswith(session.root) and '/' in entry["name"][len(session.root):]
+            }
+            if len(inner_dirs) != 1:
                 break
+            session.root += inner_dirs.pop() + '/'
+            app_logger.info(f"Found a single nested folder, showing: {session.root}")
+
+        os.makedirs(session.dir, exist_ok=True)
+        session.save_manifest()
+        return session
+
+    def discard(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+        with _sessions_lock:
+            _sessions.pop(self.sid, None)
+        _drop_thumbnails(self.sid)
+
+    # ---- entries ----
+
+    def _add_entry(self, name, source=None, file=None):
+        entry = {"id": self.next_id, "name": name, "source": source, "file": file}
+        self.next_id += 1
+        self.entries.append(entry)
+        return entry
+
+    def _find(self, name):
+        for entry in self.entries:
+            if entry["name"] == name:
+                return entry
+        return None
+
+    def resolve(self, path):
+        """Entry for a virtual path (/edit-session/<id>/<rel>) or a relative path."""
+        prefix = self.folder + '/'
+        rel = path[len(prefix):] if path.startswith(prefix) else path
+        entry = self._find(self.root + rel)
+        if entry is None:
+            raise FileNotFoundError(f"{rel} is not in the archive")
+        return entry
+
+    def rel_path(self, entry):
+        return entry["name"][len(self.root):]
+
+    def virtual_path(self, entry):
+        return f"{self.folder}/{self.rel_path(entry)}"
+
+    def visible_entries(self):
+        """Entries shown as cards: under the root folder, not skipped."""
+        return [
+            entry for entry in self.entries
+            if entry["name"].startswith(self.root)
+            and os.path.splitext(entry["name"])[1].lower() not in skippedFiles
+        ]
+
+    def read(self, entry):
+        """Current bytes of an entry."""
+        if entry["file"]:
+            with open(os.path.join(self.dir, entry["file"]), 'rb') as f:
+                return f.read()
+        with zipfile.ZipFile(self.file_path, 'r') as zf:
+            return zf.read(entry["source"])
+
+    def thumbnail_url(self, entry):
+        return f"{self.folder}/thumbnail/{entry['id']}"
+
+    def card(self, entry, full_path=False):
+        """Card dict for modal_body_template."""
+        is_image = entry["name"].lower().endswith(IMAGE_EXTENSIONS)
+        return {
+            "filename": os.path.basename(entry["name"]),
+            "rel_path": self.virtual_path(entry) if full_path else self.rel_path(entry),
+            "img_data": self.thumbnail_url(entry) if is_image else None
+        }
 
-        app_logger.info(f"Extraction complete: {folder_name}")
-        return {"folder_name": folder_name, "zip_file_path": zip_path}
-        
-    except Exception as e:
-        app_logger.error(f"Error processing CBZ file: {e}")
-        # Clean up on error
-        if os.path.exists(folder_name):
+    # ---- operations ----
+
+    def delete(self, path):
+        with self.lock:
+            entry = self.resolve(path)
+            self.entries.remove(entry)
+            self.ops.append({"op": "delete", "name": entry["name"]})
+            self.save_manifest()
+
+    def rename(self, path, new_path):
+        with self.lock:
+            entry = self.resolve(path)
+            prefix = self.folder + '/'
+            new_name = self.root + (new_path[len(prefix):] if new_path.startswith(prefix) else new_path)
+            if new_name != entry["name"] and self._find(new_name):
+                raise FileExistsError("Destination already exists")
+            self.ops.append({"op": "rename", "name": entry["name"], "new_name": new_name})
+            entry["name"] = new_name
+            self.save_manifest()
+            return entry
+
+    def _save_image(self, name, img, image_format):
+        """Add a new entry holding img encoded in image_format."""
+        entry = self._add_entry(name)
+        entry["file"] = f"{entry['id']}{os.path.splitext(name)[1].lower()}"
+        img.save(os.path.join(self.dir, entry["file"]), format=image_format)
+        return entry
+
+    def _unique_name(self, name):
+        if not self._find(name):
+            return name
+        stem, ext = os.path.splitext(name)
+        counter = 1
+        while self._find(f"{stem}-{counter}{ext}"):
+            counter += 1
+        return f"{stem}-{counter}{ext}"
+
+    def crop(self, path, crop_type):
+        """
+        Split a page like cropLeft/cropRight/cropCenter: the original is kept
+        (renamed with "b" appended, still raw-copied on save) and the crops
+        are added as new entries.
+
+        :return: List of the resulting entries (crops first, original last)
+        """
+        with self.lock:
+            entry = self.resolve(path)
+            stem, ext = os.path.splitext(entry["name"])
+
+            with Image.open(io.BytesIO(self.read(entry))) as img:
+                width, height = img.size
+                image_format = img.format
+                if crop_type == 'left':
+                    boxes = [(f"{stem}a{ext}", (0, 0, width // 2, height))]
+                elif crop_type == 'right':
+                    boxes = [(f"{stem}a{ext}", (width // 2, 0, width, height))]
+                elif crop_type == 'center':
+                    third_width = width // 3
+                    boxes = [
+                        (f"{stem}_left{ext}", (0, 0, third_width, height)),
+                        (f"{stem}_center{ext}", (third_width, 0, 2 * third_width, height)),
+                        (f"{stem}_right{ext}", (2 * third_width, 0, width, height)),
+                    ]
+                else:
+                    raise ValueError("Invalid crop type")
+
+                backup_name = self._unique_name(f"{stem}b{ext}")
+                old_name = entry["name"]
+                entry["name"] = backup_name
+                results = [
+                    self._save_image(self._unique_name(name), img.crop(box), image_format)
+                    for name, box in boxes
+                ]
+
+            self.ops.append({
+                "op": "crop", "type": crop_type, "name": old_name, "backup": backup_name,
+                "outputs": [result["name"] for result in results]
+            })
+            self.save_manifest()
+            app_logger.info(f"Processed: {os.path.basename(old_name)} original kept as {backup_name}, "
+                            f"{crop_type} crop saved as {', '.join(r['name'] for r in results)}.")
+            return results + [entry]
+
+    def crop_freeform(self, path, x, y, width, height):
+        """
+        Crop a page with custom coordinates like cropFreeForm: the original is
+        renamed with "-a" appended, the crop takes its name.
+
+        :return: (cropped entry, backup entry)
+        """
+        with self.lock:
+            entry = self.resolve(path)
+            name = entry["name"]
+            stem, ext = os.path.splitext(name)
+
+            with Image.open(io.BytesIO(self.read(entry))) as img:
+                img_width, img_height = img.size
+                # Validate and clamp coordinates to image boundaries
+                x = max(0, min(int(x), img_width))
+                y = max(0, min(int(y), img_height))
+                width = max(1, min(int(width), img_width - x))
+                height = max(1, min(int(height), img_height - y))
+                app_logger.info(f"Image size: {img_width}x{img_height}, Crop: x={x}, y={y}, w={width}, h={height}")
+
+                entry["name"] = self._unique_name(f"{stem}-a{ext}")
+                cropped = self._save_image(name, img.crop((x, y, x + width, y + height)), img.format)
+
+            self.ops.append({
+                "op": "crop", "type": "freeform", "name": name, "backup": entry["name"],
+                "outputs": [name], "box": [x, y, width, height]
+            })
+            self.save_manifest()
+            app_logger.info(f"Free form crop processed: {os.path.basename(name)}, original backed up as {os.path.basename(entry['name'])}")
+            return cropped, entry
+
+    # ---- save ----
+
+    def apply(self):
+        """
+        Write the edits into the CBZ in one streaming rewrite.
+
+        :return: ArchiveEdit stats (None if nothing changed)
+        """
+        with self.lock:
+            stat = os.stat(self.file_path)
+            if (stat.st_mtime, stat.st_size) != (self.mtime, self.size):
+                raise RuntimeError("The file was changed by something else since editing started")
+
+            kept = {entry["source"]: entry for entry in self.entries if entry["source"]}
+            with ArchiveEdit(self.file_path) as edit:
+                renamed = []
+                for name in edit.names():
+                    entry = kept.get(name)
+                    if entry is None:
+                        edit.delete(name)
+                    elif entry["name"] != name:
+                        renamed.append(entry)
+
+                # Two passes so swaps (a -> b, b -> a) cannot collide
+                for entry in renamed:
+                    edit.rename(entry["source"], f".edit-{entry['id']}")
+                for entry in renamed:
+                    edit.rename(f".edit-{entry['id']}", entry["name"])
+
+                for entry in self.entries:
+                    if entry["file"]:
+                        with open(os.path.join(self.dir, entry["file"]), 'rb') as f:
+                            edit.insert(entry["name"], f.read())
+
+                return edit.apply()
+
+
+def _drop_thumbnails(sid):
+    _thumbnail_cache.invalidate([key for key in _thumbnail_cache.keys() if key[0] == sid])
+
+
+def _cleanup_expired_sessions():
+    """Remove sessions left behind (closed browser tabs) after SESSION_TTL_SECONDS."""
+    root = _sessions_root()
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - SESSION_TTL_SECONDS
+    for sid in os.listdir(root):
+        session_dir = os.path.join(root, sid)
+        try:
+            if os.path.getmtime(session_dir) < cutoff:
+                shutil.rmtree(session_dir, ignore_errors=True)
+                with _sessions_lock:
+                    _sessions.pop(sid, None)
+                app_logger.info(f"Removed expired edit session {sid}")
+        except OSError:
+            continue
+
+
+def get_session(path_or_sid):
+    """
+    Look up an edit session by id or by any path inside its virtual folder.
+    Sessions are reloaded from their manifest after a restart.
+    """
+    sid = path_or_sid[len(EDIT_SESSION_PREFIX):] if is_edit_session_path(path_or_sid) else path_or_sid
+    sid = sid.split('/', 1)[0]
+    if not sid or not sid.isalnum():
+        raise FileNotFoundError("Edit session not found")
+    with _sessions_lock:
+        session = _sessions.get(sid)
+        if session is None:
             try:
-                shutil.rmtree(folder_name)
-            except Exception as cleanup_error:
-                app_logger.error(f"Error cleaning up folder on failure: {cleanup_error}")
-        raise
+                session = EditSession.load(sid)
+            except (OSError, ValueError, KeyError):
+                raise FileNotFoundError("Edit session not found or expired")
+            _sessions[sid] = session
+        return session
+
+
+def get_session_thumbnail(sid, entry_id):
+    """
+    JPEG thumbnail bytes for an entry, generated from the archive on first
+    request and kept in the 'edit_thumbnails' cache region (LRU, byte-bounded).
+    """
+    key = (sid, entry_id)
+    data = _thumbnail_cache.get(key)
+    if data is not None:
+        return data
+
+    session = get_session(sid)
+    with session.lock:
+        entry = next((e for e in session.entries if e["id"] == entry_id), None)
+        if entry is None:
+            raise FileNotFoundError("Page not found")
+        image_bytes = session.read(entry)
+
+    data = create_thumbnail_streaming(io.BytesIO(image_bytes), max_size=THUMBNAIL_SIZE, quality=85)
+    if data is None:
+        raise ValueError(f"Could not create thumbnail for {entry['name']}")
+
+    _thumbnail_cache.set(key, data)
+    return data
+
+
+def get_session_manifest(sid, offset=0, limit=PAGE_SIZE):
+    """
+    Paginated view of a session: the cards to show and the pending operations.
+    """
+    session = get_session(sid)
+    with session.lock:
+        visible = session.visible_entries()
+        page = visible[offset:offset + limit]
+        return {
+            "session_id": session.sid,
+            "file_path": session.file_path,
+            "folder_name": session.folder,
+            "total": len(visible),
+            "offset": offset,
+            "limit": limit,
+            "cards": [dict(session.card(entry), id=entry["id"]) for entry in page],
+            "operations": list(session.ops)
+        }
 
 
 def get_edit_modal(file_path):
     """
-    Processes the provided CBZ file and returns a dictionary with keys:
-      - modal_body: rendered HTML for the modal body (Bootstrap cards)
+    Opens an edit session on the provided CBZ file and returns a dictionary with keys:
+      - modal_body: rendered HTML for the modal body (Bootstrap cards, thumbnails load lazily)
       - folder_name, zip_file_path, original_file_path: for the hidden form fields.
-    This function walks through subdirectories and ignores .xml files.
-    Uses memory-efficient thumbnail generation.
+    Nothing is extracted; folder_name is the session's virtual folder.
     """
-    result = process_cbz_file(file_path)
-    folder_name = result["folder_name"]
-    zip_file_path = result["zip_file_path"]
-    
-    file_cards = []
-    # Walk the extraction folder recursively
-    for root, _, files in os.walk(folder_name):
-        for f in files:
-            ext = os.path.splitext(f)[1].lower()
-            # Skip files based on config
-            if ext in skippedFiles:
-                app_logger.info(f"Skipping file in edit modal: {f}")
-                continue
+    app_logger.info("********************// Editing CBZ File //********************")
+    if not file_path.lower().endswith(('.cbz', '.zip')):
+        app_logger.info("Provided file is not a CBZ file.")
+        raise ValueError("Provided file is not a CBZ file.")
 
-            # Create a relative path that includes subdirectories
-            rel_path = os.path.relpath(os.path.join(root, f), folder_name)
-            filename_only = os.path.basename(rel_path)  # Extract only the file name
-            img_data = None
-
-            # Attempt thumbnail generation for common image types using streaming
-            if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')):
-                try:
-                    full_path = os.path.join(root, f)
-                    
-                    # Use streaming thumbnail generation
-                    thumbnail_data = create_thumbnail_streaming(full_path, max_size=(100, 100), quality=85)
-                    
-                    if thumbnail_data:
-                        encoded = base64.b64encode(thumbnail_data).decode('utf-8')
-                        img_data = f"data:image/jpeg;base64,{encoded}"
-                    else:
-                        app_logger.warning(f"Failed to generate thumbnail for: {rel_path}")
-                        
-                except Exception as e:
-                    app_logger.info(f"Thumbnail generation failed for '{rel_path}': {e}")
-
-            file_cards.append({"filename": filename_only, "rel_path": rel_path, "img_data": img_data})
-            
-            # Force garbage collection periodically to prevent memory buildup
-            if len(file_cards) % 10 == 0:
-                gc.collect()
+    _cleanup_expired_sessions()
+    session = EditSession.create(file_path)
+    with _sessions_lock:
+        _sessions[session.sid] = session
+
+    file_cards = [session.card(entry) for entry in session.visible_entries()]
+    app_logger.info(f"Edit session {session.sid} opened for {file_path} ({len(file_cards)} files)")
 
     modal_body_html = render_template_string(modal_body_template, file_cards=file_cards)
-    
     return {
         "modal_body": modal_body_html,
-        "folder_name": folder_name,
-        "zip_file_path": zip_file_path,
+        "folder_name": session.folder,
+        "zip_file_path": session.sid,
         "original_file_path": file_path
     }
 
+
 def save_cbz():
     """
-    Processes the CBZ file by:
-      - Renaming the .zip file (created during extraction) to .bak (Step 5)
-      - Re-compressing the extracted folder (sorted) into a .cbz file (Step 6)
-      - Deleting the .bak file and cleaning up (Step 7)
+    Applies the pending operations of an edit session to the CBZ file in one
+    streaming rewrite (only new or cropped pages are written, everything else
+    is raw-copied), then discards the session.
     This function is meant to be used as a route handler and is imported in app.py.
-    Uses memory-efficient streaming compression.
     """
-    app_logger.info(f"Clean up and re-compressing the CBZ file.")
-    folder_name = request.form.get('folder_name')
-    zip_file_path = request.form.get('zip_file_path')
-    original_file_path = request.form.get('original_file_path')
-    
-    if not folder_name or not zip_file_path or not original_file_path:
+    app_logger.info(f"Saving edits to the CBZ file.")
+    data = request.form if request.form else (request.get_json(silent=True) or {})
+    folder_name = data.get('folder_name')
+    original_file_path = data.get('original_file_path')
+
+    if not folder_name or not original_file_path:
         return "Missing required data", 400
 
     try:
-        # Step 6: Rename the original .zip file to .bak.
-        bak_file_path = zip_file_path + '.bak'
-        os.rename(zip_file_path, bak_file_path)
-        
-        # Step 7: Re-compress the folder contents into a .cbz file (sorted).
-        # Use streaming approach to avoid loading all files into memory
-        with zipfile.ZipFile(original_file_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=6) as cbz:
-            # Collect all files first
-            file_list = []
-            for root, _, files in os.walk(folder_name):
-                for file in files:
-                    full_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(full_path, folder_name)
-                    file_list.append((rel_path, full_path))
-            
-            # Sort files for consistent ordering
-            file_list.sort(key=lambda x: x[0])
-            
-            # Add files to zip one by one
-            for rel_path, full_path in file_list:
-                try:
-                    cbz.write(full_path, rel_path)
-                except Exception as e:
-                    app_logger.warning(f"Failed to add {rel_path} to CBZ: {e}")
-                    continue
-        
-        # Step 8: Delete the .bak file.
-        try:
-            os.remove(bak_file_path)
-            app_logger.info(f"Deleted backup file: {bak_file_path}")
-        except Exception as e:
-            app_logger.error(f"Error deleting backup file {bak_file_path}: {e}")
-        
-        # Step 9: Clean up the extracted folder(s).
-        try:
-            # Clean up the current folder (which might be a nested folder)
-            if os.path.exists(folder_name):
-                shutil.rmtree(folder_name)
-                app_logger.info(f"Cleaned up extracted folder: {folder_name}")
-            
-            # Also clean up the outer extraction folder (with _folder suffix)
-            # This handles the case where we extracted to a nested folder
-            outer_folder = os.path.splitext(original_file_path)[0] + '_folder'
-            if os.path.exists(outer_folder) and outer_folder != folder_name:
-                shutil.rmtree(outer_folder)
-                app_logger.info(f"Cleaned up outer extraction folder: {outer_folder}")
-                
-        except Exception as e:
-            app_logger.error(f"Error cleaning up folders: {e}")
-        
-        # Force garbage collection
+        session = get_session(folder_name)
+        if os.path.normpath(session.file_path) != os.path.normpath(original_file_path):
+            return jsonify({"success": False, "error": "Edit session does not belong to this file"}), 400
+
+        stats = session.apply()
+        if stats:
+            app_logger.info(f"Saved {original_file_path}: {stats['written']} pages written, {stats['copied']} copied")
+            # Regenerate thumbnail for the edited file
+            regenerate_thumbnail(original_file_path)
+        else:
+            app_logger.info(f"No changes to save for {original_file_path}")
+
+        session.discard()
         gc.collect()
-        
-        # Regenerate thumbnail for the edited file
-        try:
-            import hashlib
-            from database import get_db_connection
-            
-            file_hash = hashlib.md5(original_file_path.encode()).hexdigest()
-            shard_dir = file_hash[:2]
-            cache_dir = config.get("SETTINGS", "CACHE_DIR", fallback="/cache")
-            cache_subdir = os.path.join(cache_dir, 'thumbnails', shard_dir)
-            cache_path = os.path.join(cache_subdir, f"{file_hash}.jpg")
-            os.makedirs(cache_subdir, exist_ok=True)
-            
-            with zipfile.ZipFile(original_file_path, 'r') as zf:
-                file_list = zf.namelist()
-                image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
-                image_files = sorted([f for f in file_list if os.path.splitext(f.lower())[1] in image_extensions])
-                
-                if image_files:
-                    with zf.open(image_files[0]) as image_file:
-                        img = Image.open(image_file)
-                        if img.mode in ('RGBA', 'LA', 'P'):
-                            img = img.convert('RGB')
-                        aspect_ratio = img.width / img.height
-                        new_height = 300
-                        new_width = int(new_height * aspect_ratio)
-                        img.thumbnail((new_width, new_height), Image.Resampling.LANCZOS)
-                        img.save(cache_path, format='JPEG', quality=85)
-                        
-                        conn = get_db_connection()
-                        if conn:
-                            file_mtime = int(os.path.getmtime(original_file_path))
-                            conn.execute(
-                                'INSERT OR REPLACE INTO thumbnail_jobs (path, status, file_mtime, updated_at) VALUES (?, ?, ?, CURRENT_TIMESTAMP)',
-                                (original_file_path, 'completed', file_mtime)
-                            )
-                            conn.commit()
-                            conn.close()
-                        app_logger.info(f"Thumbnail regenerated for {original_file_path}")
-        except Exception as e:
-            app_logger.error(f"Error regenerating thumbnail: {e}")
-        
         return jsonify({"success": True, "message": "CBZ file saved successfully"})
-        
+
     except Exception as e:
         app_logger.error(f"Error saving CBZ file: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
-    
+
+
+def full_image_data_url(data):
+    """Encode image bytes as a full-size JPEG data URL (for the free form crop view)."""
+    with Image.open(io.BytesIO(data)) as img:
+        # Convert to RGB if necessary
+        if img.mode in ('RGBA', 'LA', 'P'):
+            rgb_img = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            rgb_img.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+            img = rgb_img
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # Encode as JPEG
+        buffered = io.BytesIO()
+        img.save(buffered, format="JPEG", quality=95)
+        encoded = base64.b64encode(buffered.getvalue()).decode('utf-8')
+        return f"data:image/jpeg;base64,{encoded}"
+
 
 def cropRight(image_path):
     file_name, file_extension = os.path.splitext(image_path)
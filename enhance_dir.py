@@ -1,6 +1,7 @@
 from helpers import is_hidden
-from enhance_single import enhance_comic
+from enhance_single import enhance_comic, enhance_workers
 import os
+from concurrent.futures import ProcessPoolExecutor
 from app_logging import app_logger
 import sys
 
@@ -10,14 +11,18 @@ def enhance_directory(directory):
     Processes all files (no subdirectories) in the given directory by calling
     enhance_comic(file_path) on each file. Only files directly in 'directory_path'
     will be processed—no subdirectories are traversed.
+
+    One page-enhancement pool is shared by every archive in the directory, so
+    worker startup is paid once per run rather than once per book.
     """
-    # List all files in the directory (not diving into subdirectories).
-    for filename in os.listdir(directory):
-        file_path = os.path.join(directory, filename)
-        
-        # Skip hidden files or directories. Then ensure we are only processing files.
-        if not is_hidden(file_path) and os.path.isfile(file_path):
-            enhance_comic(file_path)
+    with ProcessPoolExecutor(max_workers=enhance_workers()) as pool:
+        # List all files in the directory (not diving into subdirectories).
+        for filename in os.listdir(directory):
+            file_path = os.path.join(directory, filename)
+
+            # Skip hidden files or directories. Then ensure we are only processing files.
+            if not is_hidden(file_path) and os.path.isfile(file_path):
+                enhance_comic(file_path, pool)
 
 
 if __name__ == "__main__":
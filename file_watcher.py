@@ -1,17 +1,181 @@
+"""
+file_watcher.py - Keeps file_index in step with changes under /data
+
+Events are not applied one by one. DebouncedFileHandler folds them into a
+ChangeSet for the current debounce window, which keeps one outcome per path:
+- created/modified paths are re-read from disk when the batch is applied
+- moves are kept as moves (chains A -> B -> C collapse to A -> C) so the
+  indexed row, its metadata and its page manifest follow the file
+- deletes drop the path and everything below it
+
+The batch is flushed once no event has arrived for debounce_seconds (or
+after MAX_BATCH_SECONDS of continuous activity), applied to the database in
+one transaction by apply_file_index_changes, and the new or changed
+archives are then handed to the archive analyzer and metadata scanner in
+bulk. Copying a 300-issue folder in is therefore a few transactions rather
+than 300 separate commits.
+
+Backends (WATCHER_BACKEND = auto | inotify | polling), chosen per library:
+- inotify: watchdog's native Observer. Sees nothing on network mounts,
+  because changes made by other NFS/SMB clients raise no local events.
+- polling: DirectoryPoller stats the indexed directories every
+  WATCHER_POLL_INTERVAL seconds. It re-lists only the ones whose mtime
+  changed, diffs them against the index and dispatches the differences as
+  watchdog events to the same handler. A pass stops after
+  WATCHER_POLL_IO_BUDGET filesystem operations and the next pass resumes
+  where it stopped.
+- auto picks polling for roots on a network filesystem (from /proc/mounts)
+  and inotify for everything else.
+"""
+
 import os
 import time
 import threading
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-from database import add_file_index_entry, delete_file_index_entry, invalidate_collection_status_for_path
+from watchdog.events import (FileSystemEventHandler, FileCreatedEvent, FileModifiedEvent, FileDeletedEvent,
+                             FileMovedEvent, DirCreatedEvent, DirDeletedEvent, DirMovedEvent)
+from database import (apply_file_index_changes, invalidate_collection_status_for_path,
+                      get_indexed_directories, get_indexed_children)
 from app_logging import app_logger
-from metadata_scanner import queue_file_for_scan, PRIORITY_NEW_FILE
+from config import config
+from helpers import is_network_path
+from archive_analyzer import queue_archive_analyses, get_thumbnail_cache_path
+from metadata_scanner import queue_files_for_scan, to_db_path, PRIORITY_NEW_FILE
+
+COMIC_EXTENSIONS = ('.cbz', '.cbr')
+MAX_BATCH_SECONDS = 30  # Flush a batch even if events keep arriving
+
+BACKEND_INOTIFY = 'inotify'
+BACKEND_POLLING = 'polling'
+
+
+def is_tracked(path, is_dir):
+    """
+    Check if a path belongs in the file index.
+    Directories unless hidden; files only if they are comic archives and not hidden/temporary.
+    """
+    basename = os.path.basename(path)
+    if is_dir:
+        return not basename.startswith(('.', '_'))
+    if basename.startswith(('.', '~')):
+        return False
+    return os.path.splitext(basename)[1].lower() in COMIC_EXTENSIONS
+
+
+def _index_entry(path, is_dir):
+    """file_index row for path as it is on disk now, or None if it is gone."""
+    try:
+        if is_dir:
+            has_thumbnail = int(any(os.path.exists(os.path.join(path, f'folder{ext}'))
+                                    for ext in ('.png', '.jpg', '.jpeg')))
+            return {
+                'name': os.path.basename(path),
+                'path': path,
+                'type': 'directory',
+                'size': None,
+                'parent': os.path.dirname(path),
+                'has_thumbnail': has_thumbnail,
+                'modified_at': None
+            }
+        stat = os.stat(path)
+        return {
+            'name': os.path.basename(path),
+            'path': path,
+            'type': 'file',
+            'size': stat.st_size,
+            'parent': os.path.dirname(path),
+            'has_thumbnail': 0,
+            'modified_at': stat.st_mtime
+        }
+    except OSError:
+        return None
+
+
+def _walk_entries(path):
+    """Index entries for a directory and everything tracked inside it."""
+    entry = _index_entry(path, True)
+    if entry:
+        yield entry
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if is_tracked(os.path.join(root, d), True)]
+        for name in dirs:
+            entry = _index_entry(os.path.join(root, name), True)
+            if entry:
+                yield entry
+        for name in files:
+            full_path = os.path.join(root, name)
+            if is_tracked(full_path, False):
+                entry = _index_entry(full_path, False)
+                if entry:
+                    yield entry
+
+
+class ChangeSet:
+    """
+    Filesystem events of one debounce window, coalesced to one outcome per path.
+    """
+
+    def __init__(self):
+        self.upserts = {}  # path -> is_dir; re-read from disk when applied
+        self.moves = {}    # dest_path -> (src_path, is_dir)
+        self.deletes = {}  # path -> is_dir
+
+    def __len__(self):
+        return len(self.upserts) + len(self.moves) + len(self.deletes)
+
+    def created(self, path, is_dir):
+        self.deletes.pop(path, None)
+        self.upserts[path] = is_dir
+
+    def deleted(self, path, is_dir):
+        self.upserts.pop(path, None)
+        move = self.moves.pop(path, None)
+        if move:
+            # The indexed row never left the source path
+            self.deletes[move[0]] = is_dir
+        if is_dir:
+            # Same for anything moved into the directory earlier in this window
+            prefix = path + os.sep
+            for dest in [d for d in self.moves if d.startswith(prefix)]:
+                origin, origin_is_dir = self.moves.pop(dest)
+                self.deletes[origin] = origin_is_dir
+        self.deletes[path] = is_dir
+
+    def moved(self, src_path, dest_path, is_dir):
+        origin = src_path
+        if src_path in self.moves:
+            origin = self.moves.pop(src_path)[0]
+        src_pending = self.upserts.pop(src_path, None) is not None
+        self.deletes.pop(dest_path, None)
+        self.upserts.pop(dest_path, None)
+
+        child_moves = []
+        if is_dir:
+            # Paths created, moved in or deleted inside the directory earlier in
+            # this window moved with it (the watcher only reports the directory)
+            prefix = src_path + os.sep
+            for path in [p for p in self.upserts if p.startswith(prefix)]:
+                self.upserts[dest_path + path[len(src_path):]] = self.upserts.pop(path)
+            for path in [p for p in self.moves if p.startswith(prefix)]:
+                child_moves.append((dest_path + path[len(src_path):], self.moves.pop(path)))
+            for path in [p for p in self.deletes if p.startswith(prefix)]:
+                self.deletes[dest_path + path[len(src_path):]] = self.deletes.pop(path)
+
+        if origin != dest_path:
+            self.moves[dest_path] = (origin, is_dir)
+        # Moves are applied in order: children go after their directory's move,
+        # which would otherwise replace them at the destination
+        for new_dest, move in child_moves:
+            if move[0] != new_dest:
+                self.moves[new_dest] = move
+        if src_pending:
+            self.upserts[dest_path] = is_dir
 
 
 class DebouncedFileHandler(FileSystemEventHandler):
     """
-    File system event handler with debouncing to prevent duplicate events.
-    Only tracks file creation/modification events in the /data directory.
+    File system event handler that batches events per debounce window and
+    applies each batch to the file index in one transaction.
     """
 
     def __init__(self, debounce_seconds=2):
@@ -19,186 +183,467 @@ class DebouncedFileHandler(FileSystemEventHandler):
         Initialize the debounced file handler.
 
         Args:
-            debounce_seconds: Time window to debounce events (default 2 seconds)
+            debounce_seconds: Quiet time before a batch is applied (default 2 seconds)
         """
         super().__init__()
         self.debounce_seconds = debounce_seconds
-        self.pending_events = {}  # {file_path: last_event_time}
+        self.changes = ChangeSet()
+        self.batch_started = None
+        self.last_event = None
         self.lock = threading.Lock()
+        self.apply_lock = threading.Lock()  # Batches are applied in order, one at a time
         self.debounce_timer = None
 
-    def _should_process_file(self, file_path):
-        """
-        Check if the file should be processed.
-        Only process comic book files (cbz, cbr) and ignore hidden files.
-        """
-        if not os.path.isfile(file_path):
-            return False
-
-        # Ignore hidden files and system files
-        basename = os.path.basename(file_path)
-        if basename.startswith('.') or basename.startswith('~'):
-            return False
-
-        # Only process comic book files
-        ext = os.path.splitext(file_path)[1].lower()
-        if ext not in ['.cbz', '.cbr']:
-            return False
+    def _schedule(self, delay):
+        """Start the flush timer unless one is pending. Caller holds self.lock."""
+        if self.debounce_timer is None or not self.debounce_timer.is_alive():
+            self.debounce_timer = threading.Timer(delay, self._flush)
+            self.debounce_timer.daemon = True
+            self.debounce_timer.start()
 
-        return True
-
-    def _process_pending_events(self):
-        """Process all pending events that have exceeded the debounce window."""
+    def _record(self, apply_event):
+        """Fold one event into the current batch."""
         with self.lock:
-            current_time = time.time()
-            events_to_process = []
-
-            # Find events that are ready to process
-            for file_path, event_time in list(self.pending_events.items()):
-                if current_time - event_time >= self.debounce_seconds:
-                    events_to_process.append(file_path)
-                    del self.pending_events[file_path]
-
-            # Process the events
-            for file_path in events_to_process:
-                if self._should_process_file(file_path):
-                    try:
-                        file_name = os.path.basename(file_path)
-                        file_size = os.path.getsize(file_path) if os.path.exists(file_path) else None
-                        modified_at = os.path.getmtime(file_path) if os.path.exists(file_path) else None
-                        parent = os.path.dirname(file_path)
-
-                        add_file_index_entry(file_name, file_path, 'file', size=file_size, parent=parent, modified_at=modified_at)
-                        app_logger.info(f"✅ Indexed recent file from watcher: {file_name}")
-
-                        # Queue CBZ files for metadata scanning (high priority for new files)
-                        if file_path.lower().endswith('.cbz'):
-                            queue_file_for_scan(file_path, PRIORITY_NEW_FILE)
-
-                        # Invalidate collection status cache for this directory
-                        invalidate_collection_status_for_path(file_path)
-                    except Exception as e:
-                        app_logger.error(f"Error processing file event for {file_path}: {e}")
-                else:
-                    app_logger.debug(f"File watcher skipped (filtered): {file_path}")
-
-            # Schedule next check if there are still pending events
-            if self.pending_events:
-                self.debounce_timer = threading.Timer(self.debounce_seconds, self._process_pending_events)
+            now = time.time()
+            if self.batch_started is None:
+                self.batch_started = now
+            self.last_event = now
+            apply_event(self.changes)
+            self._schedule(self.debounce_seconds)
+
+    def _flush(self):
+        """Timer callback: apply the batch once it has been quiet for the debounce window."""
+        with self.lock:
+            now = time.time()
+            quiet_for = now - self.last_event if self.last_event else self.debounce_seconds
+            overdue = self.batch_started is not None and now - self.batch_started >= MAX_BATCH_SECONDS
+            if quiet_for < self.debounce_seconds and not overdue:
+                self.debounce_timer = threading.Timer(self.debounce_seconds - quiet_for, self._flush)
                 self.debounce_timer.daemon = True
                 self.debounce_timer.start()
+                return
+            changes = self.changes
+            self.changes = ChangeSet()
+            self.batch_started = None
+
+        if changes:
+            with self.apply_lock:
+                try:
+                    self.apply_changes(changes)
+                except Exception as e:
+                    app_logger.error(f"Error applying file watcher batch of {len(changes)} changes: {e}")
 
-    def _add_event(self, file_path):
-        """Add or update an event in the pending queue."""
         with self.lock:
-            self.pending_events[file_path] = time.time()
+            self.debounce_timer = None
+            if self.changes:
+                self._schedule(self.debounce_seconds)
 
-            # Start the debounce timer if not already running
-            if self.debounce_timer is None or not self.debounce_timer.is_alive():
-                self.debounce_timer = threading.Timer(self.debounce_seconds, self._process_pending_events)
-                self.debounce_timer.daemon = True
-                self.debounce_timer.start()
+    def apply_changes(self, changes):
+        """
+        Apply a coalesced batch: one file_index transaction, then bulk fan-out.
+
+        Args:
+            changes: ChangeSet to apply
+        """
+        upserts = {}
+        moves = []
+        deletes = {path for path, is_dir in changes.deletes.items() if is_tracked(path, is_dir)}
+        touched_dirs = set()
+
+        def add_upsert(path, is_dir):
+            if is_dir:
+                for entry in _walk_entries(path):
+                    upserts[entry['path']] = entry
+            else:
+                entry = _index_entry(path, False)
+                if entry:
+                    upserts[path] = entry
+
+        for dest_path, (src_path, is_dir) in changes.moves.items():
+            src_tracked = is_tracked(src_path, is_dir)
+            dest_tracked = is_tracked(dest_path, is_dir) and os.path.exists(dest_path)
+            if src_tracked and dest_tracked:
+                entry = _index_entry(dest_path, is_dir)
+                if entry:
+                    moves.append((src_path, entry))
+            elif src_tracked:
+                # Moved out of view (renamed to a hidden or non-comic name)
+                deletes.add(src_path)
+            elif dest_tracked:
+                # Came into view, e.g. a finished download renamed from .part to .cbz
+                add_upsert(dest_path, is_dir)
+            else:
+                continue
+            touched_dirs.update((src_path if is_dir else os.path.dirname(src_path),
+                                 dest_path if is_dir else os.path.dirname(dest_path)))
+
+        for path, is_dir in changes.upserts.items():
+            if not is_tracked(path, is_dir):
+                app_logger.debug(f"File watcher skipped (filtered): {path}")
+                continue
+            if not os.path.exists(path):
+                deletes.add(path)
+                continue
+            add_upsert(path, is_dir)
+            touched_dirs.add(path if is_dir else os.path.dirname(path))
+
+        touched_dirs.update(path if changes.deletes.get(path) else os.path.dirname(path) for path in deletes)
+
+        if not (upserts or moves or deletes):
+            return
+
+        result = apply_file_index_changes(upserts=list(upserts.values()), moves=moves, deletes=sorted(deletes))
+        if result is None:
+            return
+
+        # Moved archives keep their rendered cover
+        for src_path, entry in moves:
+            if entry['type'] == 'file':
+                self._move_thumbnail(src_path, entry['path'])
+
+        # New or changed archives: CBZ through the single-pass analyzer,
+        # CBR through the RAR backend of the metadata scanner
+        fresh = [path for path, entry in upserts.items() if entry['type'] == 'file']
+        fresh.extend(path for path in result['new_paths']
+                     if path not in upserts and path.lower().endswith(COMIC_EXTENSIONS))
+        queued = queue_archive_analyses(fresh)
+        scanned = queue_files_for_scan([to_db_path(path) for path in fresh if path.lower().endswith('.cbr')],
+                                       PRIORITY_NEW_FILE)
+
+        for directory in touched_dirs:
+            invalidate_collection_status_for_path(directory)
+
+        app_logger.info(
+            f"✅ File watcher batch: {result['upserted']} indexed, {result['moved']} moved, "
+            f"{result['deleted']} removed; {queued} queued for analysis, {scanned} for metadata scan"
+        )
+
+    @staticmethod
+    def _move_thumbnail(src_path, dest_path):
+        src_thumb = get_thumbnail_cache_path(src_path)
+        dest_thumb = get_thumbnail_cache_path(dest_path)
+        if not os.path.exists(src_thumb) or os.path.exists(dest_thumb):
+            return
+        try:
+            os.makedirs(os.path.dirname(dest_thumb), exist_ok=True)
+            os.replace(src_thumb, dest_thumb)
+        except OSError as e:
+            app_logger.debug(f"Could not move thumbnail for {dest_path}: {e}")
 
     def on_any_event(self, event):
         """Log all events for debugging."""
-        app_logger.debug(f"File watcher received event: {event.event_type} - {event.src_path}")
+        app_logger.debug(f"File watcher received event: {event.event_type} - {event.src_path} (is_dir: {event.is_directory})")
 
     def on_created(self, event):
-        """Handle file creation events."""
-        app_logger.info(f"File watcher CREATE event: {event.src_path} (is_dir: {event.is_directory})")
-        if event.is_directory:
-            return
-
-        file_path = event.src_path
-        self._add_event(file_path)
+        """Handle file and directory creation events."""
+        self._record(lambda changes: changes.created(event.src_path, event.is_directory))
 
     def on_modified(self, event):
-        """Handle file modification events."""
-        app_logger.info(f"File watcher MODIFY event: {event.src_path} (is_dir: {event.is_directory})")
+        """Handle file modification events (directory mtime changes are covered by their children)."""
         if event.is_directory:
             return
-
-        file_path = event.src_path
-        self._add_event(file_path)
+        self._record(lambda changes: changes.created(event.src_path, False))
 
     def on_moved(self, event):
-        """Handle file move events (treat destination as a new file)."""
-        app_logger.info(f"File watcher MOVE event: {event.src_path} -> {event.dest_path} (is_dir: {event.is_directory})")
-        if event.is_directory:
-            return
-
-        file_path = event.dest_path
-        self._add_event(file_path)
+        """Handle file and directory moves/renames."""
+        self._record(lambda changes: changes.moved(event.src_path, event.dest_path, event.is_directory))
 
     def on_deleted(self, event):
-        """Handle file deletion events."""
-        app_logger.info(f"File watcher DELETE event: {event.src_path} (is_dir: {event.is_directory})")
-        if event.is_directory:
-            # We also want to remove directories, but for now focusing on files as per request
-            # Logic for directories would be recursive delete which delete_file_index_entry handles
-            delete_file_index_entry(event.src_path)
-            return
+        """Handle file and directory deletion events."""
+        self._record(lambda changes: changes.deleted(event.src_path, event.is_directory))
 
-        file_path = event.src_path
-        # Check if it was a comic file (extension check)
-        # Since file is gone, we can't check isfile or open it, but we can check extension
-        ext = os.path.splitext(file_path)[1].lower()
-        if ext not in ['.cbz', '.cbr']:
-            return
 
+def select_backend(path, mode='auto'):
+    """
+    Pick the watcher backend for a library root.
+
+    Args:
+        path: Library root
+        mode: 'auto', 'inotify' or 'polling'
+
+    Returns:
+        BACKEND_INOTIFY or BACKEND_POLLING
+    """
+    if mode in (BACKEND_INOTIFY, BACKEND_POLLING):
+        return mode
+    if is_network_path(path):
+        return BACKEND_POLLING
+    return BACKEND_INOTIFY
+
+
+def _outermost(paths):
+    """Drop paths nested inside another path of the list."""
+    paths = sorted(set(os.path.normpath(p) for p in paths))
+    result = []
+    for path in paths:
+        if not any(path == kept or path.startswith(kept.rstrip('/') + '/') for kept in result):
+            result.append(path)
+    return result
+
+
+class DirectoryPoller:
+    """
+    Polling backend for filesystems without change notifications (NFS, SMB).
+
+    Each pass stats the indexed directories under the roots. A directory's
+    mtime changes when an entry is added, removed or renamed in it, so only
+    those directories are re-listed and diffed against file_index. Files that
+    vanished and appeared in the same pass with the same size and mtime, and
+    directories with the same inode, are reported as moves so their metadata
+    follows them. In-place rewrites of a file do not touch the directory mtime
+    and are only caught when the directory is re-listed for another reason.
+    """
+
+    def __init__(self, handler, roots, interval=60, io_budget=2000):
+        """
+        Initialize the poller.
+
+        Args:
+            handler: FileSystemEventHandler receiving the synthesized events
+            roots: Library roots to poll
+            interval: Seconds between passes
+            io_budget: Maximum filesystem operations (stat, listing) per pass
+        """
+        self.handler = handler
+        self.roots = list(roots)
+        self.interval = interval
+        self.io_budget = max(1, io_budget)
+        self.signatures = {}  # directory -> (mtime_ns, inode) at the last stat
+        self.cursor = 0
+        self.primed = False  # True once every directory has a baseline
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def _directories(self):
+        directories = []
+        for root in self.roots:
+            directories.append(root)
+            directories.extend(get_indexed_directories(root))
+        return directories
+
+    def poll_once(self):
+        """
+        Run one budgeted pass.
+
+        Returns:
+            Number of directories that changed since their last stat
+        """
+        directories = self._directories()
+        if not directories:
+            return 0
+
+        start = self.cursor % len(directories)
+        order = directories[start:] + directories[:start]
+        budget = self.io_budget
+        changed = 0
+        checked = 0
+        vanished_files, appeared_files = {}, {}
+        vanished_dirs, appeared_dirs = {}, {}
+
+        for path in order:
+            if budget <= 0:
+                break
+            checked += 1
+            budget -= 1
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Gone: the parent's listing reports it
+                self.signatures.pop(path, None)
+                continue
+
+            signature = (stat.st_mtime_ns, stat.st_ino)
+            previous = self.signatures.get(path)
+            self.signatures[path] = signature
+            if previous is not None and previous[0] == signature[0]:
+                continue
+            if previous is None and not self.primed:
+                continue  # First sight during the initial cycle: baseline only
+
+            changed += 1
+            budget -= self._diff(path, vanished_files, appeared_files, vanished_dirs, appeared_dirs)
+
+        if start + checked >= len(directories):
+            self.primed = True
+        self.cursor = start + checked
+
+        self._dispatch(vanished_files, appeared_files, vanished_dirs, appeared_dirs)
+        return changed
+
+    def _diff(self, path, vanished_files, appeared_files, vanished_dirs, appeared_dirs):
+        """
+        Compare one directory listing with its indexed children.
+
+        Returns:
+            Filesystem operations spent
+        """
+        indexed = get_indexed_children(path)
+        if indexed is None:
+            return 1
+        spent = 1
+        on_disk = set()
         try:
-            delete_file_index_entry(file_path)
-            app_logger.info(f"❌ Removed deleted file from index: {os.path.basename(file_path)}")
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if not is_tracked(entry.path, is_dir):
+                        continue
+                    on_disk.add(entry.path)
+                    known = indexed.get(entry.path)
+                    if is_dir:
+                        if known is None:
+                            appeared_dirs.setdefault(entry.inode(), []).append(entry.path)
+                        continue
+
+                    spent += 1
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    if known is None:
+                        appeared_files.setdefault((stat.st_size, stat.st_mtime), []).append(entry.path)
+                    elif known[1] != stat.st_size or known[2] is None or abs(known[2] - stat.st_mtime) > 1:
+                        self.handler.dispatch(FileModifiedEvent(entry.path))
+        except OSError as e:
+            app_logger.debug(f"Poller could not list {path}: {e}")
+            return spent
+
+        for child, (entry_type, size, modified_at) in indexed.items():
+            # The full index also holds files the watcher does not track (PDFs,
+            # cvinfo, ...); they are never in on_disk, so skip them here too
+            if child in on_disk or not is_tracked(child, entry_type == 'directory'):
+                continue
+            if entry_type == 'directory':
+                inode = self.signatures.get(child, (None, None))[1]
+                vanished_dirs.setdefault(inode, []).append(child)
+            else:
+                vanished_files.setdefault((size, modified_at), []).append(child)
+        return spent
+
+    def _dispatch(self, vanished_files, appeared_files, vanished_dirs, appeared_dirs):
+        """Turn a pass's differences into watchdog events, pairing unambiguous moves."""
+        for key, sources in vanished_dirs.items():
+            targets = appeared_dirs.get(key)
+            if key is not None and targets and len(sources) == 1 and len(targets) == 1:
+                self.handler.dispatch(DirMovedEvent(sources[0], targets[0]))
+                del appeared_dirs[key]
+                continue
+            for source in sources:
+                self.handler.dispatch(DirDeletedEvent(source))
+        for targets in appeared_dirs.values():
+            for target in targets:
+                self.handler.dispatch(DirCreatedEvent(target))
+
+        for key, sources in vanished_files.items():
+            targets = appeared_files.get(key)
+            if targets and len(sources) == 1 and len(targets) == 1:
+                self.handler.dispatch(FileMovedEvent(sources[0], targets[0]))
+                del appeared_files[key]
+                continue
+            for source in sources:
+                self.handler.dispatch(FileDeletedEvent(source))
+        for targets in appeared_files.values():
+            for target in targets:
+                self.handler.dispatch(FileCreatedEvent(target))
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            started = time.time()
+            try:
+                changed = self.poll_once()
+                if changed:
+                    app_logger.debug(f"Poller found {changed} changed directories in {time.time() - started:.2f}s")
+            except Exception as e:
+                app_logger.error(f"Error during watcher poll: {e}")
+            self.stop_event.wait(self.interval)
 
-            # Invalidate collection status cache for this directory
-            invalidate_collection_status_for_path(file_path)
-        except Exception as e:
-            app_logger.error(f"Error removing deleted file {file_path}: {e}")
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="DirectoryPoller", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
 
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
 
 
 class FileWatcher:
     """
-    Manages the file system watcher for the /data directory.
+    Manages the file system watchers for the library roots, one backend per root.
     """
 
-    def __init__(self, watch_path, debounce_seconds=2):
+    def __init__(self, watch_paths, debounce_seconds=2):
         """
         Initialize the file watcher.
 
         Args:
-            watch_path: Path to watch for file changes
+            watch_paths: Path or list of library roots to watch for file changes
             debounce_seconds: Debounce time for events (default 2 seconds)
         """
-        self.watch_path = watch_path
+        if isinstance(watch_paths, str):
+            watch_paths = [watch_paths]
+        self.watch_paths = list(watch_paths)
         self.observer = Observer()
+        self.poller = None
+        self.backends = {}  # root -> backend
         self.event_handler = DebouncedFileHandler(debounce_seconds=debounce_seconds)
 
     def start(self):
-        """Start watching the directory in a background thread."""
-        try:
-            if not os.path.exists(self.watch_path):
-                app_logger.error(f"Watch path does not exist: {self.watch_path}")
-                return False
-
-            self.observer.schedule(self.event_handler, self.watch_path, recursive=True)
-            self.observer.start()
-            app_logger.info(f"File watcher started for: {self.watch_path}")
-            return True
-
-        except Exception as e:
-            app_logger.error(f"Failed to start file watcher: {e}")
-            return False
+        """Start watching the roots in background threads."""
+        mode = config.get("SETTINGS", "WATCHER_BACKEND", fallback="auto").strip().lower()
+
+        roots = []
+        for path in self.watch_paths:
+            if os.path.exists(path):
+                roots.append(path)
+            else:
+                app_logger.error(f"Watch path does not exist: {path}")
+
+        by_backend = {BACKEND_INOTIFY: [], BACKEND_POLLING: []}
+        for root in roots:
+            by_backend[select_backend(root, mode)].append(root)
+
+        inotify_roots = _outermost(by_backend[BACKEND_INOTIFY])
+        polling_roots = _outermost(by_backend[BACKEND_POLLING])
+
+        if inotify_roots:
+            try:
+                for root in inotify_roots:
+                    self.observer.schedule(self.event_handler, root, recursive=True)
+                self.observer.start()
+            except Exception as e:
+                # e.g. the inotify watch limit: polling still keeps the index current
+                app_logger.error(f"Failed to start inotify watcher, falling back to polling: {e}")
+                polling_roots = _outermost(polling_roots + inotify_roots)
+                inotify_roots = []
+
+        if polling_roots:
+            interval = config.getint("SETTINGS", "WATCHER_POLL_INTERVAL", fallback=60)
+            io_budget = config.getint("SETTINGS", "WATCHER_POLL_IO_BUDGET", fallback=2000)
+            self.poller = DirectoryPoller(self.event_handler, polling_roots, interval=interval, io_budget=io_budget)
+            self.poller.start()
+
+        self.backends = {root: BACKEND_INOTIFY for root in inotify_roots}
+        self.backends.update({root: BACKEND_POLLING for root in polling_roots})
+        for root, backend in self.backends.items():
+            app_logger.info(f"File watcher started for: {root} ({backend})")
+        return bool(self.backends)
 
     def stop(self):
         """Stop the file watcher."""
         try:
-            self.observer.stop()
-            self.observer.join(timeout=5)
+            if self.observer.is_alive():
+                self.observer.stop()
+                self.observer.join(timeout=5)
+            if self.poller:
+                self.poller.stop()
             app_logger.info("File watcher stopped")
         except Exception as e:
             app_logger.error(f"Error stopping file watcher: {e}")
 
     def is_alive(self):
         """Check if the watcher is running."""
-        return self.observer.is_alive()
+        return self.observer.is_alive() or (self.poller is not None and self.poller.is_alive())
@@ -0,0 +1,110 @@
+"""
+generations.py - Change counters behind the ETags of the JSON APIs
+
+The browse, insights and read-tracking endpoints return the same JSON until
+the file index or the read history changes. Instead of hashing responses,
+the writers bump in-memory generation counters and the routes derive weak
+ETags from them, so a conditional request can be answered with 304 before
+any SQLite query or filesystem walk.
+
+Counters:
+- table(name): bumped by every write to a table (file_index, issues_read)
+- directory: bump_directory(path) marks the listing of path as changed and
+  counts as a change below each of its ancestors; bump_tree(path) marks path
+  and everything under it as changed (directory moves and deletes)
+
+  directory_generation(path) changes when path's own listing may have
+  changed; subtree_generation(path) when anything at or under path may have.
+  Both sum monotonic counters over path and its ancestors, so they only
+  grow, and a lookup costs O(path depth).
+
+Counters live in the web process (gunicorn runs one worker). Writers in
+script subprocesses are covered by the file watcher and by
+app.invalidate_cache_for_paths, which both run in the web process. A random
+per-process token in every ETag keeps tags from a previous run from
+matching after a restart.
+"""
+
+import os
+import threading
+import uuid
+
+_token = uuid.uuid4().hex[:8]
+_lock = threading.Lock()
+_tables = {}
+_own = {}     # path -> changes to the listing of path
+_below = {}   # path -> changes at or anywhere under path
+_tree = {}    # path -> whole-subtree invalidations rooted at path
+
+
+def _normalize(path):
+    return os.path.normpath(path) if path else ''
+
+
+def _lineage(path):
+    """path followed by each of its ancestors up to the root."""
+    while True:
+        yield path
+        parent = os.path.dirname(path)
+        if parent == path or not parent:
+            return
+        path = parent
+
+
+def bump_table(*names):
+    with _lock:
+        for name in names:
+            _tables[name] = _tables.get(name, 0) + 1
+
+
+def bump_directory(*paths):
+    """Mark the listings of paths as changed."""
+    with _lock:
+        for path in paths:
+            if not path:
+                continue
+            path = _normalize(path)
+            _own[path] = _own.get(path, 0) + 1
+            for ancestor in _lineage(path):
+                _below[ancestor] = _below.get(ancestor, 0) + 1
+
+
+def bump_tree(*paths):
+    """Mark paths, their parents' listings and everything under paths as changed."""
+    with _lock:
+        for path in paths:
+            if not path:
+                continue
+            path = _normalize(path)
+            _tree[path] = _tree.get(path, 0) + 1
+            parent = os.path.dirname(path)
+            if parent and parent != path:
+                _own[parent] = _own.get(parent, 0) + 1
+            for ancestor in _lineage(path):
+                _below[ancestor] = _below.get(ancestor, 0) + 1
+
+
+def bump_all():
+    """Everything changed (the whole index was rebuilt)."""
+    bump_tree(os.sep)
+
+
+def table_generation(name):
+    return _tables.get(name, 0)
+
+
+def directory_generation(path):
+    path = _normalize(path)
+    with _lock:
+        return _own.get(path, 0) + sum(_tree.get(p, 0) for p in _lineage(path))
+
+
+def subtree_generation(path):
+    path = _normalize(path)
+    with _lock:
+        return _below.get(path, 0) + sum(_tree.get(p, 0) for p in _lineage(path))
+
+
+def make_etag(*parts):
+    """Opaque ETag value for a response built from the given generations."""
+    return '-'.join([_token] + [str(part) for part in parts])
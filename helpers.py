@@ -33,6 +33,51 @@ def is_hidden(filepath):
             pass
     return False
 
+#########################
+#   Mount Detection     #
+#########################
+
+# Filesystems where inotify misses changes made elsewhere: network mounts and
+# the host-shared mounts of Docker Desktop / WSL
+NETWORK_FILESYSTEMS = {
+    'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'afs', '9p', 'ceph', 'glusterfs',
+    'fuse.sshfs', 'fuse.rclone', 'fuse.glusterfs', 'fuse.s3fs', 'davfs',
+    'fuse.grpcfuse', 'fakeowner', 'virtiofs', 'drvfs'
+}
+
+def _unescape_mount_path(path):
+    """/proc/mounts escapes spaces, tabs, newlines and backslashes as octal."""
+    return (path.replace('\\040', ' ').replace('\\011', '\t')
+            .replace('\\012', '\n').replace('\\134', '\\'))
+
+def get_mount_type(path):
+    """
+    Filesystem type of the mount holding path, from /proc/mounts.
+
+    Returns:
+        Type string such as 'ext4' or 'nfs4', or None if it cannot be determined
+    """
+    try:
+        with open('/proc/mounts') as f:
+            mounts = [line.split() for line in f]
+    except OSError:
+        return None
+
+    path = os.path.realpath(path)
+    best_point, best_type = '', None
+    for fields in mounts:
+        if len(fields) < 3:
+            continue
+        mount_point = _unescape_mount_path(fields[1])
+        inside = path == mount_point or path.startswith(mount_point.rstrip('/') + '/')
+        if inside and len(mount_point) > len(best_point):
+            best_point, best_type = mount_point, fields[2]
+    return best_type
+
+def is_network_path(path):
+    """True if path lives on a filesystem that raises no inotify events for remote changes."""
+    return get_mount_type(path) in NETWORK_FILESYSTEMS
+
 #########################
 #   File Extraction     #
 #########################
@@ -232,6 +277,141 @@ def apply_modified_s_curve(image):
         return image
 
 
+# Enhancement parameters shared by the chained and fused paths
+ENHANCE_GAMMA = 0.9
+ENHANCE_BRIGHTNESS = 1.03
+ENHANCE_CONTRAST = 1.05
+ENHANCE_AUTOCONTRAST_CUTOFF = 1
+# Modes the fused LUT handles; others (RGBA, P, CMYK...) use the chained passes
+FUSED_ENHANCE_MODES = ("L", "RGB")
+
+
+def _clip8(value):
+    return 0 if value < 0 else 255 if value > 255 else value
+
+
+def _remap_histogram(histogram, lut):
+    """Histogram of point(lut) computed from the source histogram (256 bins)."""
+    remapped = [0] * 256
+    for value, count in enumerate(histogram):
+        if count:
+            remapped[lut[value]] += count
+    return remapped
+
+
+def _histogram_mean(histogram):
+    total = sum(histogram)
+    return sum(value * count for value, count in enumerate(histogram)) / total if total else 0.0
+
+
+def _autocontrast_lut(histogram, cutoff):
+    """Per-band LUT of ImageOps.autocontrast(cutoff=...) for a 256-bin histogram."""
+    h = list(histogram)
+    n = sum(h)
+    # Cut off pixels from both ends of the histogram
+    cut = int(n * cutoff // 100)
+    for lo in range(256):
+        if cut > h[lo]:
+            cut -= h[lo]
+            h[lo] = 0
+        else:
+            h[lo] -= cut
+            cut = 0
+        if cut <= 0:
+            break
+    cut = int(n * cutoff // 100)
+    for hi in range(255, -1, -1):
+        if cut > h[hi]:
+            cut -= h[hi]
+            h[hi] = 0
+        else:
+            h[hi] -= cut
+            cut = 0
+        if cut <= 0:
+            break
+
+    # Find lowest/highest samples after preprocessing
+    lo = next((i for i in range(256) if h[i]), 0)
+    hi = next((i for i in range(255, -1, -1) if h[i]), 255)
+    if hi <= lo:
+        return list(range(256))
+    scale = 255.0 / (hi - lo)
+    offset = -lo * scale
+    return [_clip8(int(i * scale + offset)) for i in range(256)]
+
+
+def fused_enhance_lut(image):
+    """
+    Build one lookup table equivalent to the enhance_image() chain.
+
+    S-curve, gamma and brightness are fixed per-value maps. Contrast needs the
+    mean grey level and autocontrast the per-band histogram of the image at
+    that point in the chain; both are derived by pushing the source
+    histogram through the preceding maps, so the only full-image work is one
+    histogram() pass here and one point() pass by the caller.
+
+    :param image: PIL image in one of FUSED_ENHANCE_MODES
+    :return: List of 256 entries per band for Image.point()
+    """
+    inv = 1.0 / ENHANCE_GAMMA
+    s_curve = modified_s_curve_lut()
+    gamma = [int(((i / 255) ** inv) * 255) for i in range(256)]
+    # ImageEnhance.Brightness: blend with black, truncated and clipped
+    base = [_clip8(int(ENHANCE_BRIGHTNESS * gamma[s_curve[i]])) for i in range(256)]
+
+    bands = len(image.getbands())
+    histogram = image.histogram()
+    band_histograms = [_remap_histogram(histogram[b * 256:(b + 1) * 256], base) for b in range(bands)]
+
+    # ImageEnhance.Contrast blends with the mean of the greyscale image
+    means = [_histogram_mean(h) for h in band_histograms]
+    if bands == 3:
+        grey_mean = (means[0] * 299 + means[1] * 587 + means[2] * 114) / 1000
+    else:
+        grey_mean = means[0]
+    mean = int(grey_mean + 0.5)
+    contrast = [_clip8(int(mean + ENHANCE_CONTRAST * (i - mean))) for i in range(256)]
+
+    lut = []
+    for band_histogram in band_histograms:
+        auto = _autocontrast_lut(_remap_histogram(band_histogram, contrast), ENHANCE_AUTOCONTRAST_CUTOFF)
+        lut.extend(auto[contrast[value]] for value in base)
+    return lut
+
+
+def enhance_image_chained(img):
+    """
+    Apply the enhancement as separate PIL passes (one full image per step).
+    Used for modes the fused LUT does not cover and as the benchmark baseline.
+    """
+    enhanced = apply_modified_s_curve(img)
+    enhanced = apply_gamma(enhanced, gamma=ENHANCE_GAMMA)
+    enhanced = ImageEnhance.Brightness(enhanced).enhance(ENHANCE_BRIGHTNESS)
+    enhanced = ImageEnhance.Contrast(enhanced).enhance(ENHANCE_CONTRAST)
+    enhanced = ImageOps.autocontrast(enhanced, cutoff=ENHANCE_AUTOCONTRAST_CUTOFF)
+    return enhanced
+
+
+def enhance_loaded_image(img):
+    """
+    Enhance an open PIL image: one fused LUT pass for L/RGB, chained passes otherwise.
+    Images above 50MP are downscaled first.
+    """
+    # Check image dimensions
+    width, height = img.size
+    max_pixels = 50_000_000  # 50MP limit
+
+    if width * height > max_pixels:
+        app_logger.warning(f"Image too large ({width}x{height}), resizing before enhancement")
+        # Calculate new dimensions maintaining aspect ratio
+        ratio = (max_pixels / (width * height)) ** 0.5
+        img = img.resize((int(width * ratio), int(height * ratio)), Image.LANCZOS)
+
+    if img.mode in FUSED_ENHANCE_MODES:
+        return img.point(fused_enhance_lut(img))
+    return enhance_image_chained(img)
+
+
 def enhance_image(path):
     """
     Enhanced image processing with memory management and error handling.
@@ -246,26 +426,7 @@ def enhance_image(path):
             return None
         
         with safe_image_open(path) as img:
-            # Check image dimensions
-            width, height = img.size
-            max_pixels = 50_000_000  # 50MP limit
-            
-            if width * height > max_pixels:
-                app_logger.warning(f"Image too large ({width}x{height}), resizing before enhancement: {path}")
-                # Calculate new dimensions maintaining aspect ratio
-                ratio = (max_pixels / (width * height)) ** 0.5
-                new_width = int(width * ratio)
-                new_height = int(height * ratio)
-                img = img.resize((new_width, new_height), Image.LANCZOS)
-            
-            # Apply enhancements with memory management
-            enhanced = apply_modified_s_curve(img)
-            enhanced = apply_gamma(enhanced, gamma=0.9)
-            enhanced = ImageEnhance.Brightness(enhanced).enhance(1.03)
-            enhanced = ImageEnhance.Contrast(enhanced).enhance(1.05)
-            enhanced = ImageOps.autocontrast(enhanced, cutoff=1)
-            
-            return enhanced
+            return enhance_loaded_image(img)
             
     except Exception as e:
         app_logger.error(f"Error enhancing image {path}: {e}")
@@ -288,30 +449,8 @@ def enhance_image_streaming(path, output_path=None):
             
             if width * height > 100_000_000:  # 100MP threshold for tiled processing
                 app_logger.info(f"Using tiled processing for large image: {path}")
-                
-                # Create output image with same mode
-                output_img = Image.new(img.mode, img.size)
-                
-                # Process image in tiles
-                for y in range(0, height, tile_size):
-                    for x in range(0, width, tile_size):
-                        # Extract tile
-                        tile = img.crop((x, y, min(x + tile_size, width), min(y + tile_size, height)))
-                        
-                        # Enhance tile
-                        enhanced_tile = enhance_image_tile(tile)
-                        
-                        # Paste enhanced tile back
-                        output_img.paste(enhanced_tile, (x, y))
-                        
-                        # Clean up tile
-                        tile.close()
-                        enhanced_tile.close()
-                        
-                        # Force garbage collection periodically
-                        if (x + tile_size) % (tile_size * 4) == 0:
-                            gc.collect()
-                
+                output_img = enhance_image_tiled(img, tile_size)
+
                 # Save and clean up
                 output_img.save(output_path, optimize=True)
                 output_img.close()
@@ -330,15 +469,81 @@ def enhance_image_streaming(path, output_path=None):
         return False
 
 
+def enhance_image_tiled(img, tile_size=2048):
+    """
+    Enhance a very large image tile by tile (no autocontrast, which needs the
+    whole image) to bound memory.
+    """
+    width, height = img.size
+    # Create output image with same mode
+    output_img = Image.new(img.mode, img.size)
+
+    # Process image in tiles
+    for y in range(0, height, tile_size):
+        for x in range(0, width, tile_size):
+            # Extract tile
+            tile = img.crop((x, y, min(x + tile_size, width), min(y + tile_size, height)))
+
+            # Enhance tile
+            enhanced_tile = enhance_image_tile(tile)
+
+            # Paste enhanced tile back
+            output_img.paste(enhanced_tile, (x, y))
+
+            # Clean up tile
+            tile.close()
+            enhanced_tile.close()
+
+            # Force garbage collection periodically
+            if (x + tile_size) % (tile_size * 4) == 0:
+                gc.collect()
+
+    return output_img
+
+
+def enhance_page_bytes(name, data):
+    """
+    Enhance one encoded page (process-pool worker for CBZ enhancement).
+
+    The page is decoded, enhanced and re-encoded in its original format with
+    the same save options the file-based path uses.
+
+    :param name: Archive member name (for logging)
+    :param data: Encoded image bytes
+    :return: Enhanced image bytes, or None if the page could not be enhanced
+    """
+    try:
+        if len(data) > 100 * 1024 * 1024:  # 100MB limit
+            app_logger.warning(f"Image too large ({len(data) / 1024 / 1024:.1f}MB), skipping enhancement: {name}")
+            return None
+
+        with Image.open(io.BytesIO(data)) as img:
+            image_format = img.format
+            width, height = img.size
+            if width * height > 100_000_000:  # 100MP threshold for tiled processing
+                enhanced = enhance_image_tiled(img)
+            else:
+                enhanced = enhance_loaded_image(img)
+
+        buffer = io.BytesIO()
+        enhanced.save(buffer, format=image_format, optimize=True)
+        enhanced.close()
+        return buffer.getvalue()
+
+    except Exception as e:
+        app_logger.error(f"Error enhancing page {name}: {e}")
+        return None
+
+
 def enhance_image_tile(tile):
     """
     Enhance a single image tile with basic operations.
     """
     try:
         enhanced = apply_modified_s_curve(tile)
-        enhanced = apply_gamma(enhanced, gamma=0.9)
-        enhanced = ImageEnhance.Brightness(enhanced).enhance(1.03)
-        enhanced = ImageEnhance.Contrast(enhanced).enhance(1.05)
+        enhanced = apply_gamma(enhanced, gamma=ENHANCE_GAMMA)
+        enhanced = ImageEnhance.Brightness(enhanced).enhance(ENHANCE_BRIGHTNESS)
+        enhanced = ImageEnhance.Contrast(enhanced).enhance(ENHANCE_CONTRAST)
         return enhanced
     except Exception as e:
         app_logger.error(f"Error enhancing tile: {e}")
@@ -372,3 +577,21 @@ def create_thumbnail_streaming(image_path, max_size=(100, 100), quality=85):
     except Exception as e:
         app_logger.error(f"Error creating thumbnail for {image_path}: {e}")
         return None
+
+
+def regenerate_thumbnail(cbz_path):
+    """
+    Regenerate the cached cover thumbnail for a rebuilt, converted or enhanced CBZ.
+
+    Runs archive_analyzer's single-pass analysis, so the thumbnail uses the same
+    cache path, size and cover page as /api/thumbnail, and the page manifest
+    and ComicInfo columns are refreshed along with it.
+    """
+    try:
+        from archive_analyzer import run_analysis
+
+        result = run_analysis(cbz_path)
+        if result and result['thumbnail']:
+            app_logger.info(f"Thumbnail regenerated for {cbz_path}")
+    except Exception as e:
+        app_logger.error(f"Error regenerating thumbnail: {e}")
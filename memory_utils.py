@@ -34,6 +34,7 @@ class MemoryMonitor:
         self.monitor_thread = None
         self._last_cleanup_time = 0
         self._min_cleanup_interval = 300  # Minimum 5 minutes between cleanups
+        self._pressure_callbacks = []
         
     def get_memory_usage(self):
         """
@@ -108,6 +109,26 @@ class MemoryMonitor:
         memory_mb = self.get_memory_usage()
         return memory_mb > self.cleanup_threshold_mb
     
+    def add_pressure_callback(self, callback):
+        """
+        Register a function called on every monitoring pass that finds memory
+        above cleanup_threshold_mb (e.g. caches shedding entries).
+
+        Args:
+            callback: Function taking no arguments
+        """
+        self._pressure_callbacks.append(callback)
+
+    def relieve_pressure(self):
+        """
+        Run the registered pressure callbacks.
+        """
+        for callback in self._pressure_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                app_logger.error(f"Error in memory pressure callback: {e}")
+
     def start_monitoring(self, interval=60):
         """
         Start background memory monitoring.
@@ -130,6 +151,8 @@ class MemoryMonitor:
 
                     # Only cleanup if above threshold AND enough time has passed
                     if self.should_cleanup():
+                        # Callbacks are offered every pass; caches rate-limit their own shedding
+                        self.relieve_pressure()
                         time_since_last = time.time() - self._last_cleanup_time
                         if time_since_last >= self._min_cleanup_interval:
                             app_logger.debug(f"Background memory cleanup triggered (usage: {memory_mb:.1f}MB)")
@@ -2,7 +2,7 @@
 metadata_scanner.py - Background worker for scanning ComicInfo.xml metadata
 
 This module provides a priority queue-based background worker that:
-1. Scans CBZ/ZIP files for ComicInfo.xml metadata
+1. Scans CBZ/ZIP and CBR/RAR files for ComicInfo.xml metadata
 2. Updates the file_index table with extracted metadata
 3. Tracks progress for UI feedback
 
@@ -10,14 +10,33 @@ The scanner runs as daemon threads and processes files in priority order:
 - PRIORITY_NEW_FILE (1): Files just added via file_watcher (highest priority)
 - PRIORITY_MODIFIED (2): Files modified since last scan
 - PRIORITY_UNSCANNED (3): Files never scanned
-- PRIORITY_BATCH (4): Batch scan during startup (lowest priority)
+- PRIORITY_BATCH (4): Batch scan during startup
+- PRIORITY_RAR (5): CBR/RAR files (solid-archive reads are expensive, lowest priority)
+
+The queue holds at most one pending task per path: repeated events for the
+same file coalesce (highest priority wins) and tasks whose file changed on
+disk after queuing are dropped when dequeued.
+
+Execution modes (METADATA_SCAN_MODE):
+- thread: workers parse ComicInfo.xml in-process (default)
+- process: workers hand the archive read + XML parse to a process pool so
+  parsing is not serialized by the GIL; DB writes stay in the worker threads
+
+When METADATA_SCAN_ADAPTIVE is enabled, a controller thread grows or shrinks
+the worker count based on observed throughput, per-file latency and queue depth.
 """
 
+import itertools
+import multiprocessing
 import threading
-from queue import PriorityQueue
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from queue import Empty
+import heapq
 import time
 import os
 import zipfile
+import rarfile
 
 from app_logging import app_logger
 from config import config
@@ -26,18 +45,37 @@ from database import (
     get_metadata_scan_stats,
     update_file_metadata,
     update_metadata_scanned_at,
+    clear_file_metadata,
+    update_file_index_entry,
     get_file_index_entry_by_path
 )
-from comicinfo import read_comicinfo_from_zip
+from comicinfo import read_comicinfo_from_archive, SCANNER_FIELDS
 
 # Priority levels (lower = higher priority)
 PRIORITY_NEW_FILE = 1      # Files just added via file_watcher
 PRIORITY_MODIFIED = 2      # Files modified (modified_at > metadata_scanned_at)
 PRIORITY_UNSCANNED = 3     # Files never scanned (metadata_scanned_at IS NULL)
 PRIORITY_BATCH = 4         # Batch scan during startup
+PRIORITY_RAR = 5           # CBR/RAR files (unless just added)
+
+SCANNABLE_EXTENSIONS = ('.cbz', '.zip', '.cbr', '.rar')
+RAR_EXTENSIONS = ('.cbr', '.rar')
+
+# Failures of the host or the unrar/unar tool rather than of the archive; the
+# file is left pending so it is scanned again once the problem is fixed
+RAR_TOOL_ERRORS = (
+    rarfile.RarCannotExec,
+    rarfile.RarMemoryError,
+    rarfile.RarSignalExit,
+    rarfile.RarUserBreak,
+    rarfile.RarCreateError,
+    rarfile.RarWriteError
+)
+# Paths already reported for a RAR_TOOL_ERRORS failure; the queue monitor
+# retries them every pass, later failures are logged at debug level
+tool_error_paths = set()
 
 # Global state
-metadata_queue = PriorityQueue()
 scanner_progress = {
     'total_pending': 0,
     'scanned_count': 0,
@@ -52,6 +90,15 @@ worker_threads = []
 monitor_thread = None
 monitor_stop_event = threading.Event()
 
+# Execution mode / adaptive concurrency state
+process_pool = None
+controller_thread = None
+target_workers = 0
+latency_samples = deque(maxlen=1000)  # (finished_at, seconds) per scanned file
+worker_ids = itertools.count()
+CONTROLLER_INTERVAL = 15   # seconds between adaptive adjustments
+THROUGHPUT_WINDOW = 60     # seconds of history used for files/sec and latency
+
 
 class ScanTask:
     """
@@ -75,27 +122,207 @@ class ScanTask:
         return self.created_at < other.created_at
 
 
+class CoalescingScanQueue:
+    """
+    Priority queue of ScanTasks keyed by file path.
+
+    At most one task per path is pending. Re-queuing a pending path
+    coalesces into the existing task: the highest priority (lowest number)
+    wins and the newest modified_at/file_id replace the old ones. The heap
+    uses lazy deletion, so superseded heap entries are skipped on get().
+
+    Paths handed out by get() stay in flight until task_done(task), so the
+    batch re-queue (queue_pending_files) can skip files a worker is scanning.
+
+    Mirrors the subset of queue.PriorityQueue used by the scanner
+    (put, get, task_done, qsize).
+    """
+
+    def __init__(self):
+        self._heap = []          # (priority, created_at, seq, path)
+        self._pending = {}       # path -> (ScanTask, seq of its live heap entry)
+        self._in_flight = {}     # path -> number of workers scanning it
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.coalesced_count = 0
+        self.stale_count = 0
+
+    def put(self, task):
+        """
+        Add a task, coalescing with any pending task for the same path.
+
+        Returns:
+            True if a new task was queued, False if it was merged
+        """
+        with self._cond:
+            existing = self._pending.get(task.file_path)
+            if existing is None:
+                seq = next(self._seq)
+                self._pending[task.file_path] = (task, seq)
+                heapq.heappush(self._heap, (task.priority, task.created_at, seq, task.file_path))
+                self._cond.notify()
+                return True
+
+            current, seq = existing
+            self.coalesced_count += 1
+            # Keep the newest view of the file
+            if (task.modified_at or 0) >= (current.modified_at or 0):
+                current.modified_at = task.modified_at
+                current.file_id = task.file_id
+            # Keep the highest priority; re-push so the heap reflects it
+            if task.priority < current.priority:
+                current.priority = task.priority
+                seq = next(self._seq)
+                self._pending[task.file_path] = (current, seq)
+                heapq.heappush(self._heap, (current.priority, current.created_at, seq, current.file_path))
+                self._cond.notify()
+            return False
+
+    def get(self, timeout=None):
+        """
+        Remove and return the highest priority task.
+
+        Raises:
+            queue.Empty if no task becomes available within timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                while self._heap:
+                    _, _, seq, path = heapq.heappop(self._heap)
+                    entry = self._pending.get(path)
+                    if entry is not None and entry[1] == seq:
+                        del self._pending[path]
+                        self._in_flight[path] = self._in_flight.get(path, 0) + 1
+                        return entry[0]
+                    # Superseded heap entry (priority was raised); skip it
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise Empty
+                self._cond.wait(remaining)
+
+    def task_done(self, task):
+        """Mark a task returned by get() as finished (its path leaves in flight)."""
+        with self._cond:
+            count = self._in_flight.get(task.file_path, 0) - 1
+            if count > 0:
+                self._in_flight[task.file_path] = count
+            else:
+                self._in_flight.pop(task.file_path, None)
+
+    def in_flight(self):
+        """Snapshot of the paths workers are scanning right now."""
+        with self._cond:
+            return set(self._in_flight)
+
+    def qsize(self):
+        """Number of distinct paths waiting to be scanned."""
+        with self._cond:
+            return len(self._pending)
+
+    def record_stale(self):
+        """Count a task re-queued at dequeue time because the file changed."""
+        with self._cond:
+            self.stale_count += 1
+
+
+metadata_queue = CoalescingScanQueue()
+
+
+def to_fs_path(db_path):
+    """
+    Convert a database path (/data/...) to the actual filesystem path.
+
+    Args:
+        db_path: Path as stored in file_index
+
+    Returns:
+        Filesystem path under DATA_DIR
+    """
+    if db_path.startswith('/data/'):
+        data_dir = config.get('SETTINGS', 'DATA_DIR', fallback='/data')
+        # Remove /data prefix and join with actual data dir
+        return os.path.join(data_dir, db_path[6:])
+    return db_path
+
+
+def is_task_stale(task):
+    """
+    Check whether a dequeued task no longer matches the file on disk.
+
+    A file whose mtime moved past the task's modified_at was rewritten after
+    it was queued (e.g. monitor.py auto-convert), so the queued view of it is
+    out of date. See requeue_stale_task. Missing files are not stale;
+    process_metadata_scan marks them scanned.
+    """
+    if not task.modified_at:
+        return False
+    try:
+        return os.path.getmtime(to_fs_path(task.file_path)) > task.modified_at + 1
+    except OSError:
+        return False
+
+
+def requeue_stale_task(task):
+    """
+    Bring a stale task's index entry up to date and queue it again.
+
+    The watcher usually refreshes the entry itself, but not for files
+    rewritten while the app was down, on polling-backend libraries (in-place
+    rewrites keep the directory mtime) or when no watcher is running;
+    without this the file would be re-queued and dropped forever. Re-queued
+    at the back of its priority, so a rewrite still in progress gets time
+    to finish before the scan.
+    """
+    try:
+        stat = os.stat(to_fs_path(task.file_path))
+    except OSError:
+        return
+    update_file_index_entry(task.file_path, size=stat.st_size, modified_at=stat.st_mtime)
+    metadata_queue.put(ScanTask(task.priority, task.file_path, task.file_id, stat.st_mtime))
+
+
 def scan_worker():
     """
     Worker thread that processes metadata scan tasks from the queue.
 
-    Runs indefinitely until shutdown signal (None) is received.
+    Runs until the scanner is stopped or the adaptive controller lowers
+    target_workers below the number of running workers.
     """
+    me = threading.current_thread()
     while True:
+        # Retire this worker if the pool has been shrunk
+        with scanner_lock:
+            if len(worker_threads) > target_workers:
+                if me in worker_threads:
+                    worker_threads.remove(me)
+                break
+
         task = None
         try:
-            task = metadata_queue.get()
-            if task is None:  # Shutdown signal
-                break
+            try:
+                task = metadata_queue.get(timeout=1.0)
+            except Empty:
+                continue
+
+            if is_task_stale(task):
+                metadata_queue.record_stale()
+                app_logger.debug(f"Metadata scan re-queued (file changed since queued): {task.file_path}")
+                requeue_stale_task(task)
+                continue
 
             with scanner_lock:
                 scanner_progress['current_file'] = os.path.basename(task.file_path)
 
+            started = time.perf_counter()
             process_metadata_scan(task)
+            elapsed = time.perf_counter() - started
 
             with scanner_lock:
                 scanner_progress['scanned_count'] += 1
                 scanner_progress['last_update'] = time.time()
+                latency_samples.append((time.time(), elapsed))
 
         except Exception as e:
             app_logger.error(f"Metadata scanner worker error: {e}")
@@ -104,28 +331,84 @@ def scan_worker():
         finally:
             # Always mark task as done (if we got one)
             if task is not None:
-                metadata_queue.task_done()
+                metadata_queue.task_done(task)
+
+
+def _read_comicinfo(file_path):
+    """
+    Read ComicInfo.xml using the configured execution mode.
+
+    In process mode the archive read and XML parse run in the process pool;
+    exceptions (e.g. BadZipFile) are re-raised in the calling worker.
+    Returns None when the archive has no ComicInfo.xml.
+    """
+    if process_pool is not None:
+        return process_pool.submit(read_comicinfo_from_archive, file_path, SCANNER_FIELDS, True).result()
+    return read_comicinfo_from_archive(file_path, SCANNER_FIELDS, none_if_missing=True)
+
+
+def comicinfo_to_db_metadata(metadata):
+    """
+    Map parsed ComicInfo.xml fields to file_index ci_* columns.
+
+    Args:
+        metadata: Dict of ComicInfo tag -> text
+
+    Returns:
+        Dict of ci_* column -> value
+    """
+    return {
+        'ci_title': metadata.get('Title', ''),
+        'ci_series': metadata.get('Series', ''),
+        'ci_number': metadata.get('Number', ''),
+        'ci_count': metadata.get('Count', ''),
+        'ci_volume': metadata.get('Volume', ''),
+        'ci_year': metadata.get('Year', ''),
+        'ci_writer': metadata.get('Writer', ''),
+        'ci_penciller': metadata.get('Penciller', ''),
+        'ci_inker': metadata.get('Inker', ''),
+        'ci_colorist': metadata.get('Colorist', ''),
+        'ci_letterer': metadata.get('Letterer', ''),
+        'ci_coverartist': metadata.get('CoverArtist', ''),
+        'ci_publisher': metadata.get('Publisher', ''),
+        'ci_genre': metadata.get('Genre', ''),
+        'ci_characters': metadata.get('Characters', '')
+    }
+
+
+def to_db_path(file_path):
+    """
+    Convert a filesystem path to the database path format (/data/...).
+
+    Args:
+        file_path: Full filesystem path to the file
+
+    Returns:
+        Path as stored in file_index
+    """
+    data_dir = config.get('SETTINGS', 'DATA_DIR', fallback='/data')
+    if file_path.startswith(data_dir):
+        db_path = '/data/' + file_path[len(data_dir):].lstrip('/').lstrip('\\')
+    else:
+        db_path = file_path
+
+    # Normalize path separators
+    return db_path.replace('\\', '/')
 
 
 def process_metadata_scan(task):
     """
-    Extract metadata from a CBZ file and update file_index.
+    Extract metadata from a CBZ/CBR file and update file_index.
 
-    Performance: read_comicinfo_from_zip() takes ~5-50ms per file.
+    Performance: reading ComicInfo.xml takes ~5-50ms per CBZ; solid CBRs
+    can take longer since preceding members must be decoded.
 
     Args:
         task: ScanTask with file_path, file_id, modified_at
     """
     try:
-        # Get the actual filesystem path
-        file_path = task.file_path
-
-        # Handle /data/ prefix (Docker mount point)
-        if file_path.startswith('/data/'):
-            data_dir = config.get('SETTINGS', 'DATA_DIR', fallback='/data')
-            # Remove /data prefix and join with actual data dir
-            relative_path = file_path[6:]  # Remove '/data/'
-            file_path = os.path.join(data_dir, relative_path)
+        # Get the actual filesystem path (handles /data/ Docker mount prefix)
+        file_path = to_fs_path(task.file_path)
 
         # Skip if file doesn't exist
         if not os.path.exists(file_path):
@@ -135,9 +418,18 @@ def process_metadata_scan(task):
 
         # Extract metadata (~5-50ms)
         try:
-            metadata = read_comicinfo_from_zip(file_path)
-        except zipfile.BadZipFile:
-            app_logger.debug(f"Metadata scan skipped (invalid ZIP): {task.file_path}")
+            metadata = _read_comicinfo(file_path)
+        except (RAR_TOOL_ERRORS + (OSError,)) as e:
+            # Not the archive's fault: don't stamp it, or it would never be retried
+            with scanner_lock:
+                scanner_progress['errors'] += 1
+                first_failure = task.file_path not in tool_error_paths
+                tool_error_paths.add(task.file_path)
+            log = app_logger.error if first_failure else app_logger.debug
+            log(f"Metadata scan failed, will retry: {task.file_path} ({type(e).__name__}: {e})")
+            return
+        except (zipfile.BadZipFile, rarfile.Error) as e:
+            app_logger.debug(f"Metadata scan skipped (invalid archive): {task.file_path} ({e})")
             update_metadata_scanned_at(task.file_id, time.time())
             return
         except Exception as e:
@@ -145,24 +437,13 @@ def process_metadata_scan(task):
             update_metadata_scanned_at(task.file_id, time.time())
             return
 
+        if metadata is None:
+            clear_file_metadata(task.file_id, time.time())
+            app_logger.debug(f"Metadata scanned (no ComicInfo.xml): {os.path.basename(task.file_path)}")
+            return
+
         # Map ComicInfo fields to database columns
-        db_metadata = {
-            'ci_title': metadata.get('Title', ''),
-            'ci_series': metadata.get('Series', ''),
-            'ci_number': metadata.get('Number', ''),
-            'ci_count': metadata.get('Count', ''),
-            'ci_volume': metadata.get('Volume', ''),
-            'ci_year': metadata.get('Year', ''),
-            'ci_writer': metadata.get('Writer', ''),
-            'ci_penciller': metadata.get('Penciller', ''),
-            'ci_inker': metadata.get('Inker', ''),
-            'ci_colorist': metadata.get('Colorist', ''),
-            'ci_letterer': metadata.get('Letterer', ''),
-            'ci_coverartist': metadata.get('CoverArtist', ''),
-            'ci_publisher': metadata.get('Publisher', ''),
-            'ci_genre': metadata.get('Genre', ''),
-            'ci_characters': metadata.get('Characters', '')
-        }
+        db_metadata = comicinfo_to_db_metadata(metadata)
 
         # Update database
         update_file_metadata(task.file_id, db_metadata, time.time())
@@ -177,31 +458,56 @@ def process_metadata_scan(task):
             scanner_progress['errors'] += 1
 
 
+def scan_priority(file_path, priority):
+    """
+    Demote CBR/RAR files below the CBZ batch unless they were just added.
+
+    Args:
+        file_path: Path of the file being queued
+        priority: Requested priority
+
+    Returns:
+        Effective priority for the task
+    """
+    if file_path.lower().endswith(RAR_EXTENSIONS) and priority != PRIORITY_NEW_FILE:
+        return max(priority, PRIORITY_RAR)
+    return priority
+
+
 def queue_pending_files():
     """
     Queue all files that need metadata scanning.
 
-    Called on startup and can be triggered manually via API.
+    Called on startup and can be triggered manually via API. Files a worker
+    is scanning right now still look pending in the database and are skipped.
     """
     try:
+        # Snapshot before the query: a scan finishing in between is either
+        # stamped in the database or still in this set
+        in_flight = metadata_queue.in_flight()
         files = get_files_needing_metadata_scan(limit=10000)
 
-        with scanner_lock:
-            scanner_progress['total_pending'] = len(files)
-
+        queued = 0
         for f in files:
+            if f['path'] in in_flight:
+                continue
             task = ScanTask(
-                priority=PRIORITY_BATCH,
+                priority=scan_priority(f['path'], PRIORITY_BATCH),
                 file_path=f['path'],
                 file_id=f['id'],
                 modified_at=f['modified_at']
             )
-            metadata_queue.put(task)
+            if metadata_queue.put(task):
+                queued += 1
+
+        with scanner_lock:
+            scanner_progress['total_pending'] = metadata_queue.qsize()
 
         if files:
-            app_logger.info(f"Queued {len(files)} files for metadata scanning")
+            app_logger.info(f"Queued {queued} files for metadata scanning "
+                            f"({len(files) - queued} already pending or being scanned)")
 
-        return len(files)
+        return queued
 
     except Exception as e:
         app_logger.error(f"Error queuing pending files for metadata scan: {e}")
@@ -219,36 +525,29 @@ def queue_file_for_scan(file_path, priority=PRIORITY_NEW_FILE):
         priority: Scan priority (default: high priority for new files)
     """
     try:
-        # Only process CBZ/ZIP files
-        if not file_path.lower().endswith(('.cbz', '.zip')):
+        # Only process archives that can carry ComicInfo.xml
+        if not file_path.lower().endswith(SCANNABLE_EXTENSIONS):
             return
 
         # Convert filesystem path to database path format (/data/...)
-        data_dir = config.get('SETTINGS', 'DATA_DIR', fallback='/data')
-        if file_path.startswith(data_dir):
-            db_path = '/data/' + file_path[len(data_dir):].lstrip('/').lstrip('\\')
-        else:
-            db_path = file_path
-
-        # Normalize path separators
-        db_path = db_path.replace('\\', '/')
+        db_path = to_db_path(file_path)
 
         # Get file_id from database
         entry = get_file_index_entry_by_path(db_path)
 
         if entry:
             task = ScanTask(
-                priority=priority,
+                priority=scan_priority(db_path, priority),
                 file_path=db_path,
                 file_id=entry['id'],
                 modified_at=entry['modified_at'] or time.time()
             )
-            metadata_queue.put(task)
-
-            with scanner_lock:
-                scanner_progress['total_pending'] += 1
-
-            app_logger.debug(f"Queued for metadata scan: {os.path.basename(file_path)}")
+            if metadata_queue.put(task):
+                with scanner_lock:
+                    scanner_progress['total_pending'] += 1
+                app_logger.debug(f"Queued for metadata scan: {os.path.basename(file_path)}")
+            else:
+                app_logger.debug(f"Coalesced metadata scan for: {os.path.basename(file_path)}")
 
     except Exception as e:
         app_logger.error(f"Error queuing file for metadata scan: {e}")
@@ -268,8 +567,8 @@ def queue_files_for_scan(file_paths, priority=PRIORITY_NEW_FILE):
 
     for file_path in file_paths:
         try:
-            # Only process CBZ/ZIP files
-            if not file_path.lower().endswith(('.cbz', '.zip')):
+            # Only process archives that can carry ComicInfo.xml
+            if not file_path.lower().endswith(SCANNABLE_EXTENSIONS):
                 continue
 
             # Normalize path separators
@@ -280,13 +579,13 @@ def queue_files_for_scan(file_paths, priority=PRIORITY_NEW_FILE):
 
             if entry:
                 task = ScanTask(
-                    priority=priority,
+                    priority=scan_priority(db_path, priority),
                     file_path=db_path,
                     file_id=entry['id'],
                     modified_at=entry['modified_at'] or time.time()
                 )
-                metadata_queue.put(task)
-                queued_count += 1
+                if metadata_queue.put(task):
+                    queued_count += 1
 
         except Exception as e:
             app_logger.error(f"Error queuing file {file_path} for metadata scan: {e}")
@@ -328,6 +627,107 @@ def queue_monitor():
             app_logger.error(f"Queue monitor error: {e}")
 
 
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def get_throughput_stats():
+    """
+    Compute files/sec and latency percentiles over the recent window.
+
+    Returns:
+        Dict with files_per_sec, latency_p50_ms, latency_p95_ms, samples
+    """
+    now = time.time()
+    with scanner_lock:
+        window = [(t, lat) for t, lat in latency_samples if now - t <= THROUGHPUT_WINDOW]
+        started_at = scanner_progress['started_at'] or now
+
+    latencies = sorted(lat for _, lat in window)
+    span = min(THROUGHPUT_WINDOW, max(now - started_at, 1.0))
+
+    return {
+        'files_per_sec': round(len(window) / span, 2),
+        'latency_p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+        'latency_p95_ms': round(_percentile(latencies, 95) * 1000, 1),
+        'samples': len(window)
+    }
+
+
+def _start_worker():
+    """Start one scan worker thread and register it."""
+    t = threading.Thread(
+        target=scan_worker,
+        daemon=True,
+        name=f"MetadataScanner-{next(worker_ids)}"
+    )
+    worker_threads.append(t)
+    t.start()
+
+
+def set_worker_count(count):
+    """
+    Grow or shrink the worker pool to the requested size.
+
+    Extra workers retire on their own after finishing their current task.
+    """
+    global target_workers
+
+    with scanner_lock:
+        target_workers = count
+        while len(worker_threads) < target_workers:
+            _start_worker()
+
+
+def adaptive_controller(min_workers, max_workers):
+    """
+    Hill-climbing controller for the scanner worker count.
+
+    Every CONTROLLER_INTERVAL seconds:
+    - Idle queue: shrink towards min_workers
+    - Last change was a grow and throughput did not improve by 10% while
+      p50 latency rose (slow NAS / saturated disk): undo it
+    - Backlog deeper than the workers can clear in one interval: grow by one
+    """
+    last_throughput = None
+    last_action = None
+
+    while not monitor_stop_event.wait(timeout=CONTROLLER_INTERVAL):
+        try:
+            stats = get_throughput_stats()
+            queue_depth = metadata_queue.qsize()
+            current = target_workers
+            throughput = stats['files_per_sec']
+
+            if queue_depth == 0:
+                if current > min_workers:
+                    set_worker_count(current - 1)
+                    last_action = 'shrink'
+            elif (last_action == 'grow' and last_throughput is not None
+                  and throughput < last_throughput['files_per_sec'] * 1.1
+                  and stats['latency_p50_ms'] > last_throughput['latency_p50_ms']):
+                if current > min_workers:
+                    set_worker_count(current - 1)
+                    app_logger.debug(f"Metadata scanner: no gain at {current} workers "
+                                     f"({throughput} files/sec), shrinking to {current - 1}")
+                last_action = 'shrink'
+            elif queue_depth > throughput * CONTROLLER_INTERVAL and current < max_workers:
+                set_worker_count(current + 1)
+                app_logger.debug(f"Metadata scanner: backlog {queue_depth}, growing to {current + 1} workers")
+                last_action = 'grow'
+            else:
+                last_action = None
+
+            last_throughput = stats
+
+        except Exception as e:
+            app_logger.error(f"Metadata scan controller error: {e}")
+
+
 def start_metadata_scanner(num_workers=None):
     """
     Initialize and start the metadata scanner background workers.
@@ -337,7 +737,7 @@ def start_metadata_scanner(num_workers=None):
     Args:
         num_workers: Number of worker threads (default from config or 2)
     """
-    global worker_threads, monitor_thread
+    global monitor_thread, controller_thread, process_pool
 
     # Check if scanning is enabled
     enabled = config.getboolean('SETTINGS', 'ENABLE_METADATA_SCAN', fallback=True)
@@ -345,31 +745,39 @@ def start_metadata_scanner(num_workers=None):
         app_logger.info("Metadata scanning disabled in config")
         return
 
-    # Get configured thread count
+    # Get configured thread count and bounds
+    max_workers = max(1, config.getint('SETTINGS', 'METADATA_SCAN_MAX_THREADS', fallback=8))
     if num_workers is None:
         num_workers = config.getint('SETTINGS', 'METADATA_SCAN_THREADS', fallback=2)
-    num_workers = max(1, min(num_workers, 4))  # Clamp between 1-4
+    num_workers = max(1, min(num_workers, max_workers))
+    mode = config.get('SETTINGS', 'METADATA_SCAN_MODE', fallback='thread').strip().lower()
+    adaptive = config.getboolean('SETTINGS', 'METADATA_SCAN_ADAPTIVE', fallback=True)
 
     with scanner_lock:
         scanner_progress['is_running'] = True
         scanner_progress['started_at'] = time.time()
         scanner_progress['scanned_count'] = 0
         scanner_progress['errors'] = 0
+        scanner_progress['mode'] = mode
+        scanner_progress['adaptive'] = adaptive
+        latency_samples.clear()
 
     # Clear the stop event in case scanner was previously stopped
     monitor_stop_event.clear()
 
-    # Start worker threads
-    for i in range(num_workers):
-        t = threading.Thread(
-            target=scan_worker,
-            daemon=True,
-            name=f"MetadataScanner-{i}"
+    # Process mode: parse in a pool sized for the largest worker count. Workers
+    # are spawned, not forked: the app process has watcher/scheduler/DB threads
+    # whose held locks and SQLite handles a forked child would inherit
+    if mode == 'process' and process_pool is None:
+        process_pool = ProcessPoolExecutor(
+            max_workers=max_workers if adaptive else num_workers,
+            mp_context=multiprocessing.get_context('spawn')
         )
-        t.start()
-        worker_threads.append(t)
+        app_logger.info("Metadata scanner using process pool for ComicInfo parsing")
 
-    app_logger.info(f"Started {num_workers} metadata scanner worker thread(s)")
+    # Start worker threads
+    set_worker_count(num_workers)
+    app_logger.info(f"Started {num_workers} metadata scanner worker thread(s) ({mode} mode)")
 
     # Start queue monitor thread to continuously queue pending files
     monitor_thread = threading.Thread(
@@ -380,32 +788,50 @@ def start_metadata_scanner(num_workers=None):
     monitor_thread.start()
     app_logger.info("Started metadata queue monitor thread")
 
+    # Start adaptive concurrency controller
+    if adaptive:
+        controller_thread = threading.Thread(
+            target=adaptive_controller,
+            args=(1, max_workers),
+            daemon=True,
+            name="MetadataScanController"
+        )
+        controller_thread.start()
+        app_logger.info(f"Started metadata scan controller (1-{max_workers} workers)")
+
     # Queue initial batch of files needing scan
     queue_pending_files()
 
 
 def stop_metadata_scanner():
     """Gracefully stop the metadata scanner workers."""
-    global worker_threads, monitor_thread
+    global monitor_thread, controller_thread, process_pool
 
     with scanner_lock:
         scanner_progress['is_running'] = False
 
-    # Signal the monitor thread to stop
+    # Signal the monitor and controller threads to stop
     monitor_stop_event.set()
     if monitor_thread:
         monitor_thread.join(timeout=5)
         monitor_thread = None
+    if controller_thread:
+        controller_thread.join(timeout=5)
+        controller_thread = None
 
-    # Send shutdown signal to all workers
-    for _ in worker_threads:
-        metadata_queue.put(None)
+    # Workers retire once target_workers drops below their count
+    with scanner_lock:
+        threads = list(worker_threads)
+    set_worker_count(0)
 
     # Wait for workers to finish (with timeout)
-    for t in worker_threads:
+    for t in threads:
         t.join(timeout=5)
 
-    worker_threads = []
+    if process_pool is not None:
+        process_pool.shutdown(wait=False, cancel_futures=True)
+        process_pool = None
+
     app_logger.info("Metadata scanner stopped")
 
 
@@ -417,6 +843,7 @@ def get_scanner_status():
         Dict with scanner status, progress, and statistics
     """
     db_stats = get_metadata_scan_stats()
+    throughput = get_throughput_stats()
 
     with scanner_lock:
         return {
@@ -429,5 +856,13 @@ def get_scanner_status():
             'started_at': scanner_progress['started_at'],
             'last_update': scanner_progress['last_update'],
             'db_stats': db_stats,
-            'threads': len(worker_threads)
+            'threads': len(worker_threads),
+            'target_threads': target_workers,
+            'mode': scanner_progress.get('mode', 'thread'),
+            'adaptive': scanner_progress.get('adaptive', False),
+            'files_per_sec': throughput['files_per_sec'],
+            'latency_p50_ms': throughput['latency_p50_ms'],
+            'latency_p95_ms': throughput['latency_p95_ms'],
+            'coalesced_count': metadata_queue.coalesced_count,
+            'stale_requeued': metadata_queue.stale_count
         }
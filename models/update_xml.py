@@ -3,9 +3,9 @@ Update ComicInfo.xml fields in CBZ files.
 """
 import os
 import zipfile
-import shutil
 import xml.etree.ElementTree as ET
-from tempfile import NamedTemporaryFile
+
+from archive_writer import rewrite_zip
 
 
 def update_field_in_cbz_files(folder_path: str, field: str, value: str) -> dict:
@@ -30,7 +30,6 @@ def update_field_in_cbz_files(folder_path: str, field: str, value: str) -> dict:
             continue
 
         cbz_path = os.path.join(folder_path, filename)
-        temp_path = None
 
         try:
             with zipfile.ZipFile(cbz_path, "r") as zf:
@@ -55,30 +54,14 @@ def update_field_in_cbz_files(folder_path: str, field: str, value: str) -> dict:
             elem.text = str(value)
             new_xml_bytes = ET.tostring(root, encoding="utf-8", xml_declaration=True)
 
-            # Create temp file in same directory
-            with NamedTemporaryFile(dir=folder_path, delete=False) as tmp_file:
-                temp_path = tmp_file.name
-
-            with zipfile.ZipFile(cbz_path, "r") as zf_in, \
-                 zipfile.ZipFile(temp_path, "w", compression=zipfile.ZIP_DEFLATED) as zf_out:
-
-                for item in zf_in.infolist():
-                    if item.filename == "ComicInfo.xml":
-                        zf_out.writestr(item, new_xml_bytes)
-                    else:
-                        with zf_in.open(item.filename) as source, \
-                             zf_out.open(item, "w") as target:
-                            shutil.copyfileobj(source, target)
-
-            os.replace(temp_path, cbz_path)
+            # Only ComicInfo.xml is rewritten; pages are raw-copied
+            rewrite_zip(cbz_path, replace={"ComicInfo.xml": new_xml_bytes})
             result['updated'] += 1
             result['details'].append({'file': filename, 'status': 'updated'})
 
         except Exception as e:
             result['errors'] += 1
             result['details'].append({'file': filename, 'status': 'error', 'reason': str(e)})
-            if temp_path and os.path.exists(temp_path):
-                os.remove(temp_path)
 
     return result
 
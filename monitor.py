@@ -5,14 +5,20 @@ import os
 import zipfile
 import re # Added for _is_temporary_download_file
 import math # Added for format_size
+import heapq
+import itertools
+import queue
+import threading
+from watchdog.observers import Observer
 from watchdog.observers.polling import PollingObserver
 from watchdog.events import FileSystemEventHandler
 from rename import rename_file, clean_directory_name
 from single_file import convert_to_cbz
 from config import config, load_config
-from helpers import is_hidden
+from helpers import is_hidden, is_network_path
 from app_logging import MONITOR_LOG
-from database import init_db
+from database import (init_db, create_monitor_file, advance_monitor_file, get_unfinished_monitor_files,
+                      prune_monitor_files, get_libraries, apply_file_index_changes, log_recent_file)
 
 load_config()
 
@@ -30,6 +36,24 @@ move_directories = config.getboolean("SETTINGS", "MOVE_DIRECTORY", fallback=Fals
 auto_unpack = config.getboolean("SETTINGS", "AUTO_UNPACK", fallback=False)
 auto_cleanup = config.getboolean("SETTINGS", "AUTO_CLEANUP_ORPHAN_FILES", fallback=True)
 cleanup_interval_hours = config.getint("SETTINGS", "CLEANUP_INTERVAL_HOURS", fallback=1)
+observer_mode = config.get("SETTINGS", "MONITOR_OBSERVER", fallback="auto").strip().lower()
+poll_interval = config.getint("SETTINGS", "MONITOR_POLL_INTERVAL", fallback=5)
+
+# Completion detection (see CompletionTracker)
+CLOSE_SETTLE_SECONDS = 0.25  # No further write this long after close/move-in -> complete
+STABLE_QUIET_SECONDS = 2.0   # Fallback: size and mtime unchanged this long -> complete
+MIN_CHECK_INTERVAL = 0.5
+MAX_CHECK_INTERVAL = 2.0
+
+# Processing pipeline (see MonitorPipeline): workers per stage and queue bound
+STAGE_WORKERS = {
+    'rename': 1,
+    'move': config.getint("SETTINGS", "MONITOR_MOVE_WORKERS", fallback=2),
+    'convert': config.getint("SETTINGS", "MONITOR_CONVERT_WORKERS", fallback=2),
+    'index': 1,
+}
+STAGE_QUEUE_SIZE = 32
+MONITOR_HISTORY_DAYS = 7
 
 # Logging setup - MONITOR_LOG imported from app_logging
 monitor_logger = logging.getLogger("monitor_logger")
@@ -51,6 +75,252 @@ monitor_logger.info(f"7. Auto Unpack Enabled: {auto_unpack}")
 monitor_logger.info(f"8. Auto Cleanup Orphan Files: {auto_cleanup}")
 monitor_logger.info(f"9. Cleanup Interval: {cleanup_interval_hours} hour(s)")
 
+
+class CompletionTracker:
+    """
+    Decides when a file in the watch folder has been fully written.
+
+    - inotify IN_CLOSE_WRITE (watchdog on_closed) or a rename into the folder
+      marks a file complete once CLOSE_SETTLE_SECONDS pass without another
+      write, which catches writers that close and reopen between chunks.
+    - Without those events (polling observer, writers that keep the file
+      open) the file is stat'ed with an interval that starts at
+      MIN_CHECK_INTERVAL and doubles up to MAX_CHECK_INTERVAL while it keeps
+      growing. It is complete once size and mtime have not changed for
+      STABLE_QUIET_SECONDS.
+
+    on_complete(filepath, first_seen, reason) runs on the tracker thread.
+    """
+
+    def __init__(self, on_complete):
+        self.on_complete = on_complete
+        self.files = {}  # filepath -> state dict
+        self.heap = []   # (due, seq, filepath); stale entries are skipped
+        self.seq = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="CompletionTracker", daemon=True)
+        self.thread.start()
+
+    def _state(self, filepath, now):
+        state = self.files.get(filepath)
+        if state is None:
+            state = {'first_seen': now, 'last_write': now, 'signal': None, 'signal_at': None,
+                     'size': None, 'mtime_ns': None, 'interval': MIN_CHECK_INTERVAL, 'due': None}
+            self.files[filepath] = state
+        return state
+
+    def _schedule(self, filepath, state, due):
+        state['due'] = due
+        heapq.heappush(self.heap, (due, next(self.seq), filepath))
+        self.condition.notify()
+
+    def written(self, filepath):
+        """The file was created or written to; completion is not known yet."""
+        with self.condition:
+            now = time.time()
+            is_new = filepath not in self.files
+            state = self._state(filepath, now)
+            state['last_write'] = now
+            if is_new:
+                self._schedule(filepath, state, now + MIN_CHECK_INTERVAL)
+
+    def signaled(self, filepath, reason):
+        """The writer closed the file, or it was renamed into the folder."""
+        with self.condition:
+            now = time.time()
+            state = self._state(filepath, now)
+            state['signal'] = reason
+            state['signal_at'] = now
+            self._schedule(filepath, state, now + CLOSE_SETTLE_SECONDS)
+
+    def forget(self, filepath):
+        with self.condition:
+            self.files.pop(filepath, None)
+
+    def _check(self, filepath, state, now):
+        """
+        Returns:
+            The completion reason, or None after rescheduling the next check
+        """
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            self.files.pop(filepath, None)
+            return None
+
+        if state['signal'] and state['last_write'] <= state['signal_at'] and now - state['signal_at'] >= CLOSE_SETTLE_SECONDS:
+            return state['signal']
+
+        unchanged = stat.st_size == state['size'] and stat.st_mtime_ns == state['mtime_ns']
+        quiet_for = now - stat.st_mtime
+        if unchanged and quiet_for >= STABLE_QUIET_SECONDS:
+            return 'stable size'
+
+        if unchanged:
+            due = now + max(STABLE_QUIET_SECONDS - quiet_for, MIN_CHECK_INTERVAL)
+        else:
+            if state['size'] is not None:
+                state['interval'] = min(state['interval'] * 2, MAX_CHECK_INTERVAL)
+            due = now + state['interval']
+        state['size'] = stat.st_size
+        state['mtime_ns'] = stat.st_mtime_ns
+        self._schedule(filepath, state, due)
+        return None
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.heap or self.heap[0][0] > time.time():
+                    self.condition.wait(self.heap[0][0] - time.time() if self.heap else None)
+                due, _, filepath = heapq.heappop(self.heap)
+                state = self.files.get(filepath)
+                if state is None or state['due'] != due:
+                    continue
+                reason = self._check(filepath, state, time.time())
+                if reason is None:
+                    continue
+                del self.files[filepath]
+
+            try:
+                self.on_complete(filepath, state['first_seen'], reason)
+            except Exception as e:
+                monitor_logger.error(f"Error handling completed file {filepath}: {e}")
+
+class Stage:
+    """
+    One pipeline stage: a bounded queue drained by a fixed pool of worker threads.
+
+    work(item) does the stage's job and returns the next stage name or a final
+    state. A full queue blocks the previous stage, so a burst of slow
+    conversions holds files back in earlier stages instead of piling up.
+    """
+
+    def __init__(self, name, workers, work, pipeline):
+        self.name = name
+        self.work = work
+        self.pipeline = pipeline
+        self.queue = queue.Queue(maxsize=STAGE_QUEUE_SIZE)
+        self.threads = []
+        for i in range(max(1, workers)):
+            thread = threading.Thread(target=self._run, name=f"Monitor-{name}-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def put(self, item):
+        self.queue.put(item)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            started = time.time()
+            error = None
+            try:
+                next_stage = self.work(item)
+            except Exception as e:
+                next_stage, error = 'failed', str(e)
+                monitor_logger.error(f"Stage '{self.name}' failed for {item['path']}: {e}")
+            item['stage_times'][self.name] = round(item['stage_times'].get(self.name, 0) + time.time() - started, 3)
+            self.pipeline.advance(item, next_stage, error)
+            self.queue.task_done()
+
+
+class MonitorPipeline:
+    """
+    Staged processing of finished downloads: rename -> move -> convert -> index.
+
+    Detection and stabilization happen before (observer + CompletionTracker).
+    Each file's stage is stored in the monitor_files table after every step, so
+    a restart resumes files where they were instead of re-running or losing
+    them. Stage timings and throughput feed the stats on the logs page.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.lock = threading.Lock()
+        self.active = set()  # Paths currently owned by the pipeline
+        self.stages = {
+            'rename': Stage('rename', STAGE_WORKERS['rename'], handler._stage_rename, self),
+            'move': Stage('move', STAGE_WORKERS['move'], handler._stage_move, self),
+            'convert': Stage('convert', STAGE_WORKERS['convert'], handler._stage_convert, self),
+            'index': Stage('index', STAGE_WORKERS['index'], handler._stage_index, self),
+        }
+
+    def is_active(self, filepath):
+        with self.lock:
+            return filepath in self.active
+
+    def set_path(self, item, new_path):
+        """Track the file under its new path after a rename, move or conversion."""
+        with self.lock:
+            self.active.discard(item['path'])
+            self.active.add(new_path)
+        item['path'] = new_path
+
+    def submit(self, filepath, first_seen, detected_at):
+        """Start a finished download down the pipeline (blocks while the first stage is full)."""
+        with self.lock:
+            if filepath in self.active:
+                return
+            self.active.add(filepath)
+        file_id = create_monitor_file(filepath, first_seen, detected_at)
+        item = {'id': file_id, 'source_path': filepath, 'path': filepath,
+                'first_seen': first_seen, 'detected_at': detected_at, 'stage_times': {}}
+        self.stages['rename'].put(item)
+
+    def advance(self, item, next_stage, error=None):
+        if item['id'] is not None:
+            advance_monitor_file(item['id'], next_stage, item['path'], item['stage_times'], error)
+
+        if next_stage in self.stages:
+            self.stages[next_stage].put(item)
+            return
+
+        with self.lock:
+            self.active.discard(item['path'])
+            self.active.discard(item['source_path'])
+        if next_stage == 'done':
+            done = time.time()
+            timings = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in item['stage_times'].items())
+            monitor_logger.info(
+                f"Time to library: {done - item['first_seen']:.2f}s "
+                f"(detect {item['detected_at'] - item['first_seen']:.2f}s, {timings}) - {item['path']}"
+            )
+
+    def resume(self):
+        """
+        Re-queue files a previous run left mid-pipeline.
+        Their paths are claimed right away so the startup scan does not submit
+        them again; queueing happens in the background.
+        """
+        items = []
+        for row in get_unfinished_monitor_files():
+            path = row['current_path']
+            if row['stage'] == 'move' and not os.path.exists(path):
+                # Moved before the restart, state not yet saved
+                target = self.handler._move_target(path)
+                if os.path.exists(target):
+                    path, row['stage'] = target, self.handler._stage_after_move(target)
+            if row['stage'] == 'convert' and not os.path.exists(path):
+                # Converted before the restart, state not yet saved
+                converted = os.path.splitext(path)[0] + '.cbz'
+                if os.path.exists(converted):
+                    path, row['stage'] = converted, 'index'
+            if not os.path.exists(path):
+                advance_monitor_file(row['id'], 'failed', path, row['stage_times'], "File missing when resuming")
+                continue
+            items.append((row['stage'], {'id': row['id'], 'source_path': row['source_path'], 'path': path,
+                                         'first_seen': row['first_seen'] or time.time(),
+                                         'detected_at': row['detected_at'] or time.time(),
+                                         'stage_times': row['stage_times']}))
+
+        with self.lock:
+            self.active.update(item['path'] for _, item in items)
+        if items:
+            monitor_logger.info(f"Resuming {len(items)} file(s) left in the pipeline by the previous run")
+            threading.Thread(target=lambda: [self.stages[stage].put(item) for stage, item in items],
+                             daemon=True).start()
+
+
 class DownloadCompleteHandler(FileSystemEventHandler):
     def __init__(self, directory, target_directory, ignored_extensions):
         """
@@ -64,6 +334,10 @@ class DownloadCompleteHandler(FileSystemEventHandler):
         self.subdirectories = subdirectories
         self.move_directories = move_directories
         self.auto_unpack = auto_unpack
+        self.target_lock = threading.Lock()
+        self.reserved_targets = set()  # Target paths claimed by moves in progress
+        self.pipeline = MonitorPipeline(self)
+        self.tracker = CompletionTracker(self._on_download_complete)
 
 
     def reload_settings(self):
@@ -126,33 +400,46 @@ class DownloadCompleteHandler(FileSystemEventHandler):
         self.reload_settings()
 
         if not event.is_directory:
-            self._handle_file_if_complete(event.src_path)
             monitor_logger.info(f"File created: {event.src_path}")
+            self._handle_file_if_complete(event.src_path)
         else:
             monitor_logger.info(f"Directory created: {event.src_path}")
             self._scan_directory(event.src_path)
 
 
     def on_modified(self, event):
-        self.reload_settings()
+        # Modify events arrive for every write; no config reload or logging here
+        if not event.is_directory and event.src_path in self.tracker.files:
+            self.tracker.written(event.src_path)
+        elif not event.is_directory:
+            self._handle_file_if_complete(event.src_path)
 
+
+    def on_closed(self, event):
+        # inotify IN_CLOSE_WRITE: the writer is done with the file
         if not event.is_directory:
-            self._handle_file_if_complete(event.src_path)
-            monitor_logger.info(f"File Modified: {event.src_path}")
+            self._handle_file_if_complete(event.src_path, signal='close_write')
 
 
     def on_moved(self, event):
         self.reload_settings()
 
         if not event.is_directory:
-            self._handle_file_if_complete(event.dest_path)
             monitor_logger.info(f"File Moved: {event.dest_path}")
+            self.tracker.forget(event.src_path)
+            # A rename is how most downloaders publish a finished file
+            self._handle_file_if_complete(event.dest_path, signal='moved in')
         else:
             monitor_logger.info(f"Directory Moved: {event.dest_path}")
-            self._scan_directory(event.dest_path)
+            self._scan_directory(event.dest_path, signal='moved in')
 
 
-    def _scan_directory(self, directory):
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.tracker.forget(event.src_path)
+
+
+    def _scan_directory(self, directory, signal=None):
         for root, dirs, files in os.walk(directory):
             # Skip hidden directories from being traversed.
             dirs[:] = [d for d in dirs if not is_hidden(os.path.join(root, d))]
@@ -161,11 +448,21 @@ class DownloadCompleteHandler(FileSystemEventHandler):
                 # Skip hidden files.
                 if is_hidden(file_path):
                     continue
-                self._handle_file_if_complete(file_path)
                 monitor_logger.info(f"Scanning directory - found file: {file_path}")
+                self._handle_file_if_complete(file_path, signal=signal)
+
+
+    def _handle_file_if_complete(self, filepath, signal=None):
+        """
+        Filter the file, then hand it to the completion tracker.
 
+        signal is 'close_write' or 'moved in' when an event says the file is
+        finished, None when it may still be written to.
+        """
+        # Our own renames inside the watch folder come back as events
+        if self.pipeline.is_active(filepath):
+            return
 
-    def _handle_file_if_complete(self, filepath):
         # Skip hidden files.
         if is_hidden(filepath):
             monitor_logger.info(f"Skipping hidden file: {filepath}")
@@ -187,11 +484,18 @@ class DownloadCompleteHandler(FileSystemEventHandler):
                 monitor_logger.info(f"Ignoring file with extension '{extension}': {filepath}")
                 return
 
-        if self._is_download_complete(filepath):
-            self._process_file(filepath)
-            monitor_logger.info(f"File Download Complete: {filepath}")
+        if signal:
+            self.tracker.signaled(filepath, signal)
         else:
-            monitor_logger.info(f"File not yet complete: {filepath}")
+            self.tracker.written(filepath)
+
+    def _on_download_complete(self, filepath, first_seen, reason):
+        """Tracker callback: hand a finished download to the pipeline."""
+        if self.pipeline.is_active(filepath):
+            return
+        detected = time.time()
+        monitor_logger.info(f"File Download Complete ({reason}, {detected - first_seen:.2f}s after first event): {filepath}")
+        self.pipeline.submit(filepath, first_seen, detected)
 
     def _is_temporary_download_file(self, filepath, extension):
         """
@@ -284,55 +588,74 @@ class DownloadCompleteHandler(FileSystemEventHandler):
             return None
 
 
-    def _process_file(self, filepath):
-        try:
-            monitor_logger.info(f"Processing file: {filepath}")
-            
-            # Check if the file is a zip file
-            if filepath.lower().endswith('.zip'):
-                if self.auto_unpack:
-                    monitor_logger.info(f"Zip file detected and auto_unpack is enabled. Unzipping: {filepath}")
-                    self.unzip_file(filepath)
-                    return  # Exit after unzipping
-                else:
-                    monitor_logger.info(f"Zip file detected, but auto_unpack is disabled. Processing as normal file: {filepath}")
-            
-            # Continue with the normal processing for non-zip files (or zip files when auto_unpack is disabled)
-            renamed_filepath = self._rename_file(filepath)
-            if not renamed_filepath or renamed_filepath == filepath:
-                monitor_logger.info(f"No rename needed for: {filepath}")
-                self._move_file(filepath)
+    def _stage_rename(self, item):
+        """Pipeline stage: unpack a zip (auto_unpack) or rename the file in place."""
+        filepath = item['path']
+        monitor_logger.info(f"Processing file: {filepath}")
+
+        # Check if the file is a zip file
+        if filepath.lower().endswith('.zip'):
+            if self.auto_unpack:
+                monitor_logger.info(f"Zip file detected and auto_unpack is enabled. Unzipping: {filepath}")
+                self.unzip_file(filepath)
+                return 'skipped'  # The extracted files arrive as new events
             else:
-                monitor_logger.info(f"Renamed file: {renamed_filepath}")
-                self._move_file(renamed_filepath)
-                    
-        except Exception as e:
-            monitor_logger.info(f"Error processing {filepath}: {e}")
+                monitor_logger.info(f"Zip file detected, but auto_unpack is disabled. Processing as normal file: {filepath}")
+
+        renamed_filepath = self._rename_file(filepath)
+        if not renamed_filepath or renamed_filepath == filepath:
+            monitor_logger.info(f"No rename needed for: {filepath}")
+        else:
+            self.pipeline.set_path(item, renamed_filepath)
+        return 'move'
 
 
-    def _move_file(self, filepath):
+    def _reserve_target(self, target_path):
+        """Pick a free target path, also avoiding paths other move workers are writing."""
+        with self.target_lock:
+            target_path = get_unique_filepath(target_path, taken=self.reserved_targets)
+            self.reserved_targets.add(target_path)
+            return target_path
+
+
+    def _stage_move(self, item):
         """
-        Moves the file from its source location to the target directory,
-        ensuring the move is completed before proceeding with conversion.
-        If move_directories is True, the file is renamed based on its original
-        sub-directory structure (flattening the hierarchy).
+        Pipeline stage: move the file from the watch folder to the target directory.
+        If move_directories is True, the file keeps its sub-directory structure
+        below the target.
         """
+        filepath = item['path']
 
         if not os.path.exists(filepath):
-            monitor_logger.info(f"File not found for moving: {filepath}")
-            return
+            raise FileNotFoundError(f"File not found for moving: {filepath}")
 
-        # Skip moving hidden files.
-        if is_hidden(filepath):
-            monitor_logger.info(f"Skipping moving hidden file: {filepath}")
-            return
+        target_path = self._move_target(filepath)
+
+        # Ensure that the target sub-directory exists.
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+
+        # Check if target file already exists and generate unique filename if needed
+        original_target_path = target_path
+        target_path = self._reserve_target(target_path)
+        try:
+            if target_path != original_target_path:
+                monitor_logger.warning(f"File already exists at destination. Using unique filename to prevent overwrite.")
+                monitor_logger.info(f"Original target: {original_target_path}")
+                monitor_logger.info(f"New target: {target_path}")
+
+            shutil.move(filepath, target_path)
+            monitor_logger.info(f"Moved file to: {target_path}")
+        finally:
+            with self.target_lock:
+                self.reserved_targets.discard(target_path)
+        self.pipeline.set_path(item, target_path)
+
+        self._remove_empty_source_dirs(os.path.dirname(filepath))
+        return self._stage_after_move(target_path)
 
-        # Wait for file download completion.
-        monitor_logger.info(f"Waiting for '{filepath}' to finish downloading before moving...")
-        if not _wait_for_download_completion(filepath):
-            monitor_logger.warning(f"File not yet complete: {filepath}")
-            return  # Exit early; do not move an incomplete file
 
+    def _move_target(self, filepath):
+        """Where _stage_move puts a watch folder file (before collision renaming)."""
         if move_directories:
             # Calculate the relative path from the source directory.
             rel_path = os.path.relpath(filepath, self.directory)
@@ -347,67 +670,67 @@ class DownloadCompleteHandler(FileSystemEventHandler):
         # This cleans the folder names (as per our directory cleaning rules)
         target_dir = os.path.dirname(target_path)
         cleaned_target_dir = clean_directory_name(target_dir)
-        target_path = os.path.join(cleaned_target_dir, os.path.basename(target_path))
-
-        try:
-            # Ensure that the target sub-directory exists.
-            os.makedirs(os.path.dirname(target_path), exist_ok=True)
-
-            # Check if target file already exists and generate unique filename if needed
-            original_target_path = target_path
-            target_path = get_unique_filepath(target_path)
-
-            if target_path != original_target_path:
-                monitor_logger.warning(f"File already exists at destination. Using unique filename to prevent overwrite.")
-                monitor_logger.info(f"Original target: {original_target_path}")
-                monitor_logger.info(f"New target: {target_path}")
+        return os.path.join(cleaned_target_dir, os.path.basename(target_path))
 
-            shutil.move(filepath, target_path)
-            monitor_logger.info(f"Moved file to: {target_path}")
 
-            # Allow filesystem update
-            time.sleep(1)
+    def _stage_after_move(self, target_path):
+        """Next stage for a file that reached the target directory."""
+        if target_path.lower().endswith('.cbr'):
+            if self.autoconvert:
+                return 'convert'
+            monitor_logger.info("Auto-conversion is disabled.")
+        return 'index'
 
-            # Track the final file path (may change after conversion)
-            final_target_path = target_path
-
-            if os.path.exists(target_path):
-                monitor_logger.info(f"Checking if '{target_path}' is a CBR file")
-                if target_path.lower().endswith('.cbr'):
-                    if self.autoconvert:
-                        monitor_logger.info(f"Sending Convert Request for '{target_path}'")
-                        retries = 3
-                        for _ in range(retries):
-                            if os.path.exists(target_path):
-                                break
-                            time.sleep(0.5)
-                        try:
-                            convert_to_cbz(target_path)
-                            # After conversion, the file will be .cbz
-                            final_target_path = os.path.splitext(target_path)[0] + '.cbz'
-                            monitor_logger.info(f"Converted to: {final_target_path}")
-                        except Exception as e:
-                            monitor_logger.error(f"Conversion failed for '{target_path}': {e}")
-                            # If conversion failed, keep the original .cbr path
-                    else:
-                        monitor_logger.info("Auto-conversion is disabled.")
-                else:
-                    monitor_logger.info(f"File '{target_path}' is not a CBR file. No conversion needed.")
-            else:
-                monitor_logger.warning(f"File move verification failed: {target_path} not found.")
 
+    def _stage_convert(self, item):
+        """Pipeline stage: convert a CBR in the target directory to CBZ."""
+        target_path = item['path']
+        monitor_logger.info(f"Sending Convert Request for '{target_path}'")
+        try:
+            convert_to_cbz(target_path)
+            converted_path = os.path.splitext(target_path)[0] + '.cbz'
+            if os.path.exists(converted_path):
+                self.pipeline.set_path(item, converted_path)
+                monitor_logger.info(f"Converted to: {converted_path}")
         except Exception as e:
-            monitor_logger.error(f"Error moving file: {e}")
-            # Allow filesystem update
-            time.sleep(1)
+            # If conversion failed, keep the original .cbr path
+            monitor_logger.error(f"Conversion failed for '{target_path}': {e}")
+        return 'index'
+
 
+    def _stage_index(self, item):
+        """
+        Pipeline stage: when the target lies inside a library, add the file to
+        file_index and the recently added list right away instead of waiting
+        for the web app's watcher or the next sync.
+        """
+        final_path = item['path']
+        if not os.path.exists(final_path):
+            raise FileNotFoundError(f"File missing after processing: {final_path}")
+
+        library_roots = [lib['path'].rstrip('/') for lib in get_libraries(enabled_only=True)]
+        if any(final_path.startswith(root + '/') for root in library_roots):
+            stat = os.stat(final_path)
+            apply_file_index_changes(upserts=[{
+                'name': os.path.basename(final_path),
+                'path': final_path,
+                'type': 'file',
+                'size': stat.st_size,
+                'parent': os.path.dirname(final_path),
+                'has_thumbnail': 0,
+                'modified_at': stat.st_mtime
+            }])
+            log_recent_file(final_path, os.path.basename(final_path), stat.st_size)
+        return 'done'
+
+
+    def _remove_empty_source_dirs(self, source_folder):
         # Remove empty directories along the processed file's source path,
         # but only those in the chain up to the main watch folder.
-        source_folder = os.path.dirname(filepath)
         watch_dir = os.path.abspath(self.directory)
         current_dir = os.path.abspath(source_folder)
 
-        while current_dir != watch_dir:
+        while current_dir != watch_dir and current_dir.startswith(watch_dir + os.sep):
             # Do not attempt to remove hidden directories.
             if is_hidden(current_dir):
                 break
@@ -426,40 +749,6 @@ class DownloadCompleteHandler(FileSystemEventHandler):
             current_dir = os.path.dirname(current_dir)
 
 
-    def _is_download_complete(self, filepath):
-        try:
-            initial_size = os.path.getsize(filepath)
-            time.sleep(5)  # Adjust sleep time as needed
-            final_size = os.path.getsize(filepath)
-            return initial_size == final_size
-        except (PermissionError, FileNotFoundError):
-            return False
-
-
-def _wait_for_download_completion(filepath, wait_time=2.0, retries=20):
-    """
-    Waits until a file is fully downloaded before proceeding.
-    - Checks for stable file size.
-    - Ensures any ".part" or ".tmp" files are gone.
-    - Retries several times with a delay before confirming the file is complete.
-    """
-    if not os.path.exists(filepath):
-        return False
-
-    previous_size = -1
-    for _ in range(retries):
-        if not os.path.exists(filepath):  # Ensure file hasn't disappeared
-            return False
-
-        current_size = os.path.getsize(filepath)
-        if current_size == previous_size:
-            return True  # File size is stable, assume complete
-
-        previous_size = current_size
-        time.sleep(wait_time)
-
-    return False
-
 def format_size(size_bytes):
     """Helper function to format file sizes in human-readable format"""
     if size_bytes == 0:
@@ -471,18 +760,19 @@ def format_size(size_bytes):
     s = round(size_bytes / p, 2)
     return f"{s} {size_names[i]}"
 
-def get_unique_filepath(target_path):
+def get_unique_filepath(target_path, taken=()):
     """
     Generate a unique filepath by appending (1), (2), etc. if the file already exists.
     This prevents files from being overwritten during the move operation.
 
     Args:
         target_path: The desired target path for the file
+        taken: Paths to treat as existing (targets of moves still in progress)
 
     Returns:
         A unique filepath that doesn't exist yet
     """
-    if not os.path.exists(target_path):
+    if not os.path.exists(target_path) and target_path not in taken:
         return target_path
 
     # Split the path into directory, filename, and extension
@@ -495,7 +785,7 @@ def get_unique_filepath(target_path):
     while True:
         new_name = f"{name} ({counter}){ext}"
         new_path = os.path.join(directory, new_name)
-        if not os.path.exists(new_path):
+        if not os.path.exists(new_path) and new_path not in taken:
             return new_path
         counter += 1
 
@@ -516,6 +806,10 @@ if __name__ == "__main__":
     else:
         monitor_logger.info("Auto cleanup disabled, skipping initial cleanup")
 
+    # Finish what the previous run left mid-pipeline, drop old history
+    prune_monitor_files(MONITOR_HISTORY_DAYS)
+    event_handler.pipeline.resume()
+
     # Initial scan
     for root, _, files in os.walk(directory):
         for file in files:
@@ -523,7 +817,15 @@ if __name__ == "__main__":
             monitor_logger.info(f"Initial startup scan for: {filepath}")
             event_handler._handle_file_if_complete(filepath)
 
-    observer = PollingObserver(timeout=30)
+    # inotify delivers close/move events the moment a download finishes; network
+    # and host-shared mounts raise no inotify events, so they are polled
+    use_polling = observer_mode == "polling" or (observer_mode == "auto" and is_network_path(directory))
+    if use_polling:
+        observer = PollingObserver(timeout=poll_interval)
+        monitor_logger.info(f"Using polling observer (every {poll_interval}s) for: {directory}")
+    else:
+        observer = Observer()
+        monitor_logger.info(f"Using native (inotify) observer for: {directory}")
     observer.schedule(event_handler, directory, recursive=subdirectories)
     observer.start()
 
@@ -541,6 +843,7 @@ if __name__ == "__main__":
                 if current_time - last_cleanup_time >= cleanup_interval:
                     monitor_logger.info("Running periodic cleanup of orphan files...")
                     event_handler.cleanup_orphan_files()
+                    prune_monitor_files(MONITOR_HISTORY_DAYS)
                     last_cleanup_time = current_time
                 
     except KeyboardInterrupt:
@@ -0,0 +1,148 @@
+"""
+path_cache.py - Path-indexed LRU cache for directory listings
+
+app.directory_cache maps directory paths (and "browse:<path>" keys) to
+listings. Invalidating a path used to scan every cached key for a prefix
+match under the global cache lock, which made a bulk move of N files cost
+O(N x cache size) lock time.
+
+PathIndexedCache is a drop-in OrderedDict that also keeps a trie of path
+components -> cache keys, updated on every insert and removal. Finding the
+keys for a path, its parent or its whole subtree walks only the affected
+branch of the trie, so invalidation is O(path depth + affected keys).
+"""
+
+import os
+from collections import OrderedDict
+
+BROWSE_PREFIX = "browse:"
+
+
+def key_path(key):
+    """Filesystem path a cache key refers to."""
+    return key[len(BROWSE_PREFIX):] if key.startswith(BROWSE_PREFIX) else key
+
+
+def _components(path):
+    path = path.rstrip(os.sep)
+    return path.split(os.sep) if path else ['']
+
+
+class _Node:
+    __slots__ = ('children', 'keys')
+
+    def __init__(self):
+        self.children = {}
+        self.keys = set()
+
+
+class PathIndex:
+    """Trie of path components; each node holds the cache keys for that path."""
+
+    def __init__(self):
+        self.root = _Node()
+
+    def add(self, key):
+        node = self.root
+        for part in _components(key_path(key)):
+            node = node.children.setdefault(part, _Node())
+        node.keys.add(key)
+
+    def discard(self, key):
+        # Walk down remembering the path so empty branches can be pruned
+        trail = []
+        node = self.root
+        for part in _components(key_path(key)):
+            child = node.children.get(part)
+            if child is None:
+                return
+            trail.append((node, part))
+            node = child
+        node.keys.discard(key)
+
+        for parent, part in reversed(trail):
+            child = parent.children[part]
+            if child.keys or child.children:
+                break
+            del parent.children[part]
+
+    def _find(self, path):
+        node = self.root
+        for part in _components(path):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def keys_at(self, path):
+        """Cache keys for exactly this path."""
+        node = self._find(path)
+        return set(node.keys) if node else set()
+
+    def keys_below(self, path):
+        """Cache keys for every path strictly inside path."""
+        node = self._find(path)
+        if node is None:
+            return set()
+        keys = set()
+        stack = list(node.children.values())
+        while stack:
+            node = stack.pop()
+            keys.update(node.keys)
+            stack.extend(node.children.values())
+        return keys
+
+    def clear(self):
+        self.root = _Node()
+
+
+class PathIndexedCache(OrderedDict):
+    """
+    OrderedDict (LRU order, move_to_end) that keeps a PathIndex of its keys.
+
+    All mutating methods go through __setitem__/__delitem__/pop/popitem/clear,
+    so existing code that treats the cache as a plain dict stays correct.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.index = PathIndex()
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self.index.add(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.index.discard(key)
+
+    _missing = object()
+
+    def pop(self, key, default=_missing):
+        if key in self:
+            self.index.discard(key)
+            return super().pop(key)
+        if default is self._missing:
+            raise KeyError(key)
+        return default
+
+    def popitem(self, last=True):
+        key, value = super().popitem(last=last)
+        self.index.discard(key)
+        return key, value
+
+    def clear(self):
+        super().clear()
+        self.index.clear()
+
+    def keys_for_invalidation(self, path):
+        """
+        Keys to drop when path changes: the path itself, its parent (whose
+        listing shows it) and everything below it, plain and browse: keys.
+        """
+        keys = self.index.keys_at(path) | self.index.keys_below(path)
+        parent = os.path.dirname(path)
+        if parent:
+            keys |= self.index.keys_at(parent)
+        return keys
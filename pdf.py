@@ -1,28 +1,47 @@
 import os
 import sys
-import zipfile
+import io
+from concurrent.futures import ThreadPoolExecutor
 from pdf2image import convert_from_path, pdfinfo_from_path
 from app_logging import app_logger
+from archive_writer import CbzWriter
+from config import config, load_config
+from conversion_pool import ConversionCancelled, make_job, run_jobs
 from PIL import Image
 from helpers import is_hidden
 import gc
-import tempfile
-import shutil
+
+load_config()
+
+# Increase PIL's image pixel limit but still reasonable
+Image.MAX_IMAGE_PIXELS = 500000000
+
+# Rendering settings (config.ini [SETTINGS])
+PDF_RENDER_THREADS = max(1, config.getint("SETTINGS", "PDF_RENDER_THREADS", fallback=4))
+PDF_DPI = config.getint("SETTINGS", "PDF_DPI", fallback=150)
+PDF_OUTPUT_FORMAT = config.get("SETTINGS", "PDF_OUTPUT_FORMAT", fallback="jpeg").strip().lower()
+PDF_OUTPUT_QUALITY = config.getint("SETTINGS", "PDF_OUTPUT_QUALITY", fallback=75)
+
+# format -> (PIL format, extension, save options)
+OUTPUT_FORMATS = {
+    'jpeg': ('JPEG', 'jpg', {'dpi': (96, 96), 'optimize': True}),
+    'webp': ('WEBP', 'webp', {'method': 4}),
+    'png': ('PNG', 'png', {}),
+}
+MAX_PAGE_PIXELS = 50_000_000  # 50MP limit
 
 
 def scan_and_convert(directory):
     """
-    Recursively scans a directory for PDF files, converts each PDF's pages to images, 
-    organizes them into folders, and creates a CBZ file for each PDF.
-    Uses memory-efficient streaming and batch processing.
+    Recursively scans a directory for PDF files and converts each one to a CBZ.
+    PDFs are converted CONVERSION_WORKERS at a time (see conversion_pool); within
+    a PDF, pages are rendered PDF_RENDER_THREADS at a time.
 
     :param directory: Root directory to scan
     """
-    # Increase PIL's image pixel limit but still reasonable
-    Image.MAX_IMAGE_PIXELS = 500000000
-
     app_logger.info("********************// Convert All PDF to CBZ //********************")
 
+    jobs = []
     for root, dirs, files in os.walk(directory):
         # Skip hidden directories.
         dirs[:] = [d for d in dirs if not is_hidden(os.path.join(root, d))]
@@ -33,139 +52,133 @@ def scan_and_convert(directory):
                 continue
 
             if file.lower().endswith('.pdf'):
-                process_pdf_file(file_path)
-                # Force garbage collection after each PDF
-                gc.collect()
+                cbz_path = os.path.splitext(file_path)[0] + ".cbz"
+                jobs.append(make_job(file_path, temp_path=cbz_path + ".tmpzip"))
+
+    app_logger.info(f"Found {len(jobs)} files to convert.")
+    results = run_jobs(jobs, process_pdf_file)
+    app_logger.info(f"Converted {sum(1 for ok in results if ok)} of {len(jobs)} PDF files.")
 
 
 def process_pdf_file(pdf_path):
     """
-    Process a single PDF file with memory-efficient streaming.
+    Convert a single PDF to CBZ, streaming rendered pages straight into the archive.
+
+    Pages are rendered PDF_RENDER_THREADS at a time (poppler thread_count) and
+    encoded on the same number of threads, so peak memory is bounded by
+    about two batches of pages regardless of document length. The CBZ is
+    written next to the PDF as .tmpzip and renamed when complete.
+
+    :param pdf_path: Path to the PDF file
+    :return: bool: True if the CBZ was created
     """
     pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
-    output_folder = os.path.join(os.path.dirname(pdf_path), pdf_name)
     cbz_path = os.path.join(os.path.dirname(pdf_path), f"{pdf_name}.cbz")
-    
+    temp_cbz_path = cbz_path + ".tmpzip"
+    pil_format, ext, save_options = OUTPUT_FORMATS.get(PDF_OUTPUT_FORMAT, OUTPUT_FORMATS['jpeg'])
+
     app_logger.info(f"Processing: {pdf_path}")
-    
+
     try:
         # Get PDF info first
         pdf_info = pdfinfo_from_path(pdf_path)
         total_pages = pdf_info["Pages"]
-        
-        # Create output folder
-        os.makedirs(output_folder, exist_ok=True)
-        
-        # Process pages in batches to reduce memory usage
-        batch_size = 5  # Process 5 pages at a time
-        for batch_start in range(1, total_pages + 1, batch_size):
-            batch_end = min(batch_start + batch_size - 1, total_pages)
-            
-            app_logger.info(f"Processing pages {batch_start}-{batch_end} of {total_pages}")
-            
-            # Convert batch of pages
-            pages = convert_from_path(
-                pdf_path, 
-                first_page=batch_start, 
-                last_page=batch_end, 
-                thread_count=1,
-                fmt="jpeg",
-                dpi=150  # Reduce DPI to save memory
-            )
-            
-            # Process each page in the batch
-            for i, page in enumerate(pages):
-                page_number = batch_start + i
-                process_single_page(page, page_number, pdf_name, output_folder)
-                # Explicitly close the page to free memory
-                page.close()
-            
-            # Clear the pages list to free memory
-            pages.clear()
-            gc.collect()
-        
-        # Create CBZ file using streaming approach
-        create_cbz_file(output_folder, cbz_path)
-        
+        # Zero-pad page numbers so readers sort pages correctly
+        name_width = len(str(total_pages))
+
+        batch_size = PDF_RENDER_THREADS
+        with CbzWriter(temp_cbz_path) as cbz, ThreadPoolExecutor(max_workers=PDF_RENDER_THREADS) as encoder:
+            for batch_start in range(1, total_pages + 1, batch_size):
+                batch_end = min(batch_start + batch_size - 1, total_pages)
+
+                app_logger.info(f"Processing pages {batch_start}-{batch_end} of {total_pages}")
+
+                # poppler renders the batch on thread_count processes
+                pages = convert_from_path(
+                    pdf_path,
+                    first_page=batch_start,
+                    last_page=batch_end,
+                    thread_count=PDF_RENDER_THREADS,
+                    dpi=PDF_DPI
+                )
+
+                # Encode concurrently (PIL releases the GIL), write in page order
+                encoded = encoder.map(
+                    lambda item: encode_page(item[1], batch_start + item[0], pil_format, save_options),
+                    enumerate(pages)
+                )
+                for i, data in enumerate(encoded):
+                    page_number = batch_start + i
+                    if data is None:
+                        continue
+                    page_filename = f"{pdf_name} page_{page_number:0{name_width}d}.{ext}"
+                    cbz.writestr(page_filename, data)
+                    app_logger.info(f"Saved page {page_number} as {page_filename}")
+
+                # Free the batch before rendering the next one
+                for page in pages:
+                    page.close()
+                pages.clear()
+                gc.collect()
+
+        os.replace(temp_cbz_path, cbz_path)
+        app_logger.info(f"CBZ file created: {cbz_path}")
+
         # Clean up source PDF
         try:
             os.remove(pdf_path)
             app_logger.info(f"Deleted source PDF: {pdf_path}")
         except OSError as e:
             app_logger.info(f"Failed to delete source PDF {pdf_path}: {e}")
-        
-        # Clean up temporary folder
-        cleanup_temp_folder(output_folder)
-        
+
+        return True
+
     except Exception as e:
         app_logger.error(f"Error processing {pdf_path}: {e}")
-        # Clean up on error
-        if os.path.exists(output_folder):
-            cleanup_temp_folder(output_folder)
+        return False
 
+    finally:
+        # Clean up a partial CBZ on error
+        if os.path.exists(temp_cbz_path):
+            os.remove(temp_cbz_path)
 
-def process_single_page(page, page_number, pdf_name, output_folder):
+
+def encode_page(page, page_number, pil_format="JPEG", save_options=None):
     """
-    Process a single page with memory-efficient operations.
+    Encode one rendered page in memory.
+
+    :param page: PIL image from pdf2image
+    :param page_number: 1-based page number (for logging)
+    :param pil_format: PIL output format (JPEG, WEBP, PNG)
+    :param save_options: Extra PIL save() options
+    :return: Encoded bytes, or None if the page failed
     """
     try:
         width, height = page.size
         total_pixels = width * height
-        
+
         app_logger.info(f"Page {page_number} size: {width}x{height} pixels ({total_pixels}px)")
-        
-        page_filename = f"{pdf_name} page_{page_number}.jpg"
-        page_path = os.path.join(output_folder, page_filename)
-        
+
         # Resize image if too large to prevent memory issues
-        max_pixels = 50_000_000  # 50MP limit
-        if total_pixels > max_pixels:
-            app_logger.info(f"Resizing large image: {page_filename}")
+        if total_pixels > MAX_PAGE_PIXELS:
+            app_logger.info(f"Resizing large page {page_number}")
             # Calculate new dimensions maintaining aspect ratio
-            ratio = (max_pixels / total_pixels) ** 0.5
-            new_width = int(width * ratio)
-            new_height = int(height * ratio)
-            page = page.resize((new_width, new_height), Image.LANCZOS)
-        
-        # Save with optimized settings
-        page.save(page_path, "JPEG", dpi=(96, 96), quality=75, optimize=True)
-        app_logger.info(f"Saved page {page_number} as {page_filename}")
-        
-    except Exception as e:
-        app_logger.error(f"Error processing page {page_number}: {e}")
+            ratio = (MAX_PAGE_PIXELS / total_pixels) ** 0.5
+            page = page.resize((int(width * ratio), int(height * ratio)), Image.LANCZOS)
 
+        if pil_format == "JPEG" and page.mode not in ("RGB", "L"):
+            page = page.convert("RGB")
 
-def create_cbz_file(output_folder, cbz_path):
-    """
-    Create CBZ file using streaming approach to avoid loading all files into memory.
-    """
-    try:
-        with zipfile.ZipFile(cbz_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=6) as cbz:
-            # Walk through the folder and add files one by one
-            for folder_root, _, folder_files in os.walk(output_folder):
-                for folder_file in folder_files:
-                    file_path_in_folder = os.path.join(folder_root, folder_file)
-                    arcname = os.path.relpath(file_path_in_folder, output_folder)
-                    
-                    # Add file to zip without loading it entirely into memory
-                    cbz.write(file_path_in_folder, arcname)
-        
-        app_logger.info(f"CBZ file created: {cbz_path}")
-        
-    except Exception as e:
-        app_logger.error(f"Error creating CBZ file {cbz_path}: {e}")
+        buffer = io.BytesIO()
+        options = dict(save_options or {})
+        if pil_format != "PNG":
+            options["quality"] = PDF_OUTPUT_QUALITY
+        page.save(buffer, pil_format, **options)
+        return buffer.getvalue()
 
-
-def cleanup_temp_folder(folder_path):
-    """
-    Clean up temporary folder and its contents.
-    """
-    try:
-        if os.path.exists(folder_path):
-            shutil.rmtree(folder_path)
-            app_logger.info(f"Cleaned up temporary folder: {folder_path}")
     except Exception as e:
-        app_logger.error(f"Error cleaning up folder {folder_path}: {e}")
+        app_logger.error(f"Error processing page {page_number}: {e}")
+        return None
 
 
 if __name__ == "__main__":
@@ -174,4 +187,8 @@ if __name__ == "__main__":
         app_logger.info("No directory provided!")
     else:
         directory = sys.argv[1]
-        scan_and_convert(directory)
+        try:
+            scan_and_convert(directory)
+        except ConversionCancelled:
+            app_logger.warning("PDF conversion cancelled.")
+            sys.exit(1)
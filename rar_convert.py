@@ -0,0 +1,201 @@
+"""
+rar_convert.py - RAR/CBR to CBZ conversion shared by convert, rebuild and single_file
+
+The converter streams members straight from the RAR into the CBZ writer:
+rarfile walks the archive headers in order and decompresses each member
+through a pipe (unrar/unar/bsdtar writing to stdout, or directly for stored
+members), so nothing is extracted to disk. That needs a single read pass and
+only the space of the new CBZ.
+
+Solid archives are not streamed: rarfile opens each member of a solid
+archive with a new tool process that decodes the stream from the start,
+so N pages would cost O(N^2) decompression. They go straight to the old
+path instead, where one unar run decodes the stream once: extract into a
+temp folder, then zip the folder. Archives rarfile cannot stream at all
+(no backend tool, unusual compression methods, damaged headers that unar
+still tolerates) use the same fallback.
+"""
+
+import os
+import shutil
+import time
+import zipfile
+
+import rarfile
+
+from app_logging import app_logger
+from archive_writer import CbzWriter, safe_zip_date_time
+from config import config
+from helpers import is_hidden, extract_rar_with_unar
+
+# Large file threshold (configurable)
+LARGE_FILE_THRESHOLD = config.getint("SETTINGS", "LARGE_FILE_THRESHOLD", fallback=500) * 1024 * 1024  # Convert MB to bytes
+
+
+def get_file_size_mb(file_path):
+    """Get file size in MB."""
+    try:
+        size_bytes = os.path.getsize(file_path)
+        return size_bytes / (1024 * 1024)
+    except OSError:
+        return 0
+
+
+def _is_hidden_member(name):
+    """True if any component of an archive member path is hidden (see helpers.is_hidden)."""
+    return any(part.startswith(('.', '_')) for part in name.replace('\\', '/').split('/') if part)
+
+
+def _log_progress(is_large_file, processed_files, total_files):
+    # Progress reporting for large files
+    if is_large_file and total_files and processed_files % max(1, total_files // 10) == 0:
+        progress_percent = (processed_files / total_files) * 100
+        app_logger.info(f"Compression progress: {progress_percent:.1f}% ({processed_files}/{total_files} files)")
+
+
+class SolidArchiveError(rarfile.Error):
+    """A solid RAR, which is cheaper to extract in one pass than to stream."""
+
+
+def stream_rar_to_cbz(rar_path, cbz_path, skip_hidden=True, is_large_file=False):
+    """
+    Convert a RAR to CBZ by streaming members, without a temp folder.
+
+    :param rar_path: Path to the RAR file
+    :param cbz_path: Path for the output CBZ file
+    :param skip_hidden: Drop members whose path has a hidden component
+    :param is_large_file: Log progress every 10%
+    :return: Number of members written
+    :raises SolidArchiveError: for solid archives (caller extracts them in one pass)
+    :raises rarfile.Error: if the archive cannot be streamed (caller falls back)
+    """
+    with rarfile.RarFile(rar_path, 'r') as rf:
+        if rf.is_solid():
+            raise SolidArchiveError(f"{os.path.basename(rar_path)} is a solid archive")
+
+        members = [info for info in rf.infolist() if not info.is_dir()]
+        if skip_hidden:
+            members = [info for info in members if not _is_hidden_member(info.filename)]
+        if not members:
+            raise rarfile.Error(f"No files found in {os.path.basename(rar_path)}")
+
+        total_files = len(members)
+        app_logger.info(f"Streaming {total_files} files from {os.path.basename(rar_path)} into CBZ...")
+
+        with CbzWriter(cbz_path) as zf:
+            # Archive order, one read pass over a non-solid archive
+            for processed_files, info in enumerate(members, start=1):
+                zip_info = zipfile.ZipInfo(
+                    filename=info.filename.replace('\\', '/'),
+                    date_time=safe_zip_date_time(info.date_time)
+                )
+                zip_info.file_size = info.file_size
+                with rf.open(info) as member:
+                    zf.write_stream(zip_info, member)
+                _log_progress(is_large_file, processed_files, total_files)
+
+    return total_files
+
+
+def _zip_extracted_folder(temp_extraction_dir, cbz_path, skip_hidden=True, is_large_file=False):
+    """Fallback path: zip a folder extracted by unar."""
+    extracted_files = []
+    for root, dirs, files in os.walk(temp_extraction_dir):
+        if skip_hidden:
+            # Skip hidden directories within the extraction folder.
+            dirs[:] = [d for d in dirs if not is_hidden(os.path.join(root, d))]
+        for file in files:
+            file_path = os.path.join(root, file)
+            if skip_hidden and is_hidden(file_path):
+                continue
+            extracted_files.append(file_path)
+
+    total_files = len(extracted_files)
+    app_logger.info(f"Step 2/3: Found {total_files} files to compress...")
+    app_logger.info(f"Step 3/3: Creating CBZ file...")
+
+    with CbzWriter(cbz_path) as zf:
+        for processed_files, file_path_inner in enumerate(extracted_files, start=1):
+            arcname = os.path.relpath(file_path_inner, temp_extraction_dir)
+
+            # Create ZipInfo manually to control the timestamp
+            # ZIP format requires dates >= 1980-01-01
+            file_time = time.localtime(os.stat(file_path_inner).st_mtime)
+            zip_info = zipfile.ZipInfo(filename=arcname, date_time=safe_zip_date_time(file_time[:6]))
+            zip_info.file_size = os.path.getsize(file_path_inner)
+
+            with open(file_path_inner, 'rb') as f:
+                zf.write_stream(zip_info, f)
+            _log_progress(is_large_file, processed_files, total_files)
+
+
+def convert_single_rar_file(rar_path, cbz_path, temp_extraction_dir, skip_hidden=True):
+    """
+    Convert a single RAR file to CBZ with progress reporting.
+
+    Streams members with rarfile first; solid archives and archives that
+    cannot be streamed are extracted with unar into temp_extraction_dir.
+
+    :param rar_path: Path to the RAR file
+    :param cbz_path: Path for the output CBZ file
+    :param temp_extraction_dir: Temporary directory for the extraction fallback
+    :param skip_hidden: Drop hidden files and folders from the archive
+    :return: bool: True if conversion was successful
+    """
+    file_size_mb = get_file_size_mb(rar_path)
+    is_large_file = file_size_mb > (LARGE_FILE_THRESHOLD / (1024 * 1024))
+
+    if is_large_file:
+        app_logger.info(f"Processing large file ({file_size_mb:.1f}MB): {os.path.basename(rar_path)}")
+        app_logger.info("This may take several minutes. Progress updates will be provided.")
+
+    try:
+        stream_rar_to_cbz(rar_path, cbz_path, skip_hidden, is_large_file)
+        app_logger.info(f"Successfully converted: {os.path.basename(rar_path)}")
+        return True
+    except SolidArchiveError as e:
+        app_logger.info(f"{e}; extracting with unar in a single pass instead of streaming")
+    except (rarfile.Error, OSError, zipfile.BadZipFile) as e:
+        app_logger.warning(f"Streaming conversion failed for {os.path.basename(rar_path)} ({e}), falling back to unar extraction")
+        if os.path.exists(cbz_path):
+            os.remove(cbz_path)
+
+    try:
+        # Create temp directory
+        os.makedirs(temp_extraction_dir, exist_ok=True)
+
+        # Step 1: Extract RAR file
+        app_logger.info(f"Step 1/3: Extracting {os.path.basename(rar_path)}...")
+        if not extract_rar_with_unar(rar_path, temp_extraction_dir):
+            app_logger.error(f"Failed to extract any files from {os.path.basename(rar_path)}")
+            return False
+
+        _zip_extracted_folder(temp_extraction_dir, cbz_path, skip_hidden, is_large_file)
+
+        app_logger.info(f"Successfully converted: {os.path.basename(rar_path)}")
+        return True
+
+    except Exception as e:
+        app_logger.error(f"Failed to convert {os.path.basename(rar_path)}: {e}")
+        if os.path.exists(cbz_path):
+            os.remove(cbz_path)
+        return False
+
+
+def convert_rar_job(rar_path, zip_path, temp_extraction_dir):
+    """
+    Convert one RAR/CBR file, delete the original on success and clean up.
+    Runs in a conversion_pool worker process when CONVERSION_WORKERS > 1.
+
+    :return: bool: True if conversion was successful
+    """
+    try:
+        success = convert_single_rar_file(rar_path, zip_path, temp_extraction_dir)
+        if success:
+            # Delete the original RAR/CBR file.
+            os.remove(rar_path)
+        return success
+    finally:
+        # Clean up temp directory
+        if os.path.exists(temp_extraction_dir):
+            shutil.rmtree(temp_extraction_dir)
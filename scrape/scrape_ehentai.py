@@ -2,7 +2,6 @@ import os
 import ssl
 import urllib3
 import requests
-import zipfile
 import shutil
 import re
 import time
@@ -10,6 +9,7 @@ from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from requests.exceptions import RequestException, ConnectTimeout
 from app_logging import app_logger
+from archive_writer import CbzWriter
 
 # Disable warnings about unverified HTTPS requests
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -81,7 +81,7 @@ def create_cbz(folder, log_callback=None):
             counter += 1
         log(f"File already exists, using unique name: {os.path.basename(cbz_filename)}")
 
-    with zipfile.ZipFile(cbz_filename, 'w', zipfile.ZIP_DEFLATED) as cbz:
+    with CbzWriter(cbz_filename) as cbz:
         for root, _, files in os.walk(folder):
             for file in sorted(files):
                 file_path = os.path.join(root, file)
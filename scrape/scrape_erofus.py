@@ -1,7 +1,6 @@
 import os
 import re
 import time
-import zipfile
 import shutil
 import requests
 from bs4 import BeautifulSoup
@@ -9,6 +8,7 @@ from urllib.parse import urljoin, urlparse
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from app_logging import app_logger
+from archive_writer import CbzWriter
 
 BASE = "https://www.erofus.com"
 UA = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
@@ -208,7 +208,7 @@ def create_cbz(folder: str, log_callback=None):
             counter += 1
         log(f"File already exists, using unique name: {os.path.basename(cbz)}")
 
-    with zipfile.ZipFile(cbz, "w", zipfile.ZIP_DEFLATED) as z:
+    with CbzWriter(cbz) as z:
         for fname in sorted(os.listdir(folder)):
             z.write(os.path.join(folder, fname), arcname=fname)
     shutil.rmtree(folder, ignore_errors=True)
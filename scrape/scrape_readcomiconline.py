@@ -1,4 +1,4 @@
-import os, re, time, zipfile, shutil, base64
+import os, re, time, shutil, base64
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
@@ -6,6 +6,7 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from playwright.sync_api import sync_playwright
 from app_logging import app_logger
+from archive_writer import CbzWriter
 
 BASE = "https://readcomiconline.li"
 UA = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
@@ -68,7 +69,7 @@ def create_cbz(folder: str, log_callback=None):
             counter += 1
         log(f"File already exists, using unique name: {os.path.basename(cbz)}")
 
-    with zipfile.ZipFile(cbz, "w", zipfile.ZIP_DEFLATED) as z:
+    with CbzWriter(cbz) as z:
         for fname in sorted(os.listdir(folder)):
             z.write(os.path.join(folder, fname), arcname=fname)
     shutil.rmtree(folder, ignore_errors=True)
@@ -1965,7 +1965,7 @@ function initEditMode(filePath) {
     container.innerHTML = `<div class="d-flex justify-content-center my-3">
                                 <button class="btn btn-primary" type="button" disabled>
                                     <span class="spinner-grow spinner-grow-sm" role="status" aria-hidden="true"></span>
-                                    Unpacking CBZ File ...
+                                    Loading CBZ File ...
                                 </button>
                             </div>`;
 
@@ -2967,7 +2967,7 @@ function initEditMode(filePath) {
     container.innerHTML = `<div class="d-flex justify-content-center my-3">
                                 <button class="btn btn-primary" type="button" disabled>
                                     <span class="spinner-grow spinner-grow-sm" role="status" aria-hidden="true"></span>
-                                    Unpacking CBZ File ...
+                                    Loading CBZ File ...
                                 </button>
                             </div>`;
 
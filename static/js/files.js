@@ -6847,7 +6847,7 @@ function openEditModal(filePath) {
   container.innerHTML = `<div class="d-flex justify-content-center my-3">
                               <button class="btn btn-primary" type="button" disabled>
                                   <span class="spinner-grow spinner-grow-sm" role="status" aria-hidden="true"></span>
-                                  Unpacking CBZ File ...
+                                  Loading CBZ File ...
                               </button>
                           </div>`;
 
@@ -7326,7 +7326,7 @@ function performRename(input) {
           input.setAttribute('data-full-path', newPath);
         } else {
           // Update relative path for original files
-          const newRelPath = newPath.substring(newPath.indexOf('/') + 1);
+          const newRelPath = newPath.substring(document.getElementById('editInlineFolderName').value.length + 1);
           span.setAttribute('data-rel-path', newRelPath);
           input.setAttribute('data-rel-path', newRelPath);
         }
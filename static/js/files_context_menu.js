@@ -267,7 +267,31 @@ function combineSelectedFiles() {
   if (modal) modal.hide();
 
   // Show progress toast
-  showToast('Processing', 'Combining files...', 'info');
+  const progressToast = document.createElement('div');
+  progressToast.className = 'toast show position-fixed';
+  progressToast.style.cssText = 'z-index: 1200; top: 60px; right: 1rem;';
+  progressToast.innerHTML = `
+    <div class="toast-header bg-primary text-white">
+      <strong class="me-auto">Combining Files</strong>
+      <small class="combine-progress-count">0/0</small>
+    </div>
+    <div class="toast-body">
+      <div class="d-flex align-items-center">
+        <div class="spinner-border spinner-border-sm me-2" role="status">
+          <span class="visually-hidden">Loading...</span>
+        </div>
+        <span class="combine-progress-file text-truncate" style="max-width: 250px;">Starting...</span>
+      </div>
+    </div>
+  `;
+  document.body.appendChild(progressToast);
+  const progressCount = progressToast.querySelector('.combine-progress-count');
+  const progressFile = progressToast.querySelector('.combine-progress-file');
+  const removeProgressToast = () => {
+    if (progressToast.parentNode) {
+      document.body.removeChild(progressToast);
+    }
+  };
 
   fetch('/api/combine-cbz', {
     method: 'POST',
@@ -284,25 +308,57 @@ function combineSelectedFiles() {
         throw new Error(`Server error ${response.status}: ${text}`);
       });
     }
-    return response.json();
-  })
-  .then(data => {
-    if (data.success) {
-      showToast('Success', `Created ${data.output_file}`, 'success');
-      selectedFiles.clear();
-      updateSelectionBadge();
 
-      // Refresh the directory
-      if (contextMenuPanel === 'source') {
-        loadDirectories(currentSourcePath, 'source');
-      } else {
-        loadDirectories(currentDestinationPath, 'destination');
-      }
-    } else {
-      showToast('Error', data.error || 'Failed to combine files', 'error');
+    // SSE stream: progress events, then complete or error
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    function processStream() {
+      return reader.read().then(({ done, value }) => {
+        if (done) {
+          removeProgressToast();
+          return;
+        }
+
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop(); // Keep incomplete line in buffer
+
+        for (const line of lines) {
+          if (!line.startsWith('data: ')) continue;
+          const data = JSON.parse(line.slice(6));
+
+          if (data.type === 'progress') {
+            progressCount.textContent = `${data.current}/${data.total}`;
+            progressFile.textContent = data.file;
+            progressFile.title = data.file;
+          } else if (data.type === 'complete') {
+            removeProgressToast();
+            showToast('Success', `Created ${data.result.output_file}`, 'success');
+            selectedFiles.clear();
+            updateSelectionBadge();
+
+            // Refresh the directory
+            if (contextMenuPanel === 'source') {
+              loadDirectories(currentSourcePath, 'source');
+            } else {
+              loadDirectories(currentDestinationPath, 'destination');
+            }
+            return;
+          } else if (data.type === 'error') {
+            throw new Error(data.error || 'Failed to combine files');
+          }
+        }
+
+        return processStream();
+      });
     }
+
+    return processStream();
   })
   .catch(error => {
+    removeProgressToast();
     console.error('Error combining files:', error);
     showToast('Error', error.message || 'An error occurred while combining files', 'error');
   });
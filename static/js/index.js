@@ -298,7 +298,7 @@ function runScript(scriptType) {
         container.innerHTML = `<div class="d-flex justify-content-center my-3">
                                     <button class="btn btn-primary" type="button" disabled>
                                         <span class="spinner-grow spinner-grow-sm" role="status" aria-hidden="true"></span>
-                                        Unpacking CBZ File ...
+                                        Loading CBZ File ...
                                     </button>
                                 </div>`;
         fetch(`/edit?file_path=${encodeURIComponent(directoryInput)}`)